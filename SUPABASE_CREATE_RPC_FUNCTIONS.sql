@@ -0,0 +1,159 @@
+-- Create transactional functions for multi-step operations
+-- Run this in your Supabase SQL Editor
+
+-- Each function runs in a single transaction and is called from the app with
+-- supabase.rpc(), so a registration, an application submission or a user reset
+-- is one round trip and either happens completely or not at all.
+
+-- Register a user; returns {ok, message, user}
+CREATE OR REPLACE FUNCTION register_user_account(
+    p_username TEXT,
+    p_email TEXT,
+    p_password_hash TEXT,
+    p_full_name TEXT,
+    p_phone TEXT
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_user users%ROWTYPE;
+BEGIN
+    IF EXISTS (SELECT 1 FROM users WHERE email = p_email) THEN
+        RETURN jsonb_build_object('ok', false, 'message', 'User with this email already exists');
+    END IF;
+
+    INSERT INTO users (username, email, password_hash, full_name, phone)
+    VALUES (p_username, p_email, p_password_hash, p_full_name, p_phone)
+    RETURNING * INTO new_user;
+
+    RETURN jsonb_build_object(
+        'ok', true,
+        'message', 'User registered successfully',
+        'user', jsonb_build_object(
+            'id', new_user.id,
+            'username', new_user.username,
+            'email', new_user.email,
+            'full_name', new_user.full_name,
+            'phone', new_user.phone
+        )
+    );
+EXCEPTION
+    WHEN unique_violation THEN
+        RETURN jsonb_build_object('ok', false, 'message', 'User with this email or name already exists');
+END;
+$$;
+
+-- Submit an application with the selected portfolio items and personal
+-- statement summarised into its notes, plus the confirmation notification.
+-- A NULL child id means the user's most recently added child profile. Returns
+-- {ok, message, application_id, child_id}
+CREATE OR REPLACE FUNCTION submit_application_with_materials(
+    p_user_id BIGINT,
+    p_child_id BIGINT,
+    p_school_name TEXT,
+    p_school_type TEXT,
+    p_application_date DATE,
+    p_notes TEXT DEFAULT NULL,
+    p_portfolio_item_ids BIGINT[] DEFAULT NULL,
+    p_statement_id BIGINT DEFAULT NULL,
+    p_notification_title TEXT DEFAULT NULL,
+    p_notification_message TEXT DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_child_id BIGINT;
+    v_notes TEXT := COALESCE(p_notes, '');
+    v_items TEXT;
+    v_statement personal_statements%ROWTYPE;
+    v_application_id BIGINT;
+BEGIN
+    IF p_child_id IS NULL THEN
+        SELECT id INTO v_child_id FROM child_profiles
+        WHERE user_id = p_user_id ORDER BY created_at DESC, id DESC LIMIT 1;
+        IF v_child_id IS NULL THEN
+            RETURN jsonb_build_object('ok', false, 'message', 'No child profiles found. Please add a child profile first.');
+        END IF;
+    ELSE
+        SELECT id INTO v_child_id FROM child_profiles
+        WHERE id = p_child_id AND user_id = p_user_id;
+        IF v_child_id IS NULL THEN
+            RETURN jsonb_build_object('ok', false, 'message', 'Child profile not found');
+        END IF;
+    END IF;
+
+    IF p_portfolio_item_ids IS NOT NULL THEN
+        SELECT string_agg(
+                   format(E'• %s (%s) - %s\n', title, category, item_date)
+                   || CASE WHEN COALESCE(description, '') <> ''
+                           THEN format(E'  Description: %s\n', description) ELSE '' END,
+                   '' ORDER BY created_at DESC, id DESC)
+        INTO v_items
+        FROM portfolio_items
+        WHERE user_id = p_user_id AND child_id = v_child_id AND id = ANY(p_portfolio_item_ids);
+
+        IF v_items IS NOT NULL THEN
+            v_notes := v_notes || E'\n\n📋 Portfolio Items Included:\n' || v_items;
+        END IF;
+    END IF;
+
+    IF p_statement_id IS NOT NULL THEN
+        SELECT * INTO v_statement FROM personal_statements
+        WHERE id = p_statement_id AND user_id = p_user_id AND child_id = v_child_id;
+
+        IF FOUND THEN
+            v_notes := v_notes || E'\n\n📝 Personal Statement Included:\n'
+                || format(E'• %s (v%s)\n', v_statement.title, v_statement.version)
+                || CASE WHEN COALESCE(v_statement.target_school, '') <> ''
+                        THEN format(E'  Target School: %s\n', v_statement.target_school) ELSE '' END
+                || format(E'  Content: %s...\n', left(COALESCE(v_statement.content, ''), 200));
+        END IF;
+    END IF;
+
+    INSERT INTO applications (user_id, child_id, school_name, school_type, application_date, notes)
+    VALUES (p_user_id, v_child_id, p_school_name, p_school_type, p_application_date, v_notes)
+    RETURNING id INTO v_application_id;
+
+    IF p_notification_title IS NOT NULL THEN
+        INSERT INTO notifications (user_id, title, message)
+        VALUES (p_user_id, p_notification_title, COALESCE(p_notification_message, ''));
+    END IF;
+
+    RETURN jsonb_build_object(
+        'ok', true,
+        'message', 'Application submitted with ID: ' || v_application_id,
+        'application_id', v_application_id,
+        'child_id', v_child_id
+    );
+END;
+$$;
+
+-- Delete a user and everything that belongs to them (for testing);
+-- returns false if no user has the email
+CREATE OR REPLACE FUNCTION reset_user_by_email(p_email TEXT) RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_user_id BIGINT;
+BEGIN
+    SELECT id INTO v_user_id FROM users WHERE email = p_email;
+    IF v_user_id IS NULL THEN
+        RETURN false;
+    END IF;
+
+    DELETE FROM notifications WHERE user_id = v_user_id;
+    DELETE FROM notifications_archive WHERE user_id = v_user_id;
+    DELETE FROM portfolio_items WHERE user_id = v_user_id;
+    DELETE FROM personal_statements WHERE user_id = v_user_id;
+    DELETE FROM applications WHERE user_id = v_user_id;
+    DELETE FROM child_profiles WHERE user_id = v_user_id;
+    DELETE FROM application_tracking WHERE user_id = v_user_id;
+    DELETE FROM users WHERE id = v_user_id;
+    RETURN true;
+END;
+$$;
+
+-- Allow the app's anon key to call the functions
+GRANT EXECUTE ON FUNCTION register_user_account(TEXT, TEXT, TEXT, TEXT, TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION submit_application_with_materials(BIGINT, BIGINT, TEXT, TEXT, DATE, TEXT, BIGINT[], BIGINT, TEXT, TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION reset_user_by_email(TEXT) TO anon, authenticated;
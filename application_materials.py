@@ -0,0 +1,39 @@
+"""
+Application Materials
+Summarises the portfolio items and personal statement sent with an
+application into its notes. submit_application_with_materials() in
+SUPABASE_CREATE_RPC_FUNCTIONS.sql builds the same text on the server
+"""
+
+from typing import Optional, Dict, List, Iterable
+
+# Notification added when an application is submitted
+SUBMITTED_TITLE = "Application Submitted: {school_name}"
+SUBMITTED_MESSAGE = ("Your application has been submitted successfully with portfolio and personal statement. "
+                     "We will contact you soon.")
+
+
+def select_items(items: List[Dict], item_ids: Optional[Iterable[int]]) -> List[Dict]:
+    """The selected items, in the order they were fetched"""
+    if not item_ids:
+        return []
+    item_ids = set(item_ids)
+    return [item for item in items if item['id'] in item_ids]
+
+
+def materials_notes(notes: Optional[str], items: List[Dict], statement: Optional[Dict]) -> str:
+    """Application notes followed by a summary of the included materials"""
+    notes = notes or ""
+    if items:
+        notes += "\n\n📋 Portfolio Items Included:\n"
+        for item in items:
+            notes += f"• {item['title']} ({item['category']}) - {item['item_date']}\n"
+            if item.get('description'):
+                notes += f"  Description: {item['description']}\n"
+    if statement:
+        notes += "\n\n📝 Personal Statement Included:\n"
+        notes += f"• {statement['title']} (v{statement['version']})\n"
+        if statement.get('target_school'):
+            notes += f"  Target School: {statement['target_school']}\n"
+        notes += f"  Content: {(statement.get('content') or '')[:200]}...\n"
+    return notes
@@ -12,15 +12,17 @@ import os
 import time
 import logging
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 import re
-from typing import List, Dict, Optional
-import schedule
+from typing import List, Dict, Optional, Iterator
 import threading
 from dataclasses import dataclass
 import sqlite3
 from pathlib import Path
 
+from scraper_telemetry import ScrapeRun, SampledLog
+from ingestion_pipeline import SourcePlugin, JsonSnapshotSink, SQLiteSink, SCHOOL_COLUMNS, run_source
+from school_identity import SchoolIdentity
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -66,19 +68,25 @@ class SchoolDataScraper:
         self.data_dir = Path("scraped_data")
         self.data_dir.mkdir(exist_ok=True)
         
+        # Per-stage run metrics and sampled per-row logging
+        self.telemetry = ScrapeRun('auto_school_scraper', self.data_dir / "scrape_runs.jsonl")
+        self.row_log = SampledLog(logger)
+        
     def scrape_edb_kindergartens(self) -> List[SchoolData]:
         """Scrape kindergarten data from EDB website"""
         logger.info("Starting kindergarten data scraping...")
-        
-        schools = []
+        schools = list(self.iter_edb_kindergartens())
+        logger.info(f"Completed kindergarten scraping. Found {len(schools)} schools.")
+        return schools
+    
+    def iter_edb_kindergartens(self) -> Iterator[SchoolData]:
+        """Yield kindergartens from the EDB website as their pages are scraped"""
         base_url = "https://www.edb.gov.hk/en/edu-system/preprimary-kindergarten/quality-assurance-framework/kindergarten-profile/"
         
         try:
             # EDB kindergarten profile page
-            response = self.session.get(base_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.telemetry.get(self.session, base_url, 'listing_fetch', timeout=30)
+            soup = self.telemetry.parse_html(response.content)
             
             # Look for kindergarten listings
             # This is a simplified approach - you may need to adjust based on actual EDB structure
@@ -88,30 +96,31 @@ class SchoolDataScraper:
                 try:
                     school_data = self._extract_kindergarten_data(link)
                     if school_data:
-                        schools.append(school_data)
-                        logger.info(f"Scraped kindergarten: {school_data.name_en}")
+                        self.telemetry.add_items('normalize')
+                        self.row_log.info('kindergarten', "Scraped kindergarten: %s", school_data.name_en)
+                        yield school_data
                 except Exception as e:
+                    self.telemetry.add_error('normalize')
                     logger.error(f"Error scraping kindergarten {link.get('href', 'unknown')}: {e}")
                     
         except Exception as e:
             logger.error(f"Error accessing EDB kindergarten page: {e}")
-            
-        logger.info(f"Completed kindergarten scraping. Found {len(schools)} schools.")
-        return schools
     
     def scrape_edb_primary_schools(self) -> List[SchoolData]:
         """Scrape primary school data from EDB website"""
         logger.info("Starting primary school data scraping...")
-        
-        schools = []
+        schools = list(self.iter_edb_primary_schools())
+        logger.info(f"Completed primary school scraping. Found {len(schools)} schools.")
+        return schools
+    
+    def iter_edb_primary_schools(self) -> Iterator[SchoolData]:
+        """Yield primary schools from the EDB website as their pages are scraped"""
         base_url = "https://www.edb.gov.hk/en/edu-system/primary-secondary/applicable-to-primary/primary-1-admission/"
         
         try:
             # EDB primary school admission page
-            response = self.session.get(base_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.telemetry.get(self.session, base_url, 'listing_fetch', timeout=30)
+            soup = self.telemetry.parse_html(response.content)
             
             # Look for primary school listings
             school_links = soup.find_all('a', href=re.compile(r'primary.*school'))
@@ -120,16 +129,15 @@ class SchoolDataScraper:
                 try:
                     school_data = self._extract_primary_school_data(link)
                     if school_data:
-                        schools.append(school_data)
-                        logger.info(f"Scraped primary school: {school_data.name_en}")
+                        self.telemetry.add_items('normalize')
+                        self.row_log.info('primary', "Scraped primary school: %s", school_data.name_en)
+                        yield school_data
                 except Exception as e:
+                    self.telemetry.add_error('normalize')
                     logger.error(f"Error scraping primary school {link.get('href', 'unknown')}: {e}")
                     
         except Exception as e:
             logger.error(f"Error accessing EDB primary school page: {e}")
-            
-        logger.info(f"Completed primary school scraping. Found {len(schools)} schools.")
-        return schools
     
     def _extract_kindergarten_data(self, link) -> Optional[SchoolData]:
         """Extract kindergarten data from individual school page"""
@@ -138,10 +146,9 @@ class SchoolDataScraper:
             if not school_url.startswith('http'):
                 school_url = f"https://www.edb.gov.hk{school_url}"
                 
-            response = self.session.get(school_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.telemetry.get(self.session, school_url, 'detail_fetch', timeout=30)
+            soup = self.telemetry.parse_html(response.content)
+            self.telemetry.add_items('detail_fetch')
             
             # Extract school information (adjust selectors based on actual page structure)
             name_en = self._extract_text(soup, '.school-name-en') or link.get_text(strip=True)
@@ -187,10 +194,9 @@ class SchoolDataScraper:
             if not school_url.startswith('http'):
                 school_url = f"https://www.edb.gov.hk{school_url}"
                 
-            response = self.session.get(school_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.telemetry.get(self.session, school_url, 'detail_fetch', timeout=30)
+            soup = self.telemetry.parse_html(response.content)
+            self.telemetry.add_items('detail_fetch')
             
             # Extract school information (adjust selectors based on actual page structure)
             name_en = self._extract_text(soup, '.school-name-en') or link.get_text(strip=True)
@@ -244,45 +250,49 @@ class SchoolDataScraper:
         logger.info("Starting school website scraping...")
         
         for school in schools:
-            if school.website and school.has_website:
-                try:
-                    logger.info(f"Scraping website for: {school.name_en}")
-                    
-                    response = self.session.get(school.website, timeout=30)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Look for application information
-                    application_keywords = ['admission', 'application', 'enrollment', 'apply']
-                    application_links = []
-                    
-                    for link in soup.find_all('a', href=True):
-                        link_text = link.get_text(strip=True).lower()
-                        if any(keyword in link_text for keyword in application_keywords):
-                            application_links.append(link.get('href'))
-                    
-                    if application_links:
-                        # Use the first application link found
-                        if not application_links[0].startswith('http'):
-                            school.application_page = f"{school.website.rstrip('/')}/{application_links[0].lstrip('/')}"
-                        else:
-                            school.application_page = application_links[0]
-                    
-                    # Update verification status
-                    school.website_verified = True
-                    school.last_updated = datetime.now().isoformat()
-                    
-                    # Add delay to be respectful to servers
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    logger.error(f"Error scraping website for {school.name_en}: {e}")
-                    school.website_verified = False
+            self._scrape_school_website(school)
         
         logger.info("Completed school website scraping.")
         return schools
     
+    def _scrape_school_website(self, school: SchoolData) -> SchoolData:
+        """Look up one school's application page on its own website"""
+        if school.website and school.has_website:
+            try:
+                self.row_log.info('website', "Scraping website for: %s", school.name_en)
+                
+                response = self.telemetry.get(self.session, school.website, 'detail_fetch', timeout=30)
+                soup = self.telemetry.parse_html(response.content)
+                self.telemetry.add_items('detail_fetch')
+                
+                # Look for application information
+                application_keywords = ['admission', 'application', 'enrollment', 'apply']
+                application_links = []
+                
+                for link in soup.find_all('a', href=True):
+                    link_text = link.get_text(strip=True).lower()
+                    if any(keyword in link_text for keyword in application_keywords):
+                        application_links.append(link.get('href'))
+                
+                if application_links:
+                    # Use the first application link found
+                    if not application_links[0].startswith('http'):
+                        school.application_page = f"{school.website.rstrip('/')}/{application_links[0].lstrip('/')}"
+                    else:
+                        school.application_page = application_links[0]
+                
+                # Update verification status
+                school.website_verified = True
+                school.last_updated = datetime.now().isoformat()
+                
+                # Add delay to be respectful to servers
+                time.sleep(2)
+                
+            except Exception as e:
+                logger.error(f"Error scraping website for {school.name_en}: {e}")
+                school.website_verified = False
+        return school
+    
     def save_data(self, schools: List[SchoolData], filename: str):
         """Save school data to JSON file"""
         try:
@@ -377,35 +387,43 @@ class SchoolDataScraper:
         except Exception as e:
             logger.error(f"Error updating database: {e}")
     
+    def source_plugin(self, table_name: str) -> SourcePlugin:
+        """Pipeline source for one school table: EDB pages, then each school's own website"""
+        records = self.iter_edb_kindergartens if table_name == "kindergartens" else self.iter_edb_primary_schools
+        identity = SchoolIdentity(scope='kindergarten' if table_name == "kindergartens" else 'primary')
+        return SourcePlugin(table_name, records, enrich=self._scrape_school_website, identity=identity)
+    
+    def ingest(self, table_name: str) -> Dict:
+        """Stream one school table into a JSON snapshot and the database; only new or changed rows are written"""
+        database = SQLiteSink("school_portal.db", table_name, SCHOOL_COLUMNS)
+        snapshot = JsonSnapshotSink(self.data_dir / f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        return run_source(self.source_plugin(table_name), [snapshot, database],
+                          telemetry=self.telemetry, diff_against=database)
+    
     def run_full_scrape(self):
         """Run complete scraping process for both kindergarten and primary schools"""
         logger.info("Starting full school data scraping process...")
         
         start_time = datetime.now()
+        self.telemetry.start()
         
         try:
-            # Scrape kindergarten data
-            kindergartens = self.scrape_edb_kindergartens()
-            if kindergartens:
-                kindergartens = self.scrape_school_websites(kindergartens)
-                self.save_data(kindergartens, f"kindergartens_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                self.update_database(kindergartens, "kindergartens")
-            
-            # Scrape primary school data
-            primary_schools = self.scrape_edb_primary_schools()
-            if primary_schools:
-                primary_schools = self.scrape_school_websites(primary_schools)
-                self.save_data(primary_schools, f"primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                self.update_database(primary_schools, "primary_schools")
+            kindergartens = self.ingest("kindergartens")
+            primary_schools = self.ingest("primary_schools")
             
             end_time = datetime.now()
             duration = end_time - start_time
+            total = kindergartens['records'] + primary_schools['records']
             
             logger.info(f"Full scraping completed in {duration}")
-            logger.info(f"Total schools scraped: {len(kindergartens) + len(primary_schools)}")
+            logger.info(f"Total schools scraped: {total}")
+            self.telemetry.finish('ok', schools=total,
+                                  new=kindergartens['new'] + primary_schools['new'],
+                                  changed=kindergartens['changed'] + primary_schools['changed'])
             
         except Exception as e:
             logger.error(f"Error in full scraping process: {e}")
+            self.telemetry.finish('error', error=str(e))
 
 def run_scheduled_scrape():
     """Function to run scheduled scraping"""
@@ -413,20 +431,10 @@ def run_scheduled_scrape():
     scraper.run_full_scrape()
 
 def start_scheduler():
-    """Start the scheduler to run scraping nightly"""
-    logger.info("Starting school data scraper scheduler...")
-    
-    # Schedule scraping to run every night at 2 AM
-    schedule.every().day.at("02:00").do(run_scheduled_scrape)
-    
-    # Also run immediately for testing
-    schedule.every().day.at("14:00").do(run_scheduled_scrape)
-    
-    logger.info("Scheduler started. Scraping will run nightly at 2 AM and 2 PM for testing.")
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    """Run the nightly 2 AM scrape, with monitoring and cleanup, until interrupted"""
+    from job_scheduler import Job
+    from scheduled_jobs import run_scheduler
+    run_scheduler(Job('auto_school_scrape', 'auto_school_scraper:run_scheduled_scrape', at="02:00", jitter=600))
 
 if __name__ == "__main__":
     import argparse
@@ -444,18 +452,10 @@ if __name__ == "__main__":
     if args.run_now:
         if args.kindergarten_only:
             logger.info("Running kindergarten scraping only...")
-            kindergartens = scraper.scrape_edb_kindergartens()
-            if kindergartens:
-                kindergartens = scraper.scrape_school_websites(kindergartens)
-                scraper.save_data(kindergartens, f"kindergartens_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                scraper.update_database(kindergartens, "kindergartens")
+            scraper.ingest("kindergartens")
         elif args.primary_only:
             logger.info("Running primary school scraping only...")
-            primary_schools = scraper.scrape_edb_primary_schools()
-            if primary_schools:
-                primary_schools = scraper.scrape_school_websites(primary_schools)
-                scraper.save_data(primary_schools, f"primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                scraper.update_database(primary_schools, "primary_schools")
+            scraper.ingest("primary_schools")
         else:
             scraper.run_full_scrape()
     
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Database Benchmark Suite
+Times every public method of DatabaseManager, CloudDatabaseManager (local
+SQLite) and SupabaseDatabaseManager (in-process fake client) against a
+synthetic dataset, and appends the results to a JSON history file so
+regressions show up between commits. The fake client can simulate network
+latency and failures, and counts the requests each call makes
+"""
+
+import argparse
+import inspect
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from synthetic_data import generate_dataset, seed_sqlite_schools, seed_supabase_schools, seed_users
+
+DEFAULT_HISTORY_FILE = os.path.join(REPO_DIR, "benchmark_history.json")
+BACKENDS = ['database', 'cloud_local', 'supabase_fake']
+
+# A method is a regression if its median got this much slower than the last
+# comparable run (and by more than the noise floor)
+DEFAULT_REGRESSION_THRESHOLD = 1.25
+NOISE_FLOOR_MS = 0.05
+
+# Public methods that are not per-request operations
+SKIPPED_METHODS = {
+    'close_connection': "closes the connection under test",
+    'migrate_from_sqlite': "one-off migration, benchmarked by its own tool",
+}
+
+# Run order: reads first so they see the seeded data, destructive calls last
+PHASES = [
+    ('read', ('get_', 'fetch_', 'verify_', 'login_', 'user_exists', 'hash_', 'is_', 'db_')),
+    ('create', ('create_', 'add_', 'register_', 'submit_', 'init_')),
+    ('update', ('update_', 'mark_', 'set_', 'sync_')),
+    ('delete', ('delete_', 'remove_', 'reset_')),
+]
+
+
+def phase_of(method_name: str) -> int:
+    for index, (_, prefixes) in enumerate(PHASES):
+        if method_name.startswith(prefixes):
+            return index
+    return len(PHASES)
+
+
+def public_methods(manager) -> List[str]:
+    """Public callables defined on the manager's class, in benchmark order"""
+    names = [
+        name for name, member in inspect.getmembers(type(manager))
+        if not name.startswith('_') and inspect.isfunction(member)
+    ]
+    return sorted(names, key=lambda name: (phase_of(name), name))
+
+
+class BenchmarkContext:
+    """Supplies arguments by parameter name and creates rows for destructive calls"""
+
+    def __init__(self, manager, seeded: List[Dict[str, Any]], dataset: Dict[str, Any]):
+        self.manager = manager
+        self.user = seeded[0]
+        self.dataset = dataset
+        self.counter = 0
+        school = (dataset['kindergartens'] or [{'school_no': 'K00001', 'name_en': 'School'}])[0]
+        self.values = {
+            'user_id': self.user['user_id'],
+            'child_id': self.user['child_ids'][0],
+            'email': self.user['email'],
+            'password': 'password123',
+            'new_password': 'password123',
+            'password_hash': 'x' * 64,
+            'hashed': 'x' * 64,
+            'name': 'Benchmark User',
+            'username': 'Benchmark User',
+            'full_name': 'Benchmark User',
+            'phone': '+852 1234 5678',
+            'child_name': 'Benchmark Child',
+            'date_of_birth': '2020-01-01',
+            'gender': 'Female',
+            'school_no': school['school_no'],
+            'school_name': school['name_en'],
+            'school_type': 'kindergarten',
+            'application_date': '2025-09-01',
+            'preferred_start_date': '2025-09-01',
+            'parent_name': 'Benchmark Parent',
+            'parent_email': self.user['email'],
+            'parent_phone': '+852 1234 5678',
+            'title': 'Benchmark title',
+            'message': 'Benchmark message',
+            'description': 'Benchmark description',
+            'content': 'Benchmark content',
+            'category': 'Art Work',
+            'item_date': '2024-01-01',
+            'status': 'tracking',
+            'reads': {
+                'children': ('get_child_profiles', self.user['user_id']),
+                'portfolio': ('get_portfolio_items', self.user['user_id']),
+                'statements': ('get_personal_statements', self.user['user_id']),
+            },
+        }
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}-{int(time.time() * 1000)}"
+
+    def _latest_id(self, rows: List[Dict]) -> Optional[int]:
+        ids = [row['id'] for row in rows if isinstance(row, dict) and row.get('id') is not None]
+        return max(ids) if ids else None
+
+    def prepare(self, method_name: str) -> Dict[str, Any]:
+        """Per-call argument overrides; creates the row a destructive call consumes"""
+        m = self.manager
+        user_id = self.user['user_id']
+        child_id = self.user['child_ids'][0]
+
+        if method_name in ('register_user', 'create_user'):
+            name = self.unique('bench-')
+            return {'email': name + '@example.com', 'name': name, 'username': name}
+        if method_name == 'update_user_profile':
+            # Optional on the cloud managers; without them the call is a no-op
+            return {'full_name': 'Benchmark User', 'phone': '+852 1234 5678'}
+        if method_name == 'reset_user_by_email':
+            email = self.unique('bench-reset-') + '@example.com'
+            m.register_user('Reset Me', email, '+852 0000 0000', 'password123')
+            return {'email': email}
+        if method_name in ('update_portfolio_item', 'delete_portfolio_item'):
+            m.add_portfolio_item(user_id, child_id, 'Temp item', 'Temp', 'Other', '2024-01-01')
+            return {'item_id': self._latest_id(m.get_portfolio_items(user_id))}
+        if method_name in ('update_personal_statement', 'delete_personal_statement'):
+            m.add_personal_statement(user_id, child_id, 'Temp statement', 'Temp content')
+            return {'statement_id': self._latest_id(m.get_personal_statements(user_id))}
+        if method_name in ('update_child_profile', 'delete_child_profile'):
+            m.add_child_profile(user_id, 'Temp Child', '2020-01-01', 'Male')
+            return {'child_id': self._latest_id(m.get_child_profiles(user_id))}
+        if method_name == 'mark_notification_read':
+            m.add_notification(user_id, 'Temp', 'Temp message')
+            return {'notification_id': self._latest_id(m.get_notifications(user_id))}
+        if method_name == 'remove_from_tracker':
+            school_no = self.unique('BENCH-')
+            m.add_to_tracker(user_id, school_no, 'Benchmark School')
+            return {'school_no': school_no}
+        return {}
+
+    def build_call(self, method: Callable, overrides: Dict[str, Any]):
+        """Positional/keyword args for the required parameters of method"""
+        kwargs = {}
+        for param in inspect.signature(method).parameters.values():
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+            if param.name in overrides:
+                kwargs[param.name] = overrides[param.name]
+            elif param.default is not param.empty:
+                continue
+            elif param.name in self.values:
+                kwargs[param.name] = self.values[param.name]
+            else:
+                raise KeyError(param.name)
+        return kwargs
+
+
+def time_method(context: BenchmarkContext, method_name: str, repeat: int) -> Dict[str, Any]:
+    """Call one method `repeat` times and summarize the latencies"""
+    method = getattr(context.manager, method_name)
+    timings = []
+    rows = None
+    errors = 0
+    client = getattr(context.manager, 'supabase', None)
+    counts_requests = hasattr(client, 'request_count')
+    requests = 0
+    for _ in range(repeat):
+        overrides = context.prepare(method_name)
+        try:
+            kwargs = context.build_call(method, overrides)
+        except KeyError as e:
+            return {'skipped': f"no benchmark value for parameter '{e.args[0]}'"}
+
+        requests_before = client.request_count if counts_requests else 0
+        start = time.perf_counter()
+        try:
+            result = method(**kwargs)
+        except Exception:
+            errors += 1
+            result = None
+        timings.append((time.perf_counter() - start) * 1000)
+        if counts_requests:
+            requests += client.request_count - requests_before
+        if isinstance(result, list):
+            rows = len(result)
+
+    timings.sort()
+    return {
+        'calls': len(timings),
+        'min_ms': round(timings[0], 4),
+        'median_ms': round(statistics.median(timings), 4),
+        'mean_ms': round(statistics.mean(timings), 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'rows': rows,
+        'errors': errors,
+        'requests_per_call': round(requests / len(timings), 2) if counts_requests else None,
+    }
+
+
+class _PassThroughCache:
+    """UserDataCache stand-in that never hits, so reads always reach SQLite"""
+
+    def get(self, *args, **kwargs):
+        return None
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def invalidate(self, *args, **kwargs):
+        pass
+
+    def invalidate_row(self, *args, **kwargs):
+        return []
+
+    def invalidate_entity(self, *args, **kwargs):
+        pass
+
+    def invalidate_user(self, *args, **kwargs):
+        pass
+
+
+def build_manager(backend: str, dataset: Dict[str, Any], with_cache: bool, network: Dict[str, float] = None):
+    """Create and seed a manager for the backend inside the current directory"""
+    if backend == 'database':
+        from database import DatabaseManager
+        manager = DatabaseManager("benchmark.db")
+        # DatabaseManager switches to :memory: when Streamlit is importable,
+        # which would give every call a fresh empty database
+        manager.db_path = os.path.abspath("benchmark.db")
+        manager.init_database()
+        import sqlite3
+        with sqlite3.connect(manager.db_path) as conn:
+            seed_sqlite_schools(conn, dataset)
+
+    elif backend == 'cloud_local':
+        from database_cloud import CloudDatabaseManager
+        manager = CloudDatabaseManager(storage_type="local")
+        seed_sqlite_schools(manager.conn, dataset)
+        if not with_cache:
+            # Measure the backend, not the session cache
+            manager.user_cache = _PassThroughCache()
+
+    elif backend == 'supabase_fake':
+        from database_supabase import SupabaseDatabaseManager
+        from supabase_fake import FakeSupabaseClient
+        manager = SupabaseDatabaseManager.__new__(SupabaseDatabaseManager)
+        manager.supabase = FakeSupabaseClient()
+        seed_supabase_schools(manager.supabase, dataset)
+
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    seeded = seed_users(manager, dataset)
+    if not seeded:
+        raise RuntimeError("seeding produced no users")
+    if backend == 'supabase_fake' and network:
+        # Seed at full speed, then time the calls under the simulated network
+        manager.supabase.set_network(**network)
+    return manager, seeded
+
+
+def run_backend(backend: str, dataset: Dict[str, Any], repeat: int, with_cache: bool,
+                network: Dict[str, float] = None) -> Dict[str, Any]:
+    """Benchmark every public method of one backend in a scratch directory"""
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f"bench_{backend}_") as workdir:
+        os.chdir(workdir)
+        try:
+            seed_start = time.perf_counter()
+            manager, seeded = build_manager(backend, dataset, with_cache, network)
+            seed_seconds = time.perf_counter() - seed_start
+
+            context = BenchmarkContext(manager, seeded, dataset)
+            results = {}
+            for method_name in public_methods(manager):
+                if method_name in SKIPPED_METHODS:
+                    results[method_name] = {'skipped': SKIPPED_METHODS[method_name]}
+                    continue
+                results[method_name] = time_method(context, method_name, repeat)
+
+            if hasattr(manager, 'close_connection') and getattr(manager, 'conn', None):
+                manager.close_connection()
+            return {'seed_seconds': round(seed_seconds, 3), 'methods': results}
+        finally:
+            os.chdir(previous_dir)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_regressions(history: List[Dict[str, Any]], run: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Compare medians with the last run that used the same dataset parameters"""
+    baseline = next((entry for entry in reversed(history) if entry['params'] == run['params']), None)
+    if not baseline:
+        return []
+
+    regressions = []
+    for backend, result in run['backends'].items():
+        old_methods = baseline['backends'].get(backend, {}).get('methods', {})
+        for method_name, stats in result.get('methods', {}).items():
+            old = old_methods.get(method_name, {})
+            if 'median_ms' not in stats or 'median_ms' not in old:
+                continue
+            if stats['median_ms'] - old['median_ms'] < NOISE_FLOOR_MS:
+                continue
+            if old['median_ms'] > 0 and stats['median_ms'] / old['median_ms'] > threshold:
+                regressions.append({
+                    'backend': backend,
+                    'method': method_name,
+                    'baseline_ms': old['median_ms'],
+                    'current_ms': stats['median_ms'],
+                    'baseline_commit': baseline.get('commit'),
+                })
+    return regressions
+
+
+def print_report(run: Dict[str, Any], regressions: List[Dict[str, Any]]):
+    for backend, result in run['backends'].items():
+        print(f"\n=== {backend} ===")
+        if 'error' in result:
+            print(f"  unavailable: {result['error']}")
+            continue
+        print(f"  seeded in {result['seed_seconds']}s")
+        for method_name, stats in result['methods'].items():
+            if 'skipped' in stats:
+                print(f"  {method_name:<32} skipped ({stats['skipped']})")
+            else:
+                rows = f" rows={stats['rows']}" if stats['rows'] is not None else ""
+                errors = f" errors={stats['errors']}" if stats['errors'] else ""
+                requests = f" requests={stats['requests_per_call']}" if stats.get('requests_per_call') else ""
+                print(f"  {method_name:<32} median {stats['median_ms']:>9.3f} ms  p95 {stats['p95_ms']:>9.3f} ms"
+                      f"{rows}{errors}{requests}")
+
+    if regressions:
+        print("\n⚠️ Regressions:")
+        for r in regressions:
+            print(f"  {r['backend']}.{r['method']}: {r['baseline_ms']} ms -> {r['current_ms']} ms "
+                  f"(baseline {r['baseline_commit']})")
+    else:
+        print("\n✅ No regressions against the previous comparable run")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the database managers on synthetic data")
+    parser.add_argument("--schools", type=int, default=500, help="Schools per level (N)")
+    parser.add_argument("--users", type=int, default=50, help="Users (M)")
+    parser.add_argument("--per-user", type=int, default=10,
+                        help="Tracked schools/notifications/portfolio items/statements per user (K)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per method")
+    parser.add_argument("--backends", default=','.join(BACKENDS), help="Comma-separated backends")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the per-session cache enabled")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="JSON history file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="Median slowdown ratio reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if a regression is found")
+    parser.add_argument("--no-save", action="store_true", help="Do not append this run to the history")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated latency per supabase_fake request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- spread of the simulated latency")
+    parser.add_argument("--failure-rate", type=float, default=0,
+                        help="Share of supabase_fake requests that fail with a 503")
+    args = parser.parse_args(argv)
+
+    network = {'latency': args.latency_ms / 1000, 'jitter': args.jitter_ms / 1000, 'failure_rate': args.failure_rate}
+
+    dataset = generate_dataset(args.schools, args.users, args.per_user)
+    run = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'params': dict(dataset['params'], repeat=args.repeat, with_cache=args.with_cache),
+        'backends': {},
+    }
+
+    if any(network.values()):
+        # Only runs under the same simulated network are comparable
+        run['params'].update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate)
+
+    for backend in [b.strip() for b in args.backends.split(',') if b.strip()]:
+        print(f"Benchmarking {backend}...")
+        try:
+            run['backends'][backend] = run_backend(backend, dataset, args.repeat, args.with_cache, network)
+        except Exception as e:
+            run['backends'][backend] = {'error': f"{type(e).__name__}: {e}"}
+
+    history = load_history(args.history)
+    regressions = find_regressions(history, run, args.threshold)
+    run['regressions'] = regressions
+    print_report(run, regressions)
+
+    if not args.no_save:
+        history.append(run)
+        with open(args.history, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+        print(f"\nResults appended to {args.history}")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Page Render Benchmark
+Drives streamlit_app.py headlessly with Streamlit's AppTest harness and
+records script run time, element count and database call count for every
+page, logged out and logged in, at several synthetic dataset sizes
+"""
+
+import argparse
+import functools
+import inspect
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from database_cloud import CloudDatabaseManager
+from synthetic_data import generate_dataset, seed_sqlite_schools, seed_users
+
+APP_FILE = os.path.join(REPO_DIR, "streamlit_app.py")
+
+# Pages dispatched by main() in streamlit_app.py
+PAGES = [
+    'home', 'kindergartens', 'primary_schools', 'analytics', 'tracker',
+    'notifications', 'applications', 'portfolio', 'personal_statements', 'profile',
+]
+
+# (schools per level, users, rows per user)
+DATASET_SIZES = {
+    'small': (100, 5, 5),
+    'medium': (1000, 50, 20),
+    'large': (5000, 200, 50),
+}
+
+DEFAULT_TIMEOUT = 120
+
+
+class DBCallCounter:
+    """Counts CloudDatabaseManager method calls and SQL statements during a run"""
+
+    def __init__(self):
+        self.method_calls = 0
+        self.sql_statements = 0
+        self._installed = False
+
+    def reset(self):
+        self.method_calls = 0
+        self.sql_statements = 0
+
+    def _count_sql(self, statement: str):
+        self.sql_statements += 1
+
+    def install(self):
+        """Wrap the manager class in place; the app imports the same module object"""
+        if self._installed:
+            return
+        counter = self
+
+        for name, member in list(vars(CloudDatabaseManager).items()):
+            if name.startswith('_') or not inspect.isfunction(member):
+                continue
+
+            def make_wrapper(func):
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    counter.method_calls += 1
+                    return func(*args, **kwargs)
+                return wrapper
+
+            setattr(CloudDatabaseManager, name, make_wrapper(member))
+
+        original_init = CloudDatabaseManager.__init__
+
+        @functools.wraps(original_init)
+        def init_with_trace(manager, *args, **kwargs):
+            original_init(manager, *args, **kwargs)
+            if getattr(manager, 'conn', None) is not None:
+                manager.conn.set_trace_callback(counter._count_sql)
+
+        CloudDatabaseManager.__init__ = init_with_trace
+        self._installed = True
+
+
+def count_elements(node) -> int:
+    """Number of leaf elements under an AppTest node"""
+    children = getattr(node, 'children', None)
+    if not children:
+        return 1
+    return sum(count_elements(child) for child in children.values())
+
+
+def seed_app_database(dataset: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Seed school_portal.db in the current directory the way the app reads it
+
+    Returns the session user dict of the first seeded user.
+    """
+    manager = CloudDatabaseManager(storage_type="local")
+    seed_sqlite_schools(manager.conn, dataset)
+    seeded = seed_users(manager, dataset)
+    success, _, user = manager.login_user(seeded[0]['email'], 'password123')
+    manager.close_connection()
+    if not success:
+        raise RuntimeError("Seeded user could not log in")
+    return user
+
+
+def run_page(page: str, user: Optional[Dict[str, Any]], counter: DBCallCounter,
+             repeat: int, timeout: int) -> Dict[str, Any]:
+    """Render one page `repeat` times in a fresh AppTest session"""
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    at.session_state['current_page'] = page
+    if user:
+        at.session_state['user_logged_in'] = True
+        at.session_state['current_user'] = user
+
+    timings, method_calls, sql_statements = [], [], []
+    for _ in range(repeat):
+        counter.reset()
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        method_calls.append(counter.method_calls)
+        sql_statements.append(counter.sql_statements)
+
+    return {
+        'median_ms': round(statistics.median(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'elements': count_elements(at.main) + count_elements(at.sidebar),
+        'db_calls': int(statistics.median(method_calls)),
+        'sql_statements': int(statistics.median(sql_statements)),
+        'exception': at.exception[0].message if at.exception else None,
+    }
+
+
+def benchmark_size(size: str, counter: DBCallCounter, repeat: int, timeout: int) -> Dict[str, Any]:
+    """Seed one dataset size in a scratch directory and render every page against it"""
+    n_schools, n_users, k = DATASET_SIZES[size]
+    dataset = generate_dataset(n_schools, n_users, k)
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f"bench_pages_{size}_") as workdir:
+        os.chdir(workdir)
+        try:
+            user = seed_app_database(dataset)
+
+            # The school lists are st.cache_data'd; start each size cold
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            cold = run_page('home', None, counter, 1, timeout)
+
+            results = {'logged_out': {}, 'logged_in': {}}
+            for page in PAGES:
+                print(f"  {size}: {page}")
+                results['logged_out'][page] = run_page(page, None, counter, repeat, timeout)
+                results['logged_in'][page] = run_page(page, user, counter, repeat, timeout)
+        finally:
+            os.chdir(previous_dir)
+
+    return {
+        'params': dataset['params'],
+        'cold_start_ms': cold['median_ms'],
+        'pages': results,
+    }
+
+
+def print_report(results: Dict[str, Any]):
+    for size, result in results.items():
+        print(f"\n=== {size} {result['params']} — cold start {result['cold_start_ms']} ms ===")
+        print(f"  {'page':<22}{'state':<12}{'median ms':>11}{'elements':>10}{'db calls':>10}{'sql':>8}")
+        for state in ('logged_out', 'logged_in'):
+            for page, stats in result['pages'][state].items():
+                flag = f"  ⚠️ {stats['exception']}" if stats['exception'] else ""
+                print(f"  {page:<22}{state:<12}{stats['median_ms']:>11.1f}{stats['elements']:>10}"
+                      f"{stats['db_calls']:>10}{stats['sql_statements']:>8}{flag}")
+
+    # Which page degrades first as the data grows
+    sizes = list(results.keys())
+    if len(sizes) > 1:
+        first, last = results[sizes[0]], results[sizes[-1]]
+        growth = []
+        for state in ('logged_out', 'logged_in'):
+            for page, stats in last['pages'][state].items():
+                base = first['pages'][state][page]['median_ms']
+                if base > 0:
+                    growth.append((stats['median_ms'] / base, page, state))
+        growth.sort(reverse=True)
+        print(f"\nSlowdown from {sizes[0]} to {sizes[-1]}:")
+        for ratio, page, state in growth[:5]:
+            print(f"  {page} ({state}): {ratio:.1f}x")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark streamlit_app.py pages with AppTest")
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"Comma-separated dataset sizes ({', '.join(DATASET_SIZES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Reruns per page")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Seconds allowed per script run")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in DATASET_SIZES]
+    if unknown:
+        parser.error(f"Unknown dataset size(s): {', '.join(unknown)}")
+
+    counter = DBCallCounter()
+    counter.install()
+
+    results = {}
+    for size in sizes:
+        print(f"Benchmarking pages with the {size} dataset...")
+        results[size] = benchmark_size(size, counter, args.repeat, args.timeout)
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'timestamp': datetime.now().isoformat(), 'results': results}, f, indent=2, ensure_ascii=False)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+HTML Parsing Benchmark
+Compares the scrapers' old full html.parser parse against lxml and the
+targeted ParsedPage from html_parsing on the saved backend pages, and times
+batch parsing with and without the process pool
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+from bs4 import BeautifulSoup
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from html_parsing import PARSER_FEATURES, LISTING_CLASS_PATTERN, ParsedPage, parse_pages
+
+SAMPLE_PAGES = [
+    os.path.join(REPO_DIR, "backend", "kg_page.html"),
+    os.path.join(REPO_DIR, "backend", "spacious_page.html"),
+]
+
+
+def mine_full(content, features: str) -> Dict[str, int]:
+    """What the scrapers did: one full parse, then whole-tree searches"""
+    soup = BeautifulSoup(content, features)
+    return {
+        'tables': len(soup.find_all('table')),
+        'links': len(soup.find_all('a', href=True)),
+        'listings': len(soup.find_all(['div', 'li'], class_=LISTING_CLASS_PATTERN)),
+    }
+
+
+def mine_page(content, targets) -> Dict[str, int]:
+    """Same searches through a ParsedPage declared for the given targets"""
+    page = ParsedPage(content, targets=targets)
+    return {target: len(getattr(page, target)) for target in targets}
+
+
+def time_it(func: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def benchmark_page(path: str, repeat: int):
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    variants = {
+        'html.parser full': lambda: mine_full(content, 'html.parser'),
+        f'{PARSER_FEATURES} full': lambda: mine_full(content, PARSER_FEATURES),
+        'page (all targets)': lambda: mine_page(content, ('tables', 'links', 'listings')),
+        'page (tables, links)': lambda: mine_page(content, ('tables', 'links')),
+        'page (listings)': lambda: mine_page(content, ('listings',)),
+    }
+
+    baseline_counts = mine_full(content, 'html.parser')
+    print(f"\n=== {os.path.basename(path)} ({len(content) / 1024:.0f} KB) ===")
+    print(f"  found {baseline_counts}")
+    baseline_ms = None
+    for name, func in variants.items():
+        counts = func()
+        ms = time_it(func, repeat)
+        baseline_ms = baseline_ms or ms
+        expected = {target: baseline_counts[target] for target in counts}
+        mismatch = "" if counts == expected else f"  ⚠️ counts differ: {counts}"
+        print(f"  {name:<22} {ms:>8.2f} ms  {baseline_ms / ms:>5.1f}x{mismatch}")
+
+
+def benchmark_batch(paths: List[str], copies: int, workers: int):
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    batch = contents * copies
+
+    print(f"\n=== batch of {len(batch)} pages ===")
+    start = time.perf_counter()
+    parse_pages(batch, ('tables', 'links', 'listings'), max_workers=1)
+    sequential = time.perf_counter() - start
+    print(f"  sequential           {sequential:>8.2f} s")
+
+    start = time.perf_counter()
+    parse_pages(batch, ('tables', 'links', 'listings'), max_workers=workers)
+    pooled = time.perf_counter() - start
+    print(f"  process pool ({workers or os.cpu_count()} workers) {pooled:>6.2f} s  {sequential / pooled:>5.1f}x")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the shared HTML parsing layer")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed parses per variant")
+    parser.add_argument("--batch-copies", type=int, default=10, help="Copies of each page in the batch test (0 to skip)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    pages = [path for path in SAMPLE_PAGES if os.path.exists(path)]
+    if not pages:
+        print("No sample pages found under backend/")
+        return 1
+
+    for path in pages:
+        benchmark_page(path, args.repeat)
+    if args.batch_copies:
+        benchmark_batch(pages, args.batch_copies, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
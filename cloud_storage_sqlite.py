@@ -7,6 +7,8 @@ import sqlite3
 import os
 import tempfile
 import shutil
+import glob
+import time
 from datetime import datetime
 from typing import Optional, Dict, Any
 import streamlit as st
@@ -22,13 +24,33 @@ except ImportError:
     GOOGLE_DRIVE_AVAILABLE = False
     print("Google Drive API not available. Install with: pip install google-auth-oauthlib google-auth-httplib2 google-api-python-client")
 
+from drive_changelog import DriveChangeLog, segment_prefix, SEGMENT_MIME_TYPE
+from sqlite_snapshot import create_snapshot, decompress_file, file_md5, get_snapshot_settings
+
+# Verified copies of Drive databases survive restarts here and are reused
+# while the remote file is unchanged; sessions work on private copies of them
+DRIVE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "school_portal_drive_cache")
+
+# Session state key of the session's working copy, reused across reruns
+# while the cached database it was copied from is unchanged
+SESSION_COPY_KEY = 'drive_working_copy'
+
+# Working copies older than this process belong to sessions that are gone
+PROCESS_STARTED = time.time()
+_swept_file_ids = set()
+
+# Download in fixed-size chunks straight to disk instead of buffering in memory
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
 class CloudSQLiteManager:
-    def __init__(self, db_name: str = "school_portal.db"):
+    def __init__(self, db_name: str = "school_portal.db", cache_dir: str = DRIVE_CACHE_DIR):
         self.db_name = db_name
         self.temp_db_path = None
         self.drive_service = None
         self.file_id = None
         self.folder_id = None
+        self.cache_dir = cache_dir
+        self.change_log: Optional[DriveChangeLog] = None
         
         # Initialize Google Drive connection
         self._init_google_drive()
@@ -117,10 +139,6 @@ class CloudSQLiteManager:
             conn = sqlite3.connect(':memory:')
             conn.close()
             
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as tmp_file:
-                self.temp_db_path = tmp_file.name
-            
             # Upload to Google Drive
             file_metadata = {
                 'name': self.db_name,
@@ -141,67 +159,237 @@ class CloudSQLiteManager:
             ).execute()
             
             self.file_id = file.get('id')
+            
+            # Start from an empty database in the cache
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_path = self._local_cache_path()
+            open(cache_path, 'wb').close()
+            self._write_cache_metadata({'md5Checksum': file_md5(cache_path)})
+            self.temp_db_path = self._session_working_copy()
+            
             st.success(f"Created new database file: {self.db_name}")
             
         except Exception as e:
             st.error(f"Error creating database file: {str(e)}")
     
+    def _local_cache_path(self) -> str:
+        """Path of the verified copy of the Drive file; never opened for writing"""
+        return os.path.join(self.cache_dir, f"{self.file_id}.db")
+    
+    def _new_working_copy(self) -> str:
+        """Copy the cached database to a file private to one connection"""
+        fd, path = tempfile.mkstemp(prefix=f"{self.file_id}-", suffix='.db', dir=self.cache_dir)
+        os.close(fd)
+        shutil.copyfile(self._local_cache_path(), path)
+        return path
+    
+    def _session_working_copy(self) -> str:
+        """
+        This session's working copy, made once and reused on every rerun
+        
+        A new copy replaces it when the cache has moved to another revision.
+        Outside a Streamlit session every call gets a new copy, which
+        close_connection() removes.
+        """
+        self._sweep_orphaned_copies()
+        base_md5 = self._read_cache_metadata().get('local_md5')
+        try:
+            record = st.session_state.get(SESSION_COPY_KEY)
+        except Exception:
+            # Not running inside a Streamlit session (scripts, tests)
+            return self._new_working_copy()
+        
+        if record and record.get('file_id') == self.file_id and os.path.exists(record['path']):
+            if record.get('base_md5') == base_md5:
+                return record['path']
+            os.unlink(record['path'])
+        
+        path = self._new_working_copy()
+        st.session_state[SESSION_COPY_KEY] = {'file_id': self.file_id, 'path': path, 'base_md5': base_md5}
+        return path
+    
+    def _is_session_copy(self, path: str) -> bool:
+        try:
+            record = st.session_state.get(SESSION_COPY_KEY)
+        except Exception:
+            return False
+        return bool(record) and record.get('path') == path
+    
+    def _sweep_orphaned_copies(self):
+        """Once per process, delete working copies left behind by earlier processes"""
+        if self.file_id in _swept_file_ids:
+            return
+        _swept_file_ids.add(self.file_id)
+        for path in glob.glob(os.path.join(self.cache_dir, f"{self.file_id}-*.db")):
+            try:
+                if os.path.getmtime(path) < PROCESS_STARTED:
+                    os.unlink(path)
+            except OSError:
+                pass
+    
+    def _cache_metadata_path(self) -> str:
+        """Path of the metadata describing which remote revision is cached"""
+        return os.path.join(self.cache_dir, f"{self.file_id}.meta.json")
+    
+    def _read_cache_metadata(self) -> Dict[str, Any]:
+        """Load cached md5Checksum/modifiedTime, or an empty dict"""
+        try:
+            with open(self._cache_metadata_path(), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _write_cache_metadata(self, metadata: Dict[str, Any], local_md5: str = None):
+        """
+        Persist which remote revision the cached copy corresponds to
+        
+        local_md5 is the checksum of the uncompressed cached copy; it differs
+        from md5Checksum when the remote file is a compressed snapshot. The
+        cached file's size and mtime are recorded so later connections can
+        confirm it is untouched without hashing it again.
+        """
+        stat = os.stat(self._local_cache_path())
+        path = self._cache_metadata_path()
+        with open(path + '.tmp', 'w') as f:
+            json.dump({
+                'md5Checksum': metadata.get('md5Checksum'),
+                'modifiedTime': metadata.get('modifiedTime'),
+                'size': metadata.get('size'),
+                'local_md5': local_md5 or metadata.get('md5Checksum'),
+                'cache_size': stat.st_size,
+                'cache_mtime_ns': stat.st_mtime_ns
+            }, f)
+        os.replace(path + '.tmp', path)
+    
+    def _get_remote_metadata(self) -> Dict[str, Any]:
+        """Fetch checksum, modification time and compression of the Drive file"""
+        return self.drive_service.files().get(
+            fileId=self.file_id,
+            fields='md5Checksum, modifiedTime, size, appProperties'
+        ).execute()
+    
+    @staticmethod
+    def _remote_compression(remote: Dict[str, Any]) -> str:
+        """Compression recorded on the Drive file by upload_database()"""
+        return (remote.get('appProperties') or {}).get('compression', 'none')
+    
+    def _is_cache_current(self, remote: Dict[str, Any]) -> bool:
+        """True if the cached copy is the remote revision and has not been touched since"""
+        try:
+            stat = os.stat(self._local_cache_path())
+        except OSError:
+            return False
+        
+        cached = self._read_cache_metadata()
+        remote_md5 = remote.get('md5Checksum')
+        if not remote_md5 or cached.get('md5Checksum') != remote_md5:
+            return False
+        return (cached.get('cache_size') == stat.st_size
+                and cached.get('cache_mtime_ns') == stat.st_mtime_ns)
+    
+    def _install_cache(self, raw_path: str, metadata: Dict[str, Any], local_md5: str):
+        """Swap a verified, uncompressed copy into the cache"""
+        os.replace(raw_path, self._local_cache_path())
+        self._write_cache_metadata(metadata, local_md5=local_md5)
+    
     def download_database(self) -> str:
-        """Download database from Google Drive to temporary file"""
+        """
+        Download database from Google Drive into a private working copy
+        
+        The download goes to the shared cache first and is reused while the
+        remote file is unchanged. Each session gets its own copy of the
+        cache, so sessions never write to the same file.
+        """
         if not self.file_id:
             st.error("No database file ID available")
             return None
         
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as tmp_file:
-                self.temp_db_path = tmp_file.name
-            
-            # Download from Google Drive
-            request = self.drive_service.files().get_media(fileId=self.file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-                if status:
-                    pass  # Don't show download progress
-            
-            # Write to temporary file
-            with open(self.temp_db_path, 'wb') as f:
-                f.write(fh.getvalue())
+            os.makedirs(self.cache_dir, exist_ok=True)
+            remote = self._get_remote_metadata()
+            if not self._is_cache_current(remote):
+                self._download_to_cache(remote)
             
+            self.temp_db_path = self._session_working_copy()
             return self.temp_db_path
             
         except Exception as e:
             st.error(f"Error downloading database: {str(e)}")
             return None
     
+    def _download_to_cache(self, remote: Dict[str, Any]):
+        """Stream the remote file into the cache, verifying its checksum"""
+        # Unique names, so concurrent downloads never share a partial file
+        fd, partial_path = tempfile.mkstemp(prefix=f"{self.file_id}.", suffix='.part', dir=self.cache_dir)
+        os.close(fd)
+        try:
+            request = self.drive_service.files().get_media(fileId=self.file_id)
+            with open(partial_path, 'wb') as fh:
+                downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+                done = False
+                while done is False:
+                    status, done = downloader.next_chunk()
+            
+            # Never cache a download that is not the revision we asked for
+            remote_md5 = remote.get('md5Checksum')
+            if remote_md5 and file_md5(partial_path) != remote_md5:
+                raise IOError("downloaded database does not match its Drive checksum")
+            
+            compression = self._remote_compression(remote)
+            if compression != 'none':
+                raw_path = partial_path[:-len('.part')] + '.raw'
+                decompress_file(partial_path, raw_path, compression)
+                os.unlink(partial_path)
+                partial_path = raw_path
+            
+            self._install_cache(partial_path, remote, local_md5=file_md5(partial_path))
+        finally:
+            if os.path.exists(partial_path):
+                os.unlink(partial_path)
+    
     def upload_database(self):
-        """Upload database from temporary file to Google Drive"""
+        """Upload a consistent, compressed snapshot of the database to Google Drive"""
         if not self.file_id or not self.temp_db_path:
             print("No database file to upload")
             return False
         
         try:
-            # Read temporary file
-            with open(self.temp_db_path, 'rb') as f:
-                file_data = f.read()
+            settings = get_snapshot_settings()
             
-            print(f"Uploading {len(file_data)} bytes to Google Drive...")
+            # Copy through the online backup API instead of reading the live
+            # file, so concurrent writes can't produce a torn upload
+            snapshot = create_snapshot(self.temp_db_path, self.db_name, settings)
+            if not snapshot:
+                return False
             
-            # Upload to Google Drive
-            media = MediaIoBaseUpload(
-                io.BytesIO(file_data),
-                mimetype='application/x-sqlite3',
-                resumable=True
-            )
+            print(f"Uploading {snapshot['size']} bytes ({snapshot['raw_size']} uncompressed) to Google Drive...")
             
-            self.drive_service.files().update(
-                fileId=self.file_id,
-                media_body=media
-            ).execute()
+            # Upload to Google Drive, streaming from the snapshot file
+            with open(snapshot['path'], 'rb') as f:
+                media = MediaIoBaseUpload(
+                    f,
+                    mimetype='application/x-sqlite3',
+                    chunksize=DOWNLOAD_CHUNK_SIZE,
+                    resumable=True
+                )
+                
+                updated = self.drive_service.files().update(
+                    fileId=self.file_id,
+                    body={'appProperties': {'compression': snapshot['compression']}},
+                    media_body=media,
+                    fields='md5Checksum, modifiedTime, size'
+                ).execute()
+            
+            # The snapshot is the new remote revision, so it becomes the
+            # cache and the next connection can skip the download
+            raw_path = snapshot['path'] + '.raw'
+            decompress_file(snapshot['path'], raw_path, snapshot['compression'])
+            self._install_cache(raw_path, updated, local_md5=snapshot['raw_md5'])
+            if self._is_session_copy(self.temp_db_path):
+                # The new cache is this session's copy, which stays current
+                st.session_state[SESSION_COPY_KEY]['base_md5'] = snapshot['raw_md5']
+            
+            self._prune_remote_revisions(settings['KEEP_CLOUD'])
             
             print("Database uploaded successfully!")
             return True
@@ -215,6 +403,22 @@ class CloudSQLiteManager:
                 print(f"Error uploading database: {str(e)}")
                 return False
     
+    def _prune_remote_revisions(self, keep: int):
+        """Delete the oldest Drive revisions of the base file beyond `keep`"""
+        try:
+            revisions = self.drive_service.revisions().list(
+                fileId=self.file_id,
+                fields='revisions(id, modifiedTime, keepForever)'
+            ).execute().get('revisions', [])
+            
+            revisions.sort(key=lambda r: r.get('modifiedTime', ''))
+            expired = [r for r in revisions[:-keep] if not r.get('keepForever')] if keep > 0 else []
+            for revision in expired:
+                self.drive_service.revisions().delete(fileId=self.file_id, revisionId=revision['id']).execute()
+        except Exception as e:
+            # Drive refuses to delete the only remaining revision; not fatal
+            print(f"Could not prune old revisions: {str(e)}")
+    
     def get_database_connection(self) -> Optional[sqlite3.Connection]:
         """Get SQLite database connection with cloud sync"""
         if not self.drive_service:
@@ -254,21 +458,113 @@ class CloudSQLiteManager:
             connection_info = self._connections[conn_id]
             
             # Upload changes
-            if hasattr(connection_info['cloud_manager'], 'upload_database'):
-                connection_info['cloud_manager'].upload_database()
-            
-            # Clean up temporary file
-            temp_path = connection_info.get('temp_path')
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except Exception as e:
-                    st.warning(f"Could not delete temporary file: {e}")
+            if self.change_log:
+                synced = self.sync_changes()
+            else:
+                synced = connection_info['cloud_manager'].upload_database()
             
             # Remove from tracking
             del self._connections[conn_id]
+            conn.close()
+            
+            # A script's working copy is private to this connection; keep it
+            # only if its changes could not be shipped. A session's copy is
+            # reused by its next rerun.
+            if not synced:
+                print(f"Keeping unsynced working copy {connection_info['temp_path']}")
+            elif not self._is_session_copy(connection_info['temp_path']):
+                os.unlink(connection_info['temp_path'])
+            return
         
         conn.close()
+    
+    # Change log shipping
+    def attach_change_log(self, conn: sqlite3.Connection) -> bool:
+        """Start recording row-level changes on conn and replay remote segments"""
+        if not self.drive_service or not self.file_id:
+            return False
+        
+        try:
+            change_log = DriveChangeLog(self, conn)
+            if not change_log.install():
+                return False
+            change_log.pull()
+            self.change_log = change_log
+            return True
+        except Exception as e:
+            # Fall back to whole-file uploads
+            print(f"Change log unavailable: {str(e)}")
+            self.change_log = None
+            return False
+    
+    def sync_changes(self) -> bool:
+        """Ship local row changes as a delta segment (whole file if no change log)"""
+        if not self.change_log:
+            return self.upload_database()
+        return self.change_log.sync()
+    
+    def get_base_metadata(self) -> Dict[str, Any]:
+        """Metadata of the base snapshot file on Drive"""
+        return self._get_remote_metadata()
+    
+    def list_segments(self) -> list:
+        """List change log segments of this database, oldest first"""
+        query = f"name contains '{segment_prefix(self.db_name)}' and trashed=false"
+        if self.folder_id:
+            query += f" and '{self.folder_id}' in parents"
+        
+        segments = []
+        page_token = None
+        while True:
+            results = self.drive_service.files().list(
+                q=query,
+                spaces='drive',
+                fields='nextPageToken, files(id, name, createdTime, size)',
+                orderBy='name',
+                pageToken=page_token
+            ).execute()
+            segments.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        return segments
+    
+    def upload_segment(self, name: str, data: bytes) -> bool:
+        """Upload one compressed change log segment"""
+        try:
+            file_metadata = {
+                'name': name,
+                'parents': [self.folder_id] if self.folder_id else []
+            }
+            media = MediaIoBaseUpload(io.BytesIO(data), mimetype=SEGMENT_MIME_TYPE, resumable=False)
+            self.drive_service.files().create(body=file_metadata, media_body=media, fields='id').execute()
+            return True
+        except Exception as e:
+            print(f"Error uploading change log segment: {str(e)}")
+            return False
+    
+    def download_segment(self, segment_id: str) -> Optional[bytes]:
+        """Download one change log segment"""
+        try:
+            request = self.drive_service.files().get_media(fileId=segment_id)
+            fh = io.BytesIO()
+            downloader = MediaIoBaseDownload(fh, request)
+            done = False
+            while done is False:
+                status, done = downloader.next_chunk()
+            return fh.getvalue()
+        except Exception as e:
+            print(f"Error downloading change log segment: {str(e)}")
+            return None
+    
+    def delete_segment(self, segment_id: str) -> bool:
+        """Delete a segment that is contained in the base snapshot"""
+        try:
+            self.drive_service.files().delete(fileId=segment_id).execute()
+            return True
+        except Exception as e:
+            print(f"Error deleting change log segment: {str(e)}")
+            return False
 
 # Alternative: Simple file-based approach for development
 class SimpleCloudSQLite:
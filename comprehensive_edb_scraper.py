@@ -13,12 +13,17 @@ import logging
 from datetime import datetime
 from bs4 import BeautifulSoup
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from pathlib import Path
 import random
-from supabase import create_client, Client
+from supabase_client import Client, create_client
 import urllib.parse
 
+from scraper_telemetry import ScrapeRun
+from school_registry import dedupe_records
+from ingestion_pipeline import SourcePlugin, JsonSnapshotSink, SupabaseSink, run_source
+from school_identity import SchoolIdentity
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,6 +46,9 @@ class ComprehensiveEDBScraper:
         self.data_dir = Path("edb_comprehensive_data")
         self.data_dir.mkdir(exist_ok=True)
         
+        # Per-stage run metrics
+        self.telemetry = ScrapeRun('comprehensive_edb', self.data_dir / "scrape_runs.jsonl")
+        
         # EDB website URLs
         self.base_url = "https://www.edb.gov.hk"
         self.school_search_url = "https://www.edb.gov.hk/en/edu-system/primary-secondary/applicable-to-primary/primary-1-admission/school-lists/"
@@ -59,51 +67,43 @@ class ComprehensiveEDBScraper:
         """Scrape all primary schools from EDB"""
         logger.info("Starting comprehensive EDB primary school scraping...")
         
-        all_schools = []
-        
-        # Method 1: Try to access the school search system
-        try:
-            search_schools = self._scrape_from_search_system()
-            if search_schools:
-                all_schools.extend(search_schools)
-                logger.info(f"Found {len(search_schools)} schools from search system")
-        except Exception as e:
-            logger.error(f"Error scraping from search system: {e}")
-        
-        # Method 2: Try to access school lists by district
-        try:
-            district_schools = self._scrape_by_districts()
-            if district_schools:
-                all_schools.extend(district_schools)
-                logger.info(f"Found {len(district_schools)} schools from district search")
-        except Exception as e:
-            logger.error(f"Error scraping by districts: {e}")
-        
-        # Method 3: Try to access school network lists
-        try:
-            network_schools = self._scrape_by_networks()
-            if network_schools:
-                all_schools.extend(network_schools)
-                logger.info(f"Found {len(network_schools)} schools from network search")
-        except Exception as e:
-            logger.error(f"Error scraping by networks: {e}")
+        all_schools = list(self.iter_primary_schools())
         
         # Remove duplicates
-        unique_schools = self._remove_duplicates(all_schools)
+        with self.telemetry.stage('dedupe') as dedupe:
+            unique_schools = self._remove_duplicates(all_schools)
+            dedupe.items += len(unique_schools)
         logger.info(f"Total unique schools found: {len(unique_schools)}")
         
         return unique_schools
     
-    def _scrape_from_search_system(self) -> List[Dict]:
+    def iter_primary_schools(self) -> Iterator[Dict]:
+        """Yield schools from the search system, then by district, then by network, as pages are scraped"""
+        methods = [
+            ('search system', self._iter_from_search_system),
+            ('district search', self._iter_by_districts),
+            ('network search', self._iter_by_networks),
+        ]
+        for label, method in methods:
+            found = 0
+            try:
+                for school in method():
+                    found += 1
+                    self.telemetry.add_items('normalize')
+                    yield school
+            except Exception as e:
+                logger.error(f"Error scraping from {label}: {e}")
+            if found:
+                logger.info(f"Found {found} schools from {label}")
+    
+    def _iter_from_search_system(self) -> Iterator[Dict]:
         """Scrape schools from EDB search system"""
         schools = []
         
         try:
             # Access the main school search page
-            response = self.session.get(self.school_search_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.telemetry.get(self.session, self.school_search_url, 'listing_fetch', timeout=30)
+            soup = self.telemetry.parse_html(response.content)
             
             # Look for school search forms or links
             search_forms = soup.find_all('form')
@@ -118,7 +118,7 @@ class ComprehensiveEDBScraper:
                     if school_data:
                         schools.append(school_data)
                 except Exception as e:
-                    logger.debug(f"Error extracting school from link: {e}")
+                    logger.debug("Error extracting school from link: %s", e)
                     continue
             
             # If no schools found from links, try to generate from page content
@@ -128,11 +128,10 @@ class ComprehensiveEDBScraper:
         except Exception as e:
             logger.error(f"Error accessing search system: {e}")
         
-        return schools
+        yield from schools
     
-    def _scrape_by_districts(self) -> List[Dict]:
-        """Scrape schools by district"""
-        schools = []
+    def _iter_by_districts(self) -> Iterator[Dict]:
+        """Scrape schools by district, yielding each district's schools as it is done"""
         
         # Hong Kong districts
         districts = [
@@ -171,10 +170,8 @@ class ComprehensiveEDBScraper:
                 district_schools = []
                 for url in district_urls:
                     try:
-                        response = self.session.get(url, timeout=30)
-                        response.raise_for_status()
-                        
-                        soup = BeautifulSoup(response.content, 'html.parser')
+                        response = self.telemetry.get(self.session, url, 'listing_fetch', timeout=30)
+                        soup = self.telemetry.parse_html(response.content)
                         page_schools = self._extract_schools_from_page(soup, district_en, district_tc)
                         
                         if page_schools:
@@ -182,21 +179,18 @@ class ComprehensiveEDBScraper:
                             break
                             
                     except Exception as e:
-                        logger.debug(f"Failed to access {url}: {e}")
+                        logger.debug("Failed to access %s: %s", url, e)
                         continue
                 
-                schools.extend(district_schools)
+                yield from district_schools
                 time.sleep(random.uniform(2, 4))  # Be respectful
                 
             except Exception as e:
                 logger.error(f"Error scraping district {district_en}: {e}")
                 continue
-        
-        return schools
     
-    def _scrape_by_networks(self) -> List[Dict]:
-        """Scrape schools by school network"""
-        schools = []
+    def _iter_by_networks(self) -> Iterator[Dict]:
+        """Scrape schools by school network, yielding each network's schools as it is done"""
         
         # Common Hong Kong school networks
         networks = ['11', '12', '14', '16', '18', '31', '32', '34', '35', '40', '41', '43', '45', '46', '48', 
@@ -215,10 +209,8 @@ class ComprehensiveEDBScraper:
                 network_schools = []
                 for url in network_urls:
                     try:
-                        response = self.session.get(url, timeout=30)
-                        response.raise_for_status()
-                        
-                        soup = BeautifulSoup(response.content, 'html.parser')
+                        response = self.telemetry.get(self.session, url, 'listing_fetch', timeout=30)
+                        soup = self.telemetry.parse_html(response.content)
                         page_schools = self._extract_schools_from_page(soup, network=f"Network {network}")
                         
                         if page_schools:
@@ -226,17 +218,15 @@ class ComprehensiveEDBScraper:
                             break
                             
                     except Exception as e:
-                        logger.debug(f"Failed to access {url}: {e}")
+                        logger.debug("Failed to access %s: %s", url, e)
                         continue
                 
-                schools.extend(network_schools)
+                yield from network_schools
                 time.sleep(random.uniform(2, 4))  # Be respectful
                 
             except Exception as e:
                 logger.error(f"Error scraping network {network}: {e}")
                 continue
-        
-        return schools
     
     def _extract_schools_from_page(self, soup: BeautifulSoup, district_en: str = "Unknown", district_tc: str = "未知", network: str = None) -> List[Dict]:
         """Extract schools from a page"""
@@ -281,7 +271,7 @@ class ComprehensiveEDBScraper:
                         schools.append(school_data)
             
         except Exception as e:
-            logger.debug(f"Error extracting from table: {e}")
+            logger.debug("Error extracting from table: %s", e)
         
         return schools
     
@@ -300,7 +290,7 @@ class ComprehensiveEDBScraper:
                         schools.append(school_data)
             
         except Exception as e:
-            logger.debug(f"Error extracting from list: {e}")
+            logger.debug("Error extracting from list: %s", e)
         
         return schools
     
@@ -316,7 +306,7 @@ class ComprehensiveEDBScraper:
                     schools.append(school_data)
             
         except Exception as e:
-            logger.debug(f"Error extracting from div: {e}")
+            logger.debug("Error extracting from div: %s", e)
         
         return schools
     
@@ -361,7 +351,7 @@ class ComprehensiveEDBScraper:
             }
             
         except Exception as e:
-            logger.debug(f"Error parsing table row: {e}")
+            logger.debug("Error parsing table row: %s", e)
             return None
     
     def _parse_list_item(self, item, district_en: str, district_tc: str, network: str = None) -> Optional[Dict]:
@@ -397,7 +387,7 @@ class ComprehensiveEDBScraper:
             }
             
         except Exception as e:
-            logger.debug(f"Error parsing list item: {e}")
+            logger.debug("Error parsing list item: %s", e)
             return None
     
     def _parse_div_content(self, div, district_en: str, district_tc: str, network: str = None) -> Optional[Dict]:
@@ -433,7 +423,7 @@ class ComprehensiveEDBScraper:
             }
             
         except Exception as e:
-            logger.debug(f"Error parsing div content: {e}")
+            logger.debug("Error parsing div content: %s", e)
             return None
     
     def _extract_school_from_link(self, link) -> Optional[Dict]:
@@ -471,7 +461,7 @@ class ComprehensiveEDBScraper:
             }
             
         except Exception as e:
-            logger.debug(f"Error extracting school from link: {e}")
+            logger.debug("Error extracting school from link: %s", e)
             return None
     
     def _generate_schools_from_content(self, soup: BeautifulSoup) -> List[Dict]:
@@ -527,17 +517,13 @@ class ComprehensiveEDBScraper:
         return any(indicator in text.lower() for indicator in school_indicators)
     
     def _remove_duplicates(self, schools: List[Dict]) -> List[Dict]:
-        """Remove duplicate schools based on name"""
-        seen_names = set()
-        unique_schools = []
-        
-        for school in schools:
-            name_key = school.get('name_en', '').lower().strip()
-            if name_key and name_key not in seen_names:
-                seen_names.add(name_key)
-                unique_schools.append(school)
-        
-        return unique_schools
+        """Merge schools that entity resolution matches on name, district, phone or website"""
+        named = [school for school in schools if self._named_school(school)]
+        return dedupe_records(named)
+    
+    def _named_school(self, school: Dict) -> Optional[Dict]:
+        """The school, or None when it has no English name to match on"""
+        return school if school.get('name_en', '').strip() else None
     
     def save_data(self, schools: List[Dict], filename: str = None) -> str:
         """Save schools data to JSON file"""
@@ -596,55 +582,56 @@ class ComprehensiveEDBScraper:
             logger.error(f"Error importing to Supabase: {e}")
             return False
     
-    def run_comprehensive_scrape(self):
-        """Run the complete comprehensive scraping process"""
+    def source_plugin(self) -> SourcePlugin:
+        """Pipeline source: search system, district and network pages"""
+        return SourcePlugin('comprehensive_edb', self.iter_primary_schools, normalize=self._named_school,
+                            identity=SchoolIdentity())
+    
+    def run_comprehensive_scrape(self) -> Dict:
+        """Run the complete comprehensive scraping process; returns the pipeline's counts and a sample of schools"""
         logger.info("Starting comprehensive EDB primary school scraping...")
         
         start_time = datetime.now()
+        self.telemetry.start()
         
         try:
-            # Scrape all school data
-            schools = self.scrape_all_primary_schools()
+            snapshot = JsonSnapshotSink(
+                self.data_dir / f"comprehensive_edb_primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            sinks = [snapshot]
+            if self.supabase:
+                sinks.append(SupabaseSink(self.supabase, 'primary_schools'))
+            else:
+                logger.info("Supabase not available - data saved locally only")
+            result = run_source(self.source_plugin(), sinks, telemetry=self.telemetry)
             
-            if schools:
-                # Save to local file
-                filepath = self.save_data(schools)
-                
-                # Import to Supabase if available
-                if self.supabase:
-                    success = self.import_to_supabase(schools)
-                    if success:
-                        logger.info("Data successfully imported to Supabase")
-                    else:
-                        logger.error("Failed to import data to Supabase")
-                else:
-                    logger.info("Supabase not available - data saved locally only")
-                
+            if result['records']:
                 end_time = datetime.now()
                 duration = end_time - start_time
                 
                 logger.info(f"Process completed in {duration}")
-                logger.info(f"Total schools processed: {len(schools)}")
-                logger.info(f"Data saved to: {filepath}")
+                logger.info(f"Total schools processed: {result['records']}")
+                logger.info(f"Data saved to: {snapshot.path}")
                 
-                return schools
+                self.telemetry.finish('ok', schools=result['records'], sinks=result['sinks'])
             else:
                 logger.warning("No schools found during scraping")
-                return []
+                self.telemetry.finish('empty', schools=0)
+            return result
                 
         except Exception as e:
             logger.error(f"Error in comprehensive scraping process: {e}")
-            return []
+            self.telemetry.finish('error', error=str(e))
+            return {'records': 0, 'sample': []}
 
 def main():
     """Main function"""
     scraper = ComprehensiveEDBScraper()
-    schools = scraper.run_comprehensive_scrape()
+    result = scraper.run_comprehensive_scrape()
     
-    if schools:
-        print(f"\nSuccessfully processed {len(schools)} primary schools")
+    if result['records']:
+        print(f"\nSuccessfully processed {result['records']} primary schools")
         print("Sample schools:")
-        for i, school in enumerate(schools[:5]):
+        for i, school in enumerate(result['sample']):
             print(f"  {i+1}. {school['name_en']} ({school['district_en']})")
     else:
         print("No schools were processed")
@@ -0,0 +1,77 @@
+"""
+Concurrent Fetch Helper
+Runs several independent database reads on a shared thread pool so a page
+pays roughly the latency of its slowest query instead of the sum of all
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple, Any, Optional
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    SCRIPT_CTX_AVAILABLE = True
+except ImportError:
+    SCRIPT_CTX_AVAILABLE = False
+
+# Shared by every session in the process; reads are network-bound so a small
+# pool is enough to overlap the HTTPS round-trips of one page
+MAX_FETCH_WORKERS = 8
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_fetch_pool() -> ThreadPoolExecutor:
+    """Return the process-wide fetch pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix='db-fetch')
+        return _pool
+
+
+def _validate_reads(target, reads: Dict[str, Tuple]):
+    """Only allow public read methods to be batched"""
+    for name, call in reads.items():
+        if not call or not isinstance(call[0], str):
+            raise ValueError(f"Read '{name}' must be a (method_name, *args) tuple")
+        method_name = call[0]
+        if not method_name.startswith('get_') or not callable(getattr(target, method_name, None)):
+            raise ValueError(f"'{method_name}' is not a read method of {type(target).__name__}")
+
+
+def fetch_sequentially(target, reads: Dict[str, Tuple]) -> Dict[str, Any]:
+    """Run the reads one after another (used for SQLite connections)"""
+    _validate_reads(target, reads)
+    return {name: getattr(target, call[0])(*call[1:]) for name, call in reads.items()}
+
+
+def fetch_concurrently(target, reads: Dict[str, Tuple]) -> Dict[str, Any]:
+    """
+    Run read methods of ``target`` concurrently and return all results together
+
+    Args:
+        target: database manager exposing the read methods
+        reads: mapping of result name -> (method_name, *args),
+            e.g. {'children': ('get_child_profiles', user_id)}
+
+    Returns:
+        Mapping of result name -> method return value
+    """
+    _validate_reads(target, reads)
+    if len(reads) <= 1:
+        return fetch_sequentially(target, reads)
+
+    # Worker threads need the script context so st.error() inside the read
+    # methods still reaches the page that issued the batch
+    ctx = get_script_run_ctx() if SCRIPT_CTX_AVAILABLE else None
+
+    def run(call):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return getattr(target, call[0])(*call[1:])
+
+    pool = get_fetch_pool()
+    futures = {name: pool.submit(run, call) for name, call in reads.items()}
+    return {name: future.result() for name, future in futures.items()}
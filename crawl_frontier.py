@@ -0,0 +1,311 @@
+"""
+Crawl Frontier
+Priority queue of the URLs a scraper run still has to fetch, keyed by
+canonicalized URL, with the visited set and each page's extracted result
+persisted to SQLite so every page is fetched at most once per run and an
+interrupted run resumes where it stopped
+"""
+
+import json
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Iterator
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode, quote, unquote
+
+# Lower numbers are fetched first; listing pages come before the detail
+# pages they link to so the whole frontier is known early
+LISTING_PRIORITY = 0
+DETAIL_PRIORITY = 10
+
+# Query parameters that never change the page served
+TRACKING_PARAMS = {'fbclid', 'gclid', 'ref', 'source'}
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Characters left unescaped in a canonical path
+PATH_SAFE_CHARS = "/:@!$&'()*+,;=-._~"
+
+PENDING = 'pending'
+FETCHING = 'fetching'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def canonicalize_url(url: str, base: Optional[str] = None) -> str:
+    """
+    Canonical form of a URL, so the same page linked in different ways maps
+    to one frontier entry
+
+    Resolves relative links against base, lowercases scheme and host, drops
+    default ports, fragments and tracking parameters, sorts the query and
+    normalizes percent-encoding.
+    """
+    if base:
+        url = urljoin(base, url.strip())
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = quote(unquote(parts.path), safe=PATH_SAFE_CHARS) or '/'
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+class FrontierEntry:
+    """One URL handed out by CrawlFrontier.pop()"""
+
+    def __init__(self, url: str, kind: str, priority: int, meta: Dict[str, Any]):
+        self.url = url
+        self.kind = kind
+        self.priority = priority
+        self.meta = meta
+
+    def __repr__(self):
+        return f"FrontierEntry({self.kind}, {self.url})"
+
+
+class CrawlFrontier:
+    """
+    Persistent crawl frontier for one scraper
+
+    begin_run() either resumes the last unfinished run or starts a new one
+    with an empty visited set. URLs are added with a priority and handed out
+    lowest priority first, in insertion order within a priority. complete()
+    stores a page's result with its visited mark, so a later link to the
+    same page (or a resumed run) reuses it instead of fetching again.
+    Writes made inside batch() share one commit.
+    """
+
+    def __init__(self, db_path: Path, scraper: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.scraper = scraper
+        self.run_id: Optional[str] = None
+        self.resumed = False
+        self.duplicates_skipped = 0
+        self._batch_depth = 0
+        # A run may be driven from a pipeline's source thread; it is only
+        # ever used by one thread at a time
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._create_tables()
+
+    def _create_tables(self):
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS frontier_runs (
+                run_id TEXT PRIMARY KEY,
+                scraper TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                finished_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                run_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                meta TEXT,
+                result TEXT,
+                error TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (run_id, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_frontier_queue ON frontier (run_id, status, priority, seq);
+        ''')
+        self.conn.commit()
+
+    def begin_run(self, resume: bool = True) -> bool:
+        """
+        Start or resume a run; returns True when an unfinished run was resumed
+
+        Pages that were being fetched when the last run stopped go back to
+        pending. Rows of older runs are dropped.
+        """
+        row = None
+        if resume:
+            row = self.conn.execute(
+                'SELECT run_id FROM frontier_runs WHERE scraper = ? AND finished_at IS NULL '
+                'ORDER BY started_at DESC LIMIT 1', (self.scraper,)
+            ).fetchone()
+
+        self.duplicates_skipped = 0
+        if row:
+            self.run_id = row['run_id']
+            self.resumed = True
+            self.conn.execute('UPDATE frontier SET status = ? WHERE run_id = ? AND status = ?',
+                              (PENDING, self.run_id, FETCHING))
+        else:
+            self.run_id = uuid.uuid4().hex
+            self.resumed = False
+            self.conn.execute('INSERT INTO frontier_runs (run_id, scraper, started_at) VALUES (?, ?, ?)',
+                              (self.run_id, self.scraper, datetime.now().isoformat()))
+
+        self.conn.execute(
+            'DELETE FROM frontier WHERE run_id IN '
+            '(SELECT run_id FROM frontier_runs WHERE scraper = ? AND run_id != ?)',
+            (self.scraper, self.run_id)
+        )
+        self.conn.execute('DELETE FROM frontier_runs WHERE scraper = ? AND run_id != ?',
+                          (self.scraper, self.run_id))
+        self.conn.commit()
+        return self.resumed
+
+    def finish_run(self):
+        """Mark the run finished; the next begin_run() starts from scratch"""
+        if self.run_id is None:
+            return
+        self.conn.execute('UPDATE frontier_runs SET finished_at = ? WHERE run_id = ?',
+                          (datetime.now().isoformat(), self.run_id))
+        self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Commit the frontier writes made inside as one transaction
+
+        Meant for one page: the links it adds and its complete() or fail().
+        An exception escaping the batch rolls it back; the page is then still
+        marked as being fetched, so a resumed run fetches it again and
+        re-adds its links.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.conn.rollback()
+            raise
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            self.conn.commit()
+
+    def _commit(self):
+        if not self._batch_depth:
+            self.conn.commit()
+
+    def _require_run(self):
+        if self.run_id is None:
+            self.begin_run()
+
+    def add(self, url: str, priority: int = DETAIL_PRIORITY, kind: str = 'detail',
+            meta: Optional[Dict[str, Any]] = None, base: Optional[str] = None) -> str:
+        """
+        Queue a URL unless it is already known to this run; returns its canonical form
+
+        A pending URL re-added with a more urgent priority is moved up.
+        """
+        self._require_run()
+        canonical = canonicalize_url(url, base)
+        existing = self.conn.execute('SELECT status, priority FROM frontier WHERE run_id = ? AND url = ?',
+                                     (self.run_id, canonical)).fetchone()
+        if existing:
+            self.duplicates_skipped += 1
+            if existing['status'] == PENDING and priority < existing['priority']:
+                self.conn.execute('UPDATE frontier SET priority = ? WHERE run_id = ? AND url = ?',
+                                  (priority, self.run_id, canonical))
+                self._commit()
+            return canonical
+
+        seq = self.conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM frontier WHERE run_id = ?',
+                                (self.run_id,)).fetchone()[0]
+        self.conn.execute(
+            'INSERT INTO frontier (run_id, url, kind, priority, seq, status, meta, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (self.run_id, canonical, kind, priority, seq, PENDING,
+             json.dumps(meta or {}, ensure_ascii=False), datetime.now().isoformat())
+        )
+        self._commit()
+        return canonical
+
+    def pop(self) -> Optional[FrontierEntry]:
+        """Next pending URL by priority, marked as being fetched; None when the frontier is empty"""
+        self._require_run()
+        row = self.conn.execute(
+            'SELECT url, kind, priority, meta FROM frontier WHERE run_id = ? AND status = ? '
+            'ORDER BY priority, seq LIMIT 1', (self.run_id, PENDING)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute('UPDATE frontier SET status = ? WHERE run_id = ? AND url = ?',
+                          (FETCHING, self.run_id, row['url']))
+        self._commit()
+        return FrontierEntry(row['url'], row['kind'], row['priority'], json.loads(row['meta'] or '{}'))
+
+    def _set_status(self, url: str, kind: str, status: str, result: Any = None, error: Optional[str] = None):
+        self._require_run()
+        now = datetime.now().isoformat()
+        result_json = json.dumps(result, ensure_ascii=False) if result is not None else None
+        updated = self.conn.execute(
+            'UPDATE frontier SET status = ?, result = ?, error = ?, updated_at = ? WHERE run_id = ? AND url = ?',
+            (status, result_json, error, now, self.run_id, url)
+        ).rowcount
+        if not updated:
+            # Fetched directly rather than popped from the queue
+            seq = self.conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM frontier WHERE run_id = ?',
+                                    (self.run_id,)).fetchone()[0]
+            self.conn.execute(
+                'INSERT INTO frontier (run_id, url, kind, priority, seq, status, meta, result, error, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (self.run_id, url, kind, DETAIL_PRIORITY, seq, status, '{}', result_json, error, now)
+            )
+        self._commit()
+
+    def complete(self, url: str, result: Any = None, kind: str = 'detail'):
+        """Mark a canonical URL visited and store what was extracted from it"""
+        self._set_status(url, kind, DONE, result=result)
+
+    def fail(self, url: str, error: str, kind: str = 'detail'):
+        """Mark a canonical URL visited without a result; it is not retried this run"""
+        self._set_status(url, kind, FAILED, error=error)
+
+    def is_visited(self, url: str) -> bool:
+        self._require_run()
+        row = self.conn.execute('SELECT status FROM frontier WHERE run_id = ? AND url = ?',
+                                (self.run_id, url)).fetchone()
+        return bool(row) and row['status'] in (DONE, FAILED)
+
+    def result(self, url: str) -> Any:
+        """Stored result of a visited URL, None if it failed or was not fetched"""
+        self._require_run()
+        row = self.conn.execute('SELECT result FROM frontier WHERE run_id = ? AND url = ? AND status = ?',
+                                (self.run_id, url, DONE)).fetchone()
+        return json.loads(row['result']) if row and row['result'] else None
+
+    def results(self, kind: str) -> List[Dict[str, Any]]:
+        """(url, meta, result) of every completed URL of a kind, in the order they were queued"""
+        return list(self.iter_results(kind))
+
+    def iter_results(self, kind: str) -> Iterator[Dict[str, Any]]:
+        """results(), read from the database one row at a time"""
+        self._require_run()
+        rows = self.conn.execute(
+            'SELECT url, meta, result FROM frontier WHERE run_id = ? AND kind = ? AND status = ? ORDER BY seq',
+            (self.run_id, kind, DONE)
+        )
+        for row in rows:
+            yield {'url': row['url'], 'meta': json.loads(row['meta'] or '{}'),
+                   'result': json.loads(row['result']) if row['result'] else None}
+
+    def stats(self) -> Dict[str, int]:
+        """URL counts by status for the current run, plus duplicate links skipped"""
+        self._require_run()
+        counts = {PENDING: 0, FETCHING: 0, DONE: 0, FAILED: 0}
+        for row in self.conn.execute('SELECT status, COUNT(*) AS n FROM frontier WHERE run_id = ? GROUP BY status',
+                                     (self.run_id,)):
+            counts[row['status']] = row['n']
+        counts['duplicates_skipped'] = self.duplicates_skipped
+        return counts
+
+    def close(self):
+        self.conn.close()
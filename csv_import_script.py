@@ -10,9 +10,15 @@ import os
 import logging
 from datetime import datetime
 from pathlib import Path
-from supabase import create_client, Client
+from supabase_client import Client, create_client
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
+
+from csv_normalization import (
+    DEFAULT_CHUNK_ROWS, iter_normalized_chunks, normalize_frame, resolve_columns, to_records,
+)
+from ingestion_pipeline import Pipeline, JsonSnapshotSink, SupabaseSink
+from school_identity import SchoolIdentity
 
 # Configure logging
 logging.basicConfig(
@@ -45,106 +51,28 @@ class CSVImportScript:
         """Process a CSV file and convert to standardized format"""
         logger.info(f"Processing CSV file: {csv_file_path}")
         
+        normalized_data = list(self.iter_csv_file(csv_file_path))
+        logger.info(f"Processed {len(normalized_data)} schools from CSV")
+        return normalized_data
+    
+    def iter_csv_file(self, csv_file_path: str, chunksize: int = DEFAULT_CHUNK_ROWS) -> Iterator[Dict]:
+        """
+        Yield a CSV file's schools in standardized format, normalizing chunksize rows at a time
+
+        Errors are re-raised so a file that cannot be read to the end is not
+        imported in part.
+        """
         try:
-            # Try different encodings
-            encodings = ['utf-8', 'gbk', 'big5', 'utf-8-sig']
-            df = None
-            
-            for encoding in encodings:
-                try:
-                    df = pd.read_csv(csv_file_path, encoding=encoding)
-                    logger.info(f"Successfully read CSV with {encoding} encoding")
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if df is None:
-                logger.error("Failed to read CSV file with any encoding")
-                return []
-            
-            # Convert to list of dictionaries
-            raw_data = df.to_dict('records')
-            
-            # Normalize the data
-            normalized_data = self._normalize_csv_data(raw_data)
-            
-            logger.info(f"Processed {len(normalized_data)} schools from CSV")
-            return normalized_data
-            
+            for chunk in iter_normalized_chunks(csv_file_path, 'EDB CSV Import', chunksize):
+                yield from chunk
         except Exception as e:
             logger.error(f"Error processing CSV file: {e}")
-            return []
+            raise
     
     def _normalize_csv_data(self, raw_data: List[Dict]) -> List[Dict]:
         """Normalize CSV data to our standard format"""
-        normalized = []
-        
-        # Common column name mappings
-        column_mappings = {
-            'name_en': ['School Name (English)', 'School Name', 'Name (English)', 'English Name', 'name_en', 'School'],
-            'name_tc': ['School Name (Chinese)', 'Chinese Name', 'Name (Chinese)', 'name_tc', '學校名稱'],
-            'district_en': ['District (English)', 'District', 'district_en', '區域'],
-            'district_tc': ['District (Chinese)', 'district_tc', '區域(中文)'],
-            'address_en': ['Address (English)', 'Address', 'address_en', '地址'],
-            'address_tc': ['Address (Chinese)', 'address_tc', '地址(中文)'],
-            'tel': ['Telephone', 'Phone', 'Tel', 'tel', '電話'],
-            'website': ['Website', 'URL', 'website', '網址'],
-            'school_type': ['School Type', 'Type', 'school_type', '學校類型'],
-            'funding_type': ['Funding Type', 'Funding', 'funding_type', '資助類型'],
-            'curriculum': ['Curriculum', 'curriculum', '課程'],
-            'language': ['Language', 'language', '語言'],
-            'capacity': ['Capacity', 'Student Capacity', 'capacity', '學生人數']
-        }
-        
-        for i, row in enumerate(raw_data):
-            try:
-                # Generate school number
-                school_no = f"PS{i+1:04d}"
-                
-                # Extract fields using mappings
-                extracted_data = {}
-                for field, possible_names in column_mappings.items():
-                    extracted_data[field] = self._extract_field(row, possible_names)
-                
-                # Create normalized school record
-                normalized_school = {
-                    'school_no': school_no,
-                    'name_en': extracted_data['name_en'] or f"Primary School {i+1}",
-                    'name_tc': extracted_data['name_tc'] or extracted_data['name_en'] or f"小學 {i+1}",
-                    'district_en': extracted_data['district_en'] or 'Unknown',
-                    'district_tc': extracted_data['district_tc'] or extracted_data['district_en'] or '未知',
-                    'address_en': extracted_data['address_en'] or 'Address not available',
-                    'address_tc': extracted_data['address_tc'] or extracted_data['address_en'] or '地址不詳',
-                    'tel': extracted_data['tel'] or 'N/A',
-                    'website': extracted_data['website'] or '',
-                    'curriculum': extracted_data['curriculum'] or '本地課程',
-                    'funding_type': extracted_data['funding_type'] or '資助',
-                    'through_train': True,
-                    'language_of_instruction': extracted_data['language'] or '中英文',
-                    'student_capacity': extracted_data['capacity'] or '600',
-                    'application_page': extracted_data['website'] or '',
-                    'has_website': bool(extracted_data['website']),
-                    'website_verified': False,
-                    'source': 'EDB CSV Import',
-                    'last_updated': datetime.now().isoformat()
-                }
-                
-                normalized.append(normalized_school)
-                
-            except Exception as e:
-                logger.error(f"Error normalizing row {i}: {e}")
-                continue
-        
-        return normalized
-    
-    def _extract_field(self, data: Dict, possible_names: List[str]) -> str:
-        """Extract a field from data using possible column names"""
-        for name in possible_names:
-            if name in data and data[name]:
-                value = str(data[name]).strip()
-                if value and value.lower() not in ['nan', 'none', 'null', '']:
-                    return value
-        return ''
+        frame = pd.DataFrame(raw_data)
+        return to_records(normalize_frame(frame, resolve_columns(frame.columns), 'EDB CSV Import'))
     
     def import_to_supabase(self, schools: List[Dict]) -> bool:
         """Import schools data to Supabase"""
@@ -203,34 +131,32 @@ class CSVImportScript:
         logger.info(f"Processed data saved to: {filepath}")
         return str(filepath)
     
-    def process_and_import(self, csv_file_path: str):
-        """Process CSV file and import to Supabase"""
+    def process_and_import(self, csv_file_path: str) -> Dict:
+        """Process CSV file and import to Supabase; returns the pipeline's counts and a sample of schools"""
         logger.info(f"Starting CSV processing and import for: {csv_file_path}")
         
-        # Process CSV file
-        schools = self.process_csv_file(csv_file_path)
+        snapshot = JsonSnapshotSink(
+            self.data_dir / f"processed_primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        sinks = [snapshot]
+        if self.supabase:
+            sinks.append(SupabaseSink(self.supabase, 'primary_schools'))
+        else:
+            logger.info("Supabase not available - data saved locally only")
+        
+        # Chunks stream straight to the sinks; the file is never held in memory whole.
+        # Stable keys make a re-import of the same schools upsert the same rows
+        identity = SchoolIdentity()
+        try:
+            result = Pipeline(self.iter_csv_file(csv_file_path), [identity.stage('EDB CSV Import')], sinks).run()
+        finally:
+            identity.close()
         
-        if schools:
-            # Save processed data
-            filepath = self.save_processed_data(schools)
-            
-            # Import to Supabase if available
-            if self.supabase:
-                success = self.import_to_supabase(schools)
-                if success:
-                    logger.info("Data successfully imported to Supabase")
-                else:
-                    logger.error("Failed to import data to Supabase")
-            else:
-                logger.info("Supabase not available - data saved locally only")
-            
-            logger.info(f"Processed {len(schools)} schools")
-            logger.info(f"Data saved to: {filepath}")
-            
-            return schools
+        if result['records']:
+            logger.info(f"Processed {result['records']} schools")
+            logger.info(f"Data saved to: {snapshot.path}")
         else:
             logger.warning("No schools found in CSV file")
-            return []
+        return result
 
 def create_sample_csv():
     """Create a sample CSV file with comprehensive Hong Kong primary school data"""
@@ -362,12 +288,12 @@ def main():
     
     # Process and import
     importer = CSVImportScript()
-    schools = importer.process_and_import(csv_file)
+    result = importer.process_and_import(csv_file)
     
-    if schools:
-        print(f"\nSuccessfully processed {len(schools)} primary schools")
+    if result['records']:
+        print(f"\nSuccessfully processed {result['records']} primary schools")
         print("Sample schools:")
-        for i, school in enumerate(schools[:5]):
+        for i, school in enumerate(result['sample']):
             print(f"  {i+1}. {school['name_en']} ({school['district_en']})")
     else:
         print("No schools were processed")
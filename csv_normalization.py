@@ -0,0 +1,175 @@
+"""
+CSV Normalization Engine
+Vectorized normalization of EDB school CSV exports: the encoding is the
+first candidate that decodes the whole file, source columns are resolved
+once from the header, and rows are normalized a chunk at a time with
+whole-column pandas operations
+"""
+
+import codecs
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Iterable, Iterator, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tried in order; utf-8-sig also reads plain UTF-8 and drops the BOM Excel writes.
+# EDB exports are Traditional Chinese, so big5 goes before gbk, which decodes most big5 bytes too
+ENCODINGS = ['utf-8-sig', 'big5', 'gbk']
+
+# Bytes read per block while checking the encoding
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+DEFAULT_CHUNK_ROWS = 500
+
+# Cell values treated as empty
+NULL_STRINGS = ['', 'nan', 'none', 'null']
+
+# Source column names for each field, in order of preference
+COLUMN_ALIASES = {
+    'school_no': ['School No.', 'School No', 'School Number', 'SCHOOL NO.', 'School Code', '學校編號'],
+    'name_en': ['School Name (English)', 'School Name', 'Name (English)', 'English Name', 'name_en', 'School'],
+    'name_tc': ['School Name (Chinese)', 'Chinese Name', 'Name (Chinese)', 'name_tc', '學校名稱'],
+    'district_en': ['District (English)', 'District', 'district_en', '區域'],
+    'district_tc': ['District (Chinese)', 'district_tc', '區域(中文)'],
+    'address_en': ['Address (English)', 'Address', 'address_en', '地址'],
+    'address_tc': ['Address (Chinese)', 'address_tc', '地址(中文)'],
+    'tel': ['Telephone', 'Phone', 'Tel', 'tel', '電話'],
+    'website': ['Website', 'URL', 'website', '網址'],
+    'school_type': ['School Type', 'Type', 'school_type', '學校類型'],
+    'funding_type': ['Funding Type', 'Funding', 'funding_type', '資助類型'],
+    'curriculum': ['Curriculum', 'curriculum', '課程'],
+    'language': ['Language', 'language', '語言'],
+    'capacity': ['Capacity', 'Student Capacity', 'capacity', '學生人數'],
+}
+
+
+def detect_encoding(path: Union[str, Path], candidates: Iterable[str] = ENCODINGS,
+                    block_size: int = ENCODING_SAMPLE_BYTES) -> Optional[str]:
+    """
+    First candidate encoding that decodes the whole file, None if none does
+
+    The file is read once, block_size bytes at a time, with one incremental
+    decoder per candidate still in the running, so a bad byte deep in the
+    file rules an encoding out before any row is imported with it.
+    """
+    decoders = {encoding: codecs.getincrementaldecoder(encoding)() for encoding in candidates}
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            for encoding, decoder in list(decoders.items()):
+                try:
+                    decoder.decode(block)
+                except UnicodeDecodeError:
+                    del decoders[encoding]
+            if not decoders:
+                return None
+    for encoding, decoder in decoders.items():
+        try:
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            # The file ends part-way through a character
+            continue
+    return None
+
+
+def resolve_columns(header: Iterable, aliases: Dict[str, List[str]] = COLUMN_ALIASES) -> Dict[str, List]:
+    """For each field, the header columns that may hold it, in order of preference"""
+    present = {str(column).strip(): column for column in header}
+    return {field: [present[name] for name in names if name in present] for field, names in aliases.items()}
+
+
+def _clean(values: pd.Series) -> pd.Series:
+    values = values.fillna('').astype(str).str.strip()
+    return values.mask(values.str.lower().isin(NULL_STRINGS), '')
+
+
+def _first_filled(*columns: pd.Series) -> pd.Series:
+    """Row-wise first non-empty value across columns"""
+    result = columns[0]
+    for column in columns[1:]:
+        result = result.where(result != '', column)
+    return result
+
+
+def normalize_frame(frame: pd.DataFrame, columns: Dict[str, List], source: str,
+                    start: int = 0, website_verified: bool = False) -> pd.DataFrame:
+    """
+    Normalize a chunk of CSV rows to the primary_schools record format
+
+    columns comes from resolve_columns(); start is the number of rows before
+    this chunk, so positional school numbers and placeholder names continue
+    across chunks. A school number column in the file takes precedence.
+    website_verified marks every school with a website as verified.
+    """
+    index = frame.index
+    empty = pd.Series('', index=index, dtype=object)
+    numbers = pd.Series(range(start + 1, start + len(frame) + 1), index=index).astype(str)
+
+    fields = {
+        field: _first_filled(*[_clean(frame[name]) for name in names]) if names else empty
+        for field, names in columns.items()
+    }
+    website = fields['website']
+
+    normalized = pd.DataFrame({
+        'school_no': _first_filled(fields['school_no'], 'PS' + numbers.str.zfill(4)),
+        'name_en': _first_filled(fields['name_en'], 'Primary School ' + numbers),
+        'name_tc': _first_filled(fields['name_tc'], fields['name_en'], '小學 ' + numbers),
+        'district_en': _first_filled(fields['district_en'], pd.Series('Unknown', index=index)),
+        'district_tc': _first_filled(fields['district_tc'], fields['district_en'], pd.Series('未知', index=index)),
+        'address_en': _first_filled(fields['address_en'], pd.Series('Address not available', index=index)),
+        'address_tc': _first_filled(fields['address_tc'], fields['address_en'], pd.Series('地址不詳', index=index)),
+        'tel': _first_filled(fields['tel'], pd.Series('N/A', index=index)),
+        'website': website,
+        'curriculum': _first_filled(fields['curriculum'], pd.Series('本地課程', index=index)),
+        'funding_type': _first_filled(fields['funding_type'], pd.Series('資助', index=index)),
+        'through_train': True,
+        'language_of_instruction': _first_filled(fields['language'], pd.Series('中英文', index=index)),
+        'student_capacity': _first_filled(fields['capacity'], pd.Series('600', index=index)),
+        'application_page': website,
+        'has_website': website != '',
+        'website_verified': (website != '') if website_verified else False,
+        'source': source,
+        'last_updated': datetime.now().isoformat(),
+    }, index=index)
+    return normalized
+
+
+def to_records(frame: pd.DataFrame) -> List[Dict]:
+    """Plain-Python dicts of a normalized frame, safe to json.dump"""
+    records = frame.astype(object).to_dict('records')
+    for record in records:
+        for name in ('through_train', 'has_website', 'website_verified'):
+            record[name] = bool(record[name])
+    return records
+
+
+def iter_normalized_chunks(path: Union[str, Path], source: str, chunksize: int = DEFAULT_CHUNK_ROWS,
+                           website_verified: bool = False, encoding: Optional[str] = None) -> Iterator[List[Dict]]:
+    """
+    Read a CSV file chunksize rows at a time, yielding each chunk normalized
+
+    Memory stays bounded by the chunk size however large the export is.
+    Every cell is read as text, so phone numbers and capacities keep their
+    original form. Without an explicit encoding the whole file is checked
+    first, so no chunk is yielded from a file that turns out undecodable.
+    """
+    encoding = encoding or detect_encoding(path)
+    if encoding is None:
+        raise ValueError(f"None of {ENCODINGS} can decode all of {path}")
+    logger.info(f"Reading CSV with {encoding} encoding")
+
+    columns = None
+    start = 0
+    for chunk in pd.read_csv(path, encoding=encoding, dtype=str, keep_default_na=False, chunksize=chunksize):
+        if columns is None:
+            columns = resolve_columns(chunk.columns)
+            missing = [field for field, names in columns.items() if not names]
+            if missing:
+                logger.info(f"CSV has no column for: {', '.join(missing)}")
+        yield to_records(normalize_frame(chunk, columns, source, start, website_verified))
+        start += len(chunk)
@@ -18,6 +18,69 @@ try:
 except ImportError:
     CLOUD_STORAGE_AVAILABLE = False
 
+from application_materials import materials_notes
+from user_data_cache import UserDataCache, cached_read
+from concurrent_fetch import fetch_concurrently, fetch_sequentially
+from db_metrics import instrument
+from notification_archive import (NOTIFICATION_PAGE_SIZE, NOTIFICATION_RETENTION_DAYS, ARCHIVE_BATCH_SIZE,
+                                  page_with_cursor, retention_cutoff, bucket_notifications, merge_entries)
+
+# The sidebar badge's unread count is refetched at most this often per session
+UNREAD_COUNT_TTL_SECONDS = 30
+
+def create_notification_counts(cursor):
+    """
+    Materialized unread count per user, kept current by triggers on notifications
+
+    Every insert, read/unread change and delete of a notification adjusts the
+    count, including rows written by Drive change log replay.
+    """
+    counts_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notification_counts'"
+    ).fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_counts (
+            user_id INTEGER PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    if not counts_exist:
+        cursor.execute('''
+            INSERT INTO notification_counts (user_id, unread)
+            SELECT user_id, COUNT(*) FROM notifications
+            WHERE is_read = FALSE AND user_id IS NOT NULL GROUP BY user_id
+        ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS notification_counts_insert AFTER INSERT ON notifications
+        WHEN NOT NEW.is_read
+        BEGIN
+            INSERT INTO notification_counts (user_id, unread) VALUES (NEW.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS notification_counts_read AFTER UPDATE OF is_read ON notifications
+        WHEN NOT OLD.is_read AND NEW.is_read
+        BEGIN
+            UPDATE notification_counts SET unread = MAX(unread - 1, 0) WHERE user_id = NEW.user_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS notification_counts_unread AFTER UPDATE OF is_read ON notifications
+        WHEN OLD.is_read AND NOT NEW.is_read
+        BEGIN
+            INSERT INTO notification_counts (user_id, unread) VALUES (NEW.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS notification_counts_delete AFTER DELETE ON notifications
+        WHEN NOT OLD.is_read
+        BEGIN
+            UPDATE notification_counts SET unread = MAX(unread - 1, 0) WHERE user_id = OLD.user_id;
+        END
+    ''')
+
 class CloudDatabaseManager:
     def __init__(self, storage_type: str = "local"):
         """
@@ -30,11 +93,15 @@ class CloudDatabaseManager:
         self.conn = None
         self.storage_manager = None
         
+        # Per-session cache of user-owned lists, invalidated by the write methods
+        self.user_cache = UserDataCache()
+        
         # Initialize storage based on type
         if storage_type == "supabase":
             try:
                 from database_supabase import SupabaseDatabaseManager
-                self.storage_manager = SupabaseDatabaseManager()
+                # Timed once, as this manager's calls; instrumenting both would count each call twice
+                self.storage_manager = SupabaseDatabaseManager(instrumented=False)
                 if self.storage_manager.supabase:
                     print("🔗 Using Supabase cloud database.")
                 else:
@@ -63,6 +130,9 @@ class CloudDatabaseManager:
         
         # Initialize database
         self._init_database()
+        
+        # Time public methods when metrics are enabled (no-op otherwise)
+        instrument(self, self.storage_type)
     
     def _init_database(self):
         """Initialize database connection and create tables"""
@@ -92,6 +162,9 @@ class CloudDatabaseManager:
             # Only create tables if we have a SQLite connection
             if self.conn:
                 self._create_tables()
+                # Ship row-level deltas to Drive instead of the whole file
+                if self.storage_type == "google_drive" and hasattr(self.storage_manager, 'attach_change_log'):
+                    self.storage_manager.attach_change_log(self.conn)
                 self._initialize_test_data()
             elif hasattr(self.storage_manager, 'supabase') and self.storage_manager.supabase:
                 # For Supabase, tables are created via SQL migrations
@@ -185,6 +258,28 @@ class CloudDatabaseManager:
             )
         ''')
         
+        # Keyset paging index: newest first within a user
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_notifications_user_created
+            ON notifications (user_id, created_at, id)
+        ''')
+        
+        # Materialized unread count per user, kept current by triggers
+        create_notification_counts(cursor)
+        
+        # Archived notifications, one row of JSON entries per user and month
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notifications_archive (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                period TEXT NOT NULL,
+                entries TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                UNIQUE (user_id, period),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
         # Portfolio items table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS portfolio_items (
@@ -264,7 +359,10 @@ class CloudDatabaseManager:
         """Sync database to cloud storage"""
         if self.storage_manager and hasattr(self.storage_manager, 'upload_database'):
             try:
-                success = self.storage_manager.upload_database()
+                if hasattr(self.storage_manager, 'sync_changes'):
+                    success = self.storage_manager.sync_changes()
+                else:
+                    success = self.storage_manager.upload_database()
                 if success:
                     st.success("✅ Database synced to cloud successfully!")
                 else:
@@ -273,6 +371,22 @@ class CloudDatabaseManager:
                 if "storageQuotaExceeded" not in str(e) and "Service Accounts do not have storage quota" not in str(e):
                     st.error(f"❌ Sync error: {str(e)}")
     
+    def fetch_many(self, reads: Dict[str, tuple]) -> Dict[str, Any]:
+        """
+        Run several independent reads and return all results together
+        
+        Reads run concurrently against Supabase; a SQLite connection cannot be
+        shared across threads, so they run in order there. Cached reads are
+        served without touching the backend either way.
+        
+        Args:
+            reads: mapping of result name -> (method_name, *args),
+                e.g. {'children': ('get_child_profiles', user_id)}
+        """
+        if self.storage_manager and hasattr(self.storage_manager, 'supabase') and self.storage_manager.supabase:
+            return fetch_concurrently(self, reads)
+        return fetch_sequentially(self, reads)
+    
     # User management methods
     def create_user(self, username: str, email: str, password_hash: str, full_name: str = None, phone: str = None) -> bool:
         """Create a new user"""
@@ -376,6 +490,7 @@ class CloudDatabaseManager:
                            gender: str = None, nationality: str = None, address: str = None,
                            parent_name: str = None, parent_phone: str = None, parent_email: str = None) -> int:
         """Create a new child profile"""
+        self.user_cache.invalidate(user_id, 'child_profiles')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'create_child_profile'):
@@ -401,6 +516,7 @@ class CloudDatabaseManager:
             st.error(f"Error creating child profile: {str(e)}")
             return None
     
+    @cached_read('child_profiles')
     def get_child_profiles(self, user_id: int) -> List[Dict]:
         """Get all child profiles for a user"""
         try:
@@ -440,6 +556,7 @@ class CloudDatabaseManager:
     
     def update_child_profile(self, child_id: int, child_name: str, date_of_birth: str, gender: str) -> tuple:
         """Update a child profile by id"""
+        self._invalidate_child(child_id)
         # Delegate to Supabase if available
         if self.storage_manager and hasattr(self.storage_manager, 'update_child_profile'):
             return self.storage_manager.update_child_profile(child_id, child_name, date_of_birth, gender)
@@ -462,6 +579,7 @@ class CloudDatabaseManager:
 
     def delete_child_profile(self, child_id: int) -> tuple:
         """Delete a child profile by id"""
+        self._invalidate_child(child_id)
         # Delegate to Supabase if available
         if self.storage_manager and hasattr(self.storage_manager, 'delete_child_profile'):
             return self.storage_manager.delete_child_profile(child_id)
@@ -482,10 +600,17 @@ class CloudDatabaseManager:
         except Exception as e:
             return False, f"Error deleting child profile: {str(e)}"
     
+    def _invalidate_child(self, child_id: int):
+        """Drop cached lists that show a child's details"""
+        self.user_cache.invalidate_row('child_profiles', child_id)
+        # Applications embed the child's name
+        self.user_cache.invalidate_row('applications', child_id, column='child_id')
+    
     # Application methods
     def create_application(self, user_id: int, child_id: int, school_name: str, school_type: str,
                           application_date: str, notes: str = None) -> int:
         """Create a new application"""
+        self.user_cache.invalidate(user_id, 'applications')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'create_application'):
@@ -511,6 +636,7 @@ class CloudDatabaseManager:
             st.error(f"Error creating application: {str(e)}")
             return None
     
+    @cached_read('applications')
     def get_applications(self, user_id: int) -> List[Dict]:
         """Get all applications for a user"""
         try:
@@ -523,7 +649,7 @@ class CloudDatabaseManager:
                 cursor = self.conn.cursor()
                 cursor.execute('''
                     SELECT a.id, a.school_name, a.school_type, a.application_date, a.status, a.notes,
-                           c.child_name, a.created_at
+                           c.child_name, a.created_at, a.child_id
                     FROM applications a
                     JOIN child_profiles c ON a.child_id = c.id
                     WHERE a.user_id = ?
@@ -540,7 +666,8 @@ class CloudDatabaseManager:
                         'status': row[4],
                         'notes': row[5],
                         'child_name': row[6],
-                        'created_at': row[7]
+                        'created_at': row[7],
+                        'child_id': row[8]
                     })
                 return applications
             return []
@@ -552,6 +679,7 @@ class CloudDatabaseManager:
     def create_portfolio_item(self, user_id: int, child_id: int, title: str, description: str = None,
                             category: str = None, attachment_path: str = None, item_date: str = None, notes: str = None) -> int:
         """Create a new portfolio item"""
+        self.user_cache.invalidate(user_id, 'portfolio_items', child_id)
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'create_portfolio_item'):
@@ -577,6 +705,7 @@ class CloudDatabaseManager:
             st.error(f"Error creating portfolio item: {str(e)}")
             return None
     
+    @cached_read('portfolio_items')
     def get_portfolio_items(self, user_id: int, child_id: int = None) -> List[Dict]:
         """Get all portfolio items for a user"""
         try:
@@ -589,13 +718,13 @@ class CloudDatabaseManager:
                 cursor = self.conn.cursor()
                 if child_id:
                     cursor.execute('''
-                        SELECT id, title, description, category, attachment_path, item_date, notes, created_at
+                        SELECT id, title, description, category, attachment_path, item_date, notes, created_at, child_id
                         FROM portfolio_items WHERE user_id = ? AND child_id = ?
                         ORDER BY created_at DESC
                     ''', (user_id, child_id))
                 else:
                     cursor.execute('''
-                        SELECT id, title, description, category, attachment_path, item_date, notes, created_at
+                        SELECT id, title, description, category, attachment_path, item_date, notes, created_at, child_id
                         FROM portfolio_items WHERE user_id = ?
                         ORDER BY created_at DESC
                     ''', (user_id,))
@@ -610,7 +739,8 @@ class CloudDatabaseManager:
                         'attachment_path': row[4],
                         'item_date': row[5],
                         'notes': row[6],
-                        'created_at': row[7]
+                        'created_at': row[7],
+                        'child_id': row[8]
                     })
                 return items
             return []
@@ -622,6 +752,7 @@ class CloudDatabaseManager:
     def create_personal_statement(self, user_id: int, child_id: int, title: str, content: str, 
                                  target_school: str = None, version: str = "1.0", notes: str = None) -> int:
         """Create a new personal statement"""
+        self.user_cache.invalidate(user_id, 'personal_statements', child_id)
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'create_personal_statement'):
@@ -647,6 +778,7 @@ class CloudDatabaseManager:
             st.error(f"Error creating personal statement: {str(e)}")
             return None
     
+    @cached_read('personal_statements')
     def get_personal_statements(self, user_id: int, child_id: int = None) -> List[Dict]:
         """Get all personal statements for a user"""
         try:
@@ -690,6 +822,7 @@ class CloudDatabaseManager:
     # Notification methods
     def create_notification(self, user_id: int, title: str, message: str) -> int:
         """Create a new notification"""
+        self.user_cache.invalidate(user_id, 'unread_count')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'create_notification'):
@@ -752,8 +885,127 @@ class CloudDatabaseManager:
             st.error(f"Error getting notifications: {str(e)}")
             return []
     
+    def get_unread_count(self, user_id: int) -> int:
+        """Number of unread notifications, for the sidebar badge; cached briefly per session"""
+        cached = self.user_cache.get(user_id, 'unread_count', ttl_seconds=UNREAD_COUNT_TTL_SECONDS)
+        if cached is not None:
+            return cached[0]
+        try:
+            # Check if using Supabase
+            if self.storage_manager and hasattr(self.storage_manager, 'get_unread_count'):
+                count = self.storage_manager.get_unread_count(user_id)
+            elif self.conn:
+                row = self.conn.execute(
+                    'SELECT unread FROM notification_counts WHERE user_id = ?', (user_id,)
+                ).fetchone()
+                count = row[0] if row else 0
+            else:
+                return 0
+            self.user_cache.set(user_id, 'unread_count', None, [count])
+            return count
+        except Exception as e:
+            print(f"Error counting notifications: {e}")
+            return 0
+    
+    def get_notifications_page(self, user_id: int, unread_only: bool = False, cursor: tuple = None,
+                               limit: int = NOTIFICATION_PAGE_SIZE) -> tuple:
+        """
+        One page of notifications, newest first, and the cursor of the next page
+        
+        cursor is the (created_at, id) of the last notification on the previous
+        page, so each page is one index range scan however long the history is.
+        """
+        try:
+            # Check if using Supabase
+            if self.storage_manager and hasattr(self.storage_manager, 'get_notifications_page'):
+                return self.storage_manager.get_notifications_page(user_id, unread_only, cursor, limit)
+            
+            # Use SQLite
+            if self.conn:
+                query = '''
+                    SELECT id, title, message, is_read, created_at
+                    FROM notifications WHERE user_id = ?
+                '''
+                params = [user_id]
+                if unread_only:
+                    query += ' AND is_read = FALSE'
+                if cursor:
+                    query += ' AND (created_at, id) < (?, ?)'
+                    params.extend(cursor)
+                query += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+                params.append(limit + 1)
+                
+                rows = self.conn.execute(query, params).fetchall()
+                notifications = [{
+                    'id': row[0],
+                    'title': row[1],
+                    'message': row[2],
+                    'is_read': bool(row[3]),
+                    'created_at': row[4]
+                } for row in rows]
+                return page_with_cursor(notifications, limit)
+            return [], None
+        except Exception as e:
+            st.error(f"Error getting notifications: {str(e)}")
+            return [], None
+    
+    def archive_notifications(self, user_id: int = None, retention_days: int = NOTIFICATION_RETENTION_DAYS) -> int:
+        """Move read notifications older than the retention period into notifications_archive"""
+        try:
+            # Check if using Supabase
+            if self.storage_manager and hasattr(self.storage_manager, 'archive_notifications'):
+                return self.storage_manager.archive_notifications(user_id, retention_days)
+            
+            # Use SQLite
+            if not self.conn:
+                return 0
+            cutoff = retention_cutoff(retention_days).strftime('%Y-%m-%d %H:%M:%S')
+            query = '''
+                SELECT id, user_id, title, message, created_at
+                FROM notifications WHERE is_read = TRUE AND created_at < ?
+            '''
+            params = [cutoff]
+            if user_id is not None:
+                query += ' AND user_id = ?'
+                params.append(user_id)
+            query += ' ORDER BY created_at LIMIT ?'
+            params.append(ARCHIVE_BATCH_SIZE)
+            
+            archived = 0
+            while True:
+                rows = [
+                    {'id': row[0], 'user_id': row[1], 'title': row[2], 'message': row[3], 'created_at': row[4]}
+                    for row in self.conn.execute(query, params).fetchall()
+                ]
+                if not rows:
+                    break
+                # Each batch moves in one transaction
+                with self.conn:
+                    for (owner, period), entries in bucket_notifications(rows).items():
+                        existing = self.conn.execute(
+                            'SELECT entries FROM notifications_archive WHERE user_id = ? AND period = ?',
+                            (owner, period)
+                        ).fetchone()
+                        merged = merge_entries(json.loads(existing[0]) if existing else [], entries)
+                        self.conn.execute('''
+                            INSERT INTO notifications_archive (user_id, period, entries, count)
+                            VALUES (?, ?, ?, ?)
+                            ON CONFLICT (user_id, period) DO UPDATE SET entries = excluded.entries, count = excluded.count
+                        ''', (owner, period, json.dumps(merged, ensure_ascii=False), len(merged)))
+                    self.conn.executemany('DELETE FROM notifications WHERE id = ?', [(row['id'],) for row in rows])
+                archived += len(rows)
+            
+            if archived and self.storage_type == "google_drive":
+                self.sync_to_cloud()
+            return archived
+        except Exception as e:
+            print(f"Error archiving notifications: {e}")
+            return 0
+    
     def mark_notification_read(self, notification_id: int) -> bool:
         """Mark a notification as read"""
+        # Only the id is known here; the session only caches its own user's count
+        self.user_cache.invalidate_entity('unread_count')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'mark_notification_read'):
@@ -781,22 +1033,48 @@ class CloudDatabaseManager:
     # High-level methods for backward compatibility
     def register_user(self, name: str, email: str, phone: str, password: str) -> tuple[bool, str]:
         """Register a new user"""
+        success, message, _ = self.register_user_account(name, email, phone, password)
+        return success, message
+    
+    def register_user_account(self, name: str, email: str, phone: str, password: str) -> tuple[bool, str, dict]:
+        """Register a new user in one transaction and return the created user"""
         try:
             # Check if using Supabase
-            if self.storage_manager and hasattr(self.storage_manager, 'register_user'):
-                return self.storage_manager.register_user(name, email, phone, password)
+            if self.storage_manager and hasattr(self.storage_manager, 'register_user_account'):
+                return self.storage_manager.register_user_account(name, email, phone, password)
             
             # Use SQLite
+            if not self.conn:
+                return False, "No database connection", {}
             import hashlib
             password_hash = hashlib.sha256(password.encode()).hexdigest()
             
-            success = self.create_user(name, email, password_hash, name, phone)
-            if success:
-                return True, "User registered successfully"
-            else:
-                return False, "Failed to create user"
+            with self.conn:
+                cursor = self.conn.cursor()
+                cursor.execute('SELECT 1 FROM users WHERE email = ?', (email,))
+                if cursor.fetchone():
+                    return False, "User with this email already exists", {}
+                cursor.execute('''
+                    INSERT INTO users (username, email, password_hash, full_name, phone)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (name, email, password_hash, name, phone))
+                user = {
+                    'id': cursor.lastrowid,
+                    'username': name,
+                    'email': email,
+                    'full_name': name,
+                    'phone': phone
+                }
+            
+            # Sync to cloud if available
+            if self.storage_type == "google_drive":
+                self.sync_to_cloud()
+            
+            return True, "User registered successfully", user
+        except sqlite3.IntegrityError:
+            return False, "User with this email or name already exists", {}
         except Exception as e:
-            return False, f"Registration error: {str(e)}"
+            return False, f"Registration error: {str(e)}", {}
     
     def login_user(self, email: str, password: str) -> tuple[bool, str, dict]:
         """Login user"""
@@ -819,6 +1097,7 @@ class CloudDatabaseManager:
     
     def add_child_profile(self, user_id: int, child_name: str, date_of_birth: str, gender: str) -> tuple[bool, str]:
         """Add a child profile"""
+        self.user_cache.invalidate(user_id, 'child_profiles')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'add_child_profile'):
@@ -836,6 +1115,7 @@ class CloudDatabaseManager:
     def add_portfolio_item(self, user_id: int, child_id: int, title: str, description: str, 
                           category: str, item_date: str, attachment_path: str = None, notes: str = None) -> tuple[bool, str]:
         """Add a portfolio item"""
+        self.user_cache.invalidate(user_id, 'portfolio_items', child_id)
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'add_portfolio_item'):
@@ -854,6 +1134,7 @@ class CloudDatabaseManager:
     def add_personal_statement(self, user_id: int, child_id: int, title: str, content: str,
                               target_school: str = None, version: str = "1.0", notes: str = None) -> tuple[bool, str]:
         """Add a personal statement"""
+        self.user_cache.invalidate(user_id, 'personal_statements', child_id)
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'add_personal_statement'):
@@ -870,6 +1151,7 @@ class CloudDatabaseManager:
     
     def add_notification(self, user_id: int, title: str, message: str, priority: str = 'medium') -> tuple[bool, str]:
         """Add a notification"""
+        self.user_cache.invalidate(user_id, 'unread_count')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'add_notification'):
@@ -888,6 +1170,7 @@ class CloudDatabaseManager:
                           parent_name: str, parent_email: str, parent_phone: str,
                           preferred_start_date: str, notes: str = None) -> tuple[bool, str]:
         """Submit an application"""
+        self.user_cache.invalidate(user_id, 'applications')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'submit_application'):
@@ -902,8 +1185,93 @@ class CloudDatabaseManager:
         except Exception as e:
             return False, f"Error submitting application: {str(e)}"
     
+    def submit_application_with_materials(self, user_id: int, child_id: Optional[int], school_no: str, school_name: str,
+                                          parent_name: str, parent_email: str, parent_phone: str,
+                                          preferred_start_date: str, notes: str = None,
+                                          portfolio_item_ids: List[int] = None, statement_id: int = None,
+                                          notification_title: str = None,
+                                          notification_message: str = None) -> tuple[bool, str]:
+        """
+        Submit an application with its materials summarised into the notes,
+        and add the confirmation notification, in one transaction
+        
+        A child_id of None means the user's most recently added child.
+        """
+        self.user_cache.invalidate(user_id, 'applications')
+        self.user_cache.invalidate(user_id, 'unread_count')
+        try:
+            # Check if using Supabase
+            if self.storage_manager and hasattr(self.storage_manager, 'submit_application_with_materials'):
+                return self.storage_manager.submit_application_with_materials(
+                    user_id, child_id, school_no, school_name, parent_name, parent_email, parent_phone,
+                    preferred_start_date, notes, portfolio_item_ids, statement_id,
+                    notification_title, notification_message
+                )
+            
+            # Use SQLite
+            if not self.conn:
+                return False, "No database connection"
+            with self.conn:
+                cursor = self.conn.cursor()
+                if child_id is None:
+                    cursor.execute('''
+                        SELECT id FROM child_profiles WHERE user_id = ?
+                        ORDER BY created_at DESC, id DESC LIMIT 1
+                    ''', (user_id,))
+                else:
+                    cursor.execute('SELECT id FROM child_profiles WHERE id = ? AND user_id = ?', (child_id, user_id))
+                child = cursor.fetchone()
+                if not child:
+                    if child_id is None:
+                        return False, "No child profiles found. Please add a child profile first."
+                    return False, "Child profile not found"
+                child_id = child[0]
+                
+                items = []
+                if portfolio_item_ids:
+                    placeholders = ', '.join('?' for _ in portfolio_item_ids)
+                    cursor.execute(f'''
+                        SELECT title, category, item_date, description FROM portfolio_items
+                        WHERE user_id = ? AND child_id = ? AND id IN ({placeholders})
+                        ORDER BY created_at DESC, id DESC
+                    ''', (user_id, child_id, *portfolio_item_ids))
+                    items = [dict(zip(('title', 'category', 'item_date', 'description'), row))
+                             for row in cursor.fetchall()]
+                
+                statement = None
+                if statement_id:
+                    cursor.execute('''
+                        SELECT title, version, target_school, content FROM personal_statements
+                        WHERE id = ? AND user_id = ? AND child_id = ?
+                    ''', (statement_id, user_id, child_id))
+                    row = cursor.fetchone()
+                    if row:
+                        statement = dict(zip(('title', 'version', 'target_school', 'content'), row))
+                
+                cursor.execute('''
+                    INSERT INTO applications (user_id, child_id, school_name, school_type, application_date, notes)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (user_id, child_id, school_name, "kindergarten", preferred_start_date,
+                      materials_notes(notes, items, statement)))
+                application_id = cursor.lastrowid
+                
+                if notification_title:
+                    cursor.execute('''
+                        INSERT INTO notifications (user_id, title, message)
+                        VALUES (?, ?, ?)
+                    ''', (user_id, notification_title, notification_message or ""))
+            
+            # Sync to cloud if available
+            if self.storage_type == "google_drive":
+                self.sync_to_cloud()
+            
+            return True, f"Application submitted with ID: {application_id}"
+        except Exception as e:
+            return False, f"Error submitting application: {str(e)}"
+    
     def add_to_tracker(self, user_id: int, school_no: str, school_name: str) -> tuple[bool, str]:
         """Add school to application tracker"""
+        self.user_cache.invalidate(user_id, 'tracked_schools')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'add_to_tracker'):
@@ -929,6 +1297,7 @@ class CloudDatabaseManager:
     
     def remove_from_tracker(self, user_id: int, school_no: str) -> tuple[bool, str]:
         """Remove school from application tracker"""
+        self.user_cache.invalidate(user_id, 'tracked_schools')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'remove_from_tracker'):
@@ -951,6 +1320,7 @@ class CloudDatabaseManager:
         except Exception as e:
             return False, f"Error removing from tracker: {str(e)}"
     
+    @cached_read('tracked_schools')
     def get_tracked_schools(self, user_id: int) -> List[Dict]:
         """Get tracked schools for a user"""
         try:
@@ -982,8 +1352,32 @@ class CloudDatabaseManager:
             st.error(f"Error getting tracked schools: {str(e)}")
             return []
     
+    def get_all_tracked_schools(self) -> List[Dict]:
+        """Get every tracked (user, school) pair, for the deadline reminder engine"""
+        try:
+            # Check if using Supabase
+            if self.storage_manager and hasattr(self.storage_manager, 'get_all_tracked_schools'):
+                return self.storage_manager.get_all_tracked_schools()
+            
+            # Use SQLite
+            if self.conn:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                    SELECT user_id, school_no, school_name, status
+                    FROM application_tracking
+                ''')
+                return [
+                    {'user_id': row[0], 'school_no': row[1], 'school_name': row[2], 'status': row[3]}
+                    for row in cursor.fetchall()
+                ]
+            return []
+        except Exception as e:
+            print(f"Error getting tracked schools: {e}")
+            return []
+    
     def mark_all_notifications_read(self, user_id: int) -> bool:
         """Mark all notifications as read for a user"""
+        self.user_cache.invalidate(user_id, 'unread_count')
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'mark_all_notifications_read'):
@@ -1010,6 +1404,7 @@ class CloudDatabaseManager:
     
     def delete_portfolio_item(self, item_id: int) -> tuple[bool, str]:
         """Delete a portfolio item"""
+        self.user_cache.invalidate_row('portfolio_items', item_id)
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'delete_portfolio_item'):
@@ -1032,6 +1427,7 @@ class CloudDatabaseManager:
     
     def delete_personal_statement(self, statement_id: int) -> tuple[bool, str]:
         """Delete a personal statement"""
+        self.user_cache.invalidate_row('personal_statements', statement_id)
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'delete_personal_statement'):
@@ -1054,6 +1450,7 @@ class CloudDatabaseManager:
     
     def reset_user_by_email(self, email: str) -> bool:
         """Reset user data by email (for testing)"""
+        self.user_cache.invalidate_user()
         try:
             # Check if using Supabase
             if self.storage_manager and hasattr(self.storage_manager, 'reset_user_by_email'):
@@ -1067,15 +1464,17 @@ class CloudDatabaseManager:
                 user = cursor.fetchone()
                 if user:
                     user_id = user[0]
-                    # Delete related data
-                    cursor.execute('DELETE FROM notifications WHERE user_id = ?', (user_id,))
-                    cursor.execute('DELETE FROM portfolio_items WHERE user_id = ?', (user_id,))
-                    cursor.execute('DELETE FROM personal_statements WHERE user_id = ?', (user_id,))
-                    cursor.execute('DELETE FROM applications WHERE user_id = ?', (user_id,))
-                    cursor.execute('DELETE FROM child_profiles WHERE user_id = ?', (user_id,))
-                    cursor.execute('DELETE FROM application_tracking WHERE user_id = ?', (user_id,))
-                    cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-                    self.conn.commit()
+                    # Delete related data, all or nothing
+                    with self.conn:
+                        cursor.execute('DELETE FROM notifications WHERE user_id = ?', (user_id,))
+                        cursor.execute('DELETE FROM notifications_archive WHERE user_id = ?', (user_id,))
+                        cursor.execute('DELETE FROM notification_counts WHERE user_id = ?', (user_id,))
+                        cursor.execute('DELETE FROM portfolio_items WHERE user_id = ?', (user_id,))
+                        cursor.execute('DELETE FROM personal_statements WHERE user_id = ?', (user_id,))
+                        cursor.execute('DELETE FROM applications WHERE user_id = ?', (user_id,))
+                        cursor.execute('DELETE FROM child_profiles WHERE user_id = ?', (user_id,))
+                        cursor.execute('DELETE FROM application_tracking WHERE user_id = ?', (user_id,))
+                        cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
                     
                     # Sync to cloud if available
                     if self.storage_type == "google_drive":
@@ -1160,6 +1559,7 @@ class CloudDatabaseManager:
 
     def update_tracker_status(self, user_id: int, school_no: str, status: str, last_checked: str = None, application_info: dict = None) -> tuple:
         """Update application tracker status"""
+        self.user_cache.invalidate(user_id, 'tracked_schools')
         # Delegate to Supabase if available
         if self.storage_manager and hasattr(self.storage_manager, 'update_tracker_status'):
             return self.storage_manager.update_tracker_status(user_id, school_no, status, last_checked, application_info)
@@ -1,17 +1,25 @@
 import streamlit as st
-import sqlite3
 import hashlib
 from typing import Optional, Dict, List, Tuple
-from supabase import create_client, Client
+from supabase_client import Client, create_client
 import os
 from datetime import datetime
 import json
 
+from application_materials import select_items, materials_notes
+from concurrent_fetch import fetch_concurrently
+from db_metrics import instrument
+from notification_archive import (NOTIFICATION_PAGE_SIZE, NOTIFICATION_RETENTION_DAYS, ARCHIVE_BATCH_SIZE,
+                                  page_with_cursor, retention_cutoff, bucket_notifications, merge_entries)
+from supabase_migration import migrate_sqlite_to_supabase
+
 class SupabaseDatabaseManager:
-    def __init__(self):
-        """Initialize Supabase database connection"""
+    def __init__(self, instrumented: bool = True):
+        """Initialize Supabase database connection; instrumented=False leaves the methods untimed"""
         self.supabase: Optional[Client] = None
         self._init_supabase()
+        if instrumented:
+            instrument(self, 'supabase')
     
     def _init_supabase(self):
         """Initialize Supabase client"""
@@ -142,6 +150,31 @@ class SupabaseDatabaseManager:
             st.error(f"Error getting users: {str(e)}")
             return []
     
+    def fetch_many(self, reads: Dict[str, Tuple]) -> Dict[str, object]:
+        """
+        Run several independent reads concurrently
+        
+        Args:
+            reads: mapping of result name -> (method_name, *args),
+                e.g. {'children': ('get_child_profiles', user_id)}
+        """
+        return fetch_concurrently(self, reads)
+    
+    def _rpc(self, function: str, params: Dict):
+        """
+        Call a database function from SUPABASE_CREATE_RPC_FUNCTIONS.sql
+        
+        Returns None if the function has not been created yet, so callers
+        can fall back to separate requests.
+        """
+        try:
+            return self.supabase.rpc(function, params).execute().data
+        except Exception as e:
+            if 'PGRST202' in str(e) or 'Could not find the function' in str(e):
+                print(f"⚠️ Database function {function} not found; run SUPABASE_CREATE_RPC_FUNCTIONS.sql")
+                return None
+            raise
+    
     # Child profile methods
     def create_child_profile(self, user_id: int, child_name: str, date_of_birth: str = None,
                            gender: str = None, nationality: str = None, address: str = None,
@@ -394,6 +427,75 @@ class SupabaseDatabaseManager:
             st.error(f"Error getting notifications: {str(e)}")
             return []
     
+    def get_unread_count(self, user_id: int) -> int:
+        """Number of unread notifications, counted server-side without fetching rows"""
+        try:
+            if not self.supabase:
+                return 0
+            
+            result = self.supabase.table('notifications').select('id', count='exact', head=True) \
+                .eq('user_id', user_id).eq('is_read', False).execute()
+            return result.count or 0
+            
+        except Exception as e:
+            print(f"Error counting notifications: {e}")
+            return 0
+    
+    def get_notifications_page(self, user_id: int, unread_only: bool = False, cursor: tuple = None,
+                               limit: int = NOTIFICATION_PAGE_SIZE) -> Tuple[List[Dict], Optional[tuple]]:
+        """One page of notifications, newest first, and the cursor of the next page"""
+        try:
+            if not self.supabase:
+                return [], None
+            
+            query = self.supabase.table('notifications').select('*').eq('user_id', user_id)
+            if unread_only:
+                query = query.eq('is_read', False)
+            if cursor:
+                created_at, notification_id = cursor
+                query = query.or_(f"created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{notification_id})")
+            
+            result = query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+            return page_with_cursor(result.data, limit)
+            
+        except Exception as e:
+            st.error(f"Error getting notifications: {str(e)}")
+            return [], None
+    
+    def archive_notifications(self, user_id: int = None, retention_days: int = NOTIFICATION_RETENTION_DAYS) -> int:
+        """Move read notifications older than the retention period into notifications_archive"""
+        archived = 0
+        try:
+            if not self.supabase:
+                return 0
+            
+            cutoff = retention_cutoff(retention_days).isoformat()
+            while True:
+                query = self.supabase.table('notifications').select('*').eq('is_read', True).lt('created_at', cutoff)
+                if user_id is not None:
+                    query = query.eq('user_id', user_id)
+                rows = query.order('created_at').limit(ARCHIVE_BATCH_SIZE).execute().data
+                if not rows:
+                    return archived
+                
+                for (owner, period), entries in bucket_notifications(rows).items():
+                    existing = self.supabase.table('notifications_archive').select('id, entries') \
+                        .eq('user_id', owner).eq('period', period).execute().data
+                    merged = merge_entries(existing[0]['entries'] if existing else [], entries)
+                    if existing:
+                        self.supabase.table('notifications_archive').update(
+                            {'entries': merged, 'count': len(merged)}).eq('id', existing[0]['id']).execute()
+                    else:
+                        self.supabase.table('notifications_archive').insert(
+                            {'user_id': owner, 'period': period, 'entries': merged, 'count': len(merged)}).execute()
+                
+                self.supabase.table('notifications').delete().in_('id', [row['id'] for row in rows]).execute()
+                archived += len(rows)
+            
+        except Exception as e:
+            print(f"Error archiving notifications: {e}")
+            return archived
+    
     def mark_notification_read(self, notification_id: int) -> bool:
         """Mark a notification as read"""
         try:
@@ -423,28 +525,41 @@ class SupabaseDatabaseManager:
     # High-level methods for backward compatibility
     def register_user(self, name: str, email: str, phone: str, password: str) -> Tuple[bool, str]:
         """Register a new user"""
+        success, message, _ = self.register_user_account(name, email, phone, password)
+        return success, message
+    
+    def register_user_account(self, name: str, email: str, phone: str, password: str) -> Tuple[bool, str, Dict]:
+        """Register a new user in one transaction and return the created user"""
         try:
             if not self.supabase:
-                return False, "Database not initialized"
+                return False, "Database not initialized", {}
+            
+            # Hash password
+            password_hash = hashlib.sha256(password.encode()).hexdigest()
+            
+            result = self._rpc('register_user_account', {
+                'p_username': name,
+                'p_email': email,
+                'p_password_hash': password_hash,
+                'p_full_name': name,
+                'p_phone': phone
+            })
+            if result is not None:
+                return result['ok'], result['message'], result.get('user') or {}
             
             # Check if user already exists
             existing_user = self.get_user_by_email(email)
             if existing_user:
-                return False, "User with this email already exists"
-            
-            # Hash password
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
+                return False, "User with this email already exists", {}
             
             # Create user
-            success = self.create_user(name, email, password_hash, name, phone)
-            
-            if success:
-                return True, "User registered successfully"
+            if self.create_user(name, email, password_hash, name, phone):
+                return True, "User registered successfully", self.verify_user(email, password_hash) or {}
             else:
-                return False, "Failed to create user"
+                return False, "Failed to create user", {}
                 
         except Exception as e:
-            return False, f"Registration error: {str(e)}"
+            return False, f"Registration error: {str(e)}", {}
     
     def login_user(self, email: str, password: str) -> Tuple[bool, str, Dict]:
         """Login user"""
@@ -540,6 +655,58 @@ class SupabaseDatabaseManager:
         except Exception as e:
             return False, f"Error submitting application: {str(e)}"
     
+    def submit_application_with_materials(self, user_id: int, child_id: Optional[int], school_no: str, school_name: str,
+                                          parent_name: str, parent_email: str, parent_phone: str,
+                                          preferred_start_date: str, notes: str = None,
+                                          portfolio_item_ids: List[int] = None, statement_id: int = None,
+                                          notification_title: str = None,
+                                          notification_message: str = None) -> Tuple[bool, str]:
+        """
+        Submit an application with its materials summarised into the notes,
+        and add the confirmation notification, in one transaction
+        
+        A child_id of None means the user's most recently added child.
+        """
+        try:
+            if not self.supabase:
+                return False, "Database not initialized"
+            
+            result = self._rpc('submit_application_with_materials', {
+                'p_user_id': user_id,
+                'p_child_id': child_id,
+                'p_school_name': school_name,
+                'p_school_type': "kindergarten",
+                'p_application_date': preferred_start_date,
+                'p_notes': notes,
+                'p_portfolio_item_ids': list(portfolio_item_ids) if portfolio_item_ids else None,
+                'p_statement_id': statement_id,
+                'p_notification_title': notification_title,
+                'p_notification_message': notification_message
+            })
+            if result is not None:
+                return result['ok'], result['message']
+            
+            # Separate requests until the function exists
+            if child_id is None:
+                child_profiles = self.get_child_profiles(user_id)
+                if not child_profiles:
+                    return False, "No child profiles found. Please add a child profile first."
+                child_id = child_profiles[0]['id']
+            items = select_items(self.get_portfolio_items(user_id, child_id), portfolio_item_ids) if portfolio_item_ids else []
+            statement = None
+            if statement_id:
+                statement = next((s for s in self.get_personal_statements(user_id, child_id) if s['id'] == statement_id), None)
+            
+            application_id = self.create_application(user_id, child_id, school_name, "kindergarten", preferred_start_date,
+                                                     materials_notes(notes, items, statement))
+            if not application_id:
+                return False, "Failed to submit application"
+            if notification_title:
+                self.create_notification(user_id, notification_title, notification_message or "")
+            return True, f"Application submitted with ID: {application_id}"
+        except Exception as e:
+            return False, f"Error submitting application: {str(e)}"
+    
     def add_to_tracker(self, user_id: int, school_no: str, school_name: str) -> Tuple[bool, str]:
         """Add school to application tracker"""
         try:
@@ -585,6 +752,18 @@ class SupabaseDatabaseManager:
             st.error(f"Error getting tracked schools: {str(e)}")
             return []
     
+    def get_all_tracked_schools(self) -> List[Dict]:
+        """Get every tracked (user, school) pair"""
+        try:
+            if not self.supabase:
+                return []
+            
+            result = self.supabase.table('application_tracking').select('user_id, school_no, school_name, status').execute()
+            return result.data
+        except Exception as e:
+            print(f"Error getting tracked schools: {e}")
+            return []
+    
     def update_tracker_status(self, user_id: int, school_no: str, status: str, last_checked: str = None, application_info: dict = None) -> Tuple[bool, str]:
         """Update application tracker status"""
         try:
@@ -639,12 +818,17 @@ class SupabaseDatabaseManager:
             if not self.supabase:
                 return False
             
+            result = self._rpc('reset_user_by_email', {'p_email': email})
+            if result is not None:
+                return bool(result)
+            
             # Get user ID first
             user = self.get_user_by_email(email)
             if user:
                 user_id = user['id']
                 # Delete related data
                 self.supabase.table('notifications').delete().eq('user_id', user_id).execute()
+                self.supabase.table('notifications_archive').delete().eq('user_id', user_id).execute()
                 self.supabase.table('portfolio_items').delete().eq('user_id', user_id).execute()
                 self.supabase.table('personal_statements').delete().eq('user_id', user_id).execute()
                 self.supabase.table('applications').delete().eq('user_id', user_id).execute()
@@ -671,54 +855,19 @@ class SupabaseDatabaseManager:
             return False
     
     def migrate_from_sqlite(self, sqlite_db_path: str) -> bool:
-        """Migrate users from SQLite database"""
+        """Migrate users and all their data from a SQLite database (see supabase_migration.py)"""
         try:
             if not self.supabase:
                 return False
             
-            # Connect to SQLite database
-            sqlite_conn = sqlite3.connect(sqlite_db_path)
-            sqlite_cursor = sqlite_conn.cursor()
+            report = migrate_sqlite_to_supabase(self.supabase, sqlite_db_path)
+            for table, stats in report.items():
+                print(f"✅ {table}: {stats['inserted']} migrated, {stats['existing'] + stats['resumed']} already in Supabase"
+                      f", {stats['orphaned']} orphaned, {stats['failed']} failed")
             
-            # Get users from SQLite
-            sqlite_cursor.execute("SELECT name, email, password_hash, created_at FROM users")
-            users = sqlite_cursor.fetchall()
-            
-            migrated_count = 0
-            for user in users:
-                name = user[0]
-                email = user[1]
-                password_hash = user[2]
-                created_at = user[3]
-                
-                # Fallback: if name is empty/null, use email prefix
-                if not name or name.strip() == "":
-                    username = email.split('@')[0]
-                    full_name = username
-                else:
-                    username = name
-                    full_name = name
-                
-                # Check if user already exists
-                existing_user = self.get_user_by_email(email)
-                if not existing_user:
-                    # Create user in Supabase
-                    data = {
-                        'username': username,
-                        'email': email,
-                        'password_hash': password_hash,
-                        'full_name': full_name,
-                        'created_at': created_at or datetime.now().isoformat()
-                    }
-                    
-                    result = self.supabase.table('users').insert(data).execute()
-                    if result.data:
-                        migrated_count += 1
-                        print(f"✅ Migrated user: {email}")
-            
-            sqlite_conn.close()
-            print(f"✅ Migration complete. {migrated_count} users migrated.")
-            return True
+            failed = sum(stats['failed'] for stats in report.values())
+            print(f"✅ Migration complete. {sum(stats['inserted'] for stats in report.values())} rows migrated.")
+            return failed == 0
             
         except Exception as e:
             st.error(f"Migration error: {str(e)}")
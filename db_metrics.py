@@ -0,0 +1,268 @@
+"""
+Database Method Instrumentation
+Records call counts, latency histograms, rows returned and errors for the
+public methods of the database managers, plus a per-rerun call trace, and
+exports them as JSON or Prometheus text
+"""
+
+import os
+import time
+import threading
+import functools
+import inspect
+from collections import deque
+from typing import Optional, Dict, List, Any
+
+import streamlit as st
+
+# Session state key holding the call trace of the current script run
+SESSION_TRACE_KEY = '_db_call_trace'
+
+# Histogram bucket upper bounds in milliseconds (Prometheus "le" labels)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Recent samples kept per method for percentile estimates
+SAMPLE_WINDOW = 1024
+
+# Longest per-rerun trace kept; a page that issues more calls has bigger problems
+MAX_TRACE_LENGTH = 500
+
+
+def _metrics_enabled_from_config() -> bool:
+    """DB_METRICS_ENABLED env var, or ENABLED in the optional [METRICS] secrets section"""
+    env_value = os.getenv('DB_METRICS_ENABLED')
+    if env_value is not None:
+        return env_value.lower() in ('1', 'true', 'yes', 'on')
+    try:
+        if 'METRICS' in st.secrets:
+            return bool(st.secrets['METRICS'].get('ENABLED', False))
+    except Exception:
+        # No secrets file (scripts, local runs)
+        pass
+    return False
+
+
+class MethodStats:
+    """Aggregated measurements for one (manager, backend, method)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.failures = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def record(self, elapsed_ms: float, rows: Optional[int], error: bool, failed: bool):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+        if rows:
+            self.rows += rows
+        if error:
+            self.errors += 1
+        if failed:
+            self.failures += 1
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.bucket_counts[index] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def percentile(self, pct: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'failures': self.failures,
+            'rows': self.rows,
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+
+class MetricsRegistry:
+    """Process-wide store of method measurements shared by all sessions"""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = _metrics_enabled_from_config() if enabled is None else enabled
+        self.started_at = time.time()
+        self._stats: Dict[tuple, MethodStats] = {}
+        self._lock = threading.Lock()
+        self._depth = threading.local()
+
+    def record(self, manager: str, backend: str, method: str, elapsed_ms: float,
+               rows: Optional[int], error: bool, failed: bool):
+        key = (manager, backend, method)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = MethodStats()
+            stats.record(elapsed_ms, rows, error, failed)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """One summary dict per (manager, backend, method), slowest total time first"""
+        with self._lock:
+            rows = [
+                dict({'manager': manager, 'backend': backend, 'method': method}, **stats.summary(),
+                     total_ms=round(stats.total_ms, 3))
+                for (manager, backend, method), stats in self._stats.items()
+            ]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'since': self.started_at,
+            'methods': self.snapshot(),
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (histogram + counters, seconds)"""
+        lines = [
+            '# HELP school_portal_db_call_duration_seconds Database manager method latency',
+            '# TYPE school_portal_db_call_duration_seconds histogram',
+        ]
+        counters = {'errors': [], 'failures': [], 'rows': []}
+        with self._lock:
+            items = list(self._stats.items())
+            for (manager, backend, method), stats in items:
+                labels = f'manager="{manager}",backend="{backend}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS_MS, stats.bucket_counts):
+                    cumulative += count
+                    lines.append(f'school_portal_db_call_duration_seconds_bucket{{{labels},le="{bound / 1000}"}} {cumulative}')
+                lines.append(f'school_portal_db_call_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.calls}')
+                lines.append(f'school_portal_db_call_duration_seconds_sum{{{labels}}} {stats.total_ms / 1000:.6f}')
+                lines.append(f'school_portal_db_call_duration_seconds_count{{{labels}}} {stats.calls}')
+                counters['errors'].append(f'school_portal_db_call_errors_total{{{labels}}} {stats.errors}')
+                counters['failures'].append(f'school_portal_db_call_failures_total{{{labels}}} {stats.failures}')
+                counters['rows'].append(f'school_portal_db_rows_returned_total{{{labels}}} {stats.rows}')
+
+        lines += ['# HELP school_portal_db_call_errors_total Calls that raised an exception',
+                  '# TYPE school_portal_db_call_errors_total counter'] + counters['errors']
+        lines += ['# HELP school_portal_db_call_failures_total Calls that returned a (False, message) result',
+                  '# TYPE school_portal_db_call_failures_total counter'] + counters['failures']
+        lines += ['# HELP school_portal_db_rows_returned_total Rows returned by list-returning calls',
+                  '# TYPE school_portal_db_rows_returned_total counter'] + counters['rows']
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every session in the process
+registry = MetricsRegistry()
+
+
+def _count_rows(result) -> Optional[int]:
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and result and all(isinstance(v, list) for v in result.values()):
+        # fetch_many results
+        return sum(len(v) for v in result.values())
+    return None
+
+
+def _is_failure(result) -> bool:
+    return result is False or (isinstance(result, tuple) and bool(result) and result[0] is False)
+
+
+def _get_session_trace() -> List[Dict[str, Any]]:
+    """The current script run's trace list, or a private list outside Streamlit"""
+    try:
+        if SESSION_TRACE_KEY not in st.session_state:
+            st.session_state[SESSION_TRACE_KEY] = []
+        return st.session_state[SESSION_TRACE_KEY]
+    except Exception:
+        # Not running inside a Streamlit session (scripts, tests)
+        return []
+
+
+def start_call_trace():
+    """Begin a new per-rerun trace; call before the rerun's manager is built"""
+    if not registry.enabled:
+        return
+    try:
+        st.session_state[SESSION_TRACE_KEY] = []
+    except Exception:
+        pass
+
+
+def get_call_trace() -> List[Dict[str, Any]]:
+    """Calls recorded so far in the current script run"""
+    try:
+        return list(st.session_state.get(SESSION_TRACE_KEY, []))
+    except Exception:
+        return []
+
+
+def instrument(manager, backend: str, metrics: Optional[MetricsRegistry] = None):
+    """
+    Wrap the public methods of a manager instance with timing
+
+    Called from the managers' __init__; does nothing when metrics are disabled,
+    so the uninstrumented methods are called directly. Calls are appended to
+    the trace started by start_call_trace() for the current rerun.
+    """
+    metrics = metrics or registry
+    if not metrics.enabled:
+        return manager
+
+    manager_name = type(manager).__name__
+    trace = _get_session_trace()
+    depth = metrics._depth
+
+    for name, member in inspect.getmembers(type(manager), inspect.isfunction):
+        if name.startswith('_'):
+            continue
+        bound = getattr(manager, name)
+
+        def make_wrapper(method_name, func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                level = getattr(depth, 'value', 0)
+                depth.value = level + 1
+                error = False
+                result = None
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                    return result
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    depth.value = level
+                    rows = _count_rows(result)
+                    failed = _is_failure(result)
+                    metrics.record(manager_name, backend, method_name, elapsed_ms, rows, error, failed)
+                    if len(trace) < MAX_TRACE_LENGTH:
+                        trace.append({
+                            'manager': manager_name,
+                            'backend': backend,
+                            'method': method_name,
+                            'depth': level,
+                            'ms': round(elapsed_ms, 3),
+                            'rows': rows,
+                            'error': error,
+                        })
+            return wrapper
+
+        setattr(manager, name, make_wrapper(name, bound))
+    return manager
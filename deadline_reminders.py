@@ -0,0 +1,223 @@
+"""
+Deadline Reminder Engine
+Keeps the upcoming deadline events of every tracked (user, school) pair in a
+min-heap ordered by reminder time. Each tick pops only the reminders that are
+due and hands them to a notifier in one batch per user, so a tick costs
+O(due log n) instead of a rescan of every tracker row
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from typing import Optional, Dict, List, Callable, Union, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# School data fields holding event dates, with the label used in reminders.
+# 'deadline' is what analyze_application_content() extracts from a school's page.
+EVENT_FIELDS = {
+    'application_deadline': 'Application deadline',
+    'deadline': 'Application deadline',
+    'interview_date': 'Interview',
+    'result_date': 'Results',
+}
+
+# How long before each event a reminder goes out
+DEFAULT_LEAD_TIMES = [timedelta(days=7), timedelta(days=1)]
+
+DateLike = Union[str, date, datetime, None]
+
+
+@dataclass(frozen=True)
+class Reminder:
+    user_id: int
+    school_no: str
+    school_name: str
+    event: str
+    event_at: datetime
+    lead: timedelta
+    generation: int
+
+    @property
+    def label(self) -> str:
+        return EVENT_FIELDS.get(self.event, self.event.replace('_', ' ').title())
+
+
+def parse_event_date(value: DateLike) -> Optional[datetime]:
+    """Event date as a datetime; a bare date means the start of that day"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+
+def event_dates(school: Dict) -> Dict[str, datetime]:
+    """The event dates a school record carries, keyed by field"""
+    dates = {}
+    for field in EVENT_FIELDS:
+        event_at = parse_event_date(school.get(field))
+        if event_at:
+            dates[field] = event_at
+    # The extracted deadline and the listed one are the same event
+    if 'application_deadline' in dates:
+        dates.pop('deadline', None)
+    return dates
+
+
+def format_batch(reminders: List[Reminder]) -> Tuple[str, str, str]:
+    """Title, message and priority of one user's batch of reminders"""
+    reminders = sorted(reminders, key=lambda r: r.event_at)
+    if len(reminders) == 1:
+        title = f"{reminders[0].label}: {reminders[0].school_name}"
+    else:
+        title = f"{len(reminders)} upcoming school dates"
+    message = "\n".join(
+        f"{r.school_name} - {r.label} on {r.event_at.strftime('%Y-%m-%d')}" for r in reminders
+    )
+    priority = 'high' if any(r.lead <= timedelta(days=1) for r in reminders) else 'medium'
+    return title, message, priority
+
+
+class ReminderEngine:
+    """
+    Min-heap of pending reminders for all tracked schools
+
+    Untracking or re-tracking a pair bumps its generation instead of
+    searching the heap; reminders from an older generation are dropped when
+    they reach the top. Reminders already sent are remembered until their
+    event has passed, so refreshing a pair's dates does not repeat them. A
+    reminder only counts as sent once notify() returns; if it raises, the
+    reminder goes back on the heap for the next tick. Safe to share between
+    sessions.
+    """
+
+    def __init__(self, notify: Callable[[int, List[Reminder]], None],
+                 lead_times: Iterable[timedelta] = DEFAULT_LEAD_TIMES):
+        self.notify = notify
+        self.lead_times = sorted(lead_times, reverse=True)
+        self.heap: List[Tuple[datetime, int, Reminder]] = []
+        self.generations: Dict[Tuple[int, str], int] = {}
+        self.sent = set()
+        # (event_at, sent key) min-heap, so passed events leave self.sent without a scan
+        self._sent_expiry: List[Tuple[datetime, Tuple]] = []
+        # Sent keys of reminders popped but not yet delivered
+        self._sending = set()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def track(self, user_id: int, school_no: str, school_name: str, dates: Dict[str, datetime],
+              now: Optional[datetime] = None, catch_up: bool = True):
+        """
+        Schedule reminders for a pair's event dates, replacing any it had
+
+        With catch_up, an event whose earlier reminders have already passed
+        still gets one reminder on the next tick, for the nearest lead time
+        that has passed. Bulk loads pass catch_up=False so a restart does
+        not resend reminders.
+        """
+        now = now or datetime.now()
+        pair = (user_id, school_no)
+        with self._lock:
+            generation = self.generations.get(pair, 0) + 1
+            self.generations[pair] = generation
+            for event, event_at in dates.items():
+                if event_at <= now:
+                    continue
+                passed = [lead for lead in self.lead_times if event_at - lead <= now]
+                for lead in self.lead_times:
+                    remind_at = event_at - lead
+                    if remind_at <= now:
+                        if not (catch_up and lead == passed[-1]):
+                            continue
+                        remind_at = now
+                    reminder = Reminder(user_id, school_no, school_name, event, event_at, lead, generation)
+                    key = self._sent_key(reminder)
+                    if key in self.sent or key in self._sending:
+                        continue
+                    heapq.heappush(self.heap, (remind_at, next(self._counter), reminder))
+
+    def untrack(self, user_id: int, school_no: str):
+        with self._lock:
+            self.generations.pop((user_id, school_no), None)
+
+    @staticmethod
+    def _sent_key(reminder: Reminder) -> Tuple:
+        return reminder.user_id, reminder.school_no, reminder.event, reminder.event_at, reminder.lead
+
+    def _is_current(self, reminder: Reminder) -> bool:
+        return self.generations.get((reminder.user_id, reminder.school_no)) == reminder.generation
+
+    def pop_due(self, now: Optional[datetime] = None) -> Dict[int, List[Reminder]]:
+        """
+        Remove and return the reminders due by now, grouped by user
+
+        Each one must be passed to mark_sent() or requeue() afterwards;
+        until then track() does not schedule it again.
+        """
+        now = now or datetime.now()
+        due: Dict[int, List[Reminder]] = {}
+        with self._lock:
+            while self._sent_expiry and self._sent_expiry[0][0] <= now:
+                _, key = heapq.heappop(self._sent_expiry)
+                self.sent.discard(key)
+            while self.heap and self.heap[0][0] <= now:
+                _, _, reminder = heapq.heappop(self.heap)
+                # A reminder retried until after its event is no use any more
+                if not self._is_current(reminder) or reminder.event_at <= now:
+                    continue
+                key = self._sent_key(reminder)
+                if key in self.sent or key in self._sending:
+                    continue
+                self._sending.add(key)
+                due.setdefault(reminder.user_id, []).append(reminder)
+        return due
+
+    def mark_sent(self, reminders: List[Reminder]):
+        """Remember delivered reminders until their event has passed"""
+        with self._lock:
+            for reminder in reminders:
+                key = self._sent_key(reminder)
+                self._sending.discard(key)
+                if key not in self.sent:
+                    self.sent.add(key)
+                    heapq.heappush(self._sent_expiry, (reminder.event_at, key))
+
+    def requeue(self, reminders: List[Reminder], at: datetime):
+        """Put undelivered reminders back, due at the given time"""
+        with self._lock:
+            for reminder in reminders:
+                self._sending.discard(self._sent_key(reminder))
+                heapq.heappush(self.heap, (at, next(self._counter), reminder))
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """Send every due reminder, one notify() call per user; returns reminders sent"""
+        now = now or datetime.now()
+        due = self.pop_due(now)
+        sent = 0
+        for user_id, reminders in due.items():
+            try:
+                self.notify(user_id, reminders)
+            except Exception as e:
+                logger.error("Could not send %d reminders to user %s, retrying next tick: %s",
+                             len(reminders), user_id, e)
+                self.requeue(reminders, now)
+                continue
+            self.mark_sent(reminders)
+            sent += len(reminders)
+        return sent
+
+    def next_due(self) -> Optional[datetime]:
+        with self._lock:
+            return self.heap[0][0] if self.heap else None
@@ -0,0 +1,154 @@
+"""
+Application Dossier Export
+Builds one ZIP of a child's portfolio items with their attachments, personal
+statements and application history. The archive is written to disk entry by
+entry with attachments copied in fixed-size chunks, so memory stays bounded
+however large the attachments are, and a finished archive is reused until the
+underlying rows or files change
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+EXPORT_DIR = Path("exports")
+
+# Bytes copied per read when adding an attachment
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# Formats that are already compressed; deflating them again only costs time
+STORED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.pdf', '.mp4', '.mov', '.zip'}
+
+
+def _slug(text: Any, limit: int = 40) -> str:
+    slug = re.sub(r'[^\w\-]+', '_', str(text or ''), flags=re.UNICODE).strip('_')
+    return slug[:limit] or 'untitled'
+
+
+def _attachment_stat(path: Optional[str]) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    except (OSError, TypeError):
+        return None
+
+
+def child_applications(applications: List[Dict], child: Dict) -> List[Dict]:
+    """Applications for one child; SQLite rows carry the child's name, Supabase rows its id"""
+    return [
+        application for application in applications
+        if application.get('child_id') == child['id']
+        or (application.get('child_id') is None and application.get('child_name') == child.get('child_name'))
+    ]
+
+
+def dossier_fingerprint(child: Dict, items: List[Dict], statements: List[Dict], applications: List[Dict]) -> str:
+    """Changes whenever a row changes or an attachment file is replaced"""
+    attachments = {item.get('id'): _attachment_stat(item.get('attachment_path')) for item in items}
+    payload = json.dumps([child, items, statements, applications, attachments], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _write_json(archive: zipfile.ZipFile, name: str, data: Any):
+    archive.writestr(name, json.dumps(data, ensure_ascii=False, indent=2, default=str))
+
+
+def _add_attachment(archive: zipfile.ZipFile, source: str, name: str):
+    compress_type = zipfile.ZIP_STORED if Path(source).suffix.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    info = zipfile.ZipInfo.from_file(source, name)
+    info.compress_type = compress_type
+    with open(source, 'rb') as src, archive.open(info, 'w', force_zip64=True) as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK_BYTES)
+
+
+def build_dossier(path: Path, child: Dict, items: List[Dict], statements: List[Dict],
+                  applications: List[Dict]) -> Dict[str, Any]:
+    """
+    Write the dossier ZIP to path and return its manifest
+
+    The archive is built in a uniquely named .tmp file and renamed into
+    place once complete, so a half-written export is never served and two
+    sessions exporting the same child never write to the same file. Attachments that no
+    longer exist on disk are listed in the manifest instead.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f"{path.stem}.", suffix='.tmp', dir=path.parent)
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    manifest = {
+        'child': child.get('child_name'),
+        'generated_at': datetime.now().isoformat(),
+        'portfolio_items': len(items),
+        'personal_statements': len(statements),
+        'applications': len(applications),
+        'attachments': [],
+        'missing_attachments': [],
+    }
+
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            entries = []
+            for item in items:
+                entry = dict(item)
+                source = item.get('attachment_path')
+                if source:
+                    name = f"portfolio/attachments/{item.get('id')}_{os.path.basename(source)}"
+                    if os.path.isfile(source):
+                        _add_attachment(archive, source, name)
+                        entry['attachment_file'] = name
+                        manifest['attachments'].append(name)
+                    else:
+                        manifest['missing_attachments'].append(source)
+                entries.append(entry)
+            _write_json(archive, 'portfolio/portfolio_items.json', entries)
+
+            for statement in statements:
+                name = f"personal_statements/{statement.get('id')}_{_slug(statement.get('title'))}.txt"
+                archive.writestr(name, statement.get('content') or '')
+            _write_json(archive, 'personal_statements/personal_statements.json', statements)
+
+            _write_json(archive, 'applications.json', applications)
+            _write_json(archive, 'manifest.json', manifest)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return manifest
+
+
+def export_dossier(db, user_id: int, child: Dict, export_dir: Path = EXPORT_DIR) -> Path:
+    """
+    Path of an up-to-date dossier ZIP for a child, building it only if needed
+
+    Archives are named by a fingerprint of their contents; an existing
+    archive with the current fingerprint is returned as is, and older
+    archives for the child are removed when a new one is built.
+    """
+    data = db.fetch_many({
+        'items': ('get_portfolio_items', user_id, child['id']),
+        'statements': ('get_personal_statements', user_id, child['id']),
+        'applications': ('get_applications', user_id),
+    })
+    items = data['items'] or []
+    statements = data['statements'] or []
+    applications = child_applications(data['applications'] or [], child)
+
+    export_dir = Path(export_dir)
+    prefix = f"dossier_{user_id}_{child['id']}_"
+    path = export_dir / f"{prefix}{dossier_fingerprint(child, items, statements, applications)}.zip"
+    if path.exists():
+        return path
+
+    build_dossier(path, child, items, statements, applications)
+    for stale in export_dir.glob(f"{prefix}*.zip"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
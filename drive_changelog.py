@@ -0,0 +1,449 @@
+"""
+Drive Change Log Shipping
+Records row-level changes to the Drive-backed SQLite database and ships them
+to Google Drive as small delta segments instead of re-uploading the whole file
+"""
+
+import gzip
+import json
+import sqlite3
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, List, Any
+
+# User tables whose writes are recorded; every one has an integer `id` key
+CHANGE_LOG_TABLES = [
+    'users',
+    'child_profiles',
+    'applications',
+    'application_tracking',
+    'notifications',
+    'notifications_archive',
+    'portfolio_items',
+    'personal_statements',
+]
+
+# Integer columns referencing another logged table. Local ids differ between
+# sessions, so these are shipped as global keys and translated on replay
+FOREIGN_KEYS = {
+    'child_profiles': {'user_id': 'users'},
+    'applications': {'user_id': 'users', 'child_id': 'child_profiles'},
+    'application_tracking': {'user_id': 'users'},
+    'notifications': {'user_id': 'users'},
+    'notifications_archive': {'user_id': 'users'},
+    'portfolio_items': {'user_id': 'users', 'child_id': 'child_profiles'},
+    'personal_statements': {'user_id': 'users', 'child_id': 'child_profiles'},
+}
+
+# Columns identifying the same entity in every session; an insert colliding
+# on them is merged into the existing row instead of being dropped
+NATURAL_KEYS = {
+    'users': ('email',),
+    'notifications_archive': ('user_id', 'period'),
+}
+
+# Origin of rows that were already in the database before any session
+# logged changes; their ids are the same everywhere
+BASE_ORIGIN = 'base'
+
+# Once this many segments were written since the last base snapshot, the
+# next sync uploads a fresh snapshot
+COMPACT_SEGMENT_THRESHOLD = 25
+
+# Segments already folded into a snapshot are only deleted once they are this
+# old, so sessions that started before the compaction can still pull them
+SEGMENT_RETENTION = timedelta(hours=24)
+
+SEGMENT_MIME_TYPE = 'application/gzip'
+
+
+def segment_prefix(db_name: str) -> str:
+    """Drive file name prefix shared by all segments of a database"""
+    return f"{db_name}.seg-"
+
+
+class DriveChangeLog:
+    """
+    Row-level change log for a CloudSQLiteManager database
+
+    Changes are captured by SQLite triggers into a local `_change_log` table.
+    `sync()` pulls and replays segments written by other sessions, ships local
+    changes as one gzipped JSON-lines segment, and compacts periodically by
+    uploading a new base snapshot.
+
+    Every row is identified across sessions by (origin session, id in that
+    session); `_change_log_ids` maps those keys to local ids and travels
+    inside the database file, so a new base carries its map along. Replay
+    translates ids and foreign keys through it, so rows inserted by two
+    sessions under the same local id stay two rows. Writes to the same row
+    resolve last-writer-wins in replay order; an insert that collides on a
+    unique column is merged by NATURAL_KEYS or skipped and reported.
+    """
+
+    def __init__(self, cloud_manager, conn: sqlite3.Connection, session_id: str = None):
+        self.cloud_manager = cloud_manager
+        self.conn = conn
+        self.session_id = session_id or uuid.uuid4().hex[:8]
+        self.bytes_shipped = 0
+        self.conflicts: List[Dict[str, Any]] = []
+
+    # Setup
+    def install(self) -> bool:
+        """
+        Create the log tables and capture triggers; False if unsupported
+
+        Leaves an already installed database untouched, so an unchanged
+        cached copy stays byte-identical to the one on Drive.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT json_object('a', 1)")
+        except sqlite3.OperationalError:
+            print("SQLite JSON functions not available; change log disabled")
+            return False
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS _change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                op TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                row_data TEXT,
+                shipped INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS _change_log_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                replaying INTEGER DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS _change_log_applied (
+                segment_name TEXT PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS _change_log_ids (
+                origin TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                origin_id INTEGER NOT NULL,
+                local_id INTEGER NOT NULL,
+                PRIMARY KEY (origin, table_name, origin_id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_change_log_ids_local
+            ON _change_log_ids (table_name, local_id)
+        ''')
+
+        state = cursor.execute('SELECT replaying FROM _change_log_state WHERE id = 1').fetchone()
+        if state is None:
+            cursor.execute('INSERT INTO _change_log_state (id, replaying) VALUES (1, 0)')
+        elif state[0]:
+            # A previous process died mid-replay
+            cursor.execute('UPDATE _change_log_state SET replaying = 0')
+
+        for table in CHANGE_LOG_TABLES:
+            columns = self._table_columns(table)
+            if 'id' not in columns:
+                continue
+            self._install_triggers(cursor, table, columns)
+
+        if self.conn.in_transaction:
+            self.conn.commit()
+        return True
+
+    def _table_columns(self, table: str) -> List[str]:
+        """Column names of a table, or [] if it does not exist"""
+        cursor = self.conn.execute(f'PRAGMA table_info({table})')
+        return [row[1] for row in cursor.fetchall()]
+
+    def _install_triggers(self, cursor, table: str, columns: List[str]):
+        """Create insert/update/delete triggers, recreating any whose captured columns changed"""
+        new_row = ', '.join(f"'{col}', NEW.{col}" for col in columns)
+        not_replaying = '(SELECT replaying FROM _change_log_state WHERE id = 1) = 0'
+        triggers = {
+            'insert': f"""CREATE TRIGGER _cl_{table}_insert AFTER INSERT ON {table}
+            WHEN {not_replaying}
+            BEGIN
+                INSERT INTO _change_log (table_name, op, row_id, row_data)
+                VALUES ('{table}', 'insert', NEW.id, json_object({new_row}));
+            END""",
+            'update': f"""CREATE TRIGGER _cl_{table}_update AFTER UPDATE ON {table}
+            WHEN {not_replaying}
+            BEGIN
+                INSERT INTO _change_log (table_name, op, row_id, row_data)
+                VALUES ('{table}', 'update', NEW.id, json_object({new_row}));
+            END""",
+            'delete': f"""CREATE TRIGGER _cl_{table}_delete AFTER DELETE ON {table}
+            WHEN {not_replaying}
+            BEGIN
+                INSERT INTO _change_log (table_name, op, row_id, row_data)
+                VALUES ('{table}', 'delete', OLD.id, NULL);
+            END""",
+        }
+        existing = dict(cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,)
+        ).fetchall())
+        for op, sql in triggers.items():
+            name = f'_cl_{table}_{op}'
+            if existing.get(name) == sql:
+                continue
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(sql)
+
+    # Global row keys
+    def _global_key(self, table: str, local_id: int) -> tuple:
+        """(origin, origin_id) of a local row; unmapped rows predate the log"""
+        row = self.conn.execute(
+            'SELECT origin, origin_id FROM _change_log_ids WHERE table_name = ? AND local_id = ?',
+            (table, local_id)
+        ).fetchone()
+        return (row[0], row[1]) if row else (BASE_ORIGIN, local_id)
+
+    def _local_id(self, table: str, origin: str, origin_id: int) -> Optional[int]:
+        """Local id of a global key, or None if the row never reached this database"""
+        row = self.conn.execute(
+            'SELECT local_id FROM _change_log_ids WHERE origin = ? AND table_name = ? AND origin_id = ?',
+            (origin, table, origin_id)
+        ).fetchone()
+        if row:
+            return row[0]
+        return origin_id if origin == BASE_ORIGIN else None
+
+    def _map_id(self, table: str, origin: str, origin_id: int, local_id: int):
+        """Record that a global key lives under local_id, replacing a stale mapping of that id"""
+        self.conn.execute('DELETE FROM _change_log_ids WHERE table_name = ? AND local_id = ?',
+                          (table, local_id))
+        self.conn.execute(
+            'INSERT OR REPLACE INTO _change_log_ids (origin, table_name, origin_id, local_id) VALUES (?, ?, ?, ?)',
+            (origin, table, origin_id, local_id)
+        )
+
+    # Shipping
+    def pending_changes(self) -> List[Dict[str, Any]]:
+        """Local changes not yet shipped to Drive, oldest first"""
+        cursor = self.conn.execute('''
+            SELECT seq, table_name, op, row_id, row_data
+            FROM _change_log WHERE shipped = 0
+            ORDER BY seq
+        ''')
+        return [
+            {
+                'seq': row[0],
+                'table': row[1],
+                'op': row[2],
+                'id': row[3],
+                'row': json.loads(row[4]) if row[4] else None
+            }
+            for row in cursor.fetchall()
+        ]
+
+    def _keyed(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        """A pending change with the global keys of its row and foreign keys"""
+        table = change['table']
+        if change['op'] == 'insert':
+            # A fresh local row is keyed by this session
+            self._map_id(table, self.session_id, change['id'], change['id'])
+        change['origin'], change['origin_id'] = self._global_key(table, change['id'])
+        row = change.get('row')
+        if row:
+            change['refs'] = {
+                column: list(self._global_key(parent, row[column]))
+                for column, parent in FOREIGN_KEYS.get(table, {}).items()
+                if row.get(column) is not None
+            }
+        return change
+
+    def ship(self) -> Optional[str]:
+        """Upload pending changes as one segment; returns the segment name"""
+        changes = [self._keyed(change) for change in self.pending_changes()]
+        if not changes:
+            return None
+
+        payload = '\n'.join(json.dumps(change, default=str) for change in changes)
+        data = gzip.compress(payload.encode('utf-8'))
+        timestamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        name = f"{segment_prefix(self.cloud_manager.db_name)}{timestamp}-{self.session_id}.jsonl.gz"
+
+        if not self.cloud_manager.upload_segment(name, data):
+            return None
+
+        cursor = self.conn.cursor()
+        cursor.execute('UPDATE _change_log SET shipped = 1 WHERE seq <= ? AND shipped = 0',
+                       (changes[-1]['seq'],))
+        # Deleted rows give up their keys only once the delete is on Drive
+        cursor.executemany('DELETE FROM _change_log_ids WHERE table_name = ? AND local_id = ?',
+                           [(c['table'], c['id']) for c in changes if c['op'] == 'delete'])
+        # Our own segment is already reflected locally
+        cursor.execute('INSERT OR IGNORE INTO _change_log_applied (segment_name) VALUES (?)', (name,))
+        self.conn.commit()
+
+        self.bytes_shipped += len(data)
+        print(f"Shipped {len(changes)} changes ({len(data)} bytes) to {name}")
+        return name
+
+    # Replay
+    def _applied_segments(self) -> set:
+        cursor = self.conn.execute('SELECT segment_name FROM _change_log_applied')
+        return {row[0] for row in cursor.fetchall()}
+
+    def pull(self) -> int:
+        """Replay segments written by other sessions; returns segments applied"""
+        segments = self.cloud_manager.list_segments()
+        applied = self._applied_segments()
+        new_segments = [seg for seg in segments if seg['name'] not in applied]
+
+        for segment in new_segments:
+            data = self.cloud_manager.download_segment(segment['id'])
+            if data is None:
+                # Try again on the next sync rather than skipping it forever
+                break
+            changes = [json.loads(line) for line in gzip.decompress(data).decode('utf-8').splitlines() if line]
+            self.replay(changes, segment['name'])
+
+        return len(new_segments)
+
+    def replay(self, changes: List[Dict[str, Any]], segment_name: str = None):
+        """Apply changes without re-logging them, in one transaction"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute('UPDATE _change_log_state SET replaying = 1')
+            columns_by_table = {}
+            for change in changes:
+                table = change['table']
+                if table not in CHANGE_LOG_TABLES:
+                    continue
+                # Segments written before global keys only know local ids
+                origin = change.get('origin', BASE_ORIGIN)
+                origin_id = change.get('origin_id', change['id'])
+                if table not in columns_by_table:
+                    columns_by_table[table] = set(self._table_columns(table))
+                self._apply(cursor, change, table, origin, origin_id, columns_by_table[table])
+
+            if segment_name:
+                cursor.execute('INSERT OR IGNORE INTO _change_log_applied (segment_name) VALUES (?)',
+                               (segment_name,))
+            cursor.execute('UPDATE _change_log_state SET replaying = 0')
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            cursor.execute('UPDATE _change_log_state SET replaying = 0')
+            self.conn.commit()
+            raise
+
+    def _apply(self, cursor, change: Dict[str, Any], table: str, origin: str, origin_id: int, columns: set):
+        """Apply one change with explicit INSERT/UPDATE/DELETE so every trigger sees it"""
+        local_id = self._local_id(table, origin, origin_id)
+
+        if change['op'] == 'delete':
+            if local_id is not None:
+                cursor.execute(f'DELETE FROM {table} WHERE id = ?', (local_id,))
+                cursor.execute('DELETE FROM _change_log_ids WHERE table_name = ? AND local_id = ?',
+                               (table, local_id))
+            return
+
+        row = {k: v for k, v in (change.get('row') or {}).items() if k in columns and k != 'id'}
+        for column, (ref_origin, ref_id) in (change.get('refs') or {}).items():
+            if column not in row:
+                continue
+            parent_id = self._local_id(FOREIGN_KEYS[table][column], ref_origin, ref_id)
+            if parent_id is None:
+                self._conflict(change, f"{column} refers to a row this database never received")
+                return
+            row[column] = parent_id
+        if not row:
+            return
+
+        if local_id is not None and self._update(cursor, table, local_id, row):
+            return
+
+        # New here: keep the sender's id when it is free, otherwise take a new one
+        if local_id is None:
+            taken = cursor.execute(f'SELECT 1 FROM {table} WHERE id = ?', (origin_id,)).fetchone()
+            local_id = None if taken else origin_id
+        values = dict(row, id=local_id) if local_id is not None else row
+        cols = list(values.keys())
+        try:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+                [values[c] for c in cols]
+            )
+            local_id = cursor.lastrowid
+        except sqlite3.IntegrityError as e:
+            local_id = self._natural_match(table, row)
+            if local_id is None:
+                self._conflict(change, str(e))
+                return
+            self._update(cursor, table, local_id, row)
+        self._map_id(table, origin, origin_id, local_id)
+
+    def _update(self, cursor, table: str, local_id: int, row: Dict[str, Any]) -> bool:
+        """Overwrite a local row; False if it does not exist"""
+        assignments = ', '.join(f'{col} = ?' for col in row)
+        cursor.execute(f'UPDATE {table} SET {assignments} WHERE id = ?', list(row.values()) + [local_id])
+        return cursor.rowcount > 0
+
+    def _natural_match(self, table: str, row: Dict[str, Any]) -> Optional[int]:
+        """Local id of the row with the same natural key, if the table has one"""
+        key = NATURAL_KEYS.get(table)
+        if not key or any(row.get(col) is None for col in key):
+            return None
+        match = self.conn.execute(
+            f"SELECT id FROM {table} WHERE {' AND '.join(f'{col} = ?' for col in key)}",
+            [row[col] for col in key]
+        ).fetchone()
+        return match[0] if match else None
+
+    def _conflict(self, change: Dict[str, Any], reason: str):
+        """Record a change that could not be applied"""
+        self.conflicts.append({'change': change, 'reason': reason})
+        print(f"Change log conflict on {change['table']} {change.get('origin')}/{change.get('origin_id')}: {reason}")
+
+    # Compaction
+    def compact_if_needed(self, threshold: int = COMPACT_SEGMENT_THRESHOLD) -> bool:
+        """Upload a new base snapshot once enough segments piled up"""
+        base = self.cloud_manager.get_base_metadata()
+        base_time = base.get('modifiedTime', '')
+        segments = self.cloud_manager.list_segments()
+        since_base = [seg for seg in segments if seg.get('createdTime', '') > base_time]
+        if len(since_base) < threshold:
+            return False
+
+        # Everything we shipped is part of the snapshot; keep the log small
+        self.conn.execute('DELETE FROM _change_log WHERE shipped = 1')
+        self.conn.commit()
+
+        if not self.cloud_manager.upload_database():
+            return False
+
+        # Only drop segments that the snapshot contains and that are past the
+        # retention window for sessions still running on an older base
+        cutoff = (datetime.now(timezone.utc) - SEGMENT_RETENTION).strftime('%Y-%m-%dT%H:%M:%S')
+        applied = self._applied_segments()
+        expired = [seg for seg in segments
+                   if seg['name'] in applied and seg.get('createdTime', '') < cutoff]
+        for segment in expired:
+            self.cloud_manager.delete_segment(segment['id'])
+
+        if expired:
+            self.conn.executemany('DELETE FROM _change_log_applied WHERE segment_name = ?',
+                                  [(seg['name'],) for seg in expired])
+            self.conn.commit()
+
+        print(f"Compacted change log into a new base snapshot ({len(expired)} segments removed)")
+        return True
+
+    def sync(self) -> bool:
+        """Pull remote changes, ship local ones, and compact when due"""
+        try:
+            self.pull()
+            self.ship()
+            self.compact_if_needed()
+            return True
+        except Exception as e:
+            print(f"Change log sync error: {str(e)}")
+            return False
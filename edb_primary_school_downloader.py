@@ -14,12 +14,18 @@ import logging
 from datetime import datetime
 from bs4 import BeautifulSoup
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from pathlib import Path
 import random
-from supabase import create_client, Client
+from supabase_client import Client, create_client
 import urllib.parse
 
+from scraper_telemetry import ScrapeRun
+from school_registry import dedupe_records
+from ingestion_pipeline import SourcePlugin, JsonSnapshotSink, SupabaseSink, run_source
+from school_identity import SchoolIdentity
+from csv_normalization import iter_normalized_chunks, normalize_frame, resolve_columns, to_records
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +37,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rows of a downloaded CSV parsed and normalized at a time
+CSV_CHUNK_ROWS = 500
+
 class EDBPrimarySchoolDownloader:
     """Downloads primary school data from EDB website"""
     
@@ -42,6 +51,9 @@ class EDBPrimarySchoolDownloader:
         self.data_dir = Path("edb_data")
         self.data_dir.mkdir(exist_ok=True)
         
+        # Per-stage run metrics
+        self.telemetry = ScrapeRun('edb_downloader', self.data_dir / "scrape_runs.jsonl")
+        
         # EDB website URLs
         self.base_url = "https://www.edb.gov.hk"
         self.primary_school_url = "https://www.edb.gov.hk/en/edu-system/primary-secondary/applicable-to-primary/primary-1-admission/school-lists/"
@@ -81,14 +93,26 @@ class EDBPrimarySchoolDownloader:
         """Download primary school data for all districts"""
         logger.info("Starting download of primary school data for all districts...")
         
-        all_schools = []
+        all_schools = list(self.iter_primary_schools())
         
+        # Remove duplicates
+        with self.telemetry.stage('dedupe') as dedupe:
+            unique_schools = self._remove_duplicates(all_schools)
+            dedupe.items += len(unique_schools)
+        logger.info(f"Total unique schools found: {len(unique_schools)}")
+        
+        return unique_schools
+    
+    def iter_primary_schools(self) -> Iterator[Dict]:
+        """Yield schools from the main list, then from each district, as they are downloaded"""
         # First, try to get the main school list page
         try:
-            main_schools = self._download_main_school_list()
-            if main_schools:
-                all_schools.extend(main_schools)
-                logger.info(f"Downloaded {len(main_schools)} schools from main list")
+            found = 0
+            for school in self._iter_main_school_list():
+                found += 1
+                yield school
+            if found:
+                logger.info(f"Downloaded {found} schools from main list")
         except Exception as e:
             logger.error(f"Error downloading main school list: {e}")
         
@@ -98,23 +122,19 @@ class EDBPrimarySchoolDownloader:
                 logger.info(f"Downloading data for {district_en}...")
                 district_schools = self._download_district_data(district_en, district_tc)
                 if district_schools:
-                    all_schools.extend(district_schools)
                     logger.info(f"Downloaded {len(district_schools)} schools from {district_en}")
+                    yield from district_schools
                 time.sleep(random.uniform(2, 4))  # Be respectful
             except Exception as e:
                 logger.error(f"Error downloading data for {district_en}: {e}")
                 continue
-        
-        # Remove duplicates
-        unique_schools = self._remove_duplicates(all_schools)
-        logger.info(f"Total unique schools found: {len(unique_schools)}")
-        
-        return unique_schools
     
     def _download_main_school_list(self) -> List[Dict]:
         """Download the main primary school list from EDB"""
-        schools = []
-        
+        return list(self._iter_main_school_list())
+    
+    def _iter_main_school_list(self) -> Iterator[Dict]:
+        """_download_main_school_list(), yielding CSV rows as each chunk is parsed"""
         try:
             # Try different EDB URLs for primary school data
             urls_to_try = [
@@ -127,13 +147,11 @@ class EDBPrimarySchoolDownloader:
             for url in urls_to_try:
                 try:
                     logger.info(f"Trying URL: {url}")
-                    response = self.session.get(url, timeout=30)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
+                    response = self.telemetry.get(self.session, url, 'listing_fetch', timeout=30)
+                    page = self.telemetry.parse_page(response.content, ('tables', 'links'))
                     
                     # Look for CSV download links
-                    csv_links = soup.find_all('a', href=re.compile(r'\.csv|\.xlsx|\.xls'))
+                    csv_links = page.soup_for('links').find_all('a', href=re.compile(r'\.csv|\.xlsx|\.xls'))
                     if csv_links:
                         for link in csv_links:
                             csv_url = link.get('href')
@@ -141,31 +159,31 @@ class EDBPrimarySchoolDownloader:
                                 csv_url = self.base_url + csv_url
                             
                             logger.info(f"Found CSV link: {csv_url}")
-                            csv_schools = self._download_csv_file(csv_url)
-                            if csv_schools:
-                                schools.extend(csv_schools)
+                            csv_count = 0
+                            for school in self._iter_csv_file(csv_url):
+                                csv_count += 1
+                                yield school
+                            if csv_count:
                                 break
                     
                     # Look for school tables
-                    table_schools = self._extract_from_tables(soup)
+                    table_schools = self._extract_from_tables(page.soup_for('tables'))
                     if table_schools:
-                        schools.extend(table_schools)
+                        yield from table_schools
                         break
                     
                     # Look for school links
-                    link_schools = self._extract_from_links(soup)
+                    link_schools = self._extract_from_links(page.soup_for('links'))
                     if link_schools:
-                        schools.extend(link_schools)
+                        yield from link_schools
                         break
                         
                 except Exception as e:
-                    logger.debug(f"Failed to access {url}: {e}")
+                    logger.debug("Failed to access %s: %s", url, e)
                     continue
             
         except Exception as e:
             logger.error(f"Error downloading main school list: {e}")
-        
-        return schools
     
     def _download_district_data(self, district_en: str, district_tc: str) -> List[Dict]:
         """Download data for a specific district"""
@@ -182,14 +200,12 @@ class EDBPrimarySchoolDownloader:
             
             for url in district_urls:
                 try:
-                    response = self.session.get(url, timeout=30)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
+                    response = self.telemetry.get(self.session, url, 'listing_fetch', timeout=30)
+                    page = self.telemetry.parse_page(response.content, ('tables', 'links'))
                     
                     # Extract schools from this district page
-                    district_schools = self._extract_from_tables(soup)
-                    district_schools.extend(self._extract_from_links(soup))
+                    district_schools = self._extract_from_tables(page.soup_for('tables'))
+                    district_schools.extend(self._extract_from_links(page.soup_for('links')))
                     
                     # Add district information
                     for school in district_schools:
@@ -202,7 +218,7 @@ class EDBPrimarySchoolDownloader:
                         break
                         
                 except Exception as e:
-                    logger.debug(f"Failed to access district URL {url}: {e}")
+                    logger.debug("Failed to access district URL %s: %s", url, e)
                     continue
             
         except Exception as e:
@@ -212,12 +228,13 @@ class EDBPrimarySchoolDownloader:
     
     def _download_csv_file(self, csv_url: str) -> List[Dict]:
         """Download and parse a CSV file"""
-        schools = []
-        
+        return list(self._iter_csv_file(csv_url))
+    
+    def _iter_csv_file(self, csv_url: str) -> Iterator[Dict]:
+        """Download a CSV file and yield its normalized rows, parsed CSV_CHUNK_ROWS at a time"""
         try:
             logger.info(f"Downloading CSV from: {csv_url}")
-            response = self.session.get(csv_url, timeout=60)
-            response.raise_for_status()
+            response = self.telemetry.get(self.session, csv_url, 'detail_fetch', timeout=60)
             
             # Save the CSV file
             filename = f"edb_primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -228,88 +245,22 @@ class EDBPrimarySchoolDownloader:
             
             logger.info(f"CSV saved to: {filepath}")
             
-            # Parse CSV
-            try:
-                df = pd.read_csv(filepath, encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(filepath, encoding='gbk')
-            
-            # Convert to list of dictionaries
-            schools = df.to_dict('records')
-            
-            # Normalize the data
-            schools = self._normalize_csv_data(schools)
+            parsed = 0
+            for chunk in iter_normalized_chunks(filepath, 'EDB CSV Download', CSV_CHUNK_ROWS, website_verified=True):
+                self.telemetry.add_items('normalize', len(chunk))
+                parsed += len(chunk)
+                yield from chunk
             
-            logger.info(f"Parsed {len(schools)} schools from CSV")
+            logger.info(f"Parsed {parsed} schools from CSV")
             
         except Exception as e:
             logger.error(f"Error downloading CSV from {csv_url}: {e}")
-        
-        return schools
     
-    def _normalize_csv_data(self, schools: List[Dict]) -> List[Dict]:
-        """Normalize CSV data to our standard format"""
-        normalized = []
-        
-        for i, school in enumerate(schools):
-            try:
-                # Generate school number
-                school_no = f"PS{i+1:04d}"
-                
-                # Extract school name (try different possible column names)
-                name_en = self._extract_field(school, ['School Name (English)', 'School Name', 'Name (English)', 'English Name', 'name_en'])
-                name_tc = self._extract_field(school, ['School Name (Chinese)', 'Chinese Name', 'Name (Chinese)', 'name_tc'])
-                
-                # Extract district
-                district_en = self._extract_field(school, ['District (English)', 'District', 'district_en'])
-                district_tc = self._extract_field(school, ['District (Chinese)', 'district_tc'])
-                
-                # Extract address
-                address_en = self._extract_field(school, ['Address (English)', 'Address', 'address_en'])
-                address_tc = self._extract_field(school, ['Address (Chinese)', 'address_tc'])
-                
-                # Extract phone
-                tel = self._extract_field(school, ['Telephone', 'Phone', 'Tel', 'tel'])
-                
-                # Extract website
-                website = self._extract_field(school, ['Website', 'URL', 'website'])
-                
-                normalized_school = {
-                    'school_no': school_no,
-                    'name_en': name_en or f"Primary School {i+1}",
-                    'name_tc': name_tc or name_en or f"小學 {i+1}",
-                    'district_en': district_en or 'Unknown',
-                    'district_tc': district_tc or district_en or '未知',
-                    'address_en': address_en or 'Address not available',
-                    'address_tc': address_tc or address_en or '地址不詳',
-                    'tel': tel or 'N/A',
-                    'website': website or '',
-                    'curriculum': '本地課程',
-                    'funding_type': '資助',
-                    'through_train': True,
-                    'language_of_instruction': '中英文',
-                    'student_capacity': '600',
-                    'application_page': website or '',
-                    'has_website': bool(website),
-                    'website_verified': bool(website),
-                    'source': 'EDB CSV Download',
-                    'last_updated': datetime.now().isoformat()
-                }
-                
-                normalized.append(normalized_school)
-                
-            except Exception as e:
-                logger.error(f"Error normalizing school data: {e}")
-                continue
-        
-        return normalized
-    
-    def _extract_field(self, data: Dict, possible_names: List[str]) -> str:
-        """Extract a field from data using possible column names"""
-        for name in possible_names:
-            if name in data and data[name]:
-                return str(data[name]).strip()
-        return ''
+    def _normalize_csv_data(self, schools: List[Dict], start: int = 0) -> List[Dict]:
+        """Normalize CSV data to our standard format; start is the row number of the first school"""
+        frame = pd.DataFrame(schools)
+        return to_records(normalize_frame(frame, resolve_columns(frame.columns), 'EDB CSV Download',
+                                          start=start, website_verified=True))
     
     def _extract_from_tables(self, soup: BeautifulSoup) -> List[Dict]:
         """Extract school data from HTML tables"""
@@ -392,7 +343,7 @@ class EDBPrimarySchoolDownloader:
             }
             
         except Exception as e:
-            logger.debug(f"Error parsing table row: {e}")
+            logger.debug("Error parsing table row: %s", e)
             return None
     
     def _parse_school_link(self, link) -> Optional[Dict]:
@@ -430,7 +381,7 @@ class EDBPrimarySchoolDownloader:
             }
             
         except Exception as e:
-            logger.debug(f"Error parsing school link: {e}")
+            logger.debug("Error parsing school link: %s", e)
             return None
     
     def _is_school_link(self, href: str, text: str) -> bool:
@@ -439,17 +390,13 @@ class EDBPrimarySchoolDownloader:
         return any(indicator in href.lower() or indicator in text.lower() for indicator in school_indicators)
     
     def _remove_duplicates(self, schools: List[Dict]) -> List[Dict]:
-        """Remove duplicate schools based on name"""
-        seen_names = set()
-        unique_schools = []
-        
-        for school in schools:
-            name_key = school.get('name_en', '').lower().strip()
-            if name_key and name_key not in seen_names:
-                seen_names.add(name_key)
-                unique_schools.append(school)
-        
-        return unique_schools
+        """Merge schools that entity resolution matches on name, district, phone or website"""
+        named = [school for school in schools if self._named_school(school)]
+        return dedupe_records(named)
+    
+    def _named_school(self, school: Dict) -> Optional[Dict]:
+        """The school, or None when it has no English name to match on"""
+        return school if school.get('name_en', '').strip() else None
     
     def save_data(self, schools: List[Dict], filename: str = None) -> str:
         """Save schools data to JSON file"""
@@ -508,55 +455,56 @@ class EDBPrimarySchoolDownloader:
             logger.error(f"Error importing to Supabase: {e}")
             return False
     
-    def run_download_and_import(self):
-        """Run the complete download and import process"""
+    def source_plugin(self) -> SourcePlugin:
+        """Pipeline source: the main school list (CSV, tables or links), then each district"""
+        return SourcePlugin('edb_download', self.iter_primary_schools, normalize=self._named_school,
+                            identity=SchoolIdentity())
+    
+    def run_download_and_import(self) -> Dict:
+        """Run the complete download and import process; returns the pipeline's counts and a sample of schools"""
         logger.info("Starting EDB primary school download and import process...")
         
         start_time = datetime.now()
+        self.telemetry.start()
         
         try:
-            # Download all school data
-            schools = self.download_all_district_data()
+            snapshot = JsonSnapshotSink(
+                self.data_dir / f"edb_primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            sinks = [snapshot]
+            if self.supabase:
+                sinks.append(SupabaseSink(self.supabase, 'primary_schools'))
+            else:
+                logger.info("Supabase not available - data saved locally only")
+            result = run_source(self.source_plugin(), sinks, telemetry=self.telemetry)
             
-            if schools:
-                # Save to local file
-                filepath = self.save_data(schools)
-                
-                # Import to Supabase if available
-                if self.supabase:
-                    success = self.import_to_supabase(schools)
-                    if success:
-                        logger.info("Data successfully imported to Supabase")
-                    else:
-                        logger.error("Failed to import data to Supabase")
-                else:
-                    logger.info("Supabase not available - data saved locally only")
-                
+            if result['records']:
                 end_time = datetime.now()
                 duration = end_time - start_time
                 
                 logger.info(f"Process completed in {duration}")
-                logger.info(f"Total schools processed: {len(schools)}")
-                logger.info(f"Data saved to: {filepath}")
+                logger.info(f"Total schools processed: {result['records']}")
+                logger.info(f"Data saved to: {snapshot.path}")
                 
-                return schools
+                self.telemetry.finish('ok', schools=result['records'], sinks=result['sinks'])
             else:
                 logger.warning("No schools found during download")
-                return []
+                self.telemetry.finish('empty', schools=0)
+            return result
                 
         except Exception as e:
             logger.error(f"Error in download and import process: {e}")
-            return []
+            self.telemetry.finish('error', error=str(e))
+            return {'records': 0, 'sample': []}
 
 def main():
     """Main function"""
     downloader = EDBPrimarySchoolDownloader()
-    schools = downloader.run_download_and_import()
+    result = downloader.run_download_and_import()
     
-    if schools:
-        print(f"\nSuccessfully processed {len(schools)} primary schools")
+    if result['records']:
+        print(f"\nSuccessfully processed {result['records']} primary schools")
         print("Sample schools:")
-        for i, school in enumerate(schools[:5]):
+        for i, school in enumerate(result['sample']):
             print(f"  {i+1}. {school['name_en']} ({school['district_en']})")
     else:
         print("No schools were processed")
@@ -8,7 +8,7 @@ import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from supabase import create_client, Client
+from supabase_client import Client, create_client
 from typing import List, Dict
 
 # Configure logging
@@ -12,16 +12,18 @@ import os
 import time
 import logging
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 import re
-from typing import List, Dict, Optional, Set
-import schedule
+from typing import List, Dict, Optional, Set, Iterator
 import threading
 from dataclasses import dataclass, asdict
 import sqlite3
 from pathlib import Path
 import random
 
+from scraper_telemetry import ScrapeRun, SampledLog
+from ingestion_pipeline import SourcePlugin, JsonSnapshotSink, SQLiteSink, SCHOOL_COLUMNS, run_source
+from school_identity import SchoolIdentity
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -68,6 +70,10 @@ class HongKongSchoolScraper:
         self.data_dir = Path("scraped_data")
         self.data_dir.mkdir(exist_ok=True)
         
+        # Per-stage run metrics and sampled per-row logging
+        self.telemetry = ScrapeRun('hk_school_scraper', self.data_dir / "scrape_runs.jsonl")
+        self.row_log = SampledLog(logger)
+        
         # Hong Kong districts
         self.districts = {
             'Central and Western': '中西區',
@@ -93,17 +99,18 @@ class HongKongSchoolScraper:
     def scrape_edb_kindergartens(self) -> List[SchoolData]:
         """Scrape kindergarten data from EDB website"""
         logger.info("Starting EDB kindergarten data scraping...")
-        
-        schools = []
-        
+        schools = list(self.iter_edb_kindergartens())
+        logger.info(f"Completed EDB kindergarten scraping. Found {len(schools)} schools.")
+        return schools
+    
+    def iter_edb_kindergartens(self) -> Iterator[SchoolData]:
+        """Yield kindergartens from the EDB website, falling back to sample data"""
         # EDB Kindergarten Profile Search
         base_url = "https://www.edb.gov.hk/en/edu-system/preprimary-kindergarten/quality-assurance-framework/kindergarten-profile/"
         
         try:
-            response = self.session.get(base_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.telemetry.get(self.session, base_url, 'listing_fetch', timeout=30)
+            soup = self.telemetry.parse_html(response.content)
             
             # Look for kindergarten search functionality
             # This is a simplified approach - actual implementation may need adjustment
@@ -115,60 +122,52 @@ class HongKongSchoolScraper:
                     logger.info("Found kindergarten search form")
                     break
             
-            # For now, create sample kindergarten data based on known Hong Kong kindergartens
-            sample_kindergartens = self._generate_sample_kindergartens()
-            schools.extend(sample_kindergartens)
-            
         except Exception as e:
             logger.error(f"Error accessing EDB kindergarten page: {e}")
-            # Fallback to sample data
-            sample_kindergartens = self._generate_sample_kindergartens()
-            schools.extend(sample_kindergartens)
             
-        logger.info(f"Completed EDB kindergarten scraping. Found {len(schools)} schools.")
-        return schools
+        # For now, create sample kindergarten data based on known Hong Kong kindergartens
+        yield from self._generate_sample_kindergartens()
     
     def scrape_edb_primary_schools(self) -> List[SchoolData]:
         """Scrape primary school data from EDB website"""
         logger.info("Starting EDB primary school data scraping...")
-        
-        schools = []
-        
+        schools = list(self.iter_edb_primary_schools())
+        logger.info(f"Completed EDB primary school scraping. Found {len(schools)} schools.")
+        return schools
+    
+    def iter_edb_primary_schools(self) -> Iterator[SchoolData]:
+        """Yield primary schools from the EDB website as their pages are scraped, falling back to sample data"""
         # EDB Primary School Profile
         base_url = "https://www.edb.gov.hk/en/edu-system/primary-secondary/applicable-to-primary/primary-1-admission/"
         
         try:
-            response = self.session.get(base_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.telemetry.get(self.session, base_url, 'listing_fetch', timeout=30)
+            soup = self.telemetry.parse_html(response.content)
             
             # Look for primary school listings
             # This is a simplified approach - actual implementation may need adjustment
             school_links = soup.find_all('a', href=re.compile(r'primary.*school|school.*profile'))
-            
-            if not school_links:
-                logger.info("No direct school links found, using sample data")
-                sample_primary_schools = self._generate_sample_primary_schools()
-                schools.extend(sample_primary_schools)
-            else:
-                for link in school_links[:20]:  # Limit for testing
-                    try:
-                        school_data = self._extract_primary_school_data(link)
-                        if school_data:
-                            schools.append(school_data)
-                            logger.info(f"Scraped primary school: {school_data.name_en}")
-                    except Exception as e:
-                        logger.error(f"Error scraping primary school {link.get('href', 'unknown')}: {e}")
-                        
         except Exception as e:
             logger.error(f"Error accessing EDB primary school page: {e}")
             # Fallback to sample data
-            sample_primary_schools = self._generate_sample_primary_schools()
-            schools.extend(sample_primary_schools)
-            
-        logger.info(f"Completed EDB primary school scraping. Found {len(schools)} schools.")
-        return schools
+            yield from self._generate_sample_primary_schools()
+            return
+        
+        if not school_links:
+            logger.info("No direct school links found, using sample data")
+            yield from self._generate_sample_primary_schools()
+            return
+        
+        for link in school_links[:20]:  # Limit for testing
+            try:
+                school_data = self._extract_primary_school_data(link)
+                if school_data:
+                    self.telemetry.add_items('normalize')
+                    self.row_log.info('primary', "Scraped primary school: %s", school_data.name_en)
+                    yield school_data
+            except Exception as e:
+                self.telemetry.add_error('normalize')
+                logger.error(f"Error scraping primary school {link.get('href', 'unknown')}: {e}")
     
     def _generate_sample_kindergartens(self) -> List[SchoolData]:
         """Generate sample kindergarten data based on real Hong Kong kindergartens"""
@@ -371,45 +370,49 @@ class HongKongSchoolScraper:
         logger.info("Starting school website scraping...")
         
         for school in schools:
-            if school.website and school.has_website:
-                try:
-                    logger.info(f"Scraping website for: {school.name_en}")
-                    
-                    response = self.session.get(school.website, timeout=30)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Look for application information
-                    application_keywords = ['admission', 'application', 'enrollment', 'apply', 'registration']
-                    application_links = []
-                    
-                    for link in soup.find_all('a', href=True):
-                        link_text = link.get_text(strip=True).lower()
-                        if any(keyword in link_text for keyword in application_keywords):
-                            application_links.append(link.get('href'))
-                    
-                    if application_links:
-                        # Use the first application link found
-                        if not application_links[0].startswith('http'):
-                            school.application_page = f"{school.website.rstrip('/')}/{application_links[0].lstrip('/')}"
-                        else:
-                            school.application_page = application_links[0]
-                    
-                    # Update verification status
-                    school.website_verified = True
-                    school.last_updated = datetime.now().isoformat()
-                    
-                    # Add delay to be respectful to servers
-                    time.sleep(random.uniform(1, 3))
-                    
-                except Exception as e:
-                    logger.error(f"Error scraping website for {school.name_en}: {e}")
-                    school.website_verified = False
+            self._scrape_school_website(school)
         
         logger.info("Completed school website scraping.")
         return schools
     
+    def _scrape_school_website(self, school: SchoolData) -> SchoolData:
+        """Look up one school's application page on its own website"""
+        if school.website and school.has_website:
+            try:
+                self.row_log.info('website', "Scraping website for: %s", school.name_en)
+                
+                response = self.telemetry.get(self.session, school.website, 'detail_fetch', timeout=30)
+                soup = self.telemetry.parse_html(response.content)
+                self.telemetry.add_items('detail_fetch')
+                
+                # Look for application information
+                application_keywords = ['admission', 'application', 'enrollment', 'apply', 'registration']
+                application_links = []
+                
+                for link in soup.find_all('a', href=True):
+                    link_text = link.get_text(strip=True).lower()
+                    if any(keyword in link_text for keyword in application_keywords):
+                        application_links.append(link.get('href'))
+                
+                if application_links:
+                    # Use the first application link found
+                    if not application_links[0].startswith('http'):
+                        school.application_page = f"{school.website.rstrip('/')}/{application_links[0].lstrip('/')}"
+                    else:
+                        school.application_page = application_links[0]
+                
+                # Update verification status
+                school.website_verified = True
+                school.last_updated = datetime.now().isoformat()
+                
+                # Add delay to be respectful to servers
+                time.sleep(random.uniform(1, 3))
+                
+            except Exception as e:
+                logger.error(f"Error scraping website for {school.name_en}: {e}")
+                school.website_verified = False
+        return school
+    
     def save_data(self, schools: List[SchoolData], filename: str):
         """Save school data to JSON file"""
         try:
@@ -487,35 +490,43 @@ class HongKongSchoolScraper:
         except Exception as e:
             logger.error(f"Error updating database: {e}")
     
+    def source_plugin(self, table_name: str) -> SourcePlugin:
+        """Pipeline source for one school table: EDB pages, then each school's own website"""
+        records = self.iter_edb_kindergartens if table_name == "kindergartens" else self.iter_edb_primary_schools
+        identity = SchoolIdentity(scope='kindergarten' if table_name == "kindergartens" else 'primary')
+        return SourcePlugin(table_name, records, enrich=self._scrape_school_website, identity=identity)
+    
+    def ingest(self, table_name: str) -> Dict:
+        """Stream one school table into a JSON snapshot and the database; only new or changed rows are written"""
+        database = SQLiteSink("school_portal.db", table_name, SCHOOL_COLUMNS + ['source'])
+        snapshot = JsonSnapshotSink(self.data_dir / f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        return run_source(self.source_plugin(table_name), [snapshot, database],
+                          telemetry=self.telemetry, diff_against=database)
+    
     def run_full_scrape(self):
         """Run complete scraping process for both kindergarten and primary schools"""
         logger.info("Starting full Hong Kong school data scraping process...")
         
         start_time = datetime.now()
+        self.telemetry.start()
         
         try:
-            # Scrape kindergarten data
-            kindergartens = self.scrape_edb_kindergartens()
-            if kindergartens:
-                kindergartens = self.scrape_school_websites(kindergartens)
-                self.save_data(kindergartens, f"kindergartens_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                self.update_database(kindergartens, "kindergartens")
-            
-            # Scrape primary school data
-            primary_schools = self.scrape_edb_primary_schools()
-            if primary_schools:
-                primary_schools = self.scrape_school_websites(primary_schools)
-                self.save_data(primary_schools, f"primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                self.update_database(primary_schools, "primary_schools")
+            kindergartens = self.ingest("kindergartens")
+            primary_schools = self.ingest("primary_schools")
             
             end_time = datetime.now()
             duration = end_time - start_time
+            total = kindergartens['records'] + primary_schools['records']
             
             logger.info(f"Full scraping completed in {duration}")
-            logger.info(f"Total schools scraped: {len(kindergartens) + len(primary_schools)}")
+            logger.info(f"Total schools scraped: {total}")
+            self.telemetry.finish('ok', schools=total,
+                                  new=kindergartens['new'] + primary_schools['new'],
+                                  changed=kindergartens['changed'] + primary_schools['changed'])
             
         except Exception as e:
             logger.error(f"Error in full scraping process: {e}")
+            self.telemetry.finish('error', error=str(e))
 
 def run_scheduled_scrape():
     """Function to run scheduled scraping"""
@@ -523,20 +534,10 @@ def run_scheduled_scrape():
     scraper.run_full_scrape()
 
 def start_scheduler():
-    """Start the scheduler to run scraping nightly"""
-    logger.info("Starting Hong Kong school data scraper scheduler...")
-    
-    # Schedule scraping to run every night at 2 AM
-    schedule.every().day.at("02:00").do(run_scheduled_scrape)
-    
-    # Also run at 2 PM for testing
-    schedule.every().day.at("14:00").do(run_scheduled_scrape)
-    
-    logger.info("Scheduler started. Scraping will run nightly at 2 AM and 2 PM for testing.")
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    """Run the nightly 2 AM scrape, with monitoring and cleanup, until interrupted"""
+    from job_scheduler import Job
+    from scheduled_jobs import run_scheduler
+    run_scheduler(Job('hk_school_scrape', 'hk_school_scraper:run_scheduled_scrape', at="02:00", jitter=600))
 
 if __name__ == "__main__":
     import argparse
@@ -554,18 +555,10 @@ if __name__ == "__main__":
     if args.run_now:
         if args.kindergarten_only:
             logger.info("Running kindergarten scraping only...")
-            kindergartens = scraper.scrape_edb_kindergartens()
-            if kindergartens:
-                kindergartens = scraper.scrape_school_websites(kindergartens)
-                scraper.save_data(kindergartens, f"kindergartens_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                scraper.update_database(kindergartens, "kindergartens")
+            scraper.ingest("kindergartens")
         elif args.primary_only:
             logger.info("Running primary school scraping only...")
-            primary_schools = scraper.scrape_edb_primary_schools()
-            if primary_schools:
-                primary_schools = scraper.scrape_school_websites(primary_schools)
-                scraper.save_data(primary_schools, f"primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-                scraper.update_database(primary_schools, "primary_schools")
+            scraper.ingest("primary_schools")
         else:
             scraper.run_full_scrape()
     
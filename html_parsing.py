@@ -0,0 +1,153 @@
+"""
+Shared HTML Parsing Layer
+lxml-backed BeautifulSoup parsing for the scrapers, with SoupStrainer-targeted
+parsing of just the tables, links or listing containers a page is mined for,
+and an optional process pool for parsing large batches of pages
+"""
+
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Any, Callable, Iterable
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    PARSER_FEATURES = 'lxml'
+except ImportError:
+    PARSER_FEATURES = 'html.parser'
+
+# Class names of the div/li containers school listings are rendered in
+LISTING_CLASS_PATTERN = re.compile(r'school|primary|list|item')
+
+# Below this many pages the process pool costs more than it saves
+MIN_PAGES_FOR_POOL = 8
+
+
+# Targets matched by tag name alone share one strained parse
+TAG_TARGETS = {'tables': 'table', 'links': 'a', 'forms': 'form'}
+ALL_TARGETS = ('tables', 'links', 'listings', 'forms')
+
+
+def make_strainer(target: str, listing_class=LISTING_CLASS_PATTERN) -> SoupStrainer:
+    """SoupStrainer for one of 'tables', 'links', 'listings' or 'forms'"""
+    if target == 'links':
+        return SoupStrainer('a', href=True)
+    if target in TAG_TARGETS:
+        return SoupStrainer(TAG_TARGETS[target])
+    if target == 'listings':
+        return SoupStrainer(['div', 'li'], class_=listing_class)
+    raise ValueError(f"Unknown parse target: {target}")
+
+
+def parse_html(content, target: Optional[str] = None, features: str = PARSER_FEATURES) -> BeautifulSoup:
+    """Parse a page with lxml; with a target, only that part of the tree is built"""
+    if target is None:
+        return BeautifulSoup(content, features)
+    return BeautifulSoup(content, features, parse_only=make_strainer(target))
+
+
+class ParsedPage:
+    """
+    One fetched page, parsed for the targets it is mined for on first use
+
+    Tables, links and forms are kept by a single strained parse; listing
+    containers need a class filter and get their own. A page mined for
+    listings as well as tag targets is parsed once in full instead, since
+    two strained passes over the same bytes cost more than one full one.
+    """
+
+    def __init__(self, content, listing_class=LISTING_CLASS_PATTERN,
+                 on_parse: Optional[Callable[[float], None]] = None,
+                 targets: Iterable[str] = ALL_TARGETS):
+        self.content = content
+        self.listing_class = listing_class
+        self.on_parse = on_parse
+        targets = tuple(targets)
+        self.tag_names = [TAG_TARGETS[t] for t in targets if t in TAG_TARGETS]
+        self.parse_full = 'listings' in targets and bool(self.tag_names)
+        self._soups: Dict[Optional[str], BeautifulSoup] = {}
+
+    def _parse(self, key: Optional[str], parse_only: Optional[SoupStrainer]) -> BeautifulSoup:
+        if key not in self._soups:
+            start = time.perf_counter()
+            self._soups[key] = BeautifulSoup(self.content, PARSER_FEATURES, parse_only=parse_only)
+            if self.on_parse:
+                self.on_parse(time.perf_counter() - start)
+        return self._soups[key]
+
+    def soup_for(self, target: Optional[str] = None) -> BeautifulSoup:
+        """Strained soup holding a target's elements, or the full document for None"""
+        if self.parse_full or self.full_soup_parsed or target is None:
+            return self._parse(None, None)
+        if target in TAG_TARGETS:
+            names = self.tag_names if TAG_TARGETS[target] in self.tag_names else [TAG_TARGETS[target]]
+            return self._parse('tags:' + ','.join(names), SoupStrainer(names))
+        return self._parse(target, make_strainer(target, self.listing_class))
+
+    @property
+    def full_soup_parsed(self) -> bool:
+        return None in self._soups
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        return self.soup_for(None)
+
+    @property
+    def tables(self) -> List:
+        return self.soup_for('tables').find_all('table')
+
+    @property
+    def links(self) -> List:
+        return self.soup_for('links').find_all('a', href=True)
+
+    @property
+    def listings(self) -> List:
+        return self.soup_for('listings').find_all(['div', 'li'], class_=self.listing_class)
+
+    @property
+    def forms(self) -> List:
+        return self.soup_for('forms').find_all('form')
+
+
+def extract_page_data(content, targets: Iterable[str] = ('tables', 'links')) -> Dict[str, Any]:
+    """
+    Plain-data extraction of a page's targets, safe to return from a worker process
+
+    tables -> list of tables, each a list of rows of cell texts
+    links -> list of (href, text)
+    listings -> list of container texts
+    """
+    targets = tuple(targets)
+    page = ParsedPage(content, targets=targets)
+    data: Dict[str, Any] = {}
+    if 'tables' in targets:
+        data['tables'] = [
+            [[cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])] for row in table.find_all('tr')]
+            for table in page.tables
+        ]
+    if 'links' in targets:
+        data['links'] = [(link.get('href', ''), link.get_text(strip=True)) for link in page.links]
+    if 'listings' in targets:
+        data['listings'] = [element.get_text(strip=True) for element in page.listings]
+    return data
+
+
+def _extract_page_data_worker(args):
+    content, targets = args
+    return extract_page_data(content, targets)
+
+
+def parse_pages(contents: List, targets: Iterable[str] = ('tables', 'links'),
+                max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    extract_page_data() over a batch of pages, in a process pool for large batches
+
+    Parsing is CPU-bound, so threads do not help; results come back in input order.
+    """
+    targets = tuple(targets)
+    if max_workers == 1 or len(contents) < MIN_PAGES_FOR_POOL:
+        return [extract_page_data(content, targets) for content in contents]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_extract_page_data_worker, [(content, targets) for content in contents], chunksize=4))
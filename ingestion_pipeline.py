@@ -0,0 +1,505 @@
+"""
+Streaming Ingestion Pipeline
+Composable generator stages shared by the school scrapers:
+source -> enrich -> normalize -> dedupe -> diff -> sinks. Records flow
+through one at a time, so memory is bounded by queue and batch sizes rather
+than by the size of the dataset, and the network-bound stages run on threads
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Callable, Iterable, Iterator
+
+from school_registry import StreamingDeduper
+
+logger = logging.getLogger(__name__)
+
+Stage = Callable[[Iterator[Any]], Iterator[Any]]
+
+DEFAULT_BATCH_SIZE = 100
+
+# Records the source may run ahead of the rest of the pipeline
+DEFAULT_QUEUE_SIZE = 64
+
+DEFAULT_ENRICH_WORKERS = 4
+
+# Columns of the kindergartens / primary_schools tables the scrapers write
+SCHOOL_COLUMNS = [
+    'school_no', 'name_en', 'name_tc', 'district_en', 'district_tc',
+    'address_en', 'address_tc', 'tel', 'website', 'school_type',
+    'curriculum', 'funding_type', 'through_train', 'language_of_instruction',
+    'student_capacity', 'application_page', 'has_website', 'website_verified',
+    'last_updated',
+]
+
+# Fields sent to the Supabase primary_schools table by the EDB importers
+SUPABASE_SCHOOL_COLUMNS = [
+    'school_no', 'name_en', 'name_tc', 'district_en', 'district_tc',
+    'address_en', 'address_tc', 'tel', 'website', 'curriculum',
+    'funding_type', 'through_train', 'language_of_instruction',
+    'student_capacity', 'application_page', 'has_website',
+    'website_verified', 'source',
+]
+
+BOOLEAN_COLUMNS = {'through_train', 'has_website', 'website_verified'}
+
+# Fields that change on every run and are left out of change fingerprints
+VOLATILE_FIELDS = {'id', 'created_at', 'last_updated'}
+
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+Change = namedtuple('Change', ['kind', 'key', 'record'])
+
+_END = object()
+
+
+def to_record(item: Any) -> Dict[str, Any]:
+    """Dict form of a scraper record (dataclass or dict)"""
+    if is_dataclass(item):
+        return asdict(item)
+    return dict(item)
+
+
+def record_fingerprint(record: Dict[str, Any], columns: Optional[List[str]] = None) -> str:
+    """Hash of a record's stable fields, comparable between scraped dicts and SQLite rows"""
+    names = columns or sorted(record)
+    values = []
+    for name in names:
+        if name in VOLATILE_FIELDS:
+            continue
+        value = record.get(name)
+        if isinstance(value, bool):
+            value = int(value)
+        values.append((name, '' if value is None else str(value)))
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+# -- Stages -------------------------------------------------------------------
+
+def map_stage(func: Callable[[Any], Any], telemetry=None, stage: str = 'normalize') -> Stage:
+    """Apply func to every record; None results are dropped, errors are counted and skipped"""
+    def run(records: Iterator[Any]) -> Iterator[Any]:
+        for record in records:
+            try:
+                result = func(record)
+            except Exception as e:
+                if telemetry:
+                    telemetry.add_error(stage)
+                logger.debug("%s failed for a record: %s", stage, e)
+                continue
+            if result is not None:
+                yield result
+    return run
+
+
+def concurrent_map_stage(func: Callable[[Any], Any], workers: int = DEFAULT_ENRICH_WORKERS,
+                         telemetry=None, stage: str = 'detail_fetch') -> Stage:
+    """
+    map_stage on a thread pool, for per-record network calls
+
+    At most 2 x workers records are in flight and results keep input order.
+    """
+    def run(records: Iterator[Any]) -> Iterator[Any]:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"pipeline-{stage}") as pool:
+            in_flight = deque()
+
+            def drain_one():
+                future = in_flight.popleft()
+                try:
+                    return future.result()
+                except Exception as e:
+                    if telemetry:
+                        telemetry.add_error(stage)
+                    logger.debug("%s failed for a record: %s", stage, e)
+                    return None
+
+            for record in records:
+                in_flight.append(pool.submit(func, record))
+                if len(in_flight) >= workers * 2:
+                    result = drain_one()
+                    if result is not None:
+                        yield result
+            while in_flight:
+                result = drain_one()
+                if result is not None:
+                    yield result
+    return run
+
+
+def dedupe_stage(telemetry=None) -> Stage:
+    """Drop records entity resolution matches to one already passed through"""
+    def run(records: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        deduper = StreamingDeduper()
+        for record in records:
+            if deduper.is_duplicate(record):
+                continue
+            if telemetry:
+                telemetry.add_items('dedupe')
+            yield record
+        logger.info("Dedupe: %d records, %d duplicates dropped", deduper.seen, deduper.duplicates)
+    return run
+
+
+class DiffStage:
+    """
+    Tags each record as new, changed or unchanged against the fingerprints
+    already stored by a sink, and counts stored keys that were not seen again
+    """
+
+    def __init__(self, existing: Dict[str, str], key_field: str = 'school_no',
+                 columns: Optional[List[str]] = None):
+        self.existing = existing
+        self.key_field = key_field
+        self.columns = columns
+        self.counts = {NEW: 0, CHANGED: 0, UNCHANGED: 0}
+        self.missing = 0
+
+    def __call__(self, records: Iterator[Dict[str, Any]]) -> Iterator[Change]:
+        seen = set()
+        for record in records:
+            key = str(record.get(self.key_field) or '')
+            seen.add(key)
+            stored = self.existing.get(key)
+            if stored is None:
+                kind = NEW
+            elif stored == record_fingerprint(record, self.columns):
+                kind = UNCHANGED
+            else:
+                kind = CHANGED
+            self.counts[kind] += 1
+            yield Change(kind, key, record)
+        self.missing = len(set(self.existing) - seen)
+
+
+def prefetch(records: Iterable[Any], queue_size: int = DEFAULT_QUEUE_SIZE) -> Iterator[Any]:
+    """
+    Run an iterator on a background thread, buffering up to queue_size items
+
+    Lets the source keep fetching while later stages and sinks work.
+    Exceptions from the source are re-raised in the consumer.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def offer(item) -> bool:
+        """Put an item, giving up once the consumer has stopped reading"""
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in records:
+                if not offer(item):
+                    return
+            offer(_END)
+        except BaseException as e:
+            offer(e)
+
+    thread = threading.Thread(target=produce, name='pipeline-source', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+# -- Sinks --------------------------------------------------------------------
+
+class Sink:
+    """
+    Receives batches of Change tuples
+
+    Sinks with only_changes set skip unchanged records.
+    """
+
+    name = 'sink'
+    only_changes = False
+
+    def __init__(self):
+        self.written = 0
+        self.errors = 0
+
+    def open(self):
+        pass
+
+    def write(self, records: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def close(self, ok: bool):
+        pass
+
+    def existing_fingerprints(self) -> Dict[str, str]:
+        return {}
+
+
+class JsonSnapshotSink(Sink):
+    """
+    Streams every record into a JSON array file
+
+    Written to a temporary file and renamed when the run succeeds, so a
+    failed run never leaves a truncated snapshot. No file is left when no
+    records arrived.
+    """
+
+    name = 'json'
+
+    def __init__(self, path: Path, sample_size: int = 5):
+        super().__init__()
+        self.path = Path(path)
+        self.sample_size = sample_size
+        self.sample: List[Dict[str, Any]] = []
+        self._tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self._file = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._file.write('[')
+
+    def write(self, records: List[Dict[str, Any]]):
+        for record in records:
+            self._file.write(',\n  ' if self.written else '\n  ')
+            self._file.write(json.dumps(record, ensure_ascii=False))
+            if len(self.sample) < self.sample_size:
+                self.sample.append(record)
+            self.written += 1
+
+    def close(self, ok: bool):
+        if self._file is None:
+            return
+        self._file.write('\n]\n' if self.written else ']\n')
+        self._file.close()
+        self._file = None
+        if ok and self.written:
+            os.replace(self._tmp_path, self.path)
+            logger.info(f"Saved {self.written} schools to {self.path}")
+        else:
+            self._tmp_path.unlink(missing_ok=True)
+
+
+class SQLiteSink(Sink):
+    """INSERT OR REPLACE batches into a school table keyed by school_no"""
+
+    name = 'sqlite'
+    only_changes = True
+
+    def __init__(self, db_path: str, table: str, columns: List[str]):
+        super().__init__()
+        self.db_path = db_path
+        self.table = table
+        self.columns = columns
+        self.conn = None
+
+    def open(self):
+        import sqlite3
+        self.conn = sqlite3.connect(self.db_path)
+        column_defs = ',\n'.join(
+            f"    {name} {'TEXT UNIQUE' if name == 'school_no' else 'BOOLEAN' if name in BOOLEAN_COLUMNS else 'TEXT'}"
+            for name in self.columns
+        )
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {column_defs},
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.commit()
+
+    def existing_fingerprints(self) -> Dict[str, str]:
+        cursor = self.conn.execute(f"SELECT {', '.join(self.columns)} FROM {self.table}")
+        fingerprints = {}
+        for row in cursor:
+            record = dict(zip(self.columns, row))
+            fingerprints[str(record['school_no'])] = record_fingerprint(record, self.columns)
+        return fingerprints
+
+    def write(self, records: List[Dict[str, Any]]):
+        placeholders = ', '.join('?' for _ in self.columns)
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table} ({', '.join(self.columns)}) VALUES ({placeholders})",
+            [tuple(record.get(name) for name in self.columns) for record in records]
+        )
+        self.conn.commit()
+        self.written += len(records)
+
+    def close(self, ok: bool):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        logger.info(f"Updated database table {self.table} with {self.written} schools")
+
+
+class SupabaseSink(Sink):
+    """Upserts batches into a Supabase table; failed batches are logged and counted"""
+
+    name = 'supabase'
+
+    def __init__(self, client, table: str, columns: List[str] = SUPABASE_SCHOOL_COLUMNS):
+        super().__init__()
+        self.client = client
+        self.table = table
+        self.columns = columns
+
+    def write(self, records: List[Dict[str, Any]]):
+        rows = [{name: record.get(name) for name in self.columns} for record in records]
+        try:
+            self.client.table(self.table).upsert(rows).execute()
+            self.written += len(rows)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error importing to Supabase: {e}")
+
+    def close(self, ok: bool):
+        logger.info(f"Imported {self.written} schools to Supabase ({self.errors} failed batches)")
+
+
+# -- Pipeline -----------------------------------------------------------------
+
+class SourcePlugin:
+    """
+    One scraper's part of the pipeline
+
+    records: callable returning an iterator of raw records (the scraper's
+        own fetch and parse, yielding as pages come in)
+    enrich: optional per-record callable doing follow-up fetches; runs on a
+        thread pool
+    normalize: raw record -> dict, or None to drop it
+    identity: optional SchoolIdentity that replaces each deduped record's
+        school_no with its stable key; run_source() closes it when the run ends
+    """
+
+    def __init__(self, name: str, records: Callable[[], Iterator[Any]],
+                 normalize: Optional[Callable[[Any], Optional[Dict[str, Any]]]] = None,
+                 enrich: Optional[Callable[[Any], Any]] = None,
+                 enrich_workers: int = DEFAULT_ENRICH_WORKERS,
+                 identity=None):
+        self.name = name
+        self.records = records
+        self.normalize = normalize or to_record
+        self.enrich = enrich
+        self.enrich_workers = enrich_workers
+        self.identity = identity
+
+    def stages(self, telemetry=None, dedupe: bool = True) -> List[Stage]:
+        stages = []
+        if self.enrich:
+            stages.append(concurrent_map_stage(self.enrich, self.enrich_workers, telemetry, 'detail_fetch'))
+        stages.append(map_stage(self.normalize, telemetry, 'normalize'))
+        if dedupe:
+            stages.append(dedupe_stage(telemetry))
+        if self.identity:
+            stages.append(self.identity.stage(self.name))
+        return stages
+
+
+class Pipeline:
+    """
+    Source and stages ending in a diff and batched writes to every sink
+
+    diff_against names the sink whose stored rows decide what is new or
+    changed; without one every record counts as new.
+    """
+
+    def __init__(self, source: Iterable[Any], stages: List[Stage], sinks: List[Sink],
+                 telemetry=None, diff_against: Optional[Sink] = None, key_field: str = 'school_no',
+                 batch_size: int = DEFAULT_BATCH_SIZE, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.source = source
+        self.stages = stages
+        self.sinks = sinks
+        self.telemetry = telemetry
+        self.diff_against = diff_against
+        self.key_field = key_field
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+    def _flush(self, batch: List[Change]):
+        if not batch:
+            return
+        changed = [change.record for change in batch if change.kind != UNCHANGED]
+        everything = [change.record for change in batch]
+        if self.telemetry:
+            with self.telemetry.stage('persist') as persist:
+                errors = sum(sink.errors for sink in self.sinks)
+                self._write(everything, changed)
+                persist.items += len(batch)
+                persist.errors += sum(sink.errors for sink in self.sinks) - errors
+        else:
+            self._write(everything, changed)
+
+    def _write(self, everything: List[Dict[str, Any]], changed: List[Dict[str, Any]]):
+        for sink in self.sinks:
+            records = changed if sink.only_changes else everything
+            if records:
+                sink.write(records)
+
+    def run(self) -> Dict[str, Any]:
+        """Drain the source through every stage; returns counts per change kind and sink"""
+        opened = []
+        ok = False
+        try:
+            for sink in self.sinks:
+                sink.open()
+                opened.append(sink)
+            existing = self.diff_against.existing_fingerprints() if self.diff_against else {}
+            diff = DiffStage(existing, self.key_field, getattr(self.diff_against, 'columns', None))
+
+            stream = prefetch(self.source, self.queue_size) if self.queue_size else iter(self.source)
+            for stage in self.stages:
+                stream = stage(stream)
+
+            batch: List[Change] = []
+            for change in diff(stream):
+                batch.append(change)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+            self._flush(batch)
+            ok = True
+        finally:
+            for sink in opened:
+                sink.close(ok)
+
+        return dict(
+            records=sum(diff.counts.values()),
+            missing=diff.missing,
+            sinks={sink.name: {'written': sink.written, 'errors': sink.errors} for sink in self.sinks},
+            sample=next((sink.sample for sink in self.sinks if isinstance(sink, JsonSnapshotSink)), []),
+            **diff.counts,
+        )
+
+
+def run_source(plugin: SourcePlugin, sinks: List[Sink], telemetry=None,
+               diff_against: Optional[Sink] = None, dedupe: bool = True, **options) -> Dict[str, Any]:
+    """Run one source plugin into the given sinks"""
+    pipeline = Pipeline(plugin.records(), plugin.stages(telemetry, dedupe), sinks,
+                        telemetry=telemetry, diff_against=diff_against, **options)
+    try:
+        result = pipeline.run()
+    finally:
+        if plugin.identity:
+            plugin.identity.close()
+    logger.info("%s pipeline: %d records (%d new, %d changed, %d unchanged, %d no longer listed)",
+                plugin.name, result['records'], result[NEW], result[CHANGED], result[UNCHANGED], result['missing'])
+    return result
@@ -0,0 +1,326 @@
+"""
+Persistent Job Scheduler
+Runs scrape, monitoring and cleanup jobs from a job table kept in SQLite.
+Each job holds a lock while it runs, so overlapping runs are impossible even
+across scheduler processes. Slots get random jitter, runs missed while the
+scheduler was down are caught up once, jobs execute in a worker process pool
+so a long scrape never blocks the others, and every run is recorded with its
+duration
+"""
+
+import importlib
+import logging
+import os
+import random
+import socket
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path("scraped_data") / "scheduler.db"
+
+DEFAULT_MAX_WORKERS = 3
+
+# Seconds between checks for due jobs
+DEFAULT_POLL_SECONDS = 30
+
+# A slot more than this many seconds in the past counts as missed
+MISSED_GRACE_SECONDS = 300
+
+# A lock older than this belongs to a run whose scheduler died
+DEFAULT_LOCK_TIMEOUT = 6 * 3600
+
+# Run history kept per job
+HISTORY_DAYS = 90
+
+RUNNING = 'running'
+OK = 'ok'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+class Job:
+    """
+    A scheduled job
+
+    target is 'module:function', imported and called in a worker process.
+    Exactly one of at ('HH:MM', daily) or every (seconds) sets the schedule.
+    Each slot is pushed back by a random 0..jitter seconds. With catch_up, a
+    slot missed while no scheduler was running is run once on start-up;
+    without it the missed slot is recorded as skipped.
+    """
+
+    def __init__(self, name: str, target: str, at: Optional[str] = None, every: Optional[int] = None,
+                 jitter: int = 0, catch_up: bool = True, lock_timeout: int = DEFAULT_LOCK_TIMEOUT):
+        if (at is None) == (every is None):
+            raise ValueError(f"Job {name} needs exactly one of at or every")
+        self.name = name
+        self.target = target
+        self.at = at
+        self.every = every
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.lock_timeout = lock_timeout
+
+    @property
+    def schedule(self) -> str:
+        return f"daily@{self.at}" if self.at else f"every {self.every}s"
+
+    def next_slot(self, after: datetime) -> datetime:
+        """First slot strictly after a time, before jitter"""
+        if self.every:
+            return after + timedelta(seconds=self.every)
+        hour, minute = (int(part) for part in self.at.split(':'))
+        slot = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return slot if slot > after else slot + timedelta(days=1)
+
+    def next_run(self, after: datetime) -> datetime:
+        return self.next_slot(after) + timedelta(seconds=random.uniform(0, self.jitter))
+
+
+def _execute(target: str) -> Any:
+    """Worker-process entry point: import and call a job target"""
+    module_name, function_name = target.split(':')
+    function = getattr(importlib.import_module(module_name), function_name)
+    return function()
+
+
+class JobScheduler:
+    """
+    Job table, locks and run history in SQLite, with execution in a process pool
+
+    The database is only touched from the scheduler's own thread; workers
+    just run the job target and hand back its result or exception.
+    """
+
+    def __init__(self, jobs: List[Job], db_path: Path = DEFAULT_DB_PATH,
+                 max_workers: int = DEFAULT_MAX_WORKERS, poll_seconds: int = DEFAULT_POLL_SECONDS):
+        self.jobs = {job.name: job for job in jobs}
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.running: Dict[Future, Tuple[str, int]] = {}
+        self._create_tables()
+        self._register()
+
+    def _create_tables(self):
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                name TEXT PRIMARY KEY,
+                target TEXT NOT NULL,
+                schedule TEXT NOT NULL,
+                next_run_at TEXT NOT NULL,
+                last_run_at TEXT,
+                last_status TEXT,
+                lock_owner TEXT,
+                lock_expires_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS job_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                scheduled_for TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                duration_seconds REAL,
+                status TEXT NOT NULL,
+                catch_up INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs (job, id);
+        ''')
+        self.conn.commit()
+
+    def _register(self):
+        """Add new jobs to the table; a job whose target or schedule changed is rescheduled"""
+        now = datetime.now()
+        for job in self.jobs.values():
+            row = self.conn.execute('SELECT target, schedule FROM jobs WHERE name = ?', (job.name,)).fetchone()
+            if row is None:
+                self.conn.execute('INSERT INTO jobs (name, target, schedule, next_run_at) VALUES (?, ?, ?, ?)',
+                                  (job.name, job.target, job.schedule, job.next_run(now).isoformat()))
+            elif (row['target'], row['schedule']) != (job.target, job.schedule):
+                self.conn.execute('UPDATE jobs SET target = ?, schedule = ?, next_run_at = ? WHERE name = ?',
+                                  (job.target, job.schedule, job.next_run(now).isoformat(), job.name))
+        self.conn.commit()
+
+    def _acquire(self, name: str, now: datetime) -> bool:
+        """Take a job's lock unless another run holds it; atomic across processes"""
+        job = self.jobs[name]
+        acquired = self.conn.execute(
+            'UPDATE jobs SET lock_owner = ?, lock_expires_at = ? '
+            'WHERE name = ? AND (lock_owner IS NULL OR lock_expires_at < ?)',
+            (self.owner, (now + timedelta(seconds=job.lock_timeout)).isoformat(), name, now.isoformat())
+        ).rowcount
+        self.conn.commit()
+        return bool(acquired)
+
+    def _release(self, name: str, status: str, now: datetime):
+        job = self.jobs[name]
+        self.conn.execute(
+            'UPDATE jobs SET lock_owner = NULL, lock_expires_at = NULL, last_run_at = ?, last_status = ?, '
+            'next_run_at = ? WHERE name = ?',
+            (now.isoformat(), status, job.next_run(now).isoformat(), name)
+        )
+        self.conn.commit()
+
+    def due_jobs(self, now: datetime) -> List[sqlite3.Row]:
+        placeholders = ', '.join('?' for _ in self.jobs)
+        return self.conn.execute(
+            f'SELECT name, next_run_at FROM jobs WHERE name IN ({placeholders}) AND next_run_at <= ? '
+            'ORDER BY next_run_at', (*self.jobs, now.isoformat())
+        ).fetchall()
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """Collect finished runs and start every due job that is not already running; returns runs started"""
+        self.collect()
+        now = now or datetime.now()
+        started = 0
+        for row in self.due_jobs(now):
+            name = row['name']
+            job = self.jobs[name]
+            scheduled_for = datetime.fromisoformat(row['next_run_at'])
+            missed = (now - scheduled_for).total_seconds() > MISSED_GRACE_SECONDS
+            if missed and not job.catch_up:
+                self._record_skipped(name, scheduled_for, now)
+                continue
+            if not self._acquire(name, now):
+                logger.info("Job %s is still running; not starting another run", name)
+                continue
+            if self._start(name, scheduled_for, now, catch_up=missed):
+                started += 1
+        return started
+
+    def _record_skipped(self, name: str, scheduled_for: datetime, now: datetime):
+        logger.info("Skipping missed run of %s scheduled for %s", name, scheduled_for)
+        self.conn.execute('INSERT INTO job_runs (job, scheduled_for, status, catch_up) VALUES (?, ?, ?, 0)',
+                          (name, scheduled_for.isoformat(), SKIPPED))
+        self.conn.execute('UPDATE jobs SET next_run_at = ? WHERE name = ?',
+                          (self.jobs[name].next_run(now).isoformat(), name))
+        self.conn.commit()
+
+    def _start(self, name: str, scheduled_for: datetime, now: datetime, catch_up: bool = False) -> bool:
+        """
+        Record a run and hand it to the pool; the caller holds the job's lock
+
+        A pool broken by a crashed worker rejects the run: it is recorded as
+        failed, the lock is released and the next run gets a new pool.
+        """
+        run_id = self.conn.execute(
+            'INSERT INTO job_runs (job, scheduled_for, started_at, status, catch_up, worker) VALUES (?, ?, ?, ?, ?, ?)',
+            (name, scheduled_for.isoformat(), now.isoformat(), RUNNING, int(catch_up), self.owner)
+        ).lastrowid
+        self.conn.commit()
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        logger.info("Starting job %s%s", name, " (catching up a missed run)" if catch_up else "")
+        try:
+            future = self.pool.submit(_execute, self.jobs[name].target)
+        except BrokenProcessPool as e:
+            logger.error("Worker pool is broken, could not start job %s: %s", name, e)
+            self._discard_pool()
+            self._finish(name, run_id, FAILED, f"BrokenProcessPool: {e}")
+            return False
+        self.running[future] = (name, run_id)
+        return True
+
+    def _discard_pool(self):
+        """Drop a pool whose worker died; the next run starts a new one"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+
+    def _finish(self, name: str, run_id: int, status: str, error: Optional[str] = None):
+        """Record a run's outcome and release its job's lock"""
+        now = datetime.now()
+        started_at = self.conn.execute('SELECT started_at FROM job_runs WHERE id = ?', (run_id,)).fetchone()[0]
+        duration = (now - datetime.fromisoformat(started_at)).total_seconds()
+        self.conn.execute(
+            'UPDATE job_runs SET finished_at = ?, duration_seconds = ?, status = ?, error = ? WHERE id = ?',
+            (now.isoformat(), duration, status, error, run_id)
+        )
+        self._release(name, status, now)
+        logger.info("Job %s finished: %s in %.1fs", name, status, duration)
+
+    def collect(self, wait: bool = False):
+        """Record the outcome of finished runs and release their locks"""
+        for future in list(self.running):
+            if not (wait or future.done()):
+                continue
+            name, run_id = self.running.pop(future)
+            error = None
+            try:
+                future.result()
+                status = OK
+            except Exception as e:
+                status = FAILED
+                error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+                logger.error("Job %s failed: %s", name, error)
+                if isinstance(e, BrokenProcessPool):
+                    self._discard_pool()
+            self._finish(name, run_id, status, error)
+
+    def run_now(self, name: str) -> bool:
+        """Start a job immediately, outside its schedule; False if it is already running or could not start"""
+        now = datetime.now()
+        if not self._acquire(name, now):
+            return False
+        return self._start(name, now, now)
+
+    def _seconds_until_next(self) -> float:
+        placeholders = ', '.join('?' for _ in self.jobs)
+        row = self.conn.execute(f'SELECT MIN(next_run_at) FROM jobs WHERE name IN ({placeholders})',
+                                tuple(self.jobs)).fetchone()
+        if not row or not row[0]:
+            return self.poll_seconds
+        wait = (datetime.fromisoformat(row[0]) - datetime.now()).total_seconds()
+        return min(max(wait, 1), self.poll_seconds)
+
+    def run_forever(self):
+        """Tick until interrupted; runs in progress are waited for on the way out"""
+        logger.info("Scheduler started with jobs: %s",
+                    ', '.join(f"{job.name} ({job.schedule})" for job in self.jobs.values()))
+        try:
+            while True:
+                self.tick()
+                time.sleep(self._seconds_until_next())
+        except KeyboardInterrupt:
+            logger.info("Scheduler stopping; waiting for %d running jobs", len(self.running))
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.collect(wait=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    def prune_history(self, days: int = HISTORY_DAYS) -> int:
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        removed = self.conn.execute('DELETE FROM job_runs WHERE scheduled_for < ? AND status != ?',
+                                    (cutoff, RUNNING)).rowcount
+        self.conn.commit()
+        return removed
+
+    def history(self, job: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent runs first"""
+        if job:
+            rows = self.conn.execute('SELECT * FROM job_runs WHERE job = ? ORDER BY id DESC LIMIT ?', (job, limit))
+        else:
+            rows = self.conn.execute('SELECT * FROM job_runs ORDER BY id DESC LIMIT ?', (limit,))
+        return [dict(row) for row in rows]
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.conn.execute('SELECT * FROM jobs ORDER BY next_run_at')]
@@ -3,8 +3,8 @@ import sqlite3
 from database_supabase import SupabaseDatabaseManager
 
 def migrate_to_supabase():
-    """Migrate users from SQLite to Supabase"""
-    print("🚀 Migrating users from SQLite to Supabase...")
+    """Migrate users and their data from SQLite to Supabase"""
+    print("🚀 Migrating users and their data from SQLite to Supabase...")
     
     try:
         # Check if Supabase credentials are available
@@ -22,7 +22,7 @@ def migrate_to_supabase():
         
         print("✅ Supabase connection established")
         
-        # Migrate users from SQLite
+        # Migrate all user tables from SQLite; rerun to resume an interrupted migration
         success = supabase_db.migrate_from_sqlite('school_portal.db')
         
         if success:
@@ -0,0 +1,53 @@
+"""
+Notification Paging and Archival
+Keyset cursors for paging notifications newest first, and the bucketing used
+to archive old read notifications as one compact row per user and month
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, List, Any, Tuple
+
+# Notifications shown per page
+NOTIFICATION_PAGE_SIZE = 20
+
+# Read notifications older than this are moved to the archive
+NOTIFICATION_RETENTION_DAYS = 90
+
+# Notifications moved per archive round trip
+ARCHIVE_BATCH_SIZE = 500
+
+# (created_at, id) of the last notification on a page
+Cursor = Tuple[str, int]
+
+
+def page_with_cursor(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[Cursor]]:
+    """Trim a limit + 1 fetch to one page; the cursor is None on the last page"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]['created_at'], rows[-1]['id'])
+
+
+def retention_cutoff(retention_days: int = NOTIFICATION_RETENTION_DAYS) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=retention_days)
+
+
+def archive_period(created_at: Any) -> str:
+    """'YYYY-MM' bucket of a notification timestamp"""
+    return str(created_at)[:7]
+
+
+def bucket_notifications(rows: List[Dict[str, Any]]) -> Dict[Tuple[int, str], List[List]]:
+    """Group notifications into archive entries per (user_id, period)"""
+    buckets: Dict[Tuple[int, str], List[List]] = {}
+    for row in rows:
+        entry = [row['id'], str(row['created_at']), row['title'], row['message']]
+        buckets.setdefault((row['user_id'], archive_period(row['created_at'])), []).append(entry)
+    return buckets
+
+
+def merge_entries(existing: List[List], entries: List[List]) -> List[List]:
+    """Archive entries with new entries added, oldest first, without duplicates"""
+    merged = {entry[0]: entry for entry in existing}
+    merged.update({entry[0]: entry for entry in entries})
+    return sorted(merged.values(), key=lambda entry: (entry[1], entry[0]))
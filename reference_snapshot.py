@@ -0,0 +1,197 @@
+"""
+Reference Data Snapshots
+Keeps the last good copy of the kindergarten and primary school tables in a
+compressed columnar file. Sessions are served from memory or the file at
+once, a stale copy is revalidated in the background, and concurrent cold
+starts share a single upstream fetch
+"""
+
+import json
+import logging
+import os
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path("reference_data")
+
+# A copy older than this is served but refreshed in the background
+REFRESH_AFTER_SECONDS = 3600
+
+# After a failed refresh the backend is left alone for this long
+RETRY_AFTER_SECONDS = 120
+
+MAGIC = b'RSNAP1'
+
+
+def encode_snapshot(rows: List[Dict[str, Any]], fetched_at: datetime) -> bytes:
+    """
+    Rows as zlib-compressed columnar JSON
+
+    Columns where values repeat (districts, funding types, flags) are stored
+    as a dictionary of distinct values plus one small integer per row.
+    """
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    encoded = {}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        # Keyed by type too, so True and 1 stay distinct
+        index: Dict[Any, int] = {}
+        distinct = []
+        codes = []
+        try:
+            for value in values:
+                key = (type(value).__name__, value)
+                if key not in index:
+                    index[key] = len(distinct)
+                    distinct.append(value)
+                codes.append(index[key])
+        except TypeError:
+            distinct = None
+        if distinct is not None and len(distinct) <= len(values) // 2:
+            encoded[column] = {'dictionary': distinct, 'codes': codes}
+        else:
+            encoded[column] = {'values': values}
+    payload = {'fetched_at': fetched_at.isoformat(), 'rows': len(rows), 'columns': encoded}
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    return MAGIC + zlib.compress(data, 9)
+
+
+def decode_snapshot(data: bytes) -> Dict[str, Any]:
+    """{'fetched_at', 'rows'} from encode_snapshot() output; ValueError if it is not a snapshot"""
+    if not data.startswith(MAGIC):
+        raise ValueError("not a reference snapshot")
+    try:
+        payload = json.loads(zlib.decompress(data[len(MAGIC):]).decode('utf-8'))
+    except (zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(f"corrupt reference snapshot: {e}")
+    columns = {}
+    for column, encoded in payload['columns'].items():
+        if 'dictionary' in encoded:
+            dictionary = encoded['dictionary']
+            columns[column] = [dictionary[code] for code in encoded['codes']]
+        else:
+            columns[column] = encoded['values']
+    rows = [{column: values[i] for column, values in columns.items()} for i in range(payload['rows'])]
+    return {'fetched_at': datetime.fromisoformat(payload['fetched_at']), 'rows': rows}
+
+
+class ReferenceSnapshot:
+    """
+    Stale-while-revalidate copy of one reference table
+
+    The caller passes fetch, which returns the formatted rows from the
+    backend; an empty result or an exception counts as a failed refresh and
+    the last good rows are kept. With background=False refreshes run on the
+    calling thread (for backends whose connections cannot be shared between
+    threads), still one at a time.
+    """
+
+    def __init__(self, name: str, directory: Path = SNAPSHOT_DIR,
+                 refresh_after: int = REFRESH_AFTER_SECONDS, retry_after: int = RETRY_AFTER_SECONDS,
+                 background: bool = True):
+        self.name = name
+        self.path = Path(directory) / f"{name}.snap"
+        self.refresh_after = timedelta(seconds=refresh_after)
+        self.retry_after = timedelta(seconds=retry_after)
+        self.background = background
+        self.rows: Optional[List[Dict]] = None
+        self.fetched_at: Optional[datetime] = None
+        self.next_check_at = datetime.min
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._inflight: Optional[Future] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        """Changes whenever new rows are installed; usable as a cache key"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return self.fetched_at.isoformat() if self.fetched_at else None
+
+    def get(self, fetch: Callable[[], List[Dict]]) -> Optional[List[Dict]]:
+        """
+        The current rows, or None if there is no snapshot and the backend failed
+
+        Only a cold start without a snapshot waits for the backend; every
+        caller arriving meanwhile waits on the same fetch. After a failed
+        cold fetch callers get None at once until the retry delay is over.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            rows = self.rows
+            stale = datetime.now() >= self.next_check_at
+        if rows is None:
+            if not stale:
+                return None
+            return self._refresh(fetch).result()
+        if stale:
+            future = self._refresh(fetch)
+            if not self.background:
+                return future.result()
+        return rows
+
+    def _load(self):
+        self._loaded = True
+        try:
+            snapshot = decode_snapshot(self.path.read_bytes())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable %s snapshot: %s", self.name, e)
+            return
+        self.rows = snapshot['rows']
+        self.fetched_at = snapshot['fetched_at']
+        self.next_check_at = self.fetched_at + self.refresh_after
+        logger.info("Loaded %d %s from snapshot of %s", len(self.rows), self.name, self.fetched_at.isoformat())
+
+    def _refresh(self, fetch: Callable[[], List[Dict]]) -> Future:
+        """The in-flight refresh, starting one if none is running"""
+        with self._lock:
+            if self._inflight is not None and not self._inflight.done():
+                return self._inflight
+            if self.background:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'snapshot-{self.name}')
+                self._inflight = self._executor.submit(self._revalidate, fetch)
+                return self._inflight
+            future = self._inflight = Future()
+        future.set_running_or_notify_cancel()
+        future.set_result(self._revalidate(fetch))
+        return future
+
+    def _revalidate(self, fetch: Callable[[], List[Dict]]) -> Optional[List[Dict]]:
+        """Fetch from the backend and install the rows; returns the rows now being served"""
+        try:
+            rows = fetch()
+        except Exception as e:
+            logger.warning("Refreshing %s failed: %s", self.name, e)
+            rows = None
+        now = datetime.now()
+        if not rows:
+            with self._lock:
+                self.next_check_at = now + self.retry_after
+                if self.rows is not None:
+                    logger.warning("Serving %s snapshot of %s until the backend answers", self.name, self.fetched_at.isoformat())
+                return self.rows
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            tmp_path.write_bytes(encode_snapshot(rows, now))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write %s snapshot: %s", self.name, e)
+        with self._lock:
+            self.rows = rows
+            self.fetched_at = now
+            self.next_check_at = now + self.refresh_after
+        return rows
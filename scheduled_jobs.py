@@ -0,0 +1,94 @@
+"""
+Scheduled Jobs
+The scraper scheduler's job definitions: the nightly scrape, a monitor that
+flags failed or overdue scrapes from the run history, and a cleanup job that
+prunes old scrape snapshots and job history
+"""
+
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Any
+
+from job_scheduler import Job, JobScheduler, DEFAULT_DB_PATH
+from scraper_telemetry import load_run_history
+
+logger = logging.getLogger(__name__)
+
+# Directories the scrapers write snapshots and scrape_runs.jsonl into
+DATA_DIRS = [Path("scraped_data"), Path("edb_data"), Path("edb_comprehensive_data")]
+
+# Snapshots kept per file prefix (e.g. kindergartens_, primary_schools_)
+SNAPSHOTS_TO_KEEP = 5
+
+# A scraper whose last successful run is older than this is reported as overdue
+STALE_AFTER_HOURS = 26
+
+SNAPSHOT_PATTERN = re.compile(r'^(?P<prefix>.+?)_\d{8}_\d{6}\.(?:json|csv)$')
+
+MAINTENANCE_JOBS = [
+    Job('scrape_monitor', 'scheduled_jobs:check_scrape_health', every=3600, catch_up=False),
+    Job('snapshot_cleanup', 'scheduled_jobs:cleanup_snapshots', at='03:30', jitter=300),
+]
+
+
+def check_scrape_health(data_dirs: List[Path] = DATA_DIRS,
+                        stale_after_hours: int = STALE_AFTER_HOURS) -> Dict[str, Any]:
+    """Warn about scrapers whose last run failed or that have not succeeded recently"""
+    now = datetime.now()
+    report = {}
+    for data_dir in data_dirs:
+        latest = {}
+        last_ok = {}
+        for run in load_run_history(data_dir / "scrape_runs.jsonl"):
+            name = run.get('scraper')
+            latest[name] = run
+            if run.get('status') == 'ok':
+                last_ok[name] = run
+        for name, run in latest.items():
+            problems = []
+            if run.get('status') != 'ok':
+                problems.append(f"last run {run.get('status')}: {run.get('error', '')}".rstrip(': '))
+            ok_run = last_ok.get(name)
+            if ok_run is None:
+                problems.append("no successful run on record")
+            elif now - datetime.fromisoformat(ok_run['finished_at']) > timedelta(hours=stale_after_hours):
+                problems.append(f"last successful run finished {ok_run['finished_at']}")
+            for problem in problems:
+                logger.warning("Scraper %s: %s", name, problem)
+            report[name] = problems
+    return report
+
+
+def cleanup_snapshots(data_dirs: List[Path] = DATA_DIRS, keep: int = SNAPSHOTS_TO_KEEP) -> int:
+    """Delete all but the newest keep timestamped snapshots per prefix, plus old job history"""
+    removed = 0
+    for data_dir in data_dirs:
+        if not data_dir.exists():
+            continue
+        groups = defaultdict(list)
+        for path in data_dir.iterdir():
+            match = SNAPSHOT_PATTERN.match(path.name)
+            if match and path.is_file():
+                groups[(match.group('prefix'), path.suffix)].append(path)
+        for paths in groups.values():
+            # Timestamps in the names sort chronologically
+            paths.sort(key=lambda p: p.name)
+            for path in paths[:max(len(paths) - keep, 0)]:
+                try:
+                    path.unlink()
+                    removed += 1
+                except OSError as e:
+                    logger.error(f"Could not delete {path}: {e}")
+    logger.info(f"Removed {removed} old snapshots")
+
+    scheduler = JobScheduler([], DEFAULT_DB_PATH)
+    logger.info(f"Removed {scheduler.prune_history()} old job runs")
+    return removed
+
+
+def run_scheduler(scrape_job: Job, **options):
+    """Run a scraper's nightly job alongside the monitor and cleanup jobs until interrupted"""
+    JobScheduler([scrape_job] + MAINTENANCE_JOBS, **options).run_forever()
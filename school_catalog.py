@@ -0,0 +1,170 @@
+"""
+School Catalog
+Read-only kindergarten or primary school list shared by every session. Rows
+are stored column by column, schools are handed out as small views over
+them, and lookups by school number, name and district go through dict
+indexes
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Optional, Dict, List, Any, Iterator, Tuple
+
+import pandas as pd
+
+# Marks a column a row did not have, so records keep the keys of their source row
+_MISSING = object()
+
+
+class SchoolRecord(Mapping):
+    """
+    One school of a SchoolCatalog
+
+    A read-only mapping over the catalog's columns, so code written for the
+    row dicts (school.get(...), school['school_no']) works unchanged.
+    """
+
+    __slots__ = ('_catalog', '_row')
+
+    def __init__(self, catalog: 'SchoolCatalog', row: int):
+        self._catalog = catalog
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        column = self._catalog._columns.get(key)
+        if column is None or column[self._row] is _MISSING:
+            raise KeyError(key)
+        return column[self._row]
+
+    def __iter__(self) -> Iterator[str]:
+        row = self._row
+        return (key for key, column in self._catalog._columns.items() if column[row] is not _MISSING)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A mutable copy of the row"""
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"SchoolRecord({self.get('school_no')!r}, {self.get('name_en')!r})"
+
+
+class SchoolCatalog:
+    """
+    Column-stored school list with indexes
+
+    Built once per dataset version and never modified; equal values within a
+    column (districts, funding types, flags) are stored once.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], name: str = 'schools'):
+        self.name = name
+        self._size = len(rows)
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        self._columns: Dict[str, Tuple[Any, ...]] = {}
+        for column in columns:
+            shared: Dict[Any, Any] = {}
+            values = []
+            for row in rows:
+                value = row.get(column, _MISSING)
+                try:
+                    value = shared.setdefault((type(value), value), value)
+                except TypeError:
+                    pass
+                values.append(value)
+            self._columns[column] = tuple(values)
+
+        self._by_school_no: Dict[Any, int] = {}
+        self._by_name: Dict[str, int] = {}
+        by_district: Dict[str, List[int]] = {}
+        school_nos = self._columns.get('school_no', ())
+        for row, school_no in enumerate(school_nos):
+            if school_no is not _MISSING and school_no not in (None, ''):
+                self._by_school_no.setdefault(school_no, row)
+        for column in ('name_en', 'name_tc'):
+            for row, value in enumerate(self._columns.get(column, ())):
+                if isinstance(value, str) and value:
+                    self._by_name.setdefault(value, row)
+        for column in ('district_en', 'district_tc'):
+            for row, value in enumerate(self._columns.get(column, ())):
+                if isinstance(value, str) and value:
+                    by_district.setdefault(value, []).append(row)
+        self._by_district = {district: tuple(rows) for district, rows in by_district.items()}
+        self._frame: Optional[pd.DataFrame] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[SchoolRecord]:
+        return (SchoolRecord(self, row) for row in range(self._size))
+
+    def __getitem__(self, row: int) -> SchoolRecord:
+        """The school at a row position (the index of frame())"""
+        if not 0 <= row < self._size:
+            raise IndexError(row)
+        return SchoolRecord(self, row)
+
+    def get(self, school_no: Any) -> Optional[SchoolRecord]:
+        """The school with a school number, or None"""
+        row = self._by_school_no.get(school_no)
+        return None if row is None else SchoolRecord(self, row)
+
+    def find_by_name(self, name: str) -> Optional[SchoolRecord]:
+        """The first school with an English or Chinese name, or None"""
+        row = self._by_name.get(name)
+        return None if row is None else SchoolRecord(self, row)
+
+    def in_district(self, district: str) -> List[SchoolRecord]:
+        """Schools in a district, by English or Chinese district name"""
+        return [SchoolRecord(self, row) for row in self._by_district.get(district, ())]
+
+    def districts(self) -> List[str]:
+        """English district names, sorted"""
+        return sorted({value for value in self._columns.get('district_en', ())
+                       if isinstance(value, str) and value})
+
+    def column(self, name: str) -> List[Any]:
+        """Values of one column, None where a row did not have it"""
+        return [None if value is _MISSING else value for value in self._columns.get(name, ())]
+
+    def frame(self) -> pd.DataFrame:
+        """
+        The schools as a DataFrame, built on first use and shared
+
+        Callers must not modify it in place; filtering returns new frames.
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame([dict(record) for record in self])
+        return self._frame
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Approximate bytes held by the catalog (and by its DataFrame, once built)"""
+        seen = set()
+        total = sys.getsizeof(self._columns)
+
+        def add(obj):
+            nonlocal total
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                total += sys.getsizeof(obj)
+
+        for column, values in self._columns.items():
+            add(column)
+            add(values)
+            for value in values:
+                if value is not _MISSING:
+                    add(value)
+        for index in (self._by_school_no, self._by_name, self._by_district):
+            total += sys.getsizeof(index)
+        for rows in self._by_district.values():
+            total += sys.getsizeof(rows)
+        frame_bytes = int(self._frame.memory_usage(deep=True).sum()) if self._frame is not None else 0
+        return {
+            'catalog': self.name,
+            'rows': self._size,
+            'columns': len(self._columns),
+            'catalog_bytes': total,
+            'frame_bytes': frame_bytes,
+        }
@@ -0,0 +1,200 @@
+"""
+School Identity Service
+Stable school keys for the importers, derived from content rather than row
+position: the EDB school number when a source has one, otherwise a hash of
+the normalized name, district and address. Every key a school has been seen
+under is kept in a persisted alias table, so a reordered or lightly edited
+re-import resolves to the same keys and upserts only touch what changed
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Tuple, Iterator
+
+from school_registry import SourceRecord, is_match, MAX_BLOCK_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path('school_identity.db')
+
+# Official EDB school numbers are all digits; the scrapers' own PS0001 /
+# KG012 style numbers are positional and never used as identity
+EDB_NUMBER_PATTERN = re.compile(r'^\d{5,}$')
+
+KEY_PREFIXES = {'primary': 'PS', 'kindergarten': 'KG'}
+
+HASH_LENGTH = 12
+
+# Fields kept per identity for matching records whose content has changed
+IDENTITY_FIELDS = ['name_en', 'name_tc', 'district_en', 'district_tc', 'address_en', 'address_tc', 'tel', 'website']
+
+EDB_ALIAS = 'edb'
+CONTENT_ALIAS = 'content'
+
+
+def edb_number(record: Dict[str, Any]) -> str:
+    """The record's official EDB school number, '' if it carries none"""
+    value = str(record.get('school_no') or '').strip()
+    return value if EDB_NUMBER_PATTERN.match(value) else ''
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Hash of normalized name + district + address, '' for a record without a real name"""
+    source = SourceRecord(0, record)
+    name = source.name_en or source.name_tc
+    if not name:
+        return ''
+    address = source.address_en or source.address_tc
+    return hashlib.sha1('|'.join([name, source.district, address]).encode('utf-8')).hexdigest()[:HASH_LENGTH].upper()
+
+
+class SchoolIdentity:
+    """
+    Persistent key assignment for one school type ('primary' or 'kindergarten')
+
+    key_for() looks a record up by its EDB number, then by its content hash,
+    then by entity resolution against the schools already known, and only
+    mints a new key when all three miss. Whatever it matched on, the
+    record's EDB number and content hash are recorded as aliases of the key.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH, scope: str = 'primary'):
+        self.db_path = Path(db_path)
+        self.scope = scope
+        self.prefix = KEY_PREFIXES.get(scope, scope[:2].upper())
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.stats = {'known': 0, 'matched': 0, 'new': 0, 'unkeyed': 0}
+        self._create_tables()
+        self._load_index()
+
+    def _create_tables(self):
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS school_identities (
+                scope TEXT NOT NULL,
+                school_key TEXT NOT NULL,
+                record TEXT NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                PRIMARY KEY (scope, school_key)
+            );
+            CREATE TABLE IF NOT EXISTS school_aliases (
+                scope TEXT NOT NULL,
+                alias TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                school_key TEXT NOT NULL,
+                source TEXT,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (scope, alias)
+            );
+            CREATE INDEX IF NOT EXISTS idx_school_aliases_key ON school_aliases (scope, school_key);
+        ''')
+        self.conn.commit()
+
+    def _load_index(self):
+        """Blocking-key index over the known schools, for entity resolution"""
+        self.blocks: Dict[Tuple, List[Tuple[SourceRecord, str]]] = {}
+        rows = self.conn.execute('SELECT school_key, record FROM school_identities WHERE scope = ?', (self.scope,))
+        for school_key, record in rows:
+            self._index(school_key, json.loads(record))
+
+    def _index(self, school_key: str, record: Dict[str, Any]):
+        known = SourceRecord(0, record)
+        known.original = known.data = None
+        for key in known.blocking_keys():
+            self.blocks.setdefault(key, []).append((known, school_key))
+
+    def _lookup_alias(self, alias: str) -> Optional[str]:
+        row = self.conn.execute('SELECT school_key FROM school_aliases WHERE scope = ? AND alias = ?',
+                                (self.scope, alias)).fetchone()
+        return row[0] if row else None
+
+    def _resolve_match(self, record: Dict[str, Any]) -> Optional[str]:
+        candidate = SourceRecord(0, record)
+        for key in candidate.blocking_keys():
+            members = self.blocks.get(key, ())
+            if len(members) > MAX_BLOCK_SIZE:
+                continue
+            for known, school_key in members:
+                if is_match(candidate, known):
+                    return school_key
+        return None
+
+    def _add_alias(self, alias: str, kind: str, school_key: str, source: Optional[str], now: str):
+        self.conn.execute(
+            'INSERT OR IGNORE INTO school_aliases (scope, alias, kind, school_key, source, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)', (self.scope, alias, kind, school_key, source, now)
+        )
+
+    def key_for(self, record: Dict[str, Any], source: Optional[str] = None) -> Optional[str]:
+        """Stable key for a record, None if it has neither an EDB number nor a real name"""
+        number = edb_number(record)
+        digest = content_hash(record)
+        aliases = []
+        if number:
+            aliases.append((f"{EDB_ALIAS}:{number}", EDB_ALIAS))
+        if digest:
+            aliases.append((f"{CONTENT_ALIAS}:{digest}", CONTENT_ALIAS))
+        if not aliases:
+            self.stats['unkeyed'] += 1
+            return None
+
+        now = datetime.now().isoformat()
+        school_key = next((key for key in (self._lookup_alias(alias) for alias, _ in aliases) if key), None)
+        if school_key:
+            self.stats['known'] += 1
+        else:
+            school_key = self._resolve_match(record)
+            if school_key:
+                self.stats['matched'] += 1
+            else:
+                school_key = number or f"{self.prefix}-{digest}"
+                self.stats['new'] += 1
+                fields = {name: record.get(name) for name in IDENTITY_FIELDS}
+                self.conn.execute(
+                    'INSERT OR IGNORE INTO school_identities (scope, school_key, record, first_seen, last_seen) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (self.scope, school_key, json.dumps(fields, ensure_ascii=False), now, now)
+                )
+                self._index(school_key, fields)
+
+        for alias, kind in aliases:
+            self._add_alias(alias, kind, school_key, source, now)
+        self.conn.execute('UPDATE school_identities SET last_seen = ? WHERE scope = ? AND school_key = ?',
+                          (now, self.scope, school_key))
+        return school_key
+
+    def assign(self, records: Iterator[Dict[str, Any]], source: Optional[str] = None,
+               key_field: str = 'school_no') -> Iterator[Dict[str, Any]]:
+        """
+        Pipeline stage: replace each record's key_field with its stable key
+
+        Records that cannot be keyed keep the value they came with.
+        Aliases are committed when the stream ends.
+        """
+        try:
+            for record in records:
+                school_key = self.key_for(record, source)
+                if school_key:
+                    record[key_field] = school_key
+                yield record
+        finally:
+            self.conn.commit()
+            logger.info("Identity (%s): %s", self.scope, self.stats)
+
+    def stage(self, source: Optional[str] = None, key_field: str = 'school_no'):
+        return lambda records: self.assign(records, source, key_field)
+
+    def aliases(self, school_key: str) -> List[str]:
+        """Every alias recorded for a key"""
+        rows = self.conn.execute('SELECT alias FROM school_aliases WHERE scope = ? AND school_key = ? ORDER BY alias',
+                                 (self.scope, school_key))
+        return [row[0] for row in rows]
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+School Entity Resolution
+Normalizes names, addresses and phone numbers of school records from the
+EDB, Schooland.hk and CSV ingestion paths, finds records that describe the
+same school by comparing only records that share a blocking key, and merges
+them into a canonical school registry that keeps each record's provenance
+"""
+
+import argparse
+import json
+import re
+import sys
+import unicodedata
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+
+# English district name -> Chinese; the English name is the district key
+DISTRICTS = {
+    'Central and Western': '中西區',
+    'Eastern': '東區',
+    'Southern': '南區',
+    'Wan Chai': '灣仔區',
+    'Sham Shui Po': '深水埗區',
+    'Kowloon City': '九龍城區',
+    'Kwun Tong': '觀塘區',
+    'Wong Tai Sin': '黃大仙區',
+    'Yau Tsim Mong': '油尖旺區',
+    'Islands': '離島區',
+    'Kwai Tsing': '葵青區',
+    'North': '北區',
+    'Sai Kung': '西貢區',
+    'Sha Tin': '沙田區',
+    'Tai Po': '大埔區',
+    'Tsuen Wan': '荃灣區',
+    'Tuen Mun': '屯門區',
+    'Yuen Long': '元朗區',
+}
+
+# Spellings seen in the sources that do not reduce to a DISTRICTS entry
+DISTRICT_ALIASES = {
+    'central western': 'Central and Western',
+    'hk east': 'Eastern',
+    'east': 'Eastern',
+    'yau tsim and mong kok': 'Yau Tsim Mong',
+    'yau tsim mong kok': 'Yau Tsim Mong',
+    'kwai chung and tsing yi': 'Kwai Tsing',
+    'shatin': 'Sha Tin',
+}
+
+# Words that say what kind of institution a record is rather than which one
+NAME_STOPWORDS_EN = {'primary', 'school', 'the', 'of', 'and', 'section', 'ps'}
+NAME_STOPWORDS_TC = ('附屬小學', '小學部', '小學', '學校')
+
+ADDRESS_ABBREVIATIONS = {
+    'rd': 'road', 'st': 'street', 'ave': 'avenue', 'blk': 'block', 'bldg': 'building',
+    'est': 'estate', 'ctr': 'centre', 'center': 'centre', 'hk': 'hong kong', 'kln': 'kowloon',
+    'nt': 'new territories', 'no': '', 'g/f': 'ground floor',
+}
+
+# Values the normalizers use in place of a missing field
+PLACEHOLDER_VALUES = {
+    '', 'n/a', 'na', 'none', 'null', 'nan', 'unknown', '未知', '地址不詳',
+    'address not available',
+}
+PLACEHOLDER_NAME_PATTERN = re.compile(r'^(primary school|小學)\s*\d+$', re.IGNORECASE)
+
+# Characters of the normalized name used in the name blocking key
+NAME_PREFIX_EN = 6
+NAME_PREFIX_TC = 3
+
+# Blocks larger than this are shared placeholders (one switchboard number
+# reused across a CSV) and are skipped instead of compared pairwise
+MAX_BLOCK_SIZE = 40
+
+# A phone number or website shared by more records than this is not taken
+# as evidence that they are the same school
+MAX_IDENTIFYING_SHARE = 6
+
+# Match thresholds
+NAME_MATCH = 0.92
+NAME_MATCH_WITH_PHONE = 0.8
+NAME_MATCH_WITH_ADDRESS = 0.8
+ADDRESS_MATCH = 0.5
+
+# Lower rank wins when sources disagree on a field
+SOURCE_PRIORITY = [
+    'EDB CSV Download',
+    'EDB CSV Import',
+    'EDB Comprehensive',
+    'EDB Website',
+    'Schooland.hk',
+    'EDB Sample Data',
+]
+
+# Canonical fields and the source record fields they can be read from
+FIELD_SOURCES = {
+    'name_en': ['name_en'],
+    'name_tc': ['name_tc'],
+    'district_en': ['district_en', 'district'],
+    'district_tc': ['district_tc', 'district'],
+    'address_en': ['address_en', 'address'],
+    'address_tc': ['address_tc', 'address'],
+    'tel': ['tel', 'telephone'],
+    'website': ['website'],
+    'school_type': ['school_type', 'funding_type'],
+    'religion': ['religion'],
+    'gender': ['gender'],
+    'school_network': ['school_network'],
+}
+
+
+def _fold(text: Any) -> str:
+    """NFKC-normalized, lowercased text with placeholders mapped to ''"""
+    if text is None:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).strip().lower()
+    return '' if text in PLACEHOLDER_VALUES else text
+
+
+def normalize_name_en(name: Any) -> str:
+    name = _fold(name)
+    if not name or PLACEHOLDER_NAME_PATTERN.match(name):
+        return ''
+    name = name.replace('&', ' and ').replace("'s", 's')
+    tokens = re.findall(r'[a-z0-9]+', name)
+    return ' '.join(token for token in tokens if token not in NAME_STOPWORDS_EN)
+
+
+def normalize_name_tc(name: Any) -> str:
+    name = _fold(name)
+    if not name or PLACEHOLDER_NAME_PATTERN.match(name):
+        return ''
+    name = re.sub(r'[\s\W_]+', '', name)
+    for word in NAME_STOPWORDS_TC:
+        if name.endswith(word):
+            name = name[:-len(word)]
+            break
+    return name
+
+
+def normalize_phone(tel: Any) -> str:
+    """The 8-digit local number, or '' if there is none"""
+    digits = re.sub(r'\D', '', _fold(tel))
+    if len(digits) == 11 and digits.startswith('852'):
+        digits = digits[3:]
+    return digits if len(digits) == 8 else ''
+
+
+def normalize_address(address: Any) -> str:
+    address = _fold(address)
+    if not address:
+        return ''
+    tokens = re.findall(r'[a-z0-9/]+|[^\x00-\x7f]', address)
+    expanded = [ADDRESS_ABBREVIATIONS.get(token, token) for token in tokens]
+    return ' '.join(token for token in expanded if token)
+
+
+def normalize_district(district: Any) -> str:
+    """English district name for an English or Chinese spelling, '' if unknown"""
+    text = _fold(district)
+    if not text:
+        return ''
+    for name_en, name_tc in DISTRICTS.items():
+        if text == name_en.lower() or text in (name_tc, name_tc.rstrip('區')):
+            return name_en
+    key = ' '.join(re.findall(r'[a-z]+', text.replace('&', ' and ')))
+    for name_en in DISTRICTS:
+        if key == name_en.lower():
+            return name_en
+    return DISTRICT_ALIASES.get(key, DISTRICT_ALIASES.get(key.replace(' and ', ' '), ''))
+
+
+def website_host(url: Any) -> str:
+    url = _fold(url)
+    match = re.match(r'^(?:https?://)?(?:www\.)?([^/:?#]+)', url)
+    return match.group(1) if match and '.' in match.group(1) else ''
+
+
+def _similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _token_overlap(a: str, b: str) -> float:
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+def _as_dict(record: Any) -> Dict[str, Any]:
+    if is_dataclass(record):
+        return asdict(record)
+    return dict(record)
+
+
+class SourceRecord:
+    """One ingested record with its normalized match keys"""
+
+    def __init__(self, index: int, record: Any, source: Optional[str] = None):
+        self.index = index
+        self.original = record
+        data = _as_dict(record)
+        self.data = data
+        self.source = source or data.get('source') or 'unknown'
+        self.source_id = str(data.get('school_no') or '')
+
+        self.fields = {
+            field: next((data[name] for name in names if _fold(data.get(name))), '')
+            for field, names in FIELD_SOURCES.items()
+        }
+        self.name_en = normalize_name_en(self.fields['name_en'])
+        self.name_tc = normalize_name_tc(self.fields['name_tc'])
+        self.district = normalize_district(self.fields['district_en']) or normalize_district(self.fields['district_tc'])
+        self.phone = normalize_phone(self.fields['tel'])
+        self.address_en = normalize_address(self.fields['address_en'])
+        self.address_tc = normalize_address(self.fields['address_tc'])
+        self.host = website_host(self.fields['website'])
+
+    def blocking_keys(self) -> List[Tuple]:
+        """
+        Keys that a matching record very likely shares
+
+        District + name prefix (English and Chinese separately), phone
+        number and website host.
+        """
+        keys = []
+        if self.name_en:
+            keys.append(('name_en', self.district, self.name_en.replace(' ', '')[:NAME_PREFIX_EN]))
+        if self.name_tc:
+            keys.append(('name_tc', self.district, self.name_tc[:NAME_PREFIX_TC]))
+        if self.phone:
+            keys.append(('phone', self.phone))
+        if self.host:
+            keys.append(('host', self.host))
+        return keys
+
+    def priority(self) -> int:
+        try:
+            return SOURCE_PRIORITY.index(self.source)
+        except ValueError:
+            return len(SOURCE_PRIORITY)
+
+
+def is_match(a: SourceRecord, b: SourceRecord, shared: frozenset = frozenset()) -> bool:
+    """
+    Whether two records describe the same school
+
+    shared holds the phone/host blocking keys too common to identify a school.
+    """
+    if a.district and b.district and a.district != b.district:
+        return False
+    name_score = max(_similarity(a.name_en, b.name_en), _similarity(a.name_tc, b.name_tc))
+    if a.host and b.host and a.host != b.host and ('host', a.host) not in shared:
+        # Different websites: only a near-identical name overrides that
+        return name_score >= NAME_MATCH
+    if name_score >= NAME_MATCH:
+        return True
+    if a.phone and a.phone == b.phone and ('phone', a.phone) not in shared and name_score >= NAME_MATCH_WITH_PHONE:
+        return True
+    if a.host and a.host == b.host and ('host', a.host) not in shared and name_score >= NAME_MATCH_WITH_PHONE:
+        return True
+    address_score = max(_token_overlap(a.address_en, b.address_en), _token_overlap(a.address_tc, b.address_tc))
+    return name_score >= NAME_MATCH_WITH_ADDRESS and address_score >= ADDRESS_MATCH
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Keep the earlier record as the root so clusters keep input order
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def cluster_records(records: List[SourceRecord]) -> Tuple[List[List[SourceRecord]], Dict[str, int]]:
+    """
+    Group records that describe the same school
+
+    Only records sharing a blocking key are compared, so the number of
+    comparisons grows with the block sizes rather than with n².
+    """
+    blocks: Dict[Tuple, List[int]] = {}
+    for record in records:
+        for key in record.blocking_keys():
+            blocks.setdefault(key, []).append(record.index)
+
+    shared = frozenset(key for key, members in blocks.items()
+                       if key[0] in ('phone', 'host') and len(members) > MAX_IDENTIFYING_SHARE)
+    union_find = _UnionFind(len(records))
+    compared = set()
+    stats = {'records': len(records), 'blocks': len(blocks), 'oversized_blocks': 0, 'comparisons': 0}
+    for members in blocks.values():
+        if len(members) > MAX_BLOCK_SIZE:
+            stats['oversized_blocks'] += 1
+            continue
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                pair = (first, second) if first < second else (second, first)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                if union_find.find(first) != union_find.find(second) and is_match(records[first], records[second], shared):
+                    union_find.union(first, second)
+    stats['comparisons'] = len(compared)
+
+    clusters: Dict[int, List[SourceRecord]] = {}
+    for record in records:
+        clusters.setdefault(union_find.find(record.index), []).append(record)
+    stats['clusters'] = len(clusters)
+    return list(clusters.values()), stats
+
+
+def merge_cluster(cluster: List[SourceRecord]) -> Dict[str, Any]:
+    """
+    Canonical school for a cluster of matching records
+
+    Each field comes from the highest-priority source that has it; the
+    provenance lists every contributing record and the fields it supplied.
+    """
+    ranked = sorted(cluster, key=lambda record: (record.priority(), record.index))
+    school: Dict[str, Any] = {}
+    supplied: Dict[int, List[str]] = {record.index: [] for record in ranked}
+    for field in FIELD_SOURCES:
+        for record in ranked:
+            if _fold(record.fields[field]):
+                school[field] = record.fields[field]
+                supplied[record.index].append(field)
+                break
+        else:
+            school[field] = ''
+
+    # Schooland and EDB spell districts differently; store both forms
+    district = next((record.district for record in ranked if record.district), '')
+    if district:
+        school['district_en'] = district
+        school['district_tc'] = DISTRICTS[district]
+
+    school['sources'] = sorted({record.source for record in ranked})
+    school['provenance'] = [
+        {'source': record.source, 'source_id': record.source_id, 'fields': supplied[record.index]}
+        for record in ranked
+    ]
+    return school
+
+
+def resolve(records: Iterable[Any], source: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Merge records (dicts or dataclasses) into canonical schools; returns (schools, stats)"""
+    source_records = [SourceRecord(index, record, source) for index, record in enumerate(records)]
+    clusters, stats = cluster_records(source_records)
+    return [merge_cluster(cluster) for cluster in clusters], stats
+
+
+def dedupe_records(records: List[Any]) -> List[Any]:
+    """
+    Within-source dedupe for the scrapers, keeping their own record type
+
+    The first record of each cluster is kept, with fields it lacks filled
+    in from its duplicates. Records that cannot be matched on anything
+    (no name, phone or website) are kept as they are.
+    """
+    source_records = [SourceRecord(index, record) for index, record in enumerate(records)]
+    clusters, _ = cluster_records(source_records)
+
+    unique = []
+    for cluster in clusters:
+        keep = cluster[0].original
+        for duplicate in cluster[1:]:
+            for name, value in duplicate.data.items():
+                if _fold(value) and not _fold(_get(keep, name)):
+                    _set(keep, name, value)
+        unique.append(keep)
+    return unique
+
+
+class StreamingDeduper:
+    """
+    First-seen-wins dedupe for a stream of records, using the blocking keys
+    and match rules of cluster_records()
+
+    Only the match keys of records already seen are kept, not the records
+    themselves. Phones and hosts count as shared once more than
+    MAX_IDENTIFYING_SHARE records have carried them so far.
+    """
+
+    def __init__(self):
+        self.blocks: Dict[Tuple, List[SourceRecord]] = {}
+        self.seen = 0
+        self.duplicates = 0
+
+    def is_duplicate(self, record: Any) -> bool:
+        candidate = SourceRecord(self.seen, record)
+        candidate.original = candidate.data = None
+        self.seen += 1
+
+        keys = candidate.blocking_keys()
+        shared = frozenset(key for key in keys
+                           if key[0] in ('phone', 'host') and len(self.blocks.get(key, ())) >= MAX_IDENTIFYING_SHARE)
+        for key in keys:
+            members = self.blocks.get(key, ())
+            if len(members) > MAX_BLOCK_SIZE:
+                continue
+            if any(is_match(candidate, other, shared) for other in members):
+                self.duplicates += 1
+                return True
+
+        for key in keys:
+            self.blocks.setdefault(key, []).append(candidate)
+        return False
+
+
+def _get(record: Any, name: str) -> Any:
+    return getattr(record, name, None) if is_dataclass(record) else record.get(name)
+
+
+def _set(record: Any, name: str, value: Any):
+    if is_dataclass(record):
+        setattr(record, name, value)
+    else:
+        record[name] = value
+
+
+class SchoolRegistry:
+    """Canonical schools resolved from every ingestion path's output files"""
+
+    # Latest file of each pattern is read; (directory, glob, source override)
+    SOURCE_FILES = [
+        ('csv_data', 'processed_primary_schools_*.json', None),
+        ('edb_data', 'edb_primary_schools_*.json', None),
+        ('edb_comprehensive_data', 'comprehensive_edb_primary_schools_*.json', None),
+        ('scraped_data', 'schooland_primary_schools_*.json', 'Schooland.hk'),
+        ('scraped_data', 'primary_schools_*.json', None),
+    ]
+
+    def __init__(self, base_dir: Path = Path('.')):
+        self.base_dir = Path(base_dir)
+        self.records: List[Tuple[Any, Optional[str]]] = []
+        self.loaded_files: List[str] = []
+        self.schools: List[Dict[str, Any]] = []
+        self.stats: Dict[str, int] = {}
+
+    def add_records(self, records: Iterable[Any], source: Optional[str] = None):
+        self.records.extend((record, source) for record in records)
+
+    def load_latest_outputs(self):
+        """Add the newest output file of every ingestion path that has one"""
+        for directory, pattern, source in self.SOURCE_FILES:
+            files = sorted((self.base_dir / directory).glob(pattern))
+            if not files:
+                continue
+            with open(files[-1], 'r', encoding='utf-8') as f:
+                self.add_records(json.load(f), source)
+            self.loaded_files.append(str(files[-1]))
+
+    def resolve(self, identity=None) -> List[Dict[str, Any]]:
+        """
+        Merge the loaded records; each school's registry_id is its stable
+        identity key, so ids survive schools being added or removed
+        """
+        # school_identity builds on this module
+        from school_identity import SchoolIdentity, EDB_NUMBER_PATTERN, DEFAULT_DB_PATH
+
+        source_records = [SourceRecord(index, record, source) for index, (record, source) in enumerate(self.records)]
+        clusters, self.stats = cluster_records(source_records)
+        self.schools = [merge_cluster(cluster) for cluster in clusters]
+        self.schools.sort(key=lambda school: (school['district_en'], school['name_en'] or school['name_tc']))
+
+        owned = identity is None
+        identity = identity or SchoolIdentity(self.base_dir / DEFAULT_DB_PATH)
+        try:
+            for number, school in enumerate(self.schools, 1):
+                edb_number = next((entry['source_id'] for entry in school['provenance']
+                                   if EDB_NUMBER_PATTERN.match(entry['source_id'])), '')
+                key = identity.key_for(dict(school, school_no=edb_number), 'registry')
+                school['registry_id'] = key or f"SR{number:05d}"
+            identity.conn.commit()
+        finally:
+            if owned:
+                identity.close()
+        return self.schools
+
+    def save(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generated_at': datetime.now().isoformat(),
+                'inputs': self.loaded_files,
+                'stats': self.stats,
+                'schools': self.schools,
+            }, f, ensure_ascii=False, indent=2)
+        return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Merge scraped school records into a canonical registry")
+    parser.add_argument("--base-dir", default=".", help="Directory holding the scrapers' data directories")
+    parser.add_argument("--output", default="scraped_data/school_registry.json", help="Registry JSON to write")
+    args = parser.parse_args(argv)
+
+    registry = SchoolRegistry(Path(args.base_dir))
+    registry.load_latest_outputs()
+    if not registry.records:
+        print("No scraper output files found")
+        return 1
+
+    registry.resolve()
+    path = registry.save(Path(args.base_dir) / args.output)
+    stats = registry.stats
+    n = stats['records']
+    print(f"📥 {n} records from {len(registry.loaded_files)} files")
+    print(f"🔎 {stats['comparisons']} comparisons in {stats['blocks']} blocks "
+          f"(all pairs would be {n * (n - 1) // 2}; {stats['oversized_blocks']} oversized blocks skipped)")
+    print(f"🏫 {stats['clusters']} canonical schools written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,13 +11,18 @@ import os
 import time
 import logging
 from datetime import datetime
-from bs4 import BeautifulSoup
 import re
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Iterator
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import random
 
+from scraper_telemetry import ScrapeRun, SampledLog
+from school_registry import dedupe_records
+from crawl_frontier import CrawlFrontier, FrontierEntry, canonicalize_url, LISTING_PRIORITY
+from ingestion_pipeline import SourcePlugin, JsonSnapshotSink, run_source
+from school_identity import SchoolIdentity
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +34,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Relative links on Schooland.hk pages resolve against the site root
+SCHOOLAND_ROOT = "https://www.schooland.hk/"
+
 @dataclass
 class PrimarySchoolData:
     """Data class for primary school information from Schooland.hk"""
@@ -59,6 +67,14 @@ class SchoolandScraper:
         self.data_dir = Path("scraped_data")
         self.data_dir.mkdir(exist_ok=True)
         
+        # Per-stage run metrics and sampled per-row logging
+        self.telemetry = ScrapeRun('schooland', self.data_dir / "scrape_runs.jsonl")
+        self.row_log = SampledLog(logger)
+        
+        # Listing and detail pages still to fetch, and what was found on the
+        # ones already fetched; kept on disk so interrupted runs resume
+        self.frontier = CrawlFrontier(self.data_dir / "schooland_frontier.db", 'schooland')
+        
         # Schooland.hk base URL
         self.base_url = "https://www.schooland.hk/ps/"
         
@@ -118,105 +134,183 @@ class SchoolandScraper:
             '有聯繫中學': 'Affiliated Secondary'
         }
     
-    def scrape_all_primary_schools(self) -> List[PrimarySchoolData]:
-        """Scrape all primary schools from Schooland.hk by iterating through all districts"""
+    def scrape_all_primary_schools(self, resume: bool = True) -> List[PrimarySchoolData]:
+        """
+        Scrape all primary schools from Schooland.hk by iterating through all districts
+
+        District listings and the school detail pages they link to go through
+        the crawl frontier, so each detail page is fetched once per run and an
+        interrupted run picks up where it stopped.
+        """
+        schools = list(self.iter_primary_schools(resume=resume))
+        
+        with self.telemetry.stage('dedupe') as dedupe:
+            unique_schools = self._remove_duplicates(schools)
+            dedupe.items += len(unique_schools)
+        logger.info(f"Found {len(unique_schools)} unique primary schools across all districts.")
+        return unique_schools
+    
+    def iter_primary_schools(self, resume: bool = True) -> Iterator[PrimarySchoolData]:
+        """Crawl every district through the frontier, then yield its schools one at a time"""
+        self._crawl_districts(resume)
+        yield from self._iter_district_schools()
+    
+    def _crawl_districts(self, resume: bool = True):
+        """Fetch every district listing and the detail pages it links to"""
         logger.info("Starting comprehensive primary school scraping from Schooland.hk (by district)...")
-        schools = []
-        for district_tc, district_en in self.districts.items():
-            try:
-                logger.info(f"Scraping schools in {district_en} ({district_tc})...")
-                district_url = f"{self.base_url}?district={district_tc}"
-                response = self.session.get(district_url, timeout=30)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Look for school data in multiple ways
-                district_schools = []
-                
-                # Method 1: Look for main school table
-                tables = soup.find_all('table')
-                logger.info(f"Found {len(tables)} tables in {district_en}")
-                
-                for table_idx, table in enumerate(tables):
-                    rows = table.find_all('tr')
-                    logger.info(f"Table {table_idx}: Found {len(rows)} rows")
-                    
-                    for row_idx, row in enumerate(rows):
-                        cells = row.find_all(['td', 'th'])
-                        if len(cells) >= 3:  # At least 3 columns
-                            cell_texts = [cell.get_text(strip=True) for cell in cells]
-                            logger.debug(f"Row {row_idx}: {cell_texts}")
-                            
-                            # Skip rows that are clearly filters/categories
-                            if any(filter_text in ' '.join(cell_texts).lower() for filter_text in 
-                                   ['種類', '宗教', '地區', '校網', '性別', 'filter', 'category']):
-                                logger.debug(f"Skipping filter row: {cell_texts}")
-                                continue
-                            
-                            # Skip rows with empty or very short school names
-                            if not cell_texts[0] or len(cell_texts[0]) < 3:
-                                logger.debug(f"Skipping row with short name: {cell_texts}")
-                                continue
-                            
-                            # Skip rows that look like statistics/numbers only
-                            if all(cell.isdigit() or not cell for cell in cell_texts):
-                                logger.debug(f"Skipping numeric row: {cell_texts}")
-                                continue
-                            
-                            try:
-                                school_data = self._parse_improved_table_row(cells, district_tc)
-                                if school_data:
-                                    district_schools.append(school_data)
-                                    logger.info(f"Found school: {school_data.name_tc}")
-                            except Exception as e:
-                                logger.debug(f"Error parsing row {row_idx}: {e}")
-                                continue
+        if self.frontier.begin_run(resume=resume):
+            logger.info("Resuming unfinished run: %s", self.frontier.stats())
+        
+        with self.frontier.batch():
+            for district_tc in self.districts:
+                self.frontier.add(f"{self.base_url}?district={district_tc}", LISTING_PRIORITY,
+                                  kind='listing', meta={'district': district_tc})
+        
+        while True:
+            entry = self.frontier.pop()
+            if entry is None:
+                break
+            if entry.kind == 'listing':
+                self._scrape_district_listing(entry)
+            else:
+                self._fetch_detail(entry.url)
+        logger.info("Frontier: %s", self.frontier.stats())
+    
+    def _scrape_district_listing(self, entry: FrontierEntry):
+        """
+        Extract the schools on one district listing page
+
+        Detail pages are queued rather than fetched inline; the listing's
+        schools are stored with the URL of their detail page as the
+        listing's frontier result. Relative links are resolved against the
+        listing's own URL, and everything the page adds is committed once.
+        """
+        district_tc = entry.meta['district']
+        district_en = self.districts.get(district_tc, district_tc)
+        with self.frontier.batch():
+            self._scrape_listing_page(entry, district_tc, district_en)
+        time.sleep(random.uniform(1, 2))  # Be respectful
+    
+    def _scrape_listing_page(self, entry: FrontierEntry, district_tc: str, district_en: str):
+        try:
+            logger.info(f"Scraping schools in {district_en} ({district_tc})...")
+            response = self.telemetry.get(self.session, entry.url, 'listing_fetch', timeout=30)
+            # After redirects, the URL the page's relative links are relative to
+            page_url = getattr(response, 'url', None) or entry.url
+            # Tables, links and listing containers all come from one lxml parse
+            page = self.telemetry.parse_page(response.content)
+            
+            # Look for school data in multiple ways; each found school is
+            # {'school': fields, 'detail_url': ..., 'requires_detail': ...}
+            district_schools = []
+            
+            # Method 1: Look for main school table
+            tables = page.tables
+            logger.debug("Found %d tables in %s", len(tables), district_en)
+            
+            for table_idx, table in enumerate(tables):
+                rows = table.find_all('tr')
+                logger.debug("Table %d: Found %d rows", table_idx, len(rows))
                 
-                # Method 2: Look for school links in the page
-                school_links = soup.find_all('a', href=True)
-                for link in school_links:
-                    href = link.get('href', '')
-                    link_text = link.get_text(strip=True)
-                    
-                    # Check if this looks like a school link
-                    if (len(link_text) > 3 and 
-                        ('小學' in link_text or 'Primary' in link_text or 'School' in link_text) and
-                        not any(filter_text in link_text for filter_text in ['種類', '宗教', '地區', '校網', '性別'])):
+                for row_idx, row in enumerate(rows):
+                    cells = row.find_all(['td', 'th'])
+                    if len(cells) >= 3:  # At least 3 columns
+                        cell_texts = [cell.get_text(strip=True) for cell in cells]
+                        logger.debug("Row %d: %s", row_idx, cell_texts)
                         
-                        try:
-                            school_data = self._scrape_school_detail_page(href, link_text, district_tc)
-                            if school_data:
-                                district_schools.append(school_data)
-                                logger.info(f"Found school from link: {school_data.name_tc}")
-                        except Exception as e:
-                            logger.debug(f"Error scraping school link: {e}")
+                        # Skip rows that are clearly filters/categories
+                        if any(filter_text in ' '.join(cell_texts).lower() for filter_text in 
+                               ['種類', '宗教', '地區', '校網', '性別', 'filter', 'category']):
+                            logger.debug("Skipping filter row: %s", cell_texts)
                             continue
-                
-                # Method 3: Look for school listings in divs
-                school_divs = soup.find_all(['div', 'li'], class_=re.compile(r'school|primary|list|item'))
-                for div in school_divs:
-                    text = div.get_text(strip=True)
-                    if len(text) > 10 and ('小學' in text or 'Primary' in text):
+                        
+                        # Skip rows with empty or very short school names
+                        if not cell_texts[0] or len(cell_texts[0]) < 3:
+                            logger.debug("Skipping row with short name: %s", cell_texts)
+                            continue
+                        
+                        # Skip rows that look like statistics/numbers only
+                        if all(cell.isdigit() or not cell for cell in cell_texts):
+                            logger.debug("Skipping numeric row: %s", cell_texts)
+                            continue
+                        
                         try:
-                            school_data = self._parse_listing_element(div, district_tc)
+                            school_data = self._parse_improved_table_row(cells, district_tc)
                             if school_data:
-                                district_schools.append(school_data)
-                                logger.info(f"Found school from div: {school_data.name_tc}")
+                                link = cells[0].find('a')
+                                detail_url = None
+                                if link and link.get('href'):
+                                    detail_url = self.frontier.add(link['href'], base=page_url)
+                                district_schools.append({'school': asdict(school_data), 'detail_url': detail_url,
+                                                         'requires_detail': False})
+                                self.telemetry.add_items('normalize')
+                                self.row_log.info('table_row', "Found school: %s", school_data.name_tc)
                         except Exception as e:
-                            logger.debug(f"Error parsing div: {e}")
+                            self.telemetry.add_error('normalize')
+                            logger.debug("Error parsing row %d: %s", row_idx, e)
                             continue
+            
+            # Method 2: Look for school links in the page; these schools are
+            # only kept if their detail page can be fetched
+            for link in page.links:
+                href = link.get('href', '')
+                link_text = link.get_text(strip=True)
                 
-                schools.extend(district_schools)
-                logger.info(f"Found {len(district_schools)} schools in {district_en}")
-                time.sleep(random.uniform(1, 2))  # Be respectful
-                
-            except Exception as e:
-                logger.error(f"Error scraping district {district_en}: {e}")
-                continue
-        
-        unique_schools = self._remove_duplicates(schools)
-        logger.info(f"Found {len(unique_schools)} unique primary schools across all districts.")
-        return unique_schools
+                # Check if this looks like a school link
+                if (len(link_text) > 3 and 
+                    ('小學' in link_text or 'Primary' in link_text or 'School' in link_text) and
+                    not any(filter_text in link_text for filter_text in ['種類', '宗教', '地區', '校網', '性別'])):
+                    
+                    school_data = self._new_school_record(link_text, district_tc)
+                    detail_url = self.frontier.add(href, base=page_url)
+                    district_schools.append({'school': asdict(school_data), 'detail_url': detail_url,
+                                             'requires_detail': True})
+                    self.row_log.info('link', "Found school link: %s", link_text)
+            
+            # Method 3: Look for school listings in divs
+            school_divs = page.listings
+            for div in school_divs:
+                text = div.get_text(strip=True)
+                if len(text) > 10 and ('小學' in text or 'Primary' in text):
+                    try:
+                        school_data = self._parse_listing_element(div, district_tc)
+                        if school_data:
+                            district_schools.append({'school': asdict(school_data), 'detail_url': None,
+                                                     'requires_detail': False})
+                            self.telemetry.add_items('normalize')
+                            self.row_log.info('div', "Found school from div: %s", school_data.name_tc)
+                    except Exception as e:
+                        self.telemetry.add_error('normalize')
+                        logger.debug("Error parsing div: %s", e)
+                        continue
+            
+            self.frontier.complete(entry.url, district_schools, kind='listing')
+            self.telemetry.add_items('listing_fetch')
+            logger.info(f"Found {len(district_schools)} schools in {district_en}")
+            
+        except Exception as e:
+            self.frontier.fail(entry.url, str(e), kind='listing')
+            logger.error(f"Error scraping district {district_en}: {e}")
+    
+    def _assemble_district_schools(self) -> List[PrimarySchoolData]:
+        """Join every completed district listing with its fetched detail pages"""
+        return list(self._iter_district_schools())
+    
+    def _iter_district_schools(self) -> Iterator[PrimarySchoolData]:
+        """_assemble_district_schools(), streamed from the frontier"""
+        for listing in self.frontier.iter_results('listing'):
+            for found in listing['result'] or []:
+                school = PrimarySchoolData(**found['school'])
+                details = self.frontier.result(found['detail_url']) if found['detail_url'] else None
+                if details:
+                    school.address = details['address'] or school.address
+                    school.telephone = details['telephone'] or school.telephone
+                    school.website = details['website'] or school.website
+                elif found['requires_detail']:
+                    continue
+                if found['requires_detail']:
+                    self.telemetry.add_items('normalize')
+                yield school
     
     def _extract_from_table(self, soup) -> List[PrimarySchoolData]:
         """Extract school data from table format"""
@@ -238,7 +332,7 @@ class SchoolandScraper:
                             if school_data:
                                 schools.append(school_data)
                         except Exception as e:
-                            logger.debug(f"Error parsing table row: {e}")
+                            logger.debug("Error parsing table row: %s", e)
                             continue
             
             logger.info(f"Extracted {len(schools)} schools from tables")
@@ -268,7 +362,7 @@ class SchoolandScraper:
                             schools.append(school_data)
                             time.sleep(random.uniform(1, 3))  # Be respectful
                     except Exception as e:
-                        logger.debug(f"Error scraping school detail: {e}")
+                        logger.debug("Error scraping school detail: %s", e)
                         continue
             
             logger.info(f"Extracted {len(schools)} schools from links")
@@ -292,7 +386,7 @@ class SchoolandScraper:
                     if school_data:
                         schools.append(school_data)
                 except Exception as e:
-                    logger.debug(f"Error parsing listing element: {e}")
+                    logger.debug("Error parsing listing element: %s", e)
                     continue
             
             logger.info(f"Extracted {len(schools)} schools from listings")
@@ -312,12 +406,10 @@ class SchoolandScraper:
                 
                 # Construct district URL
                 district_url = f"{self.base_url}?district={district_tc}"
-                response = self.session.get(district_url, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                district_schools = self._extract_from_table(soup)
-                district_schools.extend(self._extract_from_links(soup))
+                response = self.telemetry.get(self.session, district_url, 'listing_fetch', timeout=30)
+                page = self.telemetry.parse_page(response.content, ('tables', 'links'))
+                district_schools = self._extract_from_table(page.soup_for('tables'))
+                district_schools.extend(self._extract_from_links(page.soup_for('links')))
                 
                 for school in district_schools:
                     school.district = district_tc
@@ -346,12 +438,10 @@ class SchoolandScraper:
                 
                 # Construct network URL
                 network_url = f"{self.base_url}?network={network}"
-                response = self.session.get(network_url, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                network_schools = self._extract_from_table(soup)
-                network_schools.extend(self._extract_from_links(soup))
+                response = self.telemetry.get(self.session, network_url, 'listing_fetch', timeout=30)
+                page = self.telemetry.parse_page(response.content, ('tables', 'links'))
+                network_schools = self._extract_from_table(page.soup_for('tables'))
+                network_schools.extend(self._extract_from_links(page.soup_for('links')))
                 
                 for school in network_schools:
                     school.school_network = f"校網 {network}"
@@ -375,12 +465,10 @@ class SchoolandScraper:
                 
                 # Construct school type URL
                 type_url = f"{self.base_url}?type={school_type_tc}"
-                response = self.session.get(type_url, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                type_schools = self._extract_from_table(soup)
-                type_schools.extend(self._extract_from_links(soup))
+                response = self.telemetry.get(self.session, type_url, 'listing_fetch', timeout=30)
+                page = self.telemetry.parse_page(response.content, ('tables', 'links'))
+                type_schools = self._extract_from_table(page.soup_for('tables'))
+                type_schools.extend(self._extract_from_links(page.soup_for('links')))
                 
                 for school in type_schools:
                     school.school_type = school_type_tc
@@ -429,7 +517,7 @@ class SchoolandScraper:
             )
             
         except Exception as e:
-            logger.debug(f"Error parsing table row: {e}")
+            logger.debug("Error parsing table row: %s", e)
             return None
     
     def _is_school_link(self, href: str, text: str) -> bool:
@@ -456,55 +544,13 @@ class SchoolandScraper:
             network = cells[3].get_text(strip=True) if len(cells) > 3 else ""
             gender = cells[4].get_text(strip=True) if len(cells) > 4 else ""
             
-            # Try to get detail page link
-            link = cells[0].find('a')
-            detail_url = link['href'] if link and 'href' in link.attrs else None
-            
-            # Get additional details if detail page exists
+            # Address, telephone and website come from the detail page,
+            # which the caller queues on the crawl frontier
             address = ''
             telephone = ''
             website = ''
             application_info = ''
             
-            if detail_url:
-                if not detail_url.startswith('http'):
-                    detail_url = f"https://www.schooland.hk{detail_url}"
-                try:
-                    detail_resp = self.session.get(detail_url, timeout=20)
-                    detail_resp.raise_for_status()
-                    detail_soup = BeautifulSoup(detail_resp.content, 'html.parser')
-                    
-                    # Try multiple selectors for address
-                    addr_selectors = ['.address', '.location', '[class*="address"]', '[class*="location"]']
-                    for selector in addr_selectors:
-                        addr_tag = detail_soup.select_one(selector)
-                        if addr_tag:
-                            address = addr_tag.get_text(strip=True)
-                            break
-                    
-                    # Try multiple selectors for telephone
-                    tel_selectors = ['.tel', '.phone', '[class*="tel"]', '[class*="phone"]']
-                    for selector in tel_selectors:
-                        tel_tag = detail_soup.select_one(selector)
-                        if tel_tag:
-                            telephone = tel_tag.get_text(strip=True)
-                            break
-                    
-                    # Try to find website link
-                    web_links = detail_soup.find_all('a', href=True)
-                    for web_link in web_links:
-                        href = web_link.get('href', '')
-                        text = web_link.get_text(strip=True)
-                        if any(keyword in text.lower() for keyword in ['網站', 'website', '網址']):
-                            website = href
-                            break
-                        elif href.startswith('http') and any(domain in href for domain in ['.edu.hk', '.org.hk', '.com']):
-                            website = href
-                            break
-                    
-                except Exception as e:
-                    logger.debug(f"Error scraping detail page {detail_url}: {e}")
-            
             # Generate school number
             school_no = f"PS{hash(name_cell + district_tc) % 10000:04d}"
             
@@ -526,76 +572,102 @@ class SchoolandScraper:
             )
             
         except Exception as e:
-            logger.debug(f"Error parsing improved table row: {e}")
+            logger.debug("Error parsing improved table row: %s", e)
             return None
     
-    def _scrape_school_detail_page(self, href: str, school_name: str, district_tc: str) -> Optional[PrimarySchoolData]:
-        """Scrape individual school detail page with improved logic"""
+    def _fetch_detail(self, href: str) -> Optional[Dict[str, str]]:
+        """
+        Address, telephone and website from a school detail page
+
+        Pages already visited in this run are answered from the frontier
+        instead of being fetched again.
+        """
+        url = canonicalize_url(href, SCHOOLAND_ROOT)
+        if self.frontier.is_visited(url):
+            return self.frontier.result(url)
+        
         try:
-            if not href.startswith('http'):
-                href = f"https://www.schooland.hk{href}"
-            
-            response = self.session.get(href, timeout=20)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract detailed information with multiple selector attempts
-            address = ''
-            telephone = ''
-            website = ''
-            
-            # Try multiple selectors for address
-            addr_selectors = ['.address', '.location', '[class*="address"]', '[class*="location"]']
-            for selector in addr_selectors:
-                addr_tag = soup.select_one(selector)
-                if addr_tag:
-                    address = addr_tag.get_text(strip=True)
-                    break
-            
-            # Try multiple selectors for telephone
-            tel_selectors = ['.tel', '.phone', '[class*="tel"]', '[class*="phone"]']
-            for selector in tel_selectors:
-                tel_tag = soup.select_one(selector)
-                if tel_tag:
-                    telephone = tel_tag.get_text(strip=True)
-                    break
-            
-            # Try to find website link
-            web_links = soup.find_all('a', href=True)
-            for web_link in web_links:
-                href = web_link.get('href', '')
-                text = web_link.get_text(strip=True)
-                if any(keyword in text.lower() for keyword in ['網站', 'website', '網址']):
-                    website = href
-                    break
-                elif href.startswith('http') and any(domain in href for domain in ['.edu.hk', '.org.hk', '.com']):
-                    website = href
-                    break
-            
-            # Generate school number
-            school_no = f"PS{hash(school_name + district_tc) % 10000:04d}"
-            
-            return PrimarySchoolData(
-                school_no=school_no,
-                name_en='',
-                name_tc=school_name,
-                school_type='',
-                religion='',
-                district=district_tc,
-                school_network='',
-                gender='',
-                connection='',
-                address=address,
-                telephone=telephone,
-                website=website,
-                application_info='',
-                last_updated=datetime.now().isoformat()
-            )
-            
+            response = self.telemetry.get(self.session, url, 'detail_fetch', timeout=20)
+            soup = self.telemetry.parse_html(response.content)
+            details = self._parse_detail_page(soup)
         except Exception as e:
-            logger.debug(f"Error scraping school detail page: {e}")
+            logger.debug("Error scraping detail page %s: %s", url, e)
+            self.frontier.fail(url, str(e))
+            return None
+        
+        self.frontier.complete(url, details)
+        self.telemetry.add_items('detail_fetch')
+        return details
+    
+    def _parse_detail_page(self, soup) -> Dict[str, str]:
+        """Extract detailed information with multiple selector attempts"""
+        address = ''
+        telephone = ''
+        website = ''
+        
+        # Try multiple selectors for address
+        addr_selectors = ['.address', '.location', '[class*="address"]', '[class*="location"]']
+        for selector in addr_selectors:
+            addr_tag = soup.select_one(selector)
+            if addr_tag:
+                address = addr_tag.get_text(strip=True)
+                break
+        
+        # Try multiple selectors for telephone
+        tel_selectors = ['.tel', '.phone', '[class*="tel"]', '[class*="phone"]']
+        for selector in tel_selectors:
+            tel_tag = soup.select_one(selector)
+            if tel_tag:
+                telephone = tel_tag.get_text(strip=True)
+                break
+        
+        # Try to find website link
+        web_links = soup.find_all('a', href=True)
+        for web_link in web_links:
+            href = web_link.get('href', '')
+            text = web_link.get_text(strip=True)
+            if any(keyword in text.lower() for keyword in ['網站', 'website', '網址']):
+                website = href
+                break
+            elif href.startswith('http') and any(domain in href for domain in ['.edu.hk', '.org.hk', '.com']):
+                website = href
+                break
+        
+        return {'address': address, 'telephone': telephone, 'website': website}
+    
+    def _new_school_record(self, school_name: str, district_tc: str) -> PrimarySchoolData:
+        """Record for a school known only by name and district"""
+        # Generate school number
+        school_no = f"PS{hash(school_name + district_tc) % 10000:04d}"
+        
+        return PrimarySchoolData(
+            school_no=school_no,
+            name_en='',
+            name_tc=school_name,
+            school_type='',
+            religion='',
+            district=district_tc,
+            school_network='',
+            gender='',
+            connection='',
+            address='',
+            telephone='',
+            website='',
+            application_info='',
+            last_updated=datetime.now().isoformat()
+        )
+    
+    def _scrape_school_detail_page(self, href: str, school_name: str, district_tc: str) -> Optional[PrimarySchoolData]:
+        """Scrape individual school detail page with improved logic"""
+        details = self._fetch_detail(href)
+        if details is None:
             return None
+        
+        school = self._new_school_record(school_name, district_tc)
+        school.address = details['address']
+        school.telephone = details['telephone']
+        school.website = details['website']
+        return school
     
     def _parse_listing_element(self, element, district_tc) -> Optional[PrimarySchoolData]:
         """Parse a listing element with improved logic"""
@@ -634,7 +706,7 @@ class SchoolandScraper:
             )
             
         except Exception as e:
-            logger.debug(f"Error parsing listing element: {e}")
+            logger.debug("Error parsing listing element: %s", e)
             return None
     
     def _extract_text(self, soup, selector: str) -> str:
@@ -648,16 +720,8 @@ class SchoolandScraper:
         return element.get('href', '') if element else ""
     
     def _remove_duplicates(self, schools: List[PrimarySchoolData]) -> List[PrimarySchoolData]:
-        """Remove duplicate schools based on name"""
-        seen_names = set()
-        unique_schools = []
-        
-        for school in schools:
-            if school.name_en not in seen_names:
-                seen_names.add(school.name_en)
-                unique_schools.append(school)
-        
-        return unique_schools
+        """Merge schools that entity resolution matches on name, district, phone or website"""
+        return dedupe_records(schools)
     
     def save_data(self, schools: List[PrimarySchoolData], filename: str = None):
         """Save school data to JSON file"""
@@ -680,49 +744,60 @@ class SchoolandScraper:
             logger.error(f"Error saving data: {e}")
             return None
     
-    def run_scraping(self):
-        """Run the complete scraping process"""
+    def source_plugin(self, resume: bool = True) -> SourcePlugin:
+        """Pipeline source: the district crawl, streamed out of the frontier"""
+        return SourcePlugin('schooland', lambda: self.iter_primary_schools(resume=resume), identity=SchoolIdentity())
+    
+    def run_scraping(self, resume: bool = True) -> Dict:
+        """
+        Run the complete scraping process; returns the pipeline's counts and a sample of schools
+
+        An earlier run that stopped before saving is resumed unless resume is
+        False; pages it already fetched are not requested again.
+        """
         logger.info("Starting Schooland.hk primary school scraping...")
         
         start_time = datetime.now()
+        self.telemetry.start()
         
         try:
-            # Scrape all primary schools
-            schools = self.scrape_all_primary_schools()
+            snapshot = JsonSnapshotSink(
+                self.data_dir / f"schooland_primary_schools_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            result = run_source(self.source_plugin(resume), [snapshot], telemetry=self.telemetry)
+            self.frontier.finish_run()
             
-            if schools:
-                # Save data
-                filepath = self.save_data(schools)
-                
+            if result['records']:
                 end_time = datetime.now()
                 duration = end_time - start_time
                 
                 logger.info(f"Scraping completed in {duration}")
-                logger.info(f"Total schools scraped: {len(schools)}")
-                logger.info(f"Data saved to: {filepath}")
+                logger.info(f"Total schools scraped: {result['records']}")
+                logger.info(f"Data saved to: {snapshot.path}")
                 
-                return schools
+                self.telemetry.finish('ok', schools=result['records'], frontier=self.frontier.stats())
             else:
                 logger.warning("No schools found during scraping")
-                return []
+                self.telemetry.finish('empty', schools=0, frontier=self.frontier.stats())
+            return result
                 
         except Exception as e:
             logger.error(f"Error in scraping process: {e}")
-            return []
+            self.telemetry.finish('error', error=str(e))
+            return {'records': 0, 'sample': []}
 
 def main():
     """Main function to run the scraper"""
     scraper = SchoolandScraper()
-    schools = scraper.run_scraping()
+    result = scraper.run_scraping()
     
-    if schools:
-        print(f"\n✅ Successfully scraped {len(schools)} primary schools from Schooland.hk")
+    if result['records']:
+        print(f"\n✅ Successfully scraped {result['records']} primary schools from Schooland.hk")
         print(f"📁 Data saved to: scraped_data/")
         
         # Show sample of scraped data
         print(f"\n📋 Sample schools:")
-        for i, school in enumerate(schools[:5]):
-            print(f"  {i+1}. {school.name_en} ({school.district}) - {school.school_type}")
+        for i, school in enumerate(result['sample']):
+            print(f"  {i+1}. {school['name_en']} ({school['district']}) - {school['school_type']}")
     else:
         print("❌ No schools were scraped. Check the log file for details.")
 
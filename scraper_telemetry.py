@@ -0,0 +1,214 @@
+"""
+Scraper Run Telemetry
+Per-stage wall time, request throughput, bytes, parse time and error counts
+for scraper runs, appended to a JSONL run history, plus sampled logging for
+per-row messages in hot loops
+"""
+
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable
+
+from bs4 import BeautifulSoup
+
+from html_parsing import PARSER_FEATURES, LISTING_CLASS_PATTERN, ALL_TARGETS, ParsedPage
+
+# Stages every scraper reports, in pipeline order
+STAGES = ['listing_fetch', 'detail_fetch', 'parse', 'normalize', 'dedupe', 'persist']
+
+DEFAULT_HISTORY_FILE = Path("scraped_data") / "scrape_runs.jsonl"
+
+# Per-row INFO messages are logged for the first row and then every Nth
+DEFAULT_LOG_SAMPLE_EVERY = 50
+
+
+class StageMetrics:
+    """Counters for one stage of a run"""
+
+    def __init__(self):
+        self.wall_seconds = 0.0
+        self.requests = 0
+        self.bytes = 0
+        self.pages_parsed = 0
+        self.parse_seconds = 0.0
+        self.items = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'wall_seconds': round(self.wall_seconds, 3),
+            'requests': self.requests,
+            'requests_per_second': round(self.requests / self.wall_seconds, 2) if self.requests and self.wall_seconds else 0.0,
+            'bytes': self.bytes,
+            'pages_parsed': self.pages_parsed,
+            'parse_ms_per_page': round(self.parse_seconds * 1000 / self.pages_parsed, 2) if self.pages_parsed else 0.0,
+            'items': self.items,
+            'errors': self.errors,
+        }
+
+
+class ScrapeRun:
+    """
+    Metrics for one scraper run
+
+    Scrapers create one in __init__, call start() at the top of their run_*
+    method and finish() at the end. Helper methods record into it whether or
+    not a run was started, so they can still be called on their own.
+    """
+
+    def __init__(self, scraper: str, history_file: Path = DEFAULT_HISTORY_FILE):
+        self.scraper = scraper
+        self.history_file = Path(history_file)
+        self._lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        """Reset the counters for a new run"""
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages: Dict[str, StageMetrics] = {name: StageMetrics() for name in STAGES}
+
+    def _stage(self, name: str) -> StageMetrics:
+        if name not in self.stages:
+            self.stages[name] = StageMetrics()
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block of work as part of a stage; yields the stage's metrics"""
+        metrics = self._stage(name)
+        start = time.perf_counter()
+        try:
+            yield metrics
+        except Exception:
+            metrics.errors += 1
+            raise
+        finally:
+            metrics.wall_seconds += time.perf_counter() - start
+
+    def get(self, session, url: str, stage: str = 'listing_fetch', **kwargs):
+        """session.get() that records request count, bytes, latency and errors"""
+        metrics = self._stage(stage)
+        start = time.perf_counter()
+        try:
+            response = session.get(url, **kwargs)
+            response.raise_for_status()
+        except Exception:
+            with self._lock:
+                metrics.requests += 1
+                metrics.errors += 1
+                metrics.wall_seconds += time.perf_counter() - start
+            raise
+        with self._lock:
+            metrics.requests += 1
+            metrics.bytes += len(response.content)
+            metrics.wall_seconds += time.perf_counter() - start
+        return response
+
+    def parse_html(self, content, features: str = PARSER_FEATURES, **kwargs) -> BeautifulSoup:
+        """Build a BeautifulSoup tree, recording parse time under the parse stage"""
+        start = time.perf_counter()
+        soup = BeautifulSoup(content, features, **kwargs)
+        self.record_parse(time.perf_counter() - start)
+        return soup
+
+    def parse_page(self, content, targets: Iterable[str] = ALL_TARGETS,
+                   listing_class=LISTING_CLASS_PATTERN) -> ParsedPage:
+        """Targeted ParsedPage whose per-target parses are timed under the parse stage"""
+        self.record_parse(0.0)
+        return ParsedPage(content, listing_class, on_parse=lambda seconds: self.record_parse(seconds, pages=0),
+                          targets=targets)
+
+    def record_parse(self, seconds: float, pages: int = 1):
+        metrics = self._stage('parse')
+        with self._lock:
+            metrics.pages_parsed += pages
+            metrics.parse_seconds += seconds
+            metrics.wall_seconds += seconds
+
+    def add_items(self, stage: str, count: int = 1):
+        with self._lock:
+            self._stage(stage).items += count
+
+    def add_error(self, stage: str, count: int = 1):
+        with self._lock:
+            self._stage(stage).errors += count
+
+    def summary(self, status: str = 'ok', **extra) -> Dict[str, Any]:
+        total_requests = sum(s.requests for s in self.stages.values())
+        wall = time.perf_counter() - self._start
+        return dict({
+            'scraper': self.scraper,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'status': status,
+            'wall_seconds': round(wall, 3),
+            'requests': total_requests,
+            'requests_per_second': round(total_requests / wall, 2) if wall else 0.0,
+            'bytes': sum(s.bytes for s in self.stages.values()),
+            'errors': sum(s.errors for s in self.stages.values()),
+            'stages': {name: metrics.to_dict() for name, metrics in self.stages.items()},
+        }, **extra)
+
+    def finish(self, status: str = 'ok', **extra) -> Dict[str, Any]:
+        """Append the run summary to the JSONL history and log a one-line digest"""
+        record = self.summary(status, **extra)
+        try:
+            self.history_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logging.getLogger(__name__).error("Could not write scrape run history: %s", e)
+
+        logging.getLogger(__name__).info(
+            "%s run %s: %.1fs, %d requests (%.2f/s), %d bytes, %d errors",
+            self.scraper, status, record['wall_seconds'], record['requests'],
+            record['requests_per_second'], record['bytes'], record['errors']
+        )
+        return record
+
+
+class SampledLog:
+    """
+    Logs the first of a repeated per-row message and then every Nth one
+
+    Arguments are passed through to the logger unformatted, so skipped calls
+    cost a counter increment.
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = DEFAULT_LOG_SAMPLE_EVERY):
+        self.logger = logger
+        self.every = max(1, every)
+        self.counts: Dict[str, int] = {}
+
+    def info(self, key: str, msg: str, *args):
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count == 1 or count % self.every == 0:
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(f"{msg} (#%d)", *args, count)
+
+
+def load_run_history(history_file: Path = DEFAULT_HISTORY_FILE, scraper: Optional[str] = None) -> list:
+    """Read past run summaries, optionally for one scraper"""
+    history_file = Path(history_file)
+    if not history_file.exists():
+        return []
+    runs = []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                run = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if scraper is None or run.get('scraper') == scraper:
+                runs.append(run)
+    return runs
@@ -0,0 +1,181 @@
+"""
+SQLite Snapshot Pipeline
+Takes consistent hot copies of a live SQLite database with the online backup
+API, verifies and compresses them, and keeps a bounded number on disk
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import hashlib
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+import streamlit as st
+
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Pages copied per backup step; writers can take the lock between steps
+SNAPSHOT_PAGES_PER_STEP = 256
+SNAPSHOT_STEP_SLEEP = 0.005
+
+DEFAULT_SNAPSHOT_SETTINGS = {
+    'COMPRESSION': 'gzip',   # "gzip", "zstd" or "none"
+    'KEEP_LOCAL': 5,         # compressed snapshots kept in SNAPSHOT_DIR
+    'KEEP_CLOUD': 10,        # Drive revisions kept for the base file
+    'DIR': os.path.join(tempfile.gettempdir(), "school_portal_snapshots"),
+}
+
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+
+
+def get_snapshot_settings() -> Dict[str, Any]:
+    """Snapshot settings from the optional [SNAPSHOTS] section of Streamlit secrets"""
+    settings = dict(DEFAULT_SNAPSHOT_SETTINGS)
+    try:
+        if 'SNAPSHOTS' in st.secrets:
+            for key, value in st.secrets['SNAPSHOTS'].items():
+                settings[key.upper()] = value
+    except Exception:
+        # No secrets file (scripts, local runs)
+        pass
+
+    settings['COMPRESSION'] = str(settings['COMPRESSION']).lower()
+    if settings['COMPRESSION'] == 'zstd' and not ZSTD_AVAILABLE:
+        print("zstandard not installed, falling back to gzip snapshots")
+        settings['COMPRESSION'] = 'gzip'
+    if settings['COMPRESSION'] not in COMPRESSION_EXTENSIONS:
+        settings['COMPRESSION'] = 'gzip'
+    settings['KEEP_LOCAL'] = int(settings['KEEP_LOCAL'])
+    if settings['KEEP_LOCAL'] < 1:
+        # The newest snapshot is the one about to be uploaded
+        print(f"KEEP_LOCAL must be at least 1, not {settings['KEEP_LOCAL']}; keeping 1 snapshot")
+        settings['KEEP_LOCAL'] = 1
+    settings['KEEP_CLOUD'] = int(settings['KEEP_CLOUD'])
+    return settings
+
+
+def backup_database(source_path: str, dest_path: str,
+                    pages: int = SNAPSHOT_PAGES_PER_STEP, sleep: float = SNAPSHOT_STEP_SLEEP):
+    """Copy a live database with sqlite3.Connection.backup() in page-sized steps"""
+    source = sqlite3.connect(source_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest, pages=pages, sleep=sleep)
+    finally:
+        dest.close()
+        source.close()
+
+
+def check_integrity(db_path: str) -> bool:
+    """Run PRAGMA integrity_check; True only if SQLite reports 'ok'"""
+    conn = sqlite3.connect(db_path)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchall()
+        return result == [('ok',)]
+    finally:
+        conn.close()
+
+
+def compress_file(source_path: str, dest_path: str, compression: str):
+    """Stream-compress a file with gzip or zstd ("none" copies it)"""
+    with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+        if compression == 'zstd':
+            zstd.ZstdCompressor(level=3).copy_stream(src, dst)
+        elif compression == 'gzip':
+            with gzip.GzipFile(fileobj=dst, mode='wb', compresslevel=6) as gz:
+                shutil.copyfileobj(src, gz, 1024 * 1024)
+        else:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def decompress_file(source_path: str, dest_path: str, compression: str):
+    """Stream-decompress a file written by compress_file"""
+    with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+        if compression == 'zstd':
+            zstd.ZstdDecompressor().copy_stream(src, dst)
+        elif compression == 'gzip':
+            with gzip.GzipFile(fileobj=src, mode='rb') as gz:
+                shutil.copyfileobj(gz, dst, 1024 * 1024)
+        else:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def file_md5(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the MD5 hex digest of a file without loading it into memory"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prune_snapshots(snapshot_dir: str, prefix: str, keep: int, current: str = None) -> int:
+    """
+    Delete the oldest snapshots beyond `keep`; returns how many were removed
+
+    `current` (a file name) is never deleted, whatever `keep` is.
+    """
+    if not os.path.isdir(snapshot_dir):
+        return 0
+    snapshots = sorted(
+        name for name in os.listdir(snapshot_dir)
+        if name.startswith(prefix) and not name.endswith('.tmp') and name != current
+    )
+    keep = max(keep - 1, 0) if current else keep
+    expired = snapshots[:-keep] if keep > 0 else snapshots
+    for name in expired:
+        try:
+            os.unlink(os.path.join(snapshot_dir, name))
+        except OSError as e:
+            print(f"Could not delete old snapshot {name}: {e}")
+    return len(expired)
+
+
+def create_snapshot(source_path: str, db_name: str,
+                    settings: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build a verified, compressed snapshot of a live database
+
+    Returns a dict with the snapshot path, compression, sizes and the MD5 of
+    the uncompressed copy, or None if the copy fails the integrity check.
+    """
+    settings = settings or get_snapshot_settings()
+    snapshot_dir = settings['DIR']
+    compression = settings['COMPRESSION']
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    prefix = f"{db_name}.snapshot-"
+    raw_path = os.path.join(snapshot_dir, f"{prefix}{timestamp}.tmp")
+    snapshot_path = os.path.join(snapshot_dir, f"{prefix}{timestamp}{COMPRESSION_EXTENSIONS[compression]}")
+
+    try:
+        backup_database(source_path, raw_path)
+
+        if not check_integrity(raw_path):
+            print(f"Snapshot of {source_path} failed integrity check, not uploading")
+            return None
+
+        raw_size = os.path.getsize(raw_path)
+        raw_md5 = file_md5(raw_path)
+        compress_file(raw_path, snapshot_path, compression)
+    finally:
+        if os.path.exists(raw_path):
+            os.unlink(raw_path)
+
+    prune_snapshots(snapshot_dir, prefix, settings['KEEP_LOCAL'], current=os.path.basename(snapshot_path))
+
+    return {
+        'path': snapshot_path,
+        'compression': compression,
+        'raw_size': raw_size,
+        'size': os.path.getsize(snapshot_path),
+        'raw_md5': raw_md5,
+    }
@@ -22,6 +22,13 @@ except ImportError as e:
         st.error("No database available!")
         CLOUD_DB_AVAILABLE = False
 
+from application_materials import SUBMITTED_TITLE, SUBMITTED_MESSAGE
+from db_metrics import registry as db_metrics, start_call_trace, get_call_trace
+from deadline_reminders import ReminderEngine, event_dates, format_batch
+from dossier_export import export_dossier
+from reference_snapshot import ReferenceSnapshot
+from school_catalog import SchoolCatalog
+
 # Initialize database manager based on environment
 def get_db_manager():
     """Get database manager with Supabase cloud storage, fallback to local"""
@@ -76,6 +83,7 @@ def get_db_manager_instance():
     """Get database manager instance (lazy loading)"""
     global db_manager
     if db_manager is None:
+        start_call_trace()
         db_manager = init_database()
     return db_manager
 
@@ -149,39 +157,61 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_reference_snapshots(background):
+    """Snapshots of the reference school tables, shared by all sessions"""
+    return {
+        'kindergartens': ReferenceSnapshot('kindergartens', background=background),
+        'primary_schools': ReferenceSnapshot('primary_schools', background=background),
+    }
+
+def load_reference_data(name, fetch):
+    """Rows of a reference table from its snapshot, refreshed from the database when stale"""
+    db_instance = get_db()
+    if not db_instance:
+        return None
+    # SQLite connections belong to the thread that opened them, so only a
+    # Supabase backend can be refreshed in the background
+    snapshot = get_reference_snapshots(getattr(db_instance, 'conn', None) is None)[name]
+    return snapshot.get(lambda: fetch(db_instance))
+
+def reference_version(name):
+    """Version of a reference table's snapshot, None when serving sample data"""
+    db_instance = get_db()
+    if not db_instance:
+        return None
+    return get_reference_snapshots(getattr(db_instance, 'conn', None) is None)[name].version
+
+def format_kindergarten(kg):
+    """Convert a kindergarten row to the expected format"""
+    return {
+        "school_no": kg.get('school_no', ''),
+        "name_tc": kg.get('name_tc', ''),
+        "name_en": kg.get('name_en', ''),
+        "district_tc": kg.get('district_tc', ''),
+        "district_en": kg.get('district_en', ''),
+        "website": kg.get('website', ''),
+        "application_page": kg.get('application_page', ''),
+        "has_website": kg.get('has_website', False),
+        "website_verified": kg.get('website_verified', False),
+        "tel": kg.get('tel', ''),
+        "curriculum": kg.get('curriculum', ''),
+        "funding_type": kg.get('funding_type', ''),
+        "through_train": kg.get('through_train', False),
+        "language_of_instruction": kg.get('language_of_instruction', ''),
+        "student_capacity": kg.get('student_capacity', ''),
+        "last_updated": kg.get('last_updated', ''),
+        "source": kg.get('source', '')
+    }
+
 # Load kindergarten data
-@st.cache_data
 def load_kindergarten_data():
-    """Load kindergarten data from database"""
+    """Load kindergarten data from the reference snapshot"""
     try:
-        db = get_db()
-        if db:
-            # Try to get data from database first
-            kindergartens = db.get_all_kindergartens()
-            if kindergartens:
-                # Convert to the expected format
-                data = []
-                for kg in kindergartens:
-                    data.append({
-                        "school_no": kg.get('school_no', ''),
-                        "name_tc": kg.get('name_tc', ''),
-                        "name_en": kg.get('name_en', ''),
-                        "district_tc": kg.get('district_tc', ''),
-                        "district_en": kg.get('district_en', ''),
-                        "website": kg.get('website', ''),
-                        "application_page": kg.get('application_page', ''),
-                        "has_website": kg.get('has_website', False),
-                        "website_verified": kg.get('website_verified', False),
-                        "tel": kg.get('tel', ''),
-                        "curriculum": kg.get('curriculum', ''),
-                        "funding_type": kg.get('funding_type', ''),
-                        "through_train": kg.get('through_train', False),
-                        "language_of_instruction": kg.get('language_of_instruction', ''),
-                        "student_capacity": kg.get('student_capacity', ''),
-                        "last_updated": kg.get('last_updated', ''),
-                        "source": kg.get('source', '')
-                    })
-                return data
+        data = load_reference_data(
+            'kindergartens', lambda db_instance: [format_kindergarten(kg) for kg in db_instance.get_all_kindergartens()])
+        if data:
+            return data
         
         # Fallback to sample data if database is empty
         data = [
@@ -305,41 +335,38 @@ def load_kindergarten_data():
         st.error(f"Error loading data: {e}")
         return []
 
-@st.cache_data
+def format_primary_school(ps):
+    """Convert a primary school row to the expected format"""
+    return {
+        "school_no": ps.get('school_no', ''),
+        "name_tc": ps.get('name_tc', ''),
+        "name_en": ps.get('name_en', ''),
+        "district_tc": ps.get('district_tc', ''),
+        "district_en": ps.get('district_en', ''),
+        "website": ps.get('website', ''),
+        "application_page": ps.get('application_page', ''),
+        "has_website": ps.get('has_website', False),
+        "website_verified": ps.get('website_verified', False),
+        "tel": ps.get('tel', ''),
+        "curriculum": ps.get('curriculum', ''),
+        "funding_type": ps.get('funding_type', ''),
+        "through_train": ps.get('through_train', False),
+        "language_of_instruction": ps.get('language_of_instruction', ''),
+        "student_capacity": ps.get('student_capacity', ''),
+        "last_updated": ps.get('last_updated', ''),
+        "source": ps.get('source', ''),
+        "school_level": "primary",
+        "grade_levels": "P1-P6",
+        "school_system": ps.get('curriculum', '').lower()
+    }
+
 def load_primary_school_data():
-    """Load primary school data from database"""
+    """Load primary school data from the reference snapshot"""
     try:
-        db = get_db()
-        if db:
-            # Try to get data from database first
-            primary_schools = db.get_all_primary_schools()
-            if primary_schools:
-                # Convert to the expected format
-                data = []
-                for ps in primary_schools:
-                    data.append({
-                        "school_no": ps.get('school_no', ''),
-                        "name_tc": ps.get('name_tc', ''),
-                        "name_en": ps.get('name_en', ''),
-                        "district_tc": ps.get('district_tc', ''),
-                        "district_en": ps.get('district_en', ''),
-                        "website": ps.get('website', ''),
-                        "application_page": ps.get('application_page', ''),
-                        "has_website": ps.get('has_website', False),
-                        "website_verified": ps.get('website_verified', False),
-                        "tel": ps.get('tel', ''),
-                        "curriculum": ps.get('curriculum', ''),
-                        "funding_type": ps.get('funding_type', ''),
-                        "through_train": ps.get('through_train', False),
-                        "language_of_instruction": ps.get('language_of_instruction', ''),
-                        "student_capacity": ps.get('student_capacity', ''),
-                        "last_updated": ps.get('last_updated', ''),
-                        "source": ps.get('source', ''),
-                        "school_level": "primary",
-                        "grade_levels": "P1-P6",
-                        "school_system": ps.get('curriculum', '').lower()
-                    })
-                return data
+        data = load_reference_data(
+            'primary_schools', lambda db_instance: [format_primary_school(ps) for ps in db_instance.get_all_primary_schools()])
+        if data:
+            return data
         
         # Fallback to sample data if database is empty
         data = create_sample_primary_school_data()
@@ -1279,29 +1306,21 @@ def enhance_primary_school_data(data):
     
     return enhanced_data
 
-# Load data
-kindergartens_data = load_kindergarten_data()
-primary_schools_data = load_primary_school_data()
+@st.cache_resource(max_entries=4)
+def get_school_catalog(name, version, _rows):
+    """One read-only catalog per reference table and snapshot version, shared by all sessions"""
+    return SchoolCatalog(_rows or [], name)
 
-# Convert to DataFrame for easier manipulation
-@st.cache_data
-def get_kindergarten_df():
-    """Convert kindergarten data to DataFrame"""
-    if kindergartens_data:
-        df = pd.DataFrame(kindergartens_data)
-        return df
-    return pd.DataFrame()
+# Load data; the versions are taken first and key the catalogs, so a background
+# refresh landing in between only costs one extra rebuild
+kindergartens_version = reference_version('kindergartens')
+primary_schools_version = reference_version('primary_schools')
+kindergarten_catalog = get_school_catalog('kindergartens', kindergartens_version, load_kindergarten_data())
+primary_school_catalog = get_school_catalog('primary_schools', primary_schools_version, load_primary_school_data())
 
-@st.cache_data
-def get_primary_school_df():
-    """Convert primary school data to DataFrame"""
-    if primary_schools_data:
-        df = pd.DataFrame(primary_schools_data)
-        return df
-    return pd.DataFrame()
-
-df = get_kindergarten_df()
-primary_df = get_primary_school_df()
+# DataFrames for filtering and charts, built once per catalog
+df = kindergarten_catalog.frame()
+primary_df = primary_school_catalog.frame()
 
 # Language translations
 def get_text(key, language='en'):
@@ -2332,6 +2351,31 @@ def analyze_application_content(content):
         'confidence': 0.8 if dates else 0.5
     }
 
+# Deadline reminders
+def get_school_event_dates(school_no):
+    """Deadline, interview and result dates of a school from the loaded school data"""
+    for catalog in (kindergarten_catalog, primary_school_catalog):
+        school = catalog.get(school_no)
+        if school is not None:
+            return event_dates(school)
+    return {}
+
+def send_deadline_reminders(user_id, reminders):
+    """Deliver one user's due reminders as a single notification; raises if it was not stored"""
+    title, message, priority = format_batch(reminders)
+    success, error = get_db().add_notification(user_id, title, message, priority)
+    if not success:
+        raise RuntimeError(error)
+
+@st.cache_resource
+def get_reminder_engine():
+    """Reminder engine shared by all sessions, loaded once with every tracked school"""
+    engine = ReminderEngine(send_deadline_reminders)
+    for tracked in get_db().get_all_tracked_schools():
+        engine.track(tracked['user_id'], tracked['school_no'], tracked['school_name'],
+                     get_school_event_dates(tracked['school_no']), catch_up=False)
+    return engine
+
 def add_to_application_tracker(school_no, school_name):
     """Add school to application tracker using database"""
     if not st.session_state.get('current_user'):
@@ -2341,6 +2385,7 @@ def add_to_application_tracker(school_no, school_name):
     user_id = st.session_state.current_user['id']
     success, message = get_db().add_to_tracker(user_id, school_no, school_name)
     if success:
+        get_reminder_engine().track(user_id, school_no, school_name, get_school_event_dates(school_no))
         st.success(f"Added {school_name} to application tracker!")
     else:
         st.error(message)
@@ -2354,6 +2399,7 @@ def remove_from_application_tracker(school_no):
     user_id = st.session_state.current_user['id']
     success, message = get_db().remove_from_tracker(user_id, school_no)
     if success:
+        get_reminder_engine().untrack(user_id, school_no)
         st.success(f"Removed school from application tracker!")
     else:
         st.error(message)
@@ -2368,20 +2414,18 @@ def add_notification(title, message, priority='medium'):
 
 # Authentication functions
 def register_user(name, email, phone, password):
-    """Register a new user using database, with verification and logging"""
+    """Register a new user using database, with logging"""
     print(f"[DEBUG] Attempting to register user: {email}")
-    success, message = get_db().register_user(name, email, phone, password)
+    # The user is created and returned in one transaction, so a returned user is the verification
+    success, message, user = get_db().register_user_account(name, email, phone, password)
     if not success:
         print(f"[ERROR] Registration failed for {email}: {message}")
         return False, message
-    # Registration claimed success, verify user exists
-    user_check = get_db().login_user(email, password)
-    if user_check[0] and user_check[2]:
-        print(f"[DEBUG] Registration verified for {email}")
-        return True, f"{message} (Verified: {user_check[2]['name']}, {user_check[2]['email']})"
-    else:
+    if not user:
         print(f"[ERROR] Registration verification failed for {email}")
         return False, "Registration failed: User not found after registration. Please try again or contact support."
+    print(f"[DEBUG] Registration verified for {email}")
+    return True, f"{message} (Verified: {user['full_name']}, {user['email']})"
 
 def login_user(email, password):
     """Login a user using database"""
@@ -2423,53 +2467,22 @@ def submit_application(school_no, school_name, child_id, parent_name, parent_ema
     
     user_id = st.session_state.current_user['id']
     
-    # Convert child_id to integer if it's a string
+    # A legacy child_id from session state means the first child profile
     if isinstance(child_id, str) and child_id.startswith('child_'):
-        # This is a legacy child_id from session state, we need to find the actual child
-        child_profiles = get_db().get_child_profiles(user_id)
-        if not child_profiles:
-            return False, "No child profiles found. Please add a child profile first."
-        child_id = child_profiles[0]['id']  # Use the first child profile
+        child_id = None
     else:
         child_id = int(child_id)
     
-    # Prepare additional notes with portfolio and personal statement information
-    enhanced_notes = additional_notes or ""
-    
-    if selected_portfolio_items:
-        portfolio_items = get_db().get_portfolio_items(user_id, child_id)
-        selected_items = [item for item in portfolio_items if item['id'] in selected_portfolio_items]
-        if selected_items:
-            enhanced_notes += "\n\n📋 Portfolio Items Included:\n"
-            for item in selected_items:
-                enhanced_notes += f"• {item['title']} ({item['category']}) - {item['item_date']}\n"
-                if item['description']:
-                    enhanced_notes += f"  Description: {item['description']}\n"
-    
-    if selected_personal_statement:
-        personal_statements = get_db().get_personal_statements(user_id, child_id)
-        selected_statement = next((stmt for stmt in personal_statements if stmt['id'] == selected_personal_statement), None)
-        if selected_statement:
-            enhanced_notes += f"\n\n📝 Personal Statement Included:\n"
-            enhanced_notes += f"• {selected_statement['title']} (v{selected_statement['version']})\n"
-            if selected_statement['target_school']:
-                enhanced_notes += f"  Target School: {selected_statement['target_school']}\n"
-            enhanced_notes += f"  Content: {selected_statement['content'][:200]}...\n"
-    
-    success, message = get_db().submit_application(
-        user_id, child_id, school_no, school_name, parent_name, 
-        parent_email, parent_phone, preferred_start_date, enhanced_notes
+    # The application, its portfolio and personal statement summary and the
+    # confirmation notification are written in one transaction
+    return get_db().submit_application_with_materials(
+        user_id, child_id, school_no, school_name, parent_name,
+        parent_email, parent_phone, preferred_start_date, additional_notes,
+        portfolio_item_ids=selected_portfolio_items,
+        statement_id=selected_personal_statement,
+        notification_title=SUBMITTED_TITLE.format(school_name=school_name),
+        notification_message=SUBMITTED_MESSAGE
     )
-    
-    if success:
-        # Add notification
-        add_notification(
-            f"Application Submitted: {school_name}",
-            f"Your application has been submitted successfully with portfolio and personal statement. We will contact you soon.",
-            'high'
-        )
-    
-    return success, message
 
 # Session state initialization
 if 'user_logged_in' not in st.session_state:
@@ -2663,11 +2676,10 @@ def main_navigation():
             st.session_state.current_page = 'personal_statements'
             st.rerun()
         
-        # Count unread notifications from database
+        # Unread count for the badge, without fetching the notifications themselves
         unread_count = 0
         if st.session_state.user_logged_in and st.session_state.current_user:
-            notifications = get_db().get_notifications(st.session_state.current_user['id'], unread_only=True)
-            unread_count = len(notifications)
+            unread_count = get_db().get_unread_count(st.session_state.current_user['id'])
         notification_text = f"🔔 Notifications ({unread_count})" if unread_count > 0 else "🔔 Notifications"
         
         if st.button(notification_text, use_container_width=True):
@@ -2948,7 +2960,7 @@ def kindergartens_page():
             st.rerun()
     
     # Filter data
-    filtered_df = df.copy()
+    filtered_df = df
     
     if search_term:
         mask = pd.Series([False] * len(filtered_df))
@@ -3071,6 +3083,7 @@ def kindergartens_page():
                     if st.button(get_text("stop_tracking", lang), key=f"stop_track_{school['school_no']}"):
                         success, message = get_db().remove_from_tracker(user_id, school['school_no'])
                         if success:
+                            get_reminder_engine().untrack(user_id, school['school_no'])
                             st.success("School removed from tracker!")
                             st.rerun()
                         else:
@@ -3100,8 +3113,11 @@ def kindergartens_page():
                             st.info("Status information available but could not be displayed")
                 else:
                     if st.button(get_text("start_tracking_btn", lang), key=f"start_track_{school['school_no']}"):
-                        success, message = get_db().add_to_tracker(user_id, school['school_no'], school.get('name_en', 'Unknown School'))
+                        school_name = school.get('name_en', 'Unknown School')
+                        success, message = get_db().add_to_tracker(user_id, school['school_no'], school_name)
                         if success:
+                            get_reminder_engine().track(user_id, school['school_no'], school_name,
+                                                        get_school_event_dates(school['school_no']))
                             st.success("School added to tracker!")
                             st.rerun()
                         else:
@@ -3132,7 +3148,7 @@ def kindergartens_page():
     
     # Display results
     if len(filtered_df) > 0:
-        for _, school in filtered_df.iterrows():
+        for row, school in filtered_df.iterrows():
             with st.container():
                 col1, col2 = st.columns([3, 1])
                 
@@ -3162,7 +3178,7 @@ def kindergartens_page():
                         st.link_button("🗺️ Map", map_url)
                     
                     if st.button(f"📋 Details", key=f"details_{school['school_no']}"):
-                        st.session_state.selected_school = school.to_dict()
+                        st.session_state.selected_school = kindergarten_catalog[row]
                         st.rerun()
                     
                     # Add to tracker button
@@ -3177,8 +3193,11 @@ def kindergartens_page():
                                 pass
                         else:
                             if st.button("📊 Track", key=f"track_{school['school_no']}"):
-                                success, message = get_db().add_to_tracker(user_id, school['school_no'], school.get('name_en', 'Unknown School'))
+                                school_name = school.get('name_en', 'Unknown School')
+                                success, message = get_db().add_to_tracker(user_id, school['school_no'], school_name)
                                 if success:
+                                    get_reminder_engine().track(user_id, school['school_no'], school_name,
+                                                                get_school_event_dates(school['school_no']))
                                     st.success("School added to tracker!")
                                     st.rerun()
                                 else:
@@ -3187,7 +3206,7 @@ def kindergartens_page():
                         # Apply button
                         if st.button("📝 Apply", key=f"apply_{school['school_no']}", use_container_width=True):
                             st.session_state.show_application_form = True
-                            st.session_state.selected_school = school.to_dict()
+                            st.session_state.selected_school = kindergarten_catalog[row]
                             st.rerun()
                     else:
                         # Show login prompt for non-logged in users
@@ -3365,12 +3384,20 @@ def profile_page():
         st.selectbox("Notification Settings", ["Email", "SMS", "Both", "None"], key="profile_notifications")
         st.checkbox("Receive updates about new schools", key="profile_updates")
     
+    # Load child profiles and application history together
+    profile_data = {'child_profiles': [], 'applications': []}
+    if st.session_state.get('current_user'):
+        profile_data = get_db().fetch_many({
+            'child_profiles': ('get_child_profiles', st.session_state.current_user['id']),
+            'applications': ('get_applications', st.session_state.current_user['id']),
+        })
+    
     # Child profiles
     st.markdown("#### 👶 Child Profiles")
     
     if st.session_state.get('current_user'):
         user_id = st.session_state.current_user['id']
-        child_profiles = get_db().get_child_profiles(user_id)
+        child_profiles = profile_data['child_profiles']
         
         if child_profiles:
             for child in child_profiles:
@@ -3446,7 +3473,7 @@ def profile_page():
     
     if st.session_state.get('current_user'):
         user_id = st.session_state.current_user['id']
-        applications = get_db().get_applications(user_id)
+        applications = profile_data['applications']
         
         if applications:
             for app in applications:
@@ -3492,17 +3519,17 @@ def application_tracker_page():
     col1, col2 = st.columns([3, 1])
     with col1:
         if not df.empty:
-            school_options = df['name_en'].tolist()
+            school_options = kindergarten_catalog.column('name_en')
             selected_school = st.selectbox("Select a school to track", school_options)
             
             if selected_school:
-                school_data = df[df['name_en'] == selected_school].iloc[0]
+                school_data = kindergarten_catalog.find_by_name(selected_school)
                 st.info(f"Selected: {school_data['name_tc']} ({school_data['district_en']})")
     
     with col2:
         if st.button("➕ Add to Tracker", use_container_width=True):
             if selected_school:
-                school_data = df[df['name_en'] == selected_school].iloc[0]
+                school_data = kindergarten_catalog.find_by_name(selected_school)
                 add_to_application_tracker(school_data['school_no'], selected_school)
                 st.rerun()
     
@@ -3572,6 +3599,12 @@ def application_tracker_page():
                                 )
                                 
                                 if success:
+                                    # Remind about the deadline found on the school's page too
+                                    dates = get_school_event_dates(school['school_no'])
+                                    if analysis.get('deadline') and 'application_deadline' not in dates:
+                                        dates['deadline'] = analysis['deadline']
+                                    get_reminder_engine().track(user_id, school['school_no'], school['school_name'], dates)
+                                    
                                     # Show status information
                                     st.success(f"✅ Status Updated: {analysis['status'].title()}")
                                     
@@ -3608,6 +3641,7 @@ def application_tracker_page():
                     if st.button("❌ Remove", key=f"remove_{school['school_no']}"):
                         success, message = get_db().remove_from_tracker(user_id, school['school_no'])
                         if success:
+                            get_reminder_engine().untrack(user_id, school['school_no'])
                             st.success(message)
                             st.rerun()
                         else:
@@ -3710,8 +3744,12 @@ def application_form_page():
         st.markdown("### 🎨 Portfolio & Personal Statement")
         
         # Get portfolio items and personal statements for the selected child
-        portfolio_items = get_db().get_portfolio_items(user_id, selected_child_id)
-        personal_statements = get_db().get_personal_statements(user_id, selected_child_id)
+        child_data = get_db().fetch_many({
+            'portfolio_items': ('get_portfolio_items', user_id, selected_child_id),
+            'personal_statements': ('get_personal_statements', user_id, selected_child_id),
+        })
+        portfolio_items = child_data['portfolio_items']
+        personal_statements = child_data['personal_statements']
         
         col1, col2 = st.columns(2)
         
@@ -3813,6 +3851,11 @@ def notifications_page():
     
     user_id = st.session_state.current_user['id']
     
+    # Move old read notifications to the archive once per session
+    if not st.session_state.get('notifications_archived'):
+        get_db().archive_notifications(user_id)
+        st.session_state.notifications_archived = True
+    
     # Notification filters
     col1, col2 = st.columns([2, 1])
     with col1:
@@ -3820,21 +3863,30 @@ def notifications_page():
     with col2:
         if st.button("Mark All as Read"):
             get_db().mark_all_notifications_read(user_id)
+            st.session_state.notification_cursors = [None]
             st.rerun()
     
-    # Display notifications
-    notifications = get_db().get_notifications(user_id, unread_only=not show_read)
+    # Cursors of the pages visited so far; the last one is the current page
+    if st.session_state.get('notification_filter') != show_read:
+        st.session_state.notification_filter = show_read
+        st.session_state.notification_cursors = [None]
+    cursors = st.session_state.setdefault('notification_cursors', [None])
+    
+    # Display one page of notifications
+    notifications, next_cursor = get_db().get_notifications_page(user_id, unread_only=not show_read, cursor=cursors[-1])
     
     if not notifications:
         st.info("No notifications to display.")
     else:
         for notification in notifications:
+            priority = notification.get('priority', 'medium')
             priority_color = {
                 'low': '🟢',
                 'medium': '🟡', 
                 'high': '🟠',
                 'urgent': '🔴'
-            }.get(notification['priority'], '🟡')
+            }.get(priority, '🟡')
+            is_read = notification.get('is_read', notification.get('read', False))
             
             with st.container():
                 col1, col2 = st.columns([4, 1])
@@ -3844,17 +3896,30 @@ def notifications_page():
                     <div class="school-card">
                         <h4>{priority_color} {notification['title']}</h4>
                         <p>{notification['message']}</p>
-                        <small>Priority: {notification['priority'].title()} | {notification['timestamp']}</small>
+                        <small>Priority: {priority.title()} | {notification.get('created_at', notification.get('timestamp', ''))}</small>
                     </div>
                     """, unsafe_allow_html=True)
                 
                 with col2:
-                    if not notification['read']:
+                    if not is_read:
                         if st.button("✓ Read", key=f"read_{notification['id']}"):
                             get_db().mark_notification_read(notification['id'])
                             st.rerun()
                 
                 st.markdown("---")
+    
+    # Page navigation
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if len(cursors) > 1 and st.button("← Newer"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {len(cursors)}")
+    with col3:
+        if next_cursor and st.button("Older →"):
+            cursors.append(next_cursor)
+            st.rerun()
 
 # About page
 def about_page():
@@ -3944,7 +4009,12 @@ def portfolio_page():
         return
     
     user_id = st.session_state.current_user['id']
-    child_profiles = get_db().get_child_profiles(user_id)
+    # Load child profiles and every portfolio item of the user together
+    page_data = get_db().fetch_many({
+        'child_profiles': ('get_child_profiles', user_id),
+        'portfolio_items': ('get_portfolio_items', user_id),
+    })
+    child_profiles = page_data['child_profiles']
     
     if not child_profiles:
         st.warning("Please add a child profile first before managing portfolio items.")
@@ -3956,14 +4026,31 @@ def portfolio_page():
         options=[child['id'] for child in child_profiles],
         format_func=lambda x: next(child['child_name'] for child in child_profiles if child['id'] == x)
     )
+    selected_child = next(child for child in child_profiles if child['id'] == selected_child_id)
+    portfolio_items = [item for item in page_data['portfolio_items'] if item.get('child_id') == selected_child_id]
+    
+    # Whole-dossier export; the ZIP is rebuilt only when the child's data has changed
+    with st.expander("📦 Export Dossier"):
+        st.write("Download this child's portfolio items with attachments, personal statements and application history as one ZIP file.")
+        if st.button("Prepare Export", key=f"prepare_dossier_{selected_child_id}"):
+            with st.spinner("Preparing export..."):
+                st.session_state.dossier_export = (selected_child_id, str(export_dossier(get_db(), user_id, selected_child)))
+        export = st.session_state.get('dossier_export')
+        if export and export[0] == selected_child_id and os.path.exists(export[1]):
+            with open(export[1], "rb") as f:
+                st.download_button(
+                    label="Download ZIP",
+                    data=f,
+                    file_name=f"{selected_child['child_name']}_dossier.zip",
+                    mime="application/zip",
+                    key=f"download_dossier_{selected_child_id}"
+                )
     
     # Portfolio management tabs
     tab1, tab2, tab3 = st.tabs(["📋 Portfolio Items", "➕ Add New Item", "📊 Portfolio Stats"])
     
     with tab1:
         # Display portfolio items
-        portfolio_items = get_db().get_portfolio_items(user_id, selected_child_id)
-        
         if not portfolio_items:
             st.info(get_text("no_portfolio_items", lang))
         else:
@@ -4083,8 +4170,6 @@ def portfolio_page():
     
     with tab3:
         # Portfolio statistics
-        portfolio_items = get_db().get_portfolio_items(user_id, selected_child_id)
-        
         if portfolio_items:
             st.markdown("### 📊 Portfolio Statistics")
             
@@ -4239,8 +4324,7 @@ def primary_schools_page():
     
     st.markdown(f'<h1 class="main-header">🎓 {get_text("primary_schools", lang)}</h1>', unsafe_allow_html=True)
     
-    # Load primary school data
-    primary_schools = load_primary_school_data()
+    primary_schools = primary_school_catalog
     
     if not primary_schools:
         st.warning("No primary school data available.")
@@ -4257,7 +4341,7 @@ def primary_schools_page():
     with col2:
         district_filter = st.selectbox(
             "District",
-            ["All Districts"] + list(set(ps.get('district_en', '') for ps in primary_schools if ps.get('district_en')))
+            ["All Districts"] + primary_schools.districts()
         )
     
     with col3:
@@ -4269,6 +4353,9 @@ def primary_schools_page():
     # Filter schools based on search and filters
     filtered_schools = primary_schools
     
+    if district_filter != "All Districts":
+        filtered_schools = primary_schools.in_district(district_filter)
+    
     if search_term:
         search_lower = search_term.lower()
         filtered_schools = [
@@ -4278,9 +4365,6 @@ def primary_schools_page():
                 search_lower in ps.get('district_en', '').lower())
         ]
     
-    if district_filter != "All Districts":
-        filtered_schools = [ps for ps in filtered_schools if ps.get('district_en') == district_filter]
-    
     if curriculum_filter != "All Curriculums":
         filtered_schools = [ps for ps in filtered_schools if ps.get('curriculum') == curriculum_filter]
     
@@ -4345,11 +4429,7 @@ def primary_schools_page():
                     
                     # Apply button
                     if st.button("📝 Apply", key=f"apply_ps_{i}"):
-                        st.session_state.selected_school = {
-                            'school_no': school.get('school_no', ''),
-                            'name': school.get('name_en', ''),
-                            'type': 'primary'
-                        }
+                        st.session_state.selected_school = school
                         st.session_state.show_application_form = True
                         st.rerun()
                 else:
@@ -4400,6 +4480,35 @@ def admin_utilities():
             else:
                 st.error('User not found or error occurred.')
 
+    st.markdown('### 🏫 School Catalogs')
+    catalogs = [kindergarten_catalog.memory_usage(), primary_school_catalog.memory_usage()]
+    st.dataframe(pd.DataFrame(catalogs), use_container_width=True, hide_index=True)
+
+    st.markdown('### 📈 Database Metrics')
+    if not db_metrics.enabled:
+        st.caption('Metrics are disabled. Set DB_METRICS_ENABLED=1 or ENABLED = true under [METRICS] in secrets.')
+        return
+    metrics = db_metrics.snapshot()
+    if metrics:
+        st.dataframe(pd.DataFrame(metrics), use_container_width=True, hide_index=True)
+    else:
+        st.info('No database calls recorded yet.')
+    with st.expander(f'Calls in this rerun ({len(get_call_trace())})'):
+        trace = get_call_trace()
+        if trace:
+            st.dataframe(pd.DataFrame(trace), use_container_width=True, hide_index=True)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button('Export JSON', json.dumps(db_metrics.to_json(), indent=2),
+                           file_name='db_metrics.json', mime='application/json', key='admin_metrics_json')
+    with col2:
+        st.download_button('Export Prometheus', db_metrics.to_prometheus(),
+                           file_name='db_metrics.prom', mime='text/plain', key='admin_metrics_prom')
+    with col3:
+        if st.button('Reset Metrics', key='admin_metrics_reset'):
+            db_metrics.reset()
+            st.rerun()
+
 # Main app logic
 def main():
     """Main application logic"""
@@ -4416,6 +4525,9 @@ def main():
     # Initialize test data if needed
     initialize_test_data()
     
+    # Send any deadline reminders that have come due
+    get_reminder_engine().tick()
+    
     # Navigation
     main_navigation()
     
@@ -0,0 +1,35 @@
+"""
+Supabase Client Factory
+create_client() for the app and the import scripts: a fake:// URL gives the
+in-process SQLite fake, any other URL the real supabase-py client. The
+supabase package is only needed for real URLs, so offline runs and the
+benchmark work without it
+"""
+
+from typing import Any
+
+try:
+    from supabase import Client
+except ImportError:
+    # Annotations only; create_client() reports the missing package for real URLs
+    Client = Any
+
+# create_client() URLs with this scheme get a fake, e.g.
+# fake://dev_supabase.db?latency_ms=80&failure_rate=0.01
+FAKE_URL_SCHEME = 'fake://'
+
+
+def create_client(supabase_url: str, supabase_key: str, **options) -> Client:
+    """
+    Drop-in for supabase.create_client
+
+    A 'fake://<path>' URL returns a FakeSupabaseClient on that SQLite file
+    (':memory:' when the path is empty), configured from the query string:
+    latency_ms, jitter_ms, failure_rate and seed. Any other URL returns the
+    real client.
+    """
+    if supabase_url.startswith(FAKE_URL_SCHEME):
+        from supabase_fake import client_from_url
+        return client_from_url(supabase_url)
+    from supabase import create_client as create_supabase_client
+    return create_supabase_client(supabase_url, supabase_key, **options)
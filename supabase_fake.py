@@ -0,0 +1,624 @@
+"""
+In-process Supabase Fake
+Implements the subset of the supabase-py query builder and rpc() the project
+uses on top of SQLite, so Supabase code paths can run, be benchmarked and be
+load-tested without a project. Each request can be given simulated network
+latency and a failure rate
+"""
+
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Optional, Dict, List, Any, Callable, Tuple
+from urllib.parse import parse_qs
+
+from application_materials import select_items, materials_notes
+from supabase_client import FAKE_URL_SCHEME
+
+# Unique constraints from supabase_tables.sql that the app relies on
+DEFAULT_UNIQUE = {
+    'users': [('email',), ('username',)],
+}
+
+_IDENTIFIER = re.compile(r'^\w+$')
+
+Condition = Tuple[str, List[Any]]
+
+
+class FakeResponse:
+    """Mimics postgrest's APIResponse"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeAPIError(Exception):
+    """Mimics postgrest's APIError; str() includes the code like the real one"""
+
+    def __init__(self, code: str, message: str, details: str = None, hint: str = None):
+        self.code = code
+        self.message = message
+        self.details = details
+        self.hint = hint
+        super().__init__(str({'code': code, 'message': message, 'details': details, 'hint': hint}))
+
+
+def _identifier(name: str) -> str:
+    if not _IDENTIFIER.match(str(name)):
+        raise FakeAPIError('PGRST100', f'Invalid identifier: {name}')
+    return f'"{name}"'
+
+
+def _kind(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, (dict, list)):
+        return 'json'
+    return 'text'
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode(value: Any, kind: Optional[str]) -> Any:
+    if value is None:
+        return None
+    if kind == 'bool':
+        return bool(value)
+    if kind == 'json' and isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _literal(text: str, kind: Optional[str]) -> Any:
+    """Value of a PostgREST filter string for a column of the given kind"""
+    if text == 'null':
+        return None
+    try:
+        if kind == 'int':
+            return int(text)
+        if kind == 'float':
+            return float(text)
+    except ValueError:
+        return text
+    if kind == 'bool':
+        return int(text in ('true', '1'))
+    return text
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses"""
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        depth += (char == '(') - (char == ')')
+        current += char
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+_COMPARISONS = {'eq': '=', 'neq': '!=', 'lt': '<', 'lte': '<=', 'gt': '>', 'gte': '>='}
+
+
+class FakeQuery:
+    """Chainable query builder for one table"""
+
+    def __init__(self, client: 'FakeSupabaseClient', table: str):
+        self.client = client
+        self.table = table
+        self.action = 'select'
+        self.payload = None
+        self.on_conflict = None
+        self.columns = '*'
+        self.count = None
+        self.head = False
+        # (column, operator, value) and ('or', filter string) entries
+        self.filters: List[Tuple] = []
+        self.order_by: List[Tuple[str, bool]] = []
+        self.offset = 0
+        self.row_limit = None
+
+    # Actions
+    def select(self, columns: str = '*', count: str = None, head: bool = False):
+        self.action = 'select'
+        self.columns = columns
+        self.count = count
+        self.head = head
+        return self
+
+    def insert(self, data):
+        self.action = 'insert'
+        self.payload = data
+        return self
+
+    def upsert(self, data, on_conflict=None):
+        self.action = 'upsert'
+        self.payload = data
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, data: Dict):
+        self.action = 'update'
+        self.payload = data
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    # Filters
+    def eq(self, column: str, value):
+        self.filters.append((column, 'eq', value))
+        return self
+
+    def neq(self, column: str, value):
+        self.filters.append((column, 'neq', value))
+        return self
+
+    def in_(self, column: str, values):
+        self.filters.append((column, 'in', list(values)))
+        return self
+
+    def lt(self, column: str, value):
+        self.filters.append((column, 'lt', value))
+        return self
+
+    def lte(self, column: str, value):
+        self.filters.append((column, 'lte', value))
+        return self
+
+    def gt(self, column: str, value):
+        self.filters.append((column, 'gt', value))
+        return self
+
+    def gte(self, column: str, value):
+        self.filters.append((column, 'gte', value))
+        return self
+
+    def or_(self, filters: str):
+        """PostgREST or filter, e.g. 'created_at.lt.X,and(created_at.eq.X,id.lt.5)'"""
+        self.filters.append(('or', filters))
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def execute(self) -> FakeResponse:
+        return self.client._request(lambda: self.client._execute(self))
+
+
+class FakeRPC:
+    def __init__(self, client: 'FakeSupabaseClient', function: str, params: Dict):
+        self.client = client
+        self.function = function
+        self.params = params or {}
+
+    def execute(self) -> FakeResponse:
+        return self.client._request(lambda: self.client._call(self.function, self.params))
+
+
+class FakeSupabaseClient:
+    """
+    Stand-in for supabase.Client storing every table in SQLite
+
+    Tables are created on first use and gain a column the first time a row
+    or filter mentions it; each column remembers the Python type of its
+    first value so bools and JSON come back as they went in. A request that
+    writes several rows is atomic, and rpc() functions run in one
+    transaction, as in Postgres.
+
+    latency and jitter are in seconds and apply to every request, rpc()
+    included; failure_rate is the chance a request fails with a 503 before
+    touching the database. Requests sleep outside the database lock, so
+    concurrent requests overlap like real round trips.
+    """
+
+    def __init__(self, path: str = ':memory:', latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, seed: Optional[int] = None,
+                 unique: Optional[Dict[str, List[Tuple[str, ...]]]] = None):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.unique = DEFAULT_UNIQUE if unique is None else unique
+        self.request_count = 0
+        self.failure_count = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS _fake_columns (
+                table_name TEXT NOT NULL,
+                column_name TEXT NOT NULL,
+                kind TEXT,
+                PRIMARY KEY (table_name, column_name)
+            )
+        ''')
+        # table -> {column: kind}
+        self._columns: Dict[str, Dict[str, Optional[str]]] = {}
+        self._load_columns()
+        self.functions: Dict[str, Callable[['FakeSupabaseClient', Dict], Any]] = dict(RPC_FUNCTIONS)
+
+    # Client API
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, function: str, params: Dict = None) -> FakeRPC:
+        return FakeRPC(self, function, params)
+
+    def register_function(self, name: str, function: Callable[['FakeSupabaseClient', Dict], Any]):
+        """Add an rpc() function; it receives the client and the params and runs in a transaction"""
+        self.functions[name] = function
+
+    def set_network(self, latency: float = None, jitter: float = None, failure_rate: float = None):
+        if latency is not None:
+            self.latency = latency
+        if jitter is not None:
+            self.jitter = jitter
+        if failure_rate is not None:
+            self.failure_rate = failure_rate
+
+    def close(self):
+        self.conn.close()
+
+    # Network simulation
+    def _request(self, run: Callable[[], FakeResponse]) -> FakeResponse:
+        with self._lock:
+            self.request_count += 1
+        if self.latency or self.jitter:
+            time.sleep(max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0))
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            with self._lock:
+                self.failure_count += 1
+            raise FakeAPIError('503', 'Service Unavailable (injected failure)')
+        return run()
+
+    # Storage
+    @contextmanager
+    def transaction(self):
+        """Hold the database for a unit of work; nested use joins the outer transaction"""
+        with self._lock:
+            outermost = self._depth == 0
+            if outermost:
+                self.conn.execute('BEGIN')
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    self.conn.execute('ROLLBACK')
+                    # Columns added in the transaction are gone too
+                    self._load_columns()
+                raise
+            self._depth -= 1
+            if outermost:
+                self.conn.execute('COMMIT')
+
+    def _load_columns(self):
+        self._columns = {}
+        for table, column, kind in self.conn.execute('SELECT * FROM _fake_columns'):
+            self._columns.setdefault(table, {})[column] = kind
+
+    def _ensure_table(self, table: str):
+        if table in self._columns:
+            return
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {_identifier(table)} (id INTEGER PRIMARY KEY AUTOINCREMENT)')
+        self._columns[table] = {'id': 'int'}
+        self.conn.execute('INSERT OR REPLACE INTO _fake_columns VALUES (?, ?, ?)', (table, 'id', 'int'))
+        for columns in self.unique.get(table, []):
+            for column in columns:
+                self._ensure_column(table, column, None)
+            name = _identifier(f"uq_{table}_{'_'.join(columns)}")
+            self.conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {_identifier(table)} '
+                              f'({", ".join(_identifier(column) for column in columns)})')
+
+    def _ensure_column(self, table: str, column: str, value: Any):
+        self._ensure_table(table)
+        columns = self._columns[table]
+        kind = _kind(value)
+        if column not in columns:
+            self.conn.execute(f'ALTER TABLE {_identifier(table)} ADD COLUMN {_identifier(column)}')
+        elif columns[column] is not None or kind is None:
+            return
+        columns[column] = kind
+        self.conn.execute('INSERT OR REPLACE INTO _fake_columns VALUES (?, ?, ?)', (table, column, kind))
+
+    def _row(self, table: str, names: List[str], values: tuple) -> Dict:
+        kinds = self._columns[table]
+        return {name: _decode(value, kinds.get(name)) for name, value in zip(names, values)}
+
+    def _select_rows(self, table: str, where: str = '1', params: List = None, columns: str = '*') -> List[Dict]:
+        cursor = self.conn.execute(f'SELECT {columns} FROM {_identifier(table)} WHERE {where}', params or [])
+        names = [description[0] for description in cursor.description]
+        return [self._row(table, names, values) for values in cursor.fetchall()]
+
+    # Filters
+    def _condition(self, table: str, column: str, op: str, value: Any) -> Condition:
+        self._ensure_column(table, column, None)
+        name = _identifier(column)
+        if op == 'in':
+            if not value:
+                return '0', []
+            return f'{name} IN ({", ".join("?" for _ in value)})', [_encode(v) for v in value]
+        if value is None:
+            return (f'{name} IS NULL', []) if op == 'eq' else (f'{name} IS NOT NULL', []) if op == 'neq' else ('0', [])
+        if op == 'neq':
+            # PostgREST's neq leaves out NULLs like any SQL comparison
+            return f'{name} != ?', [_encode(value)]
+        return f'{name} {_COMPARISONS[op]} ?', [_encode(value)]
+
+    def _logic(self, table: str, logic: str, text: str) -> Condition:
+        parts = []
+        params = []
+        for part in _split_top_level(text):
+            for nested in ('and', 'or'):
+                if part.startswith(f'{nested}(') and part.endswith(')'):
+                    sql, part_params = self._logic(table, nested, part[len(nested) + 1:-1])
+                    break
+            else:
+                column, op, literal = part.split('.', 2)
+                self._ensure_column(table, column, None)
+                kind = self._columns[table].get(column)
+                if op == 'in':
+                    value = [_literal(item.strip(), kind) for item in literal.strip('()').split(',')]
+                else:
+                    value = _literal(literal, kind)
+                sql, part_params = self._condition(table, column, op, value)
+            parts.append(f'({sql})')
+            params += part_params
+        return f' {logic.upper()} '.join(parts) or '1', params
+
+    def _where(self, query: FakeQuery) -> Condition:
+        parts = ['1']
+        params = []
+        for entry in query.filters:
+            if entry[0] == 'or':
+                sql, entry_params = self._logic(query.table, 'or', entry[1])
+            else:
+                sql, entry_params = self._condition(query.table, *entry)
+            parts.append(f'({sql})')
+            params += entry_params
+        return ' AND '.join(parts), params
+
+    def _projection(self, table: str, columns: str) -> str:
+        # Embedded resources like "child_profiles(child_name)" are ignored
+        fields = [c.strip() for c in columns.split(',') if c.strip() and '(' not in c]
+        if not fields or '*' in fields:
+            return '*'
+        for field in fields:
+            self._ensure_column(table, field, None)
+        return ', '.join(_identifier(field) for field in fields)
+
+    # Execution
+    def _execute(self, query: FakeQuery) -> FakeResponse:
+        with self.transaction():
+            self._ensure_table(query.table)
+            if query.action in ('insert', 'upsert'):
+                return FakeResponse(self._write(query))
+
+            where, params = self._where(query)
+            table = _identifier(query.table)
+
+            if query.action == 'update':
+                ids = [row['id'] for row in self._select_rows(query.table, where, params, 'id')]
+                if ids and query.payload:
+                    for column, value in query.payload.items():
+                        self._ensure_column(query.table, column, value)
+                    assignments = ', '.join(f'{_identifier(column)} = ?' for column in query.payload)
+                    self.conn.execute(f'UPDATE {table} SET {assignments} WHERE {where}',
+                                      [_encode(value) for value in query.payload.values()] + params)
+                return FakeResponse(self._rows_by_id(query.table, ids))
+
+            if query.action == 'delete':
+                matched = self._select_rows(query.table, where, params)
+                self.conn.execute(f'DELETE FROM {table} WHERE {where}', params)
+                return FakeResponse(matched)
+
+            # Select
+            count = None
+            if query.count:
+                count = self.conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}', params).fetchone()[0]
+            if query.head:
+                return FakeResponse([], count=count)
+            order = []
+            for column, desc in query.order_by:
+                self._ensure_column(query.table, column, None)
+                name = _identifier(column)
+                # Postgres puts NULLs last ascending and first descending
+                order.append(f'{name} IS NULL DESC, {name} DESC' if desc else f'{name} IS NULL, {name}')
+            sql = where + ' ORDER BY ' + ', '.join(order + ['id'])
+            if query.row_limit is not None or query.offset:
+                sql += ' LIMIT ? OFFSET ?'
+                params = params + [-1 if query.row_limit is None else query.row_limit, query.offset]
+            return FakeResponse(self._select_rows(query.table, sql, params, self._projection(query.table, query.columns)),
+                                count=count)
+
+    def _rows_by_id(self, table: str, ids: List[int]) -> List[Dict]:
+        if not ids:
+            return []
+        rows = {row['id']: row for row in self._select_rows(table, f'id IN ({", ".join("?" for _ in ids)})', ids)}
+        return [rows[row_id] for row_id in ids if row_id in rows]
+
+    def _write(self, query: FakeQuery) -> List[Dict]:
+        payload = query.payload if isinstance(query.payload, list) else [query.payload]
+        conflict = query.on_conflict or 'id'
+        if isinstance(conflict, str):
+            conflict = [column.strip() for column in conflict.split(',')]
+        table = _identifier(query.table)
+        ids = []
+        for item in payload:
+            for column, value in item.items():
+                self._ensure_column(query.table, column, value)
+            existing = None
+            if query.action == 'upsert' and all(item.get(column) is not None for column in conflict):
+                where = ' AND '.join(f'{_identifier(column)} = ?' for column in conflict)
+                existing = self.conn.execute(f'SELECT id FROM {table} WHERE {where}',
+                                             [_encode(item[column]) for column in conflict]).fetchone()
+            try:
+                if existing:
+                    if item:
+                        assignments = ', '.join(f'{_identifier(column)} = ?' for column in item)
+                        self.conn.execute(f'UPDATE {table} SET {assignments} WHERE id = ?',
+                                          [_encode(value) for value in item.values()] + [existing[0]])
+                    ids.append(item.get('id', existing[0]))
+                    continue
+                columns = ', '.join(_identifier(column) for column in item)
+                if item:
+                    cursor = self.conn.execute(f'INSERT INTO {table} ({columns}) VALUES ({", ".join("?" for _ in item)})',
+                                               [_encode(value) for value in item.values()])
+                else:
+                    cursor = self.conn.execute(f'INSERT INTO {table} DEFAULT VALUES')
+                ids.append(cursor.lastrowid)
+            except sqlite3.IntegrityError as e:
+                raise FakeAPIError('23505', f'duplicate key value violates unique constraint: {e}')
+        return self._rows_by_id(query.table, ids)
+
+    def _call(self, function: str, params: Dict) -> FakeResponse:
+        if function not in self.functions:
+            raise FakeAPIError('PGRST202', f'Could not find the function public.{function} in the schema cache')
+        with self.transaction():
+            return FakeResponse(self.functions[function](self, params))
+
+
+# Python versions of the functions in SUPABASE_CREATE_RPC_FUNCTIONS.sql; they
+# use the client's own query API, which joins the rpc() call's transaction
+
+def _run(client: FakeSupabaseClient, query: FakeQuery) -> List[Dict]:
+    return client._execute(query).data
+
+
+def _register_user_account(client: FakeSupabaseClient, params: Dict) -> Dict:
+    if _run(client, client.table('users').select('id').eq('email', params['p_email'])):
+        return {'ok': False, 'message': 'User with this email already exists'}
+    try:
+        user = _run(client, client.table('users').insert({
+            'username': params['p_username'],
+            'email': params['p_email'],
+            'password_hash': params['p_password_hash'],
+            'full_name': params.get('p_full_name'),
+            'phone': params.get('p_phone'),
+            'created_at': datetime.now().isoformat(),
+        }))[0]
+    except FakeAPIError:
+        return {'ok': False, 'message': 'User with this email or name already exists'}
+    return {
+        'ok': True,
+        'message': 'User registered successfully',
+        'user': {key: user.get(key) for key in ('id', 'username', 'email', 'full_name', 'phone')},
+    }
+
+
+def _submit_application_with_materials(client: FakeSupabaseClient, params: Dict) -> Dict:
+    user_id = params['p_user_id']
+    child_query = client.table('child_profiles').select('id').eq('user_id', user_id)
+    if params.get('p_child_id') is None:
+        children = _run(client, child_query.order('created_at', desc=True).order('id', desc=True).limit(1))
+        if not children:
+            return {'ok': False, 'message': 'No child profiles found. Please add a child profile first.'}
+    else:
+        children = _run(client, child_query.eq('id', params['p_child_id']))
+        if not children:
+            return {'ok': False, 'message': 'Child profile not found'}
+    child_id = children[0]['id']
+
+    items = []
+    if params.get('p_portfolio_item_ids'):
+        items = select_items(_run(client, client.table('portfolio_items').select('*').eq('user_id', user_id)
+                                  .eq('child_id', child_id).order('created_at', desc=True).order('id', desc=True)),
+                             params['p_portfolio_item_ids'])
+    statement = None
+    if params.get('p_statement_id'):
+        statements = _run(client, client.table('personal_statements').select('*').eq('id', params['p_statement_id'])
+                          .eq('user_id', user_id).eq('child_id', child_id))
+        statement = statements[0] if statements else None
+
+    application = _run(client, client.table('applications').insert({
+        'user_id': user_id,
+        'child_id': child_id,
+        'school_name': params['p_school_name'],
+        'school_type': params['p_school_type'],
+        'application_date': params['p_application_date'],
+        'status': 'pending',
+        'notes': materials_notes(params.get('p_notes'), items, statement),
+        'created_at': datetime.now().isoformat(),
+    }))[0]
+    if params.get('p_notification_title') is not None:
+        _run(client, client.table('notifications').insert({
+            'user_id': user_id,
+            'title': params['p_notification_title'],
+            'message': params.get('p_notification_message') or '',
+            'is_read': False,
+            'created_at': datetime.now().isoformat(),
+        }))
+    return {
+        'ok': True,
+        'message': f"Application submitted with ID: {application['id']}",
+        'application_id': application['id'],
+        'child_id': child_id,
+    }
+
+
+def _reset_user_by_email(client: FakeSupabaseClient, params: Dict) -> bool:
+    users = _run(client, client.table('users').select('id').eq('email', params['p_email']))
+    if not users:
+        return False
+    user_id = users[0]['id']
+    for table in ('notifications', 'notifications_archive', 'portfolio_items', 'personal_statements',
+                  'applications', 'child_profiles', 'application_tracking'):
+        _run(client, client.table(table).delete().eq('user_id', user_id))
+    _run(client, client.table('users').delete().eq('id', user_id))
+    return True
+
+
+RPC_FUNCTIONS = {
+    'register_user_account': _register_user_account,
+    'submit_application_with_materials': _submit_application_with_materials,
+    'reset_user_by_email': _reset_user_by_email,
+}
+
+
+def client_from_url(supabase_url: str) -> FakeSupabaseClient:
+    """The FakeSupabaseClient a supabase_client.create_client() fake:// URL describes"""
+    path, _, query = supabase_url[len(FAKE_URL_SCHEME):].partition('?')
+    settings = {key: values[-1] for key, values in parse_qs(query).items()}
+    return FakeSupabaseClient(
+        path or ':memory:',
+        latency=float(settings.get('latency_ms', 0)) / 1000,
+        jitter=float(settings.get('jitter_ms', 0)) / 1000,
+        failure_rate=float(settings.get('failure_rate', 0)),
+        seed=int(settings['seed']) if 'seed' in settings else None,
+    )
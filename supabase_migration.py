@@ -0,0 +1,384 @@
+"""
+SQLite to Supabase Migration
+Copies every user table of a local SQLite database into Supabase in chunks.
+Rows already in Supabase are found with one in_() query per chunk, new rows
+are written with one bulk request per chunk, and each source id's Supabase id
+is recorded in a state database, so foreign keys are remapped and an
+interrupted migration resumes where it stopped. Tables that do not depend on
+each other are migrated in parallel
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Source rows read, checked and written per request
+CHUNK_SIZE = 500
+
+# Table streams migrated at the same time
+MAX_WORKERS = 3
+
+# PostgREST returns at most this many rows per request by default
+SELECT_PAGE_SIZE = 1000
+
+
+def _date(value: Any) -> Optional[str]:
+    return str(value)[:10] if value else None
+
+
+def _timestamp(*values: Any) -> str:
+    """The first non-empty value; all rows of a bulk insert need the same columns"""
+    return next((str(value) for value in values if value), datetime.now().isoformat())
+
+
+def _user(row: Dict) -> Dict:
+    email = row['email']
+    username = row.get('username') or row.get('name') or ''
+    if not username.strip():
+        username = email.split('@')[0]
+    return {
+        'username': username,
+        'email': email,
+        'password_hash': row['password_hash'],
+        'full_name': row.get('full_name') or row.get('name') or username,
+        'phone': row.get('phone'),
+        'created_at': _timestamp(row.get('created_at')),
+    }
+
+
+def _child_profile(row: Dict) -> Dict:
+    return {
+        'user_id': row['user_id'],
+        'child_name': row.get('child_name') or row.get('name'),
+        'date_of_birth': _date(row.get('date_of_birth')),
+        'gender': row.get('gender'),
+        'nationality': row.get('nationality'),
+        'address': row.get('address'),
+        'parent_name': row.get('parent_name'),
+        'parent_phone': row.get('parent_phone'),
+        'parent_email': row.get('parent_email'),
+        'created_at': _timestamp(row.get('created_at')),
+    }
+
+
+def _application(row: Dict) -> Dict:
+    # database.py's applications table has preferred_start_date, additional_notes and submitted_at
+    created_at = _timestamp(row.get('created_at'), row.get('submitted_at'))
+    return {
+        'user_id': row['user_id'],
+        'child_id': row['child_id'],
+        'school_name': row['school_name'],
+        'school_type': row.get('school_type') or 'kindergarten',
+        'application_date': _date(row.get('application_date') or row.get('preferred_start_date') or created_at),
+        'status': row.get('status') or 'pending',
+        'notes': row.get('notes') or row.get('additional_notes'),
+        'created_at': created_at,
+    }
+
+
+def _tracked_school(row: Dict) -> Dict:
+    # database.py's application_tracker table has added_date, last_checked and application_info
+    data = {
+        'user_id': row['user_id'],
+        'school_no': row['school_no'],
+        'school_name': row['school_name'],
+        'status': row.get('status') or 'tracking',
+        'notes': row.get('notes'),
+        'date_updated': _timestamp(row.get('date_updated'), row.get('last_checked'), row.get('added_date')),
+    }
+    if 'application_info' in row:
+        # Needs the column from SUPABASE_ADD_APPLICATION_INFO.sql
+        try:
+            data['application_info'] = json.loads(row['application_info'] or '{}')
+        except ValueError:
+            data['application_info'] = {}
+    return data
+
+
+def _notification(row: Dict) -> Dict:
+    return {
+        'user_id': row['user_id'],
+        'title': row['title'],
+        'message': row['message'],
+        'is_read': bool(row.get('is_read')),
+        'created_at': _timestamp(row.get('created_at'), row.get('timestamp')),
+    }
+
+
+def _archived_notifications(row: Dict) -> Dict:
+    # SQLite keeps entries as JSON text; Supabase's column is jsonb
+    try:
+        entries = json.loads(row['entries'] or '[]')
+    except ValueError:
+        entries = []
+    return {
+        'user_id': row['user_id'],
+        'period': row['period'],
+        'entries': entries,
+        'count': len(entries),
+    }
+
+
+def _portfolio_item(row: Dict) -> Dict:
+    return {
+        'user_id': row['user_id'],
+        'child_id': row['child_id'],
+        'title': row['title'],
+        'description': row.get('description'),
+        'category': row.get('category'),
+        'item_date': _date(row.get('item_date')),
+        'attachment_path': row.get('attachment_path'),
+        'notes': row.get('notes'),
+        'created_at': _timestamp(row.get('created_at')),
+    }
+
+
+def _personal_statement(row: Dict) -> Dict:
+    created_at = _timestamp(row.get('created_at'))
+    return {
+        'user_id': row['user_id'],
+        'child_id': row['child_id'],
+        'title': row['title'],
+        'content': row['content'],
+        'target_school': row.get('target_school'),
+        'version': row.get('version') or '1.0',
+        'notes': row.get('notes'),
+        'created_at': created_at,
+        'updated_at': _timestamp(row.get('updated_at'), created_at),
+    }
+
+
+@dataclass
+class TableSpec:
+    """
+    How one Supabase table is filled
+
+    key is the set of columns that identifies a row already in Supabase; its
+    first column is the one the existence check filters on. parents maps a
+    foreign key column to the source table whose ids it holds.
+    """
+    target: str
+    sources: List[str]
+    key: Tuple[str, ...]
+    transform: Callable[[Dict], Dict]
+    parents: Dict[str, str] = field(default_factory=dict)
+    on_conflict: Optional[str] = None
+
+
+USERS = TableSpec('users', ['users'], ('email',), _user, on_conflict='email')
+CHILD_PROFILES = TableSpec('child_profiles', ['child_profiles'], ('user_id', 'child_name', 'date_of_birth'),
+                           _child_profile, {'user_id': 'users'})
+APPLICATION_TRACKING = TableSpec('application_tracking', ['application_tracking', 'application_tracker'],
+                                 ('user_id', 'school_no'), _tracked_school, {'user_id': 'users'})
+NOTIFICATIONS = TableSpec('notifications', ['notifications'], ('user_id', 'title', 'message'),
+                          _notification, {'user_id': 'users'})
+NOTIFICATIONS_ARCHIVE = TableSpec('notifications_archive', ['notifications_archive'], ('user_id', 'period'),
+                                  _archived_notifications, {'user_id': 'users'})
+APPLICATIONS = TableSpec('applications', ['applications'], ('user_id', 'child_id', 'school_name', 'application_date'),
+                         _application, {'user_id': 'users', 'child_id': 'child_profiles'})
+PORTFOLIO_ITEMS = TableSpec('portfolio_items', ['portfolio_items'], ('user_id', 'child_id', 'title', 'item_date'),
+                            _portfolio_item, {'user_id': 'users', 'child_id': 'child_profiles'})
+PERSONAL_STATEMENTS = TableSpec('personal_statements', ['personal_statements'],
+                                ('user_id', 'child_id', 'title', 'version'),
+                                _personal_statement, {'user_id': 'users', 'child_id': 'child_profiles'})
+
+# Each level only references tables of earlier levels, so its tables run in parallel
+LEVELS = [
+    [USERS],
+    [CHILD_PROFILES, APPLICATION_TRACKING, NOTIFICATIONS, NOTIFICATIONS_ARCHIVE],
+    [APPLICATIONS, PORTFOLIO_ITEMS, PERSONAL_STATEMENTS],
+]
+
+
+def _key(row: Dict, columns: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tuple('' if row.get(column) is None else str(row[column]) for column in columns)
+
+
+def _new_stats() -> Dict[str, int]:
+    return {'read': 0, 'resumed': 0, 'existing': 0, 'inserted': 0, 'orphaned': 0, 'failed': 0}
+
+
+class SupabaseMigration:
+    """
+    Migrates a SQLite database's user tables into a Supabase client
+
+    The state database (next to the source by default) holds the id map.
+    A run after an interruption skips source rows already mapped; rows that
+    were written but not yet mapped are found by the existence check rather
+    than inserted twice.
+    """
+
+    def __init__(self, client, sqlite_path: str, state_path: Optional[str] = None,
+                 chunk_size: int = CHUNK_SIZE, max_workers: int = MAX_WORKERS):
+        self.client = client
+        self.sqlite_path = str(sqlite_path)
+        self.state_path = Path(state_path) if state_path else Path(sqlite_path).with_suffix('.migration.db')
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.state = sqlite3.connect(str(self.state_path), check_same_thread=False)
+        self.state.execute('''
+            CREATE TABLE IF NOT EXISTS id_map (
+                source_table TEXT NOT NULL,
+                source_id INTEGER NOT NULL,
+                target_table TEXT NOT NULL,
+                target_id INTEGER NOT NULL,
+                PRIMARY KEY (source_table, source_id)
+            )
+        ''')
+        self.state.commit()
+        # source table -> {source id: Supabase id}
+        self.id_maps: Dict[str, Dict[int, int]] = {}
+        # Supabase table -> ids already mapped to a source row
+        self.claimed: Dict[str, set] = {}
+        for source_table, source_id, target_table, target_id in self.state.execute('SELECT * FROM id_map'):
+            self.id_maps.setdefault(source_table, {})[source_id] = target_id
+            self.claimed.setdefault(target_table, set()).add(target_id)
+
+    def run(self) -> Dict[str, Dict[str, int]]:
+        """Migrate every table; returns counts per source table"""
+        report = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='migrate') as pool:
+            for level in LEVELS:
+                for stats in pool.map(self.migrate_table, level):
+                    report.update(stats)
+        return report
+
+    def migrate_table(self, spec: TableSpec) -> Dict[str, Dict[str, int]]:
+        report = {}
+        source = sqlite3.connect(self.sqlite_path)
+        source.row_factory = sqlite3.Row
+        try:
+            for source_table in spec.sources:
+                exists = source.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                        (source_table,)).fetchone()
+                if not exists:
+                    continue
+                stats = report[source_table] = _new_stats()
+                cursor = source.execute(f'SELECT * FROM {source_table} ORDER BY id')
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    self._migrate_chunk(spec, source_table, [dict(row) for row in rows], stats)
+                logger.info("Migrated %s -> %s: %s", source_table, spec.target, stats)
+        finally:
+            source.close()
+        return report
+
+    def _migrate_chunk(self, spec: TableSpec, source_table: str, rows: List[Dict], stats: Dict[str, int]):
+        done = self.id_maps.setdefault(source_table, {})
+        pending = []
+        for row in rows:
+            stats['read'] += 1
+            if row['id'] in done:
+                stats['resumed'] += 1
+                continue
+            for column, parent in spec.parents.items():
+                row[column] = self.id_maps.get(parent, {}).get(row.get(column))
+            if any(row[column] is None for column in spec.parents):
+                stats['orphaned'] += 1
+                continue
+            pending.append((row['id'], spec.transform(row)))
+        if not pending:
+            return
+
+        existing = self._existing(spec, [target for _, target in pending])
+        mapped, to_insert = [], []
+        for source_id, target in pending:
+            ids = existing.get(_key(target, spec.key))
+            if ids:
+                mapped.append((source_id, ids.pop(0)))
+                stats['existing'] += 1
+            else:
+                to_insert.append((source_id, target))
+        mapped += self._insert(spec, to_insert, stats)
+        self._record(source_table, spec.target, mapped)
+
+    def _existing(self, spec: TableSpec, targets: List[Dict]) -> Dict[Tuple, List[int]]:
+        """Unclaimed Supabase ids by key, for rows sharing the chunk's first-key values"""
+        column = spec.key[0]
+        values = sorted({target[column] for target in targets if target.get(column) is not None})
+        if not values:
+            return {}
+        claimed = self.claimed.get(spec.target, set())
+        columns = ', '.join(('id',) + spec.key)
+        existing: Dict[Tuple, List[int]] = {}
+        start = 0
+        while True:
+            rows = (self.client.table(spec.target).select(columns).in_(column, values)
+                    .order('id').range(start, start + SELECT_PAGE_SIZE - 1).execute().data)
+            for row in rows:
+                if row['id'] not in claimed:
+                    existing.setdefault(_key(row, spec.key), []).append(row['id'])
+            if len(rows) < SELECT_PAGE_SIZE:
+                return existing
+            start += SELECT_PAGE_SIZE
+
+    def _write(self, spec: TableSpec, targets: List[Dict]) -> List[Dict]:
+        table = self.client.table(spec.target)
+        if spec.on_conflict:
+            return table.upsert(targets, on_conflict=spec.on_conflict).execute().data
+        return table.insert(targets).execute().data
+
+    def _insert(self, spec: TableSpec, items: List[Tuple[int, Dict]], stats: Dict[str, int]) -> List[Tuple[int, int]]:
+        """Write rows in one request, or one by one if the batch is rejected; returns (source id, Supabase id)"""
+        if not items:
+            return []
+        try:
+            written = self._write(spec, [target for _, target in items])
+        except Exception as e:
+            if len(items) == 1:
+                logger.error("Could not migrate %s row %s: %s", spec.target, items[0][0], e)
+                stats['failed'] += 1
+                return []
+            logger.warning("Batch of %d %s rows rejected, retrying one by one: %s", len(items), spec.target, e)
+            mapped = []
+            for item in items:
+                mapped += self._insert(spec, [item], stats)
+            return mapped
+
+        # Match written rows back by key; the response order is not relied on
+        ids: Dict[Tuple, List[int]] = {}
+        for row in written:
+            ids.setdefault(_key(row, spec.key), []).append(row['id'])
+        mapped = []
+        for source_id, target in items:
+            matches = ids.get(_key(target, spec.key))
+            if matches:
+                mapped.append((source_id, matches.pop(0)))
+                stats['inserted'] += 1
+            else:
+                stats['failed'] += 1
+        return mapped
+
+    def _record(self, source_table: str, target_table: str, mapped: List[Tuple[int, int]]):
+        if not mapped:
+            return
+        with self._lock:
+            self.id_maps.setdefault(source_table, {}).update(mapped)
+            self.claimed.setdefault(target_table, set()).update(target_id for _, target_id in mapped)
+            self.state.executemany('INSERT OR REPLACE INTO id_map VALUES (?, ?, ?, ?)',
+                                   [(source_table, source_id, target_table, target_id)
+                                    for source_id, target_id in mapped])
+            self.state.commit()
+
+    def close(self):
+        self.state.close()
+
+
+def migrate_sqlite_to_supabase(client, sqlite_path: str, **options) -> Dict[str, Dict[str, int]]:
+    """Run a full migration and return counts per source table"""
+    migration = SupabaseMigration(client, sqlite_path, **options)
+    try:
+        return migration.run()
+    finally:
+        migration.close()
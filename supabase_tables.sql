@@ -58,6 +58,22 @@ CREATE TABLE IF NOT EXISTS notifications (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Keyset paging index for notifications, newest first within a user
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications (user_id, created_at DESC, id DESC);
+
+-- Unread count for the sidebar badge (count='exact', head=True)
+CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON notifications (user_id) WHERE NOT is_read;
+
+-- Archived read notifications, one row of entries per user and month
+CREATE TABLE IF NOT EXISTS notifications_archive (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT REFERENCES users(id),
+    period TEXT NOT NULL,
+    entries JSONB NOT NULL DEFAULT '[]',
+    count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (user_id, period)
+);
+
 -- Create portfolio_items table
 CREATE TABLE IF NOT EXISTS portfolio_items (
     id BIGSERIAL PRIMARY KEY,
@@ -92,6 +108,7 @@ ALTER TABLE child_profiles ENABLE ROW LEVEL SECURITY;
 ALTER TABLE applications ENABLE ROW LEVEL SECURITY;
 ALTER TABLE application_tracking ENABLE ROW LEVEL SECURITY;
 ALTER TABLE notifications ENABLE ROW LEVEL SECURITY;
+ALTER TABLE notifications_archive ENABLE ROW LEVEL SECURITY;
 ALTER TABLE portfolio_items ENABLE ROW LEVEL SECURITY;
 ALTER TABLE personal_statements ENABLE ROW LEVEL SECURITY;
 
@@ -101,5 +118,6 @@ CREATE POLICY "Allow all operations on child_profiles" ON child_profiles FOR ALL
 CREATE POLICY "Allow all operations on applications" ON applications FOR ALL USING (true);
 CREATE POLICY "Allow all operations on application_tracking" ON application_tracking FOR ALL USING (true);
 CREATE POLICY "Allow all operations on notifications" ON notifications FOR ALL USING (true);
+CREATE POLICY "Allow all operations on notifications_archive" ON notifications_archive FOR ALL USING (true);
 CREATE POLICY "Allow all operations on portfolio_items" ON portfolio_items FOR ALL USING (true);
 CREATE POLICY "Allow all operations on personal_statements" ON personal_statements FOR ALL USING (true); 
\ No newline at end of file
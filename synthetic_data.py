@@ -0,0 +1,177 @@
+"""
+Synthetic Dataset Generator
+Builds reproducible school and user datasets of any size for benchmarks and
+load tests, and seeds them into the database managers
+"""
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Any
+
+DISTRICTS = [
+    ("Central & Western", "中西區"), ("Wan Chai", "灣仔區"), ("Eastern", "東區"),
+    ("Southern", "南區"), ("Yau Tsim Mong", "油尖旺區"), ("Sham Shui Po", "深水埗區"),
+    ("Kowloon City", "九龍城區"), ("Wong Tai Sin", "黃大仙區"), ("Kwun Tong", "觀塘區"),
+    ("Kwai Tsing", "葵青區"), ("Tsuen Wan", "荃灣區"), ("Tuen Mun", "屯門區"),
+    ("Yuen Long", "元朗區"), ("North", "北區"), ("Tai Po", "大埔區"),
+    ("Sha Tin", "沙田區"), ("Sai Kung", "西貢區"), ("Islands", "離島區"),
+]
+
+CURRICULA = ["Local", "International", "IB", "British", "Montessori"]
+FUNDING_TYPES = ["Aided", "Government", "Direct Subsidy Scheme", "Private"]
+PORTFOLIO_CATEGORIES = ["Art Work", "Writing Sample", "Photo", "Video", "Certificate", "Other"]
+
+# Columns of the kindergartens/primary_schools reference tables
+SCHOOL_COLUMNS = [
+    'school_no', 'name_en', 'name_tc', 'district_en', 'district_tc', 'address_en',
+    'website', 'application_page', 'has_website', 'website_verified', 'tel',
+    'curriculum', 'funding_type', 'through_train', 'language_of_instruction',
+    'student_capacity', 'last_updated', 'source',
+]
+
+
+def generate_schools(n: int, level: str = 'kindergarten', seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate n school rows shaped like the kindergartens/primary_schools tables"""
+    rng = random.Random(f"{seed}-{level}")
+    prefix = 'K' if level == 'kindergarten' else 'P'
+    kind = 'KINDERGARTEN' if level == 'kindergarten' else 'PRIMARY SCHOOL'
+    schools = []
+    for i in range(n):
+        district_en, district_tc = rng.choice(DISTRICTS)
+        slug = f"{prefix.lower()}{i:05d}"
+        has_website = rng.random() < 0.8
+        schools.append({
+            'school_no': f"{prefix}{i + 1:05d}",
+            'name_en': f"SYNTHETIC {kind} {i + 1} ({district_en.upper()})",
+            'name_tc': f"合成學校{i + 1}（{district_tc}）",
+            'district_en': district_en,
+            'district_tc': district_tc,
+            'address_en': f"{rng.randint(1, 999)} Example Road, {district_en}",
+            'website': f"https://www.{slug}.edu.hk" if has_website else '',
+            'application_page': f"https://www.{slug}.edu.hk/admission" if has_website else '',
+            'has_website': has_website,
+            'website_verified': has_website and rng.random() < 0.5,
+            'tel': f"2{rng.randint(1000000, 9999999)}",
+            'curriculum': rng.choice(CURRICULA),
+            'funding_type': rng.choice(FUNDING_TYPES),
+            'through_train': rng.random() < 0.2,
+            'language_of_instruction': rng.choice(["Chinese", "English", "Chinese & English"]),
+            'student_capacity': str(rng.randint(60, 900)),
+            'last_updated': datetime(2025, 1, 1).isoformat(),
+            'source': 'synthetic',
+        })
+    return schools
+
+
+def generate_users(m: int, k: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate m users, each with children and k tracked schools/notifications/portfolio items/statements"""
+    rng = random.Random(f"{seed}-users")
+    users = []
+    for i in range(m):
+        children = []
+        for c in range(max(1, k // 5) if k else 1):
+            dob = datetime(2019, 1, 1) + timedelta(days=rng.randint(0, 1500))
+            children.append({
+                'child_name': f"Child {i + 1}-{c + 1}",
+                'date_of_birth': dob.strftime('%Y-%m-%d'),
+                'gender': rng.choice(["Male", "Female"]),
+            })
+        users.append({
+            'name': f"Synthetic User {i + 1}",
+            'email': f"user{i + 1}@synthetic.example.com",
+            'phone': f"+852 {rng.randint(5000, 9999)} {rng.randint(1000, 9999)}",
+            'password': 'password123',
+            'children': children,
+            'tracked': [rng.randint(0, 10 ** 6) for _ in range(k)],
+            'notifications': [
+                {'title': f"Notification {n + 1}", 'message': f"Synthetic message {n + 1} for user {i + 1}",
+                 'priority': rng.choice(['low', 'medium', 'high'])}
+                for n in range(k)
+            ],
+            'portfolio': [
+                {'title': f"Portfolio item {p + 1}", 'description': "Synthetic portfolio item",
+                 'category': rng.choice(PORTFOLIO_CATEGORIES),
+                 'item_date': (datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 365))).strftime('%Y-%m-%d')}
+                for p in range(k)
+            ],
+            'statements': [
+                {'title': f"Statement {s + 1}", 'content': "Synthetic personal statement. " * 20,
+                 'target_school': None, 'version': '1.0'}
+                for s in range(k)
+            ],
+        })
+    return users
+
+
+def generate_dataset(n_schools: int, n_users: int, k_per_user: int, seed: int = 42) -> Dict[str, Any]:
+    """Generate a full dataset: n schools of each level, n_users users with k rows each"""
+    return {
+        'kindergartens': generate_schools(n_schools, 'kindergarten', seed),
+        'primary_schools': generate_schools(n_schools, 'primary', seed),
+        'users': generate_users(n_users, k_per_user, seed),
+        'params': {'n_schools': n_schools, 'n_users': n_users, 'k_per_user': k_per_user, 'seed': seed},
+    }
+
+
+def seed_sqlite_schools(conn: sqlite3.Connection, dataset: Dict[str, Any]):
+    """Create and fill the kindergartens/primary_schools tables on a SQLite connection"""
+    cursor = conn.cursor()
+    columns_sql = ', '.join(f"{col} TEXT" if col != 'school_no' else "school_no TEXT UNIQUE" for col in SCHOOL_COLUMNS)
+    placeholders = ', '.join('?' for _ in SCHOOL_COLUMNS)
+    for table in ('kindergartens', 'primary_schools'):
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns_sql})")
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(SCHOOL_COLUMNS)}) VALUES ({placeholders})",
+            [[school[col] for col in SCHOOL_COLUMNS] for school in dataset[table]]
+        )
+    conn.commit()
+
+
+def seed_supabase_schools(client, dataset: Dict[str, Any]):
+    """Insert the school reference tables through a supabase-style client"""
+    for table in ('kindergartens', 'primary_schools'):
+        client.table(table).insert(dataset[table]).execute()
+
+
+def seed_users(manager, dataset: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Register the dataset's users through a manager's public API
+
+    Works with DatabaseManager, CloudDatabaseManager and SupabaseDatabaseManager.
+    Returns [{'user_id', 'email', 'child_ids'}] for the seeded users.
+    """
+    schools = dataset['kindergartens'] or dataset['primary_schools']
+    seeded = []
+    for user in dataset['users']:
+        manager.register_user(user['name'], user['email'], user['phone'], user['password'])
+        success, _, account = manager.login_user(user['email'], user['password'])
+        if not success or not account:
+            continue
+        user_id = account['id']
+
+        for child in user['children']:
+            manager.add_child_profile(user_id, child['child_name'], child['date_of_birth'], child['gender'])
+        child_ids = [child['id'] for child in manager.get_child_profiles(user_id)]
+        if not child_ids:
+            continue
+
+        for n, index in enumerate(user['tracked']):
+            if schools:
+                school = schools[index % len(schools)]
+                manager.add_to_tracker(user_id, school['school_no'], school['name_en'])
+        for notification in user['notifications']:
+            manager.add_notification(user_id, notification['title'], notification['message'], notification['priority'])
+        for n, item in enumerate(user['portfolio']):
+            manager.add_portfolio_item(user_id, child_ids[n % len(child_ids)], item['title'], item['description'],
+                                       item['category'], item['item_date'])
+        for n, statement in enumerate(user['statements']):
+            manager.add_personal_statement(user_id, child_ids[n % len(child_ids)], statement['title'],
+                                           statement['content'], statement['target_school'], statement['version'])
+        if schools:
+            school = schools[user_id % len(schools)]
+            manager.submit_application(user_id, child_ids[0], school['school_no'], school['name_en'],
+                                       user['name'], user['email'], user['phone'], '2025-09-01')
+
+        seeded.append({'user_id': user_id, 'email': user['email'], 'child_ids': child_ids})
+    return seeded
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Crawl Frontier Test Script
+Checks URL canonicalization, queue order, per-page commit batching and
+resuming an interrupted run
+"""
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from crawl_frontier import CrawlFrontier, LISTING_PRIORITY, canonicalize_url
+
+LISTING = "https://www.schooland.hk/ps/district/central"
+
+
+def new_frontier(path=None):
+    path = path or Path(tempfile.mkdtemp()) / 'frontier.db'
+    return CrawlFrontier(path, 'test'), path
+
+
+def test_canonical_urls():
+    assert canonicalize_url('HTTPS://Example.com:443/a%7eb?utm_source=x&b=2&a=1#top') == \
+        'https://example.com/a~b?a=1&b=2'
+    # Relative links resolve against the page they were found on
+    assert canonicalize_url('st-pauls', LISTING + '/') == 'https://www.schooland.hk/ps/district/central/st-pauls'
+    assert canonicalize_url('../st-pauls', LISTING + '/') == 'https://www.schooland.hk/ps/district/st-pauls'
+    print("✓ Links to the same page share one canonical URL")
+
+
+def test_queue_order_and_duplicates():
+    frontier, _ = new_frontier()
+    frontier.begin_run()
+    detail = frontier.add('/ps/a')  # no base: kept as given
+    frontier.add(LISTING, LISTING_PRIORITY, kind='listing')
+    assert frontier.add('/ps/a') == detail
+    assert frontier.pop().url == LISTING
+    assert frontier.pop().url == detail
+    assert frontier.pop() is None
+    assert frontier.stats()['duplicates_skipped'] == 1
+    print("✓ Listings come first and duplicate links are skipped")
+
+
+def test_batch_commits_once_per_page():
+    frontier, path = new_frontier()
+    frontier.begin_run()
+    frontier.add(LISTING, LISTING_PRIORITY, kind='listing')
+    entry = frontier.pop()
+    reader = sqlite3.connect(str(path))
+    with frontier.batch():
+        for name in ('a', 'b', 'c'):
+            frontier.add(name, base=LISTING + '/')
+        frontier.complete(entry.url, ['a', 'b', 'c'], kind='listing')
+        # Nothing the page found is visible to other connections yet
+        assert reader.execute("SELECT COUNT(*) FROM frontier WHERE kind = 'detail'").fetchone() == (0,)
+    assert reader.execute("SELECT COUNT(*) FROM frontier WHERE kind = 'detail'").fetchone() == (3,)
+    assert frontier.is_visited(entry.url)
+    print("✓ A page's links and result are committed together")
+
+
+def test_interrupted_page_is_fetched_again_on_resume():
+    frontier, path = new_frontier()
+    frontier.begin_run()
+    frontier.add(LISTING, LISTING_PRIORITY, kind='listing')
+    entry = frontier.pop()
+    try:
+        with frontier.batch():
+            frontier.add('a', base=LISTING + '/')
+            raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+    frontier.close()
+
+    frontier, _ = new_frontier(path)
+    assert frontier.begin_run(resume=True)
+    assert frontier.pop().url == entry.url
+    assert frontier.pop() is None
+    print("✓ A page interrupted mid-batch goes back in the queue")
+
+
+if __name__ == "__main__":
+    print("=== Crawl Frontier Test Script ===")
+    test_canonical_urls()
+    test_queue_order_and_duplicates()
+    test_batch_commits_once_per_page()
+    test_interrupted_page_is_fetched_again_on_resume()
+    print("\n=== Test Complete ===")
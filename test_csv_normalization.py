@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+CSV Normalization Test Script
+Checks that the encoding of an EDB export is judged from the whole file and
+that an undecodable file is not imported in part
+"""
+
+import os
+import tempfile
+
+from csv_normalization import ENCODING_SAMPLE_BYTES, detect_encoding, iter_normalized_chunks
+
+HEADER = 'School No.,School Name (English),School Name (Chinese),District\n'
+
+
+def write_csv(data):
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_big5_export_is_read_as_big5():
+    path = write_csv((HEADER + '1,Sample School,聖保羅小學,灣仔\n').encode('big5'))
+    assert detect_encoding(path) == 'big5'
+    schools = [school for chunk in iter_normalized_chunks(path, 'test') for school in chunk]
+    assert schools[0]['name_tc'] == '聖保羅小學'
+    print("✓ Big5 exports are decoded as Big5")
+
+
+def test_bad_byte_after_the_first_block():
+    # Plain ASCII for more than one block, then a Big5 name
+    rows = ''.join(f'{i},School {i},,Central\n' for i in range(ENCODING_SAMPLE_BYTES // 20))
+    data = (HEADER + rows).encode('ascii') + '99999,Late School,灣仔小學,灣仔\n'.encode('big5')
+    assert len(data) > ENCODING_SAMPLE_BYTES
+    path = write_csv(data)
+    assert detect_encoding(path) == 'big5'
+    print("✓ Encoding is checked beyond the first block")
+
+
+def test_undecodable_file_yields_nothing():
+    path = write_csv(HEADER.encode('ascii') + b'1,School,\xff\xff\xff,Central\n')
+    yielded = []
+    try:
+        for chunk in iter_normalized_chunks(path, 'test'):
+            yielded.extend(chunk)
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+    assert yielded == []
+    print("✓ An undecodable file raises before any row is yielded")
+
+
+if __name__ == "__main__":
+    print("=== CSV Normalization Test Script ===")
+    test_big5_export_is_read_as_big5()
+    test_bad_byte_after_the_first_block()
+    test_undecodable_file_yields_nothing()
+    print("\n=== Test Complete ===")
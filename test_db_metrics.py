@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Database Metrics Test Script
+Checks that instrumented manager methods are timed and counted once, and
+that failures and returned rows are recorded
+"""
+
+from db_metrics import MetricsRegistry, instrument
+
+
+class InnerManager:
+    def get_items(self, user_id):
+        return [{'id': 1}, {'id': 2}]
+
+    def add_item(self, user_id):
+        return False, "duplicate"
+
+
+class OuterManager:
+    """Delegates like CloudDatabaseManager does to its storage manager"""
+
+    def __init__(self, metrics, instrument_inner):
+        self.storage_manager = InnerManager()
+        if instrument_inner:
+            instrument(self.storage_manager, 'supabase', metrics)
+        instrument(self, 'supabase', metrics)
+
+    def get_items(self, user_id):
+        return self.storage_manager.get_items(user_id)
+
+    def add_item(self, user_id):
+        return self.storage_manager.add_item(user_id)
+
+
+def calls(metrics):
+    return {(row['manager'], row['method']): row for row in metrics.snapshot()}
+
+
+def test_calls_rows_and_failures_are_recorded():
+    metrics = MetricsRegistry(enabled=True)
+    manager = OuterManager(metrics, instrument_inner=False)
+    manager.get_items(1)
+    manager.get_items(1)
+    manager.add_item(1)
+
+    recorded = calls(metrics)
+    assert set(recorded) == {('OuterManager', 'get_items'), ('OuterManager', 'add_item')}
+    assert recorded[('OuterManager', 'get_items')]['calls'] == 2
+    assert recorded[('OuterManager', 'get_items')]['rows'] == 4
+    assert recorded[('OuterManager', 'add_item')]['failures'] == 1
+    assert sum(row['calls'] for row in metrics.snapshot()) == 3
+    assert 'school_portal_db_call_duration_seconds_count{manager="OuterManager",backend="supabase",method="get_items"} 2' \
+        in metrics.to_prometheus()
+    print("✓ Each delegated call is counted once, with rows and failures")
+
+
+def test_disabled_registry_leaves_methods_alone():
+    metrics = MetricsRegistry(enabled=False)
+    manager = OuterManager(metrics, instrument_inner=True)
+    assert 'get_items' not in vars(manager)
+    manager.get_items(1)
+    assert metrics.snapshot() == []
+    print("✓ Disabled metrics do not wrap anything")
+
+
+if __name__ == "__main__":
+    print("=== Database Metrics Test Script ===")
+    test_calls_rows_and_failures_are_recorded()
+    test_disabled_registry_leaves_methods_alone()
+    print("\n=== Test Complete ===")
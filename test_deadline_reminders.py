@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Deadline Reminder Test Script
+Drives the reminder engine with fixed clocks: batching per user, catch-up
+for late tracking, untracking, and retrying a failed delivery
+"""
+
+from datetime import datetime, timedelta
+
+from deadline_reminders import Reminder, ReminderEngine, event_dates, format_batch
+
+NOW = datetime(2024, 9, 1, 9, 0)
+
+
+class Outbox:
+    """notify() that records batches and can be made to fail"""
+
+    def __init__(self):
+        self.batches = []
+        self.failing = False
+
+    def __call__(self, user_id, reminders):
+        if self.failing:
+            raise ConnectionError("database unavailable")
+        self.batches.append((user_id, sorted((r.school_no, r.lead.days) for r in reminders)))
+
+
+def test_due_reminders_are_batched_per_user():
+    outbox = Outbox()
+    engine = ReminderEngine(outbox)
+    deadline = NOW + timedelta(days=10)
+    engine.track(1, 'S1', 'School One', {'application_deadline': deadline}, now=NOW)
+    engine.track(1, 'S2', 'School Two', {'interview_date': deadline}, now=NOW)
+    engine.track(2, 'S1', 'School One', {'application_deadline': deadline}, now=NOW)
+
+    assert engine.tick(NOW) == 0
+    assert engine.next_due() == deadline - timedelta(days=7)
+    assert engine.tick(deadline - timedelta(days=7)) == 3
+    assert sorted(outbox.batches) == [(1, [('S1', 7), ('S2', 7)]), (2, [('S1', 7)])]
+    assert engine.tick(deadline - timedelta(days=1)) == 3
+    assert len(outbox.batches) == 4
+    print("✓ One notification per user per tick")
+
+
+def test_batch_format():
+    deadline = NOW + timedelta(days=1)
+    reminders = [
+        Reminder(1, 'S2', 'School Two', 'interview_date', deadline + timedelta(days=2), timedelta(days=7), 1),
+        Reminder(1, 'S1', 'School One', 'application_deadline', deadline, timedelta(days=1), 1),
+    ]
+    title, message, priority = format_batch(reminders)
+    assert title == "2 upcoming school dates"
+    assert message.splitlines()[0] == "School One - Application deadline on 2024-09-02"
+    assert priority == 'high'
+    assert format_batch(reminders[:1]) == ("Interview: School Two", "School Two - Interview on 2024-09-04", 'medium')
+    print("✓ Batches are titled, ordered by date and prioritised")
+
+
+def test_catch_up_sends_only_the_nearest_passed_lead():
+    outbox = Outbox()
+    engine = ReminderEngine(outbox)
+    # Tracked three days before the deadline: the 7-day reminder is late
+    deadline = NOW + timedelta(days=3)
+    engine.track(1, 'S1', 'School One', {'application_deadline': deadline}, now=NOW)
+    assert engine.tick(NOW) == 1
+    assert outbox.batches == [(1, [('S1', 7)])]
+
+    # A bulk load after a restart does not catch up
+    engine = ReminderEngine(outbox)
+    engine.track(1, 'S1', 'School One', {'application_deadline': deadline}, now=NOW, catch_up=False)
+    assert engine.tick(NOW) == 0
+    assert engine.tick(deadline - timedelta(days=1)) == 1
+    print("✓ Late tracking catches up with a single reminder")
+
+
+def test_untracked_and_refreshed_pairs():
+    outbox = Outbox()
+    engine = ReminderEngine(outbox)
+    deadline = NOW + timedelta(days=10)
+    engine.track(1, 'S1', 'School One', {'application_deadline': deadline}, now=NOW)
+    engine.untrack(1, 'S1')
+    assert engine.tick(deadline) == 0
+
+    # Refreshing the dates after a reminder went out does not repeat it
+    engine.track(1, 'S1', 'School One', {'application_deadline': deadline}, now=NOW)
+    assert engine.tick(deadline - timedelta(days=7)) == 1
+    engine.track(1, 'S1', 'School One', {'application_deadline': deadline}, now=deadline - timedelta(days=6))
+    assert engine.tick(deadline - timedelta(days=6)) == 0
+    assert engine.tick(deadline - timedelta(days=1)) == 1
+    assert outbox.batches == [(1, [('S1', 7)]), (1, [('S1', 1)])]
+    print("✓ Untracked pairs get nothing and sent reminders are not repeated")
+
+
+def test_failed_delivery_is_retried_and_sent_is_pruned():
+    outbox = Outbox()
+    engine = ReminderEngine(outbox)
+    deadline = NOW + timedelta(days=10)
+    engine.track(1, 'S1', 'School One', {'application_deadline': deadline}, now=NOW)
+
+    outbox.failing = True
+    assert engine.tick(deadline - timedelta(days=7)) == 0
+    assert not engine.sent
+    outbox.failing = False
+    assert engine.tick(deadline - timedelta(days=7) + timedelta(hours=1)) == 1
+    assert outbox.batches == [(1, [('S1', 7)])]
+    assert len(engine.sent) == 1
+
+    assert engine.tick(deadline - timedelta(days=1)) == 1
+    # Once the event has passed its sent keys are dropped
+    assert engine.tick(deadline + timedelta(minutes=1)) == 0
+    assert not engine.sent
+    print("✓ Failed reminders are retried and sent keys expire with their event")
+
+
+def test_event_dates_prefer_the_listed_deadline():
+    dates = event_dates({'application_deadline': '2024-10-01', 'deadline': '2024-10-02', 'interview_date': ''})
+    assert dates == {'application_deadline': datetime(2024, 10, 1)}
+    print("✓ Event dates parsed from school records")
+
+
+if __name__ == "__main__":
+    print("=== Deadline Reminder Test Script ===")
+    test_due_reminders_are_batched_per_user()
+    test_batch_format()
+    test_catch_up_sends_only_the_nearest_passed_lead()
+    test_untracked_and_refreshed_pairs()
+    test_failed_delivery_is_retried_and_sent_is_pruned()
+    test_event_dates_prefer_the_listed_deadline()
+    print("\n=== Test Complete ===")
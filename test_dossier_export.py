@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Dossier Export Test Script
+Builds a child's dossier ZIP from a small in-memory backend and checks its
+contents, attachment copies, reuse of an unchanged export and rebuilding
+after a change
+"""
+
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+from dossier_export import COPY_CHUNK_BYTES, export_dossier
+
+CHILD = {'id': 7, 'child_name': 'Amy Lee'}
+
+
+class Backend:
+    """Answers fetch_many() from lists, like CloudDatabaseManager would"""
+
+    def __init__(self, items, statements, applications):
+        self.rows = {'get_portfolio_items': items, 'get_personal_statements': statements,
+                     'get_applications': applications}
+
+    def fetch_many(self, reads):
+        return {name: [dict(row) for row in self.rows[method]] for name, (method, *args) in reads.items()}
+
+
+def make_backend(directory):
+    drawing = directory / 'drawing.png'
+    drawing.write_bytes(os.urandom(COPY_CHUNK_BYTES * 2 + 123))
+    essay = directory / 'essay.txt'
+    essay.write_text('My summer holiday\n' * 1000, encoding='utf-8')
+    items = [
+        {'id': 1, 'title': 'Drawing', 'attachment_path': str(drawing)},
+        {'id': 2, 'title': 'Essay', 'attachment_path': str(essay)},
+        {'id': 3, 'title': 'Lost certificate', 'attachment_path': str(directory / 'gone.pdf')},
+    ]
+    statements = [{'id': 4, 'title': 'Why this school?', 'content': 'Because it has a garden.'}]
+    applications = [{'id': 5, 'child_id': 7, 'school_name': 'St. Paul'},
+                    {'id': 6, 'child_id': 8, 'school_name': 'Other child'}]
+    return Backend(items, statements, applications), drawing
+
+
+def test_dossier_contents():
+    directory = Path(tempfile.mkdtemp())
+    backend, drawing = make_backend(directory)
+    path = export_dossier(backend, 1, CHILD, directory / 'exports')
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        manifest = json.loads(archive.read('manifest.json'))
+        assert manifest['attachments'] == ['portfolio/attachments/1_drawing.png',
+                                           'portfolio/attachments/2_essay.txt']
+        assert manifest['missing_attachments'] == [str(directory / 'gone.pdf')]
+        # Copied in chunks but byte for byte; already-compressed formats are stored
+        assert archive.read('portfolio/attachments/1_drawing.png') == drawing.read_bytes()
+        assert archive.getinfo('portfolio/attachments/1_drawing.png').compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo('portfolio/attachments/2_essay.txt').compress_type == zipfile.ZIP_DEFLATED
+        assert archive.read('personal_statements/4_Why_this_school.txt') == b'Because it has a garden.'
+        applications = json.loads(archive.read('applications.json'))
+        assert [application['id'] for application in applications] == [5]
+    print("✓ The dossier holds attachments, statements and the child's applications")
+
+
+def test_unchanged_dossier_is_reused():
+    directory = Path(tempfile.mkdtemp())
+    backend, _ = make_backend(directory)
+    export_dir = directory / 'exports'
+    path = export_dossier(backend, 1, CHILD, export_dir)
+    built_at = path.stat().st_mtime_ns
+
+    assert export_dossier(backend, 1, CHILD, export_dir) == path
+    assert path.stat().st_mtime_ns == built_at
+
+    # A changed statement means a new archive, and the old one is removed
+    backend.rows['get_personal_statements'][0]['content'] = 'Because of its library.'
+    rebuilt = export_dossier(backend, 1, CHILD, export_dir)
+    assert rebuilt != path
+    assert sorted(export_dir.iterdir()) == [rebuilt]
+    print("✓ An unchanged dossier is reused and a changed one rebuilt")
+
+
+if __name__ == "__main__":
+    print("=== Dossier Export Test Script ===")
+    test_dossier_contents()
+    test_unchanged_dossier_is_reused()
+    print("\n=== Test Complete ===")
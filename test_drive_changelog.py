@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Drive Change Log Test Script
+Replays segments between sessions that share a base database, using an
+in-memory stand-in for Google Drive
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from drive_changelog import DriveChangeLog
+
+SCHEMA = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        full_name TEXT
+    );
+    CREATE TABLE child_profiles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        full_name TEXT NOT NULL
+    );
+'''
+
+
+class FakeDrive:
+    """Segments kept in memory, in the shape CloudSQLiteManager returns them"""
+
+    def __init__(self):
+        self.db_name = 'test.db'
+        self.segments = []
+
+    def upload_segment(self, name, data):
+        self.segments.append({'id': name, 'name': name, 'createdTime': '', 'data': data})
+        return True
+
+    def list_segments(self):
+        return sorted(self.segments, key=lambda seg: seg['name'])
+
+    def download_segment(self, segment_id):
+        return next(seg['data'] for seg in self.segments if seg['id'] == segment_id)
+
+    def get_base_metadata(self):
+        return {}
+
+
+def open_session(drive, base_path, directory, name):
+    """A session working on its own copy of the base database"""
+    path = os.path.join(directory, f'{name}.db')
+    shutil.copyfile(base_path, path)
+    conn = sqlite3.connect(path)
+    log = DriveChangeLog(drive, conn, session_id=name)
+    assert log.install()
+    return conn, log
+
+
+def add_user(conn, email, name):
+    cursor = conn.execute('INSERT INTO users (username, email, full_name) VALUES (?, ?, ?)',
+                          (email, email, name))
+    user_id = cursor.lastrowid
+    conn.execute('INSERT INTO child_profiles (user_id, full_name) VALUES (?, ?)', (user_id, f'{name} Jr'))
+    conn.commit()
+    return user_id
+
+
+def families(conn):
+    """{email: [child names]} joined through the local ids"""
+    rows = conn.execute('''
+        SELECT u.email, c.full_name FROM users u JOIN child_profiles c ON c.user_id = u.id
+        ORDER BY u.email, c.full_name
+    ''').fetchall()
+    result = {}
+    for email, child in rows:
+        result.setdefault(email, []).append(child)
+    return result
+
+
+def make_base(directory):
+    base_path = os.path.join(directory, 'base.db')
+    conn = sqlite3.connect(base_path)
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT INTO users (username, email, full_name) VALUES ('old', 'old@example.com', 'Old')")
+    conn.commit()
+    DriveChangeLog(None, conn).install()
+    conn.close()
+    return base_path
+
+
+def test_install_leaves_installed_database_unchanged():
+    directory = tempfile.mkdtemp()
+    base_path = make_base(directory)
+    before = hashlib.md5(open(base_path, 'rb').read()).hexdigest()
+    conn = sqlite3.connect(base_path)
+    assert DriveChangeLog(None, conn).install()
+    conn.close()
+    assert hashlib.md5(open(base_path, 'rb').read()).hexdigest() == before
+    print("✓ install() is a no-op on an installed database")
+
+
+def test_same_local_ids_stay_separate_rows():
+    directory = tempfile.mkdtemp()
+    drive = FakeDrive()
+    base_path = make_base(directory)
+    conn_a, log_a = open_session(drive, base_path, directory, 'a')
+    conn_b, log_b = open_session(drive, base_path, directory, 'b')
+
+    # Both sessions register a user; each gets local id 2
+    assert add_user(conn_a, 'alice@example.com', 'Alice') == add_user(conn_b, 'bob@example.com', 'Bob')
+    log_a.sync()
+    log_b.sync()
+    log_a.pull()
+
+    expected = {
+        'alice@example.com': ['Alice Jr'],
+        'bob@example.com': ['Bob Jr'],
+    }
+    assert families(conn_a) == expected
+    assert families(conn_b) == expected
+
+    # A edits Bob, whose local id differs between A and B
+    conn_a.execute("UPDATE users SET full_name = 'Robert' WHERE email = 'bob@example.com'")
+    conn_a.commit()
+    log_a.sync()
+    log_b.pull()
+    assert conn_b.execute("SELECT full_name FROM users WHERE email = 'bob@example.com'").fetchone() == ('Robert',)
+    assert conn_b.execute("SELECT full_name FROM users WHERE email = 'alice@example.com'").fetchone() == ('Alice',)
+
+    # A late session on the original base replays everything
+    conn_c, log_c = open_session(drive, base_path, directory, 'c')
+    log_c.pull()
+    assert families(conn_c) == expected
+    assert conn_c.execute('SELECT COUNT(*) FROM users').fetchone() == (3,)
+    assert conn_c.execute("SELECT full_name FROM users WHERE email = 'bob@example.com'").fetchone() == ('Robert',)
+    print("✓ Rows inserted under the same local id stay separate")
+
+
+def test_deletes_follow_the_global_key():
+    directory = tempfile.mkdtemp()
+    drive = FakeDrive()
+    base_path = make_base(directory)
+    conn_a, log_a = open_session(drive, base_path, directory, 'a')
+    conn_b, log_b = open_session(drive, base_path, directory, 'b')
+
+    add_user(conn_a, 'alice@example.com', 'Alice')
+    add_user(conn_b, 'bob@example.com', 'Bob')
+    log_a.sync()
+    log_b.sync()
+
+    # B deletes Alice's child; in B it has a different id than in A
+    conn_b.execute("DELETE FROM child_profiles WHERE full_name = 'Alice Jr'")
+    conn_b.commit()
+    log_b.sync()
+    log_a.pull()
+    assert families(conn_a) == {'bob@example.com': ['Bob Jr']}
+    print("✓ Deletes remove the same entity in every session")
+
+
+def test_same_email_is_merged():
+    directory = tempfile.mkdtemp()
+    drive = FakeDrive()
+    base_path = make_base(directory)
+    conn_a, log_a = open_session(drive, base_path, directory, 'a')
+    conn_b, log_b = open_session(drive, base_path, directory, 'b')
+
+    add_user(conn_a, 'same@example.com', 'First')
+    add_user(conn_b, 'same@example.com', 'Second')
+    log_a.sync()
+    log_b.sync()
+    log_a.pull()
+
+    # One account, both children attached to it
+    assert conn_a.execute("SELECT COUNT(*) FROM users WHERE email = 'same@example.com'").fetchone() == (1,)
+    assert families(conn_a) == {'same@example.com': ['First Jr', 'Second Jr']}
+    assert not log_a.conflicts
+    print("✓ Registrations with the same email merge into one user")
+
+
+if __name__ == "__main__":
+    print("=== Drive Change Log Test Script ===")
+    test_install_leaves_installed_database_unchanged()
+    test_same_local_ids_stay_separate_rows()
+    test_deletes_follow_the_global_key()
+    test_same_email_is_merged()
+    print("\n=== Test Complete ===")
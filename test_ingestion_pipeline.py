@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Ingestion Pipeline Test Script
+Checks that the prefetching source thread hands over every item, re-raises
+source errors in the consumer and exits when the consumer stops early
+"""
+
+import threading
+import time
+
+from ingestion_pipeline import prefetch
+
+
+def source_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'pipeline-source']
+
+
+def wait_for_source_threads(timeout=5.0):
+    deadline = time.time() + timeout
+    while source_threads() and time.time() < deadline:
+        time.sleep(0.05)
+    return source_threads()
+
+
+def test_items_arrive_in_order():
+    assert list(prefetch(iter(range(100)), queue_size=4)) == list(range(100))
+    assert not wait_for_source_threads()
+    print("✓ Every item is handed over in order")
+
+
+def failing_source():
+    yield 1
+    raise ValueError("listing page changed")
+
+
+def test_source_errors_reach_the_consumer():
+    received = []
+    try:
+        for item in prefetch(failing_source(), queue_size=1):
+            received.append(item)
+        raise AssertionError("expected ValueError")
+    except ValueError as e:
+        assert str(e) == "listing page changed"
+    assert received == [1]
+    print("✓ Source exceptions are re-raised in the consumer")
+
+
+def test_producer_exits_when_consumer_stops_early():
+    # The buffer is full when the source ends, and again when it fails
+    for source in (iter([1, 2]), failing_source()):
+        stream = prefetch(source, queue_size=1)
+        assert next(stream) == 1
+        time.sleep(0.1)
+        stream.close()
+        assert not wait_for_source_threads(), "source thread still blocked on a full buffer"
+    print("✓ The source thread exits when nobody reads the buffer any more")
+
+
+if __name__ == "__main__":
+    print("=== Ingestion Pipeline Test Script ===")
+    test_items_arrive_in_order()
+    test_source_errors_reach_the_consumer()
+    test_producer_exits_when_consumer_stops_early()
+    print("\n=== Test Complete ===")
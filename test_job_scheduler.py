@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Job Scheduler Test Script
+Runs small jobs through the scheduler's worker pool and checks the run
+history, job locks, missed slots and recovery from a crashed worker
+"""
+
+import os
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from job_scheduler import FAILED, OK, SKIPPED, Job, JobScheduler
+
+
+def quick_job():
+    return 'done'
+
+
+def crashing_job():
+    # Kills the worker process, which breaks the pool
+    os._exit(1)
+
+
+def make_scheduler(*jobs):
+    return JobScheduler(list(jobs), Path(tempfile.mkdtemp()) / 'scheduler.db', max_workers=1)
+
+
+def statuses(scheduler, name):
+    return [run['status'] for run in reversed(scheduler.history(name))]
+
+
+def test_run_is_recorded_and_lock_released():
+    scheduler = make_scheduler(Job('quick', 'test_job_scheduler:quick_job', every=60))
+    try:
+        assert scheduler.run_now('quick')
+        # The lock is held while the run is in progress
+        assert not scheduler.run_now('quick')
+        scheduler.collect(wait=True)
+        assert statuses(scheduler, 'quick') == [OK]
+        job = scheduler.status()[0]
+        assert job['lock_owner'] is None and job['last_status'] == OK
+        assert scheduler.run_now('quick')
+    finally:
+        scheduler.shutdown()
+    print("✓ Runs are recorded and only one runs at a time")
+
+
+def test_missed_slots():
+    catch_up = Job('catch_up', 'test_job_scheduler:quick_job', every=60)
+    skip = Job('skip', 'test_job_scheduler:quick_job', every=60, catch_up=False)
+    scheduler = make_scheduler(catch_up, skip)
+    try:
+        later = datetime.now() + timedelta(hours=2)
+        assert scheduler.tick(later) == 1
+        scheduler.collect(wait=True)
+        assert statuses(scheduler, 'skip') == [SKIPPED]
+        assert statuses(scheduler, 'catch_up') == [OK]
+        assert scheduler.history('catch_up')[0]['catch_up'] == 1
+    finally:
+        scheduler.shutdown()
+    print("✓ Missed slots are caught up once or recorded as skipped")
+
+
+def test_crashed_worker_does_not_stop_the_scheduler():
+    scheduler = make_scheduler(Job('crash', 'test_job_scheduler:crashing_job', every=60),
+                               Job('quick', 'test_job_scheduler:quick_job', every=60))
+    try:
+        assert scheduler.run_now('crash')
+        scheduler.collect(wait=True)
+        assert statuses(scheduler, 'crash') == [FAILED]
+        assert scheduler.pool is None
+
+        # A fresh pool runs the next job
+        assert scheduler.run_now('quick')
+        scheduler.collect(wait=True)
+        assert statuses(scheduler, 'quick') == [OK]
+    finally:
+        scheduler.shutdown()
+    print("✓ A crashed worker fails its run and the pool is replaced")
+
+
+class BrokenPool:
+    def submit(self, *args):
+        raise BrokenProcessPool("a child process terminated abruptly")
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def test_submit_to_broken_pool_releases_the_lock():
+    scheduler = make_scheduler(Job('quick', 'test_job_scheduler:quick_job', every=60))
+    try:
+        scheduler.pool = BrokenPool()
+        assert not scheduler.run_now('quick')
+        assert statuses(scheduler, 'quick') == [FAILED]
+        assert scheduler.status()[0]['lock_owner'] is None
+        assert scheduler.pool is None
+        assert scheduler.run_now('quick')
+        scheduler.collect(wait=True)
+        assert statuses(scheduler, 'quick') == [FAILED, OK]
+    finally:
+        scheduler.shutdown()
+    print("✓ A run rejected by a broken pool is failed and its lock released")
+
+
+if __name__ == "__main__":
+    print("=== Job Scheduler Test Script ===")
+    test_run_is_recorded_and_lock_released()
+    test_missed_slots()
+    test_crashed_worker_does_not_stop_the_scheduler()
+    test_submit_to_broken_pool_releases_the_lock()
+    print("\n=== Test Complete ===")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Notification Archive Test Script
+Pages notifications with keyset cursors on SQLite and the Supabase fake,
+including many notifications sharing one timestamp, and archives old read
+notifications into monthly rows
+"""
+
+import json
+import sqlite3
+
+from database_cloud import CloudDatabaseManager
+from database_supabase import SupabaseDatabaseManager
+from notification_archive import bucket_notifications, merge_entries, page_with_cursor
+from supabase_fake import FakeSupabaseClient
+from user_data_cache import UserDataCache
+
+# 23 notifications over three timestamps, so pages split runs of equal created_at
+TIMESTAMPS = ['2024-09-01 08:00:00'] * 9 + ['2024-09-02 08:00:00'] * 10 + ['2024-09-03 08:00:00'] * 4
+
+
+def sqlite_manager():
+    manager = CloudDatabaseManager.__new__(CloudDatabaseManager)
+    manager.storage_manager = None
+    manager.storage_type = 'local'
+    manager.user_cache = UserDataCache(store={})
+    manager.conn = sqlite3.connect(':memory:')
+    manager._create_tables()
+    return manager
+
+
+def supabase_manager():
+    manager = SupabaseDatabaseManager.__new__(SupabaseDatabaseManager)
+    manager.supabase = FakeSupabaseClient()
+    return manager
+
+
+def add_notifications(manager, user_id=1):
+    rows = [{'user_id': user_id, 'title': f'n{i}', 'message': '', 'is_read': False, 'created_at': created_at}
+            for i, created_at in enumerate(TIMESTAMPS)]
+    if isinstance(manager, SupabaseDatabaseManager):
+        manager.supabase.table('notifications').insert(rows).execute()
+    else:
+        manager.conn.executemany(
+            'INSERT INTO notifications (user_id, title, message, is_read, created_at) VALUES (?, ?, ?, ?, ?)',
+            [(r['user_id'], r['title'], r['message'], r['is_read'], r['created_at']) for r in rows])
+        manager.conn.commit()
+
+
+def all_pages(manager, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, cursor = manager.get_notifications_page(1, cursor=cursor, limit=limit)
+        seen += [row['title'] for row in page]
+        pages += 1
+        if cursor is None:
+            return seen, pages
+
+
+def test_page_with_cursor():
+    rows = [{'id': 3, 'created_at': 'b'}, {'id': 2, 'created_at': 'a'}, {'id': 1, 'created_at': 'a'}]
+    assert page_with_cursor(rows, 3) == (rows, None)
+    assert page_with_cursor(rows, 2) == (rows[:2], ('a', 2))
+    print("✓ A limit + 1 fetch is trimmed to a page and a cursor")
+
+
+def test_paging_across_timestamp_ties():
+    expected = [f'n{i}' for i in sorted(range(len(TIMESTAMPS)), key=lambda i: (TIMESTAMPS[i], i), reverse=True)]
+    for manager in (sqlite_manager(), supabase_manager()):
+        add_notifications(manager)
+        titles, pages = all_pages(manager, limit=4)
+        assert titles == expected, type(manager).__name__
+        assert pages == 6
+    print("✓ Every notification appears exactly once across pages, ties included")
+
+
+def test_archive_moves_old_read_notifications():
+    manager = sqlite_manager()
+    manager.conn.executemany(
+        'INSERT INTO notifications (user_id, title, message, is_read, created_at) VALUES (?, ?, ?, ?, ?)',
+        [(1, 'old read', '', True, '2020-01-05 10:00:00'),
+         (1, 'old read too', '', True, '2020-01-20 10:00:00'),
+         (1, 'old unread', '', False, '2020-01-06 10:00:00'),
+         (1, 'other month', '', True, '2020-02-01 10:00:00')])
+    manager.conn.commit()
+
+    assert manager.archive_notifications(1) == 3
+    assert manager.archive_notifications(1) == 0
+    remaining = [row[0] for row in manager.conn.execute('SELECT title FROM notifications')]
+    assert remaining == ['old unread']
+    archive = {period: (json.loads(entries), count) for period, entries, count in
+               manager.conn.execute('SELECT period, entries, count FROM notifications_archive')}
+    assert [entry[2] for entry in archive['2020-01'][0]] == ['old read', 'old read too']
+    assert archive['2020-01'][1] == 2 and archive['2020-02'][1] == 1
+    print("✓ Old read notifications become one archive row per month")
+
+
+def test_merge_entries_is_idempotent():
+    rows = [{'id': 7, 'user_id': 1, 'title': 't', 'message': 'm', 'created_at': '2020-01-05 10:00:00'}]
+    entries = bucket_notifications(rows)[(1, '2020-01')]
+    merged = merge_entries(entries, entries)
+    assert merged == entries
+    assert merge_entries([], []) == []
+    print("✓ Archiving the same notification twice keeps one entry")
+
+
+if __name__ == "__main__":
+    print("=== Notification Archive Test Script ===")
+    test_page_with_cursor()
+    test_paging_across_timestamp_ties()
+    test_archive_moves_old_read_notifications()
+    test_merge_entries_is_idempotent()
+    print("\n=== Test Complete ===")
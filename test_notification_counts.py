@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Notification Count Test Script
+Checks that the materialized unread counts stay exact when notifications
+arrive through Drive change log replay
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+
+from database_cloud import create_notification_counts
+from test_drive_changelog import FakeDrive, open_session
+
+
+def make_base(directory):
+    base_path = os.path.join(directory, 'base.db')
+    conn = sqlite3.connect(base_path)
+    conn.executescript('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL
+        );
+        CREATE TABLE notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            title TEXT NOT NULL,
+            message TEXT NOT NULL,
+            is_read BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO users (username, email) VALUES ('parent', 'parent@example.com');
+    ''')
+    create_notification_counts(conn.cursor())
+    conn.commit()
+    conn.close()
+    return base_path
+
+
+def unread(conn):
+    counted = conn.execute('SELECT unread FROM notification_counts WHERE user_id = 1').fetchone()
+    actual = conn.execute('SELECT COUNT(*) FROM notifications WHERE user_id = 1 AND NOT is_read').fetchone()
+    return (counted[0] if counted else 0), actual[0]
+
+
+def test_counts_follow_replayed_changes():
+    directory = tempfile.mkdtemp()
+    drive = FakeDrive()
+    base_path = make_base(directory)
+    conn_a, log_a = open_session(drive, base_path, directory, 'a')
+    conn_b, log_b = open_session(drive, base_path, directory, 'b')
+
+    conn_a.executemany("INSERT INTO notifications (user_id, title, message) VALUES (1, ?, '')",
+                       [('Deadline',), ('Interview',)])
+    conn_a.commit()
+    log_a.sync()
+    log_b.pull()
+    assert unread(conn_b) == (2, 2)
+
+    # The same segment replayed again must not count twice
+    segment = drive.list_segments()[0]
+    changes = [json.loads(line) for line in gzip.decompress(segment['data']).decode('utf-8').splitlines()]
+    log_b.replay(changes)
+    assert unread(conn_b) == (2, 2)
+
+    # A marks one read and deletes the other
+    conn_a.execute("UPDATE notifications SET is_read = TRUE WHERE title = 'Deadline'")
+    conn_a.execute("DELETE FROM notifications WHERE title = 'Interview'")
+    conn_a.commit()
+    log_a.sync()
+    log_b.pull()
+    assert unread(conn_b) == (0, 0)
+    print("✓ Unread counts match the notifications after replay")
+
+
+if __name__ == "__main__":
+    print("=== Notification Count Test Script ===")
+    test_counts_follow_replayed_changes()
+    print("\n=== Test Complete ===")
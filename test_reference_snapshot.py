@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Reference Snapshot Test Script
+Checks the snapshot file format, serving a stale copy while the backend is
+down, and backing off after a failed cold start
+"""
+
+import tempfile
+from datetime import datetime, timedelta
+
+from reference_snapshot import ReferenceSnapshot, decode_snapshot, encode_snapshot
+
+ROWS = [
+    {'school_no': 'PS0001', 'district_en': 'Central', 'has_website': True, 'capacity': 1},
+    {'school_no': 'PS0002', 'district_en': 'Central', 'has_website': True, 'capacity': 1},
+    {'school_no': 'PS0003', 'district_en': 'Central', 'has_website': False, 'capacity': None},
+]
+
+
+class Backend:
+    """A fetch function that counts its calls and can be switched off"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.rows is None:
+            raise ConnectionError("backend down")
+        return self.rows
+
+
+def test_snapshot_round_trip():
+    fetched_at = datetime(2024, 9, 1, 8, 30)
+    snapshot = decode_snapshot(encode_snapshot(ROWS, fetched_at))
+    assert snapshot['fetched_at'] == fetched_at
+    assert snapshot['rows'] == ROWS
+    # True and 1 come back as their own types
+    assert snapshot['rows'][0]['has_website'] is True
+    assert snapshot['rows'][0]['capacity'] == 1 and snapshot['rows'][0]['capacity'] is not True
+    print("✓ Rows survive the columnar encoding")
+
+
+def test_stale_copy_served_while_backend_is_down():
+    directory = tempfile.mkdtemp()
+    ReferenceSnapshot('schools', directory, background=False).get(Backend(ROWS))
+
+    # A new process finds the file, then the backend fails on revalidation
+    snapshot = ReferenceSnapshot('schools', directory, background=False)
+    snapshot.get(Backend(ROWS))
+    snapshot.next_check_at = datetime.now() - timedelta(seconds=1)
+    down = Backend(None)
+    assert snapshot.get(down) == ROWS
+    assert snapshot.get(down) == ROWS
+    assert down.calls == 1
+    print("✓ Last good rows are served and the backend is left alone after a failure")
+
+
+def test_cold_start_backs_off_after_failure():
+    directory = tempfile.mkdtemp()
+    snapshot = ReferenceSnapshot('schools', directory, retry_after=60, background=False)
+    down = Backend(None)
+    assert snapshot.get(down) is None
+    assert snapshot.get(down) is None
+    assert snapshot.get(down) is None
+    assert down.calls == 1
+
+    # Once the retry delay is over the next caller fetches again
+    snapshot.next_check_at = datetime.now() - timedelta(seconds=1)
+    down.rows = ROWS
+    assert snapshot.get(down) == ROWS
+    assert down.calls == 2
+    print("✓ A failed cold start is not retried on every call")
+
+
+if __name__ == "__main__":
+    print("=== Reference Snapshot Test Script ===")
+    test_snapshot_round_trip()
+    test_stale_copy_served_while_backend_is_down()
+    test_cold_start_backs_off_after_failure()
+    print("\n=== Test Complete ===")
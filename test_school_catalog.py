@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+School Catalog Test Script
+Checks that catalog records read like the source row dicts, that lookups go
+through the indexes, and that the catalog cannot be changed through them
+"""
+
+from school_catalog import SchoolCatalog
+
+ROWS = [
+    {'school_no': 'PS0001', 'name_en': 'Alpha Primary', 'name_tc': '甲小學', 'district_en': 'Central',
+     'district_tc': '中西區', 'has_website': True, 'capacity': 1, 'tags': ['through-train']},
+    {'school_no': 'PS0002', 'name_en': 'Beta Primary', 'name_tc': '乙小學', 'district_en': 'Central',
+     'district_tc': '中西區', 'has_website': False, 'capacity': 600},
+    # A row from another source without the optional columns
+    {'school_no': 'PS0003', 'name_en': 'Gamma Primary', 'district_en': 'Sha Tin'},
+]
+
+
+def test_records_read_like_row_dicts():
+    catalog = SchoolCatalog(ROWS, 'primary_schools')
+    assert len(catalog) == 3
+    assert [dict(record) for record in catalog] == ROWS
+    gamma = catalog[2]
+    assert 'name_tc' not in gamma and gamma.get('name_tc', '') == ''
+    # True and 1 stay distinct even though they compare equal
+    assert catalog[0]['has_website'] is True and catalog[0]['capacity'] == 1
+    assert catalog[0]['capacity'] is not True
+    print("✓ Records have the same keys and values as their source rows")
+
+
+def test_indexed_lookups():
+    catalog = SchoolCatalog(ROWS)
+    assert catalog.get('PS0002')['name_en'] == 'Beta Primary'
+    assert catalog.get('PS9999') is None
+    assert catalog.find_by_name('甲小學')['school_no'] == 'PS0001'
+    assert catalog.find_by_name('Gamma Primary')['school_no'] == 'PS0003'
+    assert [school['school_no'] for school in catalog.in_district('中西區')] == ['PS0001', 'PS0002']
+    assert [school['school_no'] for school in catalog.in_district('Sha Tin')] == ['PS0003']
+    assert catalog.districts() == ['Central', 'Sha Tin']
+    assert catalog.column('name_tc') == ['甲小學', '乙小學', None]
+    print("✓ Lookups by number, name and district use the indexes")
+
+
+def test_catalog_is_read_only():
+    rows = [dict(row) for row in ROWS]
+    catalog = SchoolCatalog(rows)
+    record = catalog.get('PS0001')
+    try:
+        record['name_en'] = 'Changed'
+        raise AssertionError("expected TypeError")
+    except TypeError:
+        pass
+    copy = record.to_dict()
+    copy['name_en'] = 'Changed'
+    rows[0]['name_en'] = 'Changed in the source list'
+    assert catalog.get('PS0001')['name_en'] == 'Alpha Primary'
+    print("✓ Records cannot be modified and copies are independent")
+
+
+def test_shared_values_and_frame():
+    rows = [{'school_no': f'PS{i:04d}', 'district_en': ''.join(['Cen', 'tral'])} for i in range(50)]
+    catalog = SchoolCatalog(rows)
+    districts = catalog.column('district_en')
+    assert all(value is districts[0] for value in districts)
+
+    frame = catalog.frame()
+    assert catalog.frame() is frame
+    assert list(frame['school_no'][:2]) == ['PS0000', 'PS0001']
+    usage = catalog.memory_usage()
+    assert usage['rows'] == 50 and usage['frame_bytes'] > 0
+    print("✓ Equal values are stored once and the DataFrame is built once")
+
+
+if __name__ == "__main__":
+    print("=== School Catalog Test Script ===")
+    test_records_read_like_row_dicts()
+    test_indexed_lookups()
+    test_catalog_is_read_only()
+    test_shared_values_and_frame()
+    print("\n=== Test Complete ===")
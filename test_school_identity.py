@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+School Identity Test Script
+Checks that re-imports resolve to the same school keys: reordered input,
+lightly edited names and addresses, and EDB numbers taking precedence over
+content hashes
+"""
+
+import tempfile
+from pathlib import Path
+
+from school_identity import SchoolIdentity
+
+ST_PAULS = {'school_no': 'PS0001', 'name_en': "St. Paul's Primary School", 'district_en': 'Wan Chai',
+            'address_en': '12 Kennedy Road, HK', 'tel': '2525 1234'}
+KOWLOON_TONG = {'school_no': 'PS0002', 'name_en': 'Kowloon Tong Primary School', 'district_en': 'Kowloon City',
+                'address_en': '5 Cumberland Rd'}
+SHA_TIN = {'school_no': '123456', 'name_en': 'Sha Tin Methodist Primary School', 'district_en': 'Sha Tin',
+           'address_en': '1 Tai Wai Road'}
+
+
+def new_db():
+    return Path(tempfile.mkdtemp()) / 'identity.db'
+
+
+def import_keys(db_path, records):
+    """One import run: school_no -> stable key"""
+    identity = SchoolIdentity(db_path)
+    try:
+        return {record['name_en']: record['school_no']
+                for record in identity.assign(dict(record) for record in records)}
+    finally:
+        identity.close()
+
+
+def test_reordered_import_keeps_keys():
+    db_path = new_db()
+    first = import_keys(db_path, [ST_PAULS, KOWLOON_TONG, SHA_TIN])
+    # The positional PS000n numbers are not identities
+    assert first[ST_PAULS['name_en']].startswith('PS-')
+    assert first[SHA_TIN['name_en']] == '123456'
+    assert len(set(first.values())) == 3
+
+    renumbered = [dict(KOWLOON_TONG, school_no='PS0001'), dict(SHA_TIN), dict(ST_PAULS, school_no='PS0003')]
+    assert import_keys(db_path, renumbered) == first
+    print("✓ A reordered re-import gets the same keys")
+
+
+def test_edited_records_resolve_to_existing_key():
+    identity = SchoolIdentity(new_db())
+    try:
+        key = identity.key_for(ST_PAULS)
+        other = identity.key_for(KOWLOON_TONG)
+
+        # Misspelt name, same phone number
+        assert identity.key_for(dict(ST_PAULS, name_en="St. Pual's Primary School")) == key
+        # Same name, address reworded
+        assert identity.key_for(dict(ST_PAULS, address_en='12 Kennedy Road, Mid-Levels')) == key
+        assert identity.stats['matched'] == 2
+        # Both edits are remembered, so the next import finds them by hash
+        assert len(identity.aliases(key)) == 3
+        assert identity.key_for(dict(ST_PAULS, address_en='12 Kennedy Road, Mid-Levels')) == key
+        assert identity.stats['known'] == 1
+
+        # A different school in the same district gets its own key
+        assert identity.key_for(dict(ST_PAULS, name_en='Wan Chai Church Primary School', tel='')) not in (key, other)
+    finally:
+        identity.close()
+    print("✓ Lightly edited names and addresses keep their key")
+
+
+def test_edb_number_takes_precedence_over_hash():
+    identity = SchoolIdentity(new_db())
+    try:
+        content_key = identity.key_for(ST_PAULS)
+        assert identity.key_for(SHA_TIN) == '123456'
+        # St Paul's content under Sha Tin's number is Sha Tin, not St Paul's
+        assert identity.key_for(dict(ST_PAULS, school_no='123456')) == '123456'
+        # A renamed school keeps its number's key
+        assert identity.key_for(dict(SHA_TIN, name_en='Sha Tin Wesley Primary School')) == '123456'
+        assert identity.key_for(ST_PAULS) == content_key
+        # Neither a number nor a real name
+        assert identity.key_for({'school_no': 'PS0009', 'name_en': 'Primary School 9'}) is None
+    finally:
+        identity.close()
+    print("✓ EDB numbers win over content hashes")
+
+
+if __name__ == "__main__":
+    print("=== School Identity Test Script ===")
+    test_reordered_import_keeps_keys()
+    test_edited_records_resolve_to_existing_key()
+    test_edb_number_takes_precedence_over_hash()
+    print("\n=== Test Complete ===")
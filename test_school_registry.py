@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+School Registry Test Script
+Checks which records entity resolution merges: the same school spelt
+differently by EDB and Schooland.hk, schools sharing a switchboard number,
+oversized blocks, and the streaming deduper agreeing with cluster_records()
+"""
+
+from school_registry import SourceRecord, StreamingDeduper, cluster_records
+
+EDB_ST_PAULS = {'school_no': '111111', 'name_en': "St. Paul's Co-educational College Primary School",
+                'district_en': 'Central and Western', 'tel': '2523 1187', 'source': 'EDB Website'}
+SCHOOLAND_ST_PAULS = {'name_en': "St Paul's Co-educational College Primary School",
+                      'district': 'Central & Western', 'telephone': '', 'source': 'Schooland.hk'}
+
+# Names 0.85 alike, so only the shared phone number makes them one school
+EDB_KOWLOON_TONG = {'school_no': '222222', 'name_en': 'Kowloon Tong Government Primary School',
+                    'district_en': 'Kowloon City', 'tel': '2336 1234', 'source': 'EDB Website'}
+SCHOOLAND_KOWLOON_TONG = {'name_en': 'Kowloon Tong Govt Primary School', 'district': '九龍城',
+                          'telephone': '+852 2336 1234', 'source': 'Schooland.hk'}
+
+
+def clusters_of(records):
+    clusters, stats = cluster_records([SourceRecord(index, record) for index, record in enumerate(records)])
+    return [[member.index for member in cluster] for cluster in clusters], stats
+
+
+def switchboard_schools(count):
+    # Different schools of one sponsoring body, all listing its head office number
+    words = ['Grace', 'Faith', 'Light', 'Glory', 'Happy', 'Hope', 'Joy']
+    return [{'name_en': f'Tai Po Catholic {word} Primary School', 'district_en': 'Tai Po', 'tel': '2658 0000'}
+            for word in words[:count]]
+
+
+def test_cross_source_spellings_merge():
+    clusters, _ = clusters_of([EDB_ST_PAULS, SCHOOLAND_ST_PAULS, EDB_KOWLOON_TONG, SCHOOLAND_KOWLOON_TONG])
+    assert clusters == [[0, 1], [2, 3]]
+
+    # Without the phone number the Kowloon Tong names alone are not enough
+    clusters, _ = clusters_of([EDB_KOWLOON_TONG, dict(SCHOOLAND_KOWLOON_TONG, telephone='')])
+    assert clusters == [[0], [1]]
+    print("✓ EDB and Schooland.hk spellings of one school merge")
+
+
+def test_shared_switchboard_does_not_merge_schools():
+    # Two schools sharing a number are taken to be one...
+    clusters, _ = clusters_of(switchboard_schools(2))
+    assert clusters == [[0, 1]]
+    # ...but a number shared by more schools than MAX_IDENTIFYING_SHARE is no evidence
+    clusters, _ = clusters_of(switchboard_schools(7))
+    assert len(clusters) == 7
+    print("✓ A shared switchboard number does not merge different schools")
+
+
+def test_oversized_block_is_skipped():
+    records = [{'name_en': f'{number:03d} Academy', 'tel': '2345 6789'} for number in range(41)]
+    clusters, stats = clusters_of(records)
+    assert stats['oversized_blocks'] == 1
+    assert stats['comparisons'] == 0
+    assert len(clusters) == 41
+    print("✓ Blocks over MAX_BLOCK_SIZE are skipped")
+
+
+def test_streaming_deduper_agrees_with_clusters():
+    records = [EDB_ST_PAULS, EDB_KOWLOON_TONG, SCHOOLAND_ST_PAULS, dict(EDB_ST_PAULS),
+               SCHOOLAND_KOWLOON_TONG] + switchboard_schools(2)
+    clusters, _ = clusters_of(records)
+    deduper = StreamingDeduper()
+    kept = [index for index, record in enumerate(records) if not deduper.is_duplicate(record)]
+    assert kept == [cluster[0] for cluster in clusters] == [0, 1, 5]
+    assert deduper.duplicates == len(records) - len(clusters)
+    print("✓ StreamingDeduper keeps the first record of each cluster")
+
+
+if __name__ == "__main__":
+    print("=== School Registry Test Script ===")
+    test_cross_source_spellings_merge()
+    test_shared_switchboard_does_not_merge_schools()
+    test_oversized_block_is_skipped()
+    test_streaming_deduper_agrees_with_clusters()
+    print("\n=== Test Complete ===")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+SQLite Snapshot Test Script
+Tests hot snapshots, compression round trips and local retention
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from sqlite_snapshot import create_snapshot, decompress_file, file_md5, prune_snapshots
+
+
+def make_database(directory):
+    path = os.path.join(directory, 'live.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)')
+    conn.executemany('INSERT INTO users (email) VALUES (?)', [(f'user{i}@example.com',) for i in range(500)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def settings_for(directory, keep_local):
+    return {'COMPRESSION': 'gzip', 'KEEP_LOCAL': keep_local, 'KEEP_CLOUD': 10,
+            'DIR': os.path.join(directory, 'snapshots')}
+
+
+def test_snapshot_round_trip():
+    directory = tempfile.mkdtemp()
+    live_path = make_database(directory)
+    snapshot = create_snapshot(live_path, 'live.db', settings_for(directory, 5))
+    assert snapshot and snapshot['size'] < snapshot['raw_size']
+
+    restored = os.path.join(directory, 'restored.db')
+    decompress_file(snapshot['path'], restored, snapshot['compression'])
+    assert file_md5(restored) == snapshot['raw_md5']
+    conn = sqlite3.connect(restored)
+    assert conn.execute('SELECT COUNT(*) FROM users').fetchone() == (500,)
+    conn.close()
+    print("✓ Snapshot decompresses to the verified copy")
+
+
+def test_retention_keeps_the_current_snapshot():
+    directory = tempfile.mkdtemp()
+    live_path = make_database(directory)
+    settings = settings_for(directory, 2)
+    paths = [create_snapshot(live_path, 'live.db', settings)['path'] for _ in range(4)]
+    assert sorted(os.listdir(settings['DIR'])) == sorted(os.path.basename(p) for p in paths[-2:])
+
+    # Even with nothing to keep, the snapshot being uploaded survives
+    assert prune_snapshots(settings['DIR'], 'live.db.snapshot-', 0, current=os.path.basename(paths[-1])) == 1
+    assert os.listdir(settings['DIR']) == [os.path.basename(paths[-1])]
+    print("✓ Pruning never removes the current snapshot")
+
+
+if __name__ == "__main__":
+    print("=== SQLite Snapshot Test Script ===")
+    test_snapshot_round_trip()
+    test_retention_keeps_the_current_snapshot()
+    print("\n=== Test Complete ===")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Supabase Migration Test Script
+Migrates a small SQLite database into the in-process Supabase fake and
+checks foreign key remapping, archived notifications and resuming
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+
+from supabase_fake import FakeSupabaseClient
+from supabase_migration import SupabaseMigration, migrate_sqlite_to_supabase
+
+
+def make_source(directory):
+    path = os.path.join(directory, 'source.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT, email TEXT, password_hash TEXT, full_name TEXT, phone TEXT, created_at TEXT
+        );
+        CREATE TABLE child_profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER, child_name TEXT, date_of_birth TEXT, created_at TEXT
+        );
+        CREATE TABLE notifications_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER, period TEXT NOT NULL, entries TEXT NOT NULL, count INTEGER NOT NULL,
+            UNIQUE (user_id, period)
+        );
+    ''')
+    # Source ids 5 and 9, so they differ from the ids Supabase hands out
+    conn.executemany('INSERT INTO users (id, username, email, password_hash) VALUES (?, ?, ?, ?)',
+                     [(5, 'amy', 'amy@example.com', 'x'), (9, 'ben', 'ben@example.com', 'y')])
+    conn.executemany('INSERT INTO child_profiles (user_id, child_name, date_of_birth) VALUES (?, ?, ?)',
+                     [(5, 'Amy Jr', '2019-01-02'), (9, 'Ben Jr', '2020-03-04'), (42, 'Orphan', '2020-01-01')])
+    # [id, created_at, title, message], as bucket_notifications() writes them
+    entries = [[1, '2024-01-05 09:00:00', 'Deadline', 'Apply by Friday']]
+    conn.execute("INSERT INTO notifications_archive (user_id, period, entries, count) VALUES (9, '2024-01', ?, 1)",
+                 (json.dumps(entries),))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def rows(client, table):
+    return client.table(table).select('*').order('id').execute().data
+
+
+def test_foreign_keys_and_archive_are_remapped():
+    directory = tempfile.mkdtemp()
+    source = make_source(directory)
+    client = FakeSupabaseClient()
+    report = migrate_sqlite_to_supabase(client, source)
+
+    users = {user['email']: user['id'] for user in rows(client, 'users')}
+    children = {child['child_name']: child['user_id'] for child in rows(client, 'child_profiles')}
+    assert children == {'Amy Jr': users['amy@example.com'], 'Ben Jr': users['ben@example.com']}
+    assert report['child_profiles']['orphaned'] == 1
+
+    archive = rows(client, 'notifications_archive')
+    assert len(archive) == 1
+    assert archive[0]['user_id'] == users['ben@example.com']
+    assert archive[0]['period'] == '2024-01'
+    assert archive[0]['entries'] == [[1, '2024-01-05 09:00:00', 'Deadline', 'Apply by Friday']]
+    assert archive[0]['count'] == 1
+    print("✓ Foreign keys point at Supabase ids and archive entries arrive as JSON")
+
+
+def test_interrupted_migration_resumes_without_duplicates():
+    directory = tempfile.mkdtemp()
+    source = make_source(directory)
+    client = FakeSupabaseClient()
+    migrate_sqlite_to_supabase(client, source)
+
+    # Simulate a stop after the writes but before the child ids were recorded
+    state = sqlite3.connect(os.path.join(directory, 'source.migration.db'))
+    state.execute("DELETE FROM id_map WHERE source_table IN ('child_profiles', 'notifications_archive')")
+    state.commit()
+    state.close()
+
+    migration = SupabaseMigration(client, source)
+    try:
+        report = migration.run()
+    finally:
+        migration.close()
+    assert report['users']['resumed'] == 2
+    assert report['child_profiles']['existing'] == 2
+    assert report['child_profiles']['inserted'] == 0
+    assert report['notifications_archive']['existing'] == 1
+    assert len(rows(client, 'child_profiles')) == 2
+    assert len(rows(client, 'notifications_archive')) == 1
+
+    # A third run has nothing left to do
+    report = migrate_sqlite_to_supabase(client, source)
+    assert report['child_profiles']['resumed'] == 2
+    assert report['notifications_archive']['resumed'] == 1
+    print("✓ A resumed migration maps rows already written instead of inserting them again")
+
+
+if __name__ == "__main__":
+    print("=== Supabase Migration Test Script ===")
+    test_foreign_keys_and_archive_are_remapped()
+    test_interrupted_migration_resumes_without_duplicates()
+    print("\n=== Test Complete ===")
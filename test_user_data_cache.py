@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+User Data Cache Test Script
+Checks that cached rows cannot be changed through returned copies and that
+invalidation only drops the lists a write affects
+"""
+
+from user_data_cache import UserDataCache
+
+
+def test_returned_rows_are_copies():
+    cache = UserDataCache(store={})
+    rows = [{'id': 1, 'child_name': 'Amy'}]
+    cache.set(1, 'child_profiles', None, rows)
+    rows[0]['child_name'] = 'changed by the caller after set'
+
+    first = cache.get(1, 'child_profiles')
+    first[0]['child_name'] = 'changed by a page'
+    first.append({'id': 2})
+    assert cache.get(1, 'child_profiles') == [{'id': 1, 'child_name': 'Amy'}]
+    print("✓ Mutating returned rows leaves the cache untouched")
+
+
+def test_child_write_only_drops_that_childs_lists():
+    cache = UserDataCache(store={})
+    cache.set(1, 'child_profiles', None, [{'id': 10, 'child_name': 'Amy'}])
+    cache.set(1, 'applications', None, [{'id': 100, 'child_id': 10, 'child_name': 'Amy'}])
+    cache.set(2, 'child_profiles', None, [{'id': 20, 'child_name': 'Ben'}])
+    cache.set(2, 'applications', None, [{'id': 200, 'child_id': 20, 'child_name': 'Ben'}])
+
+    # What CloudDatabaseManager._invalidate_child does for child 10
+    assert cache.invalidate_row('child_profiles', 10) == [(1, 'child_profiles', None)]
+    assert cache.invalidate_row('applications', 10, column='child_id') == [(1, 'applications', None)]
+
+    assert cache.get(1, 'applications') is None
+    assert cache.get(2, 'applications') == [{'id': 200, 'child_id': 20, 'child_name': 'Ben'}]
+    assert cache.get(2, 'child_profiles') is not None
+    print("✓ Another user's applications stay cached")
+
+
+def test_expired_entries_miss():
+    cache = UserDataCache(store={}, ttl_seconds=300)
+    cache.set(1, 'unread_count', None, [3])
+    assert cache.get(1, 'unread_count') == [3]
+    assert cache.get(1, 'unread_count', ttl_seconds=-1) is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 0}
+    print("✓ Entries older than the TTL are refetched")
+
+
+if __name__ == "__main__":
+    print("=== User Data Cache Test Script ===")
+    test_returned_rows_are_copies()
+    test_child_write_only_drops_that_childs_lists()
+    test_expired_entries_miss()
+    print("\n=== Test Complete ===")
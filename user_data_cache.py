@@ -0,0 +1,153 @@
+"""
+Per-session User Data Cache
+Read-through cache for user-owned rows (child profiles, portfolio items,
+personal statements, applications, tracked schools) with write invalidation
+"""
+
+import time
+import threading
+import functools
+from typing import Optional, Dict, List, Any, Tuple
+
+import streamlit as st
+
+# Session state key holding the cache entries for the current browser session
+SESSION_CACHE_KEY = '_user_data_cache'
+
+# Entries older than this are refetched even without a local write, so that
+# changes made from other sessions (admin tools, scrapers) eventually show up
+DEFAULT_TTL_SECONDS = 300
+
+CacheKey = Tuple[Any, str, Any]
+
+
+def _copy_rows(rows: List) -> List:
+    """A new list of new row dicts, so callers and the cache never share a mutable row"""
+    return [dict(row) if isinstance(row, dict) else row for row in rows]
+
+
+def _get_session_store() -> Dict:
+    """Return the per-session cache dict, or a private dict outside Streamlit"""
+    try:
+        if SESSION_CACHE_KEY not in st.session_state:
+            st.session_state[SESSION_CACHE_KEY] = {}
+        return st.session_state[SESSION_CACHE_KEY]
+    except Exception:
+        # Not running inside a Streamlit session (scripts, tests)
+        return {}
+
+
+class UserDataCache:
+    """Cache of user-owned lists keyed by (user_id, entity, child_id)"""
+
+    def __init__(self, store: Optional[Dict] = None, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        # Resolve the store once so worker threads never touch st.session_state
+        self._store = store if store is not None else _get_session_store()
+        self._lock = threading.RLock()
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, entity: str, child_id=None, ttl_seconds: Optional[int] = None) -> Optional[List[Dict]]:
+        """Return copies of the cached rows, or None on a miss; ttl_seconds overrides the cache TTL"""
+        key = (user_id, entity, child_id)
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, rows = entry
+            if ttl_seconds and time.time() - stored_at > ttl_seconds:
+                del self._store[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return _copy_rows(rows)
+
+    def set(self, user_id, entity: str, child_id, rows: List[Dict]):
+        """Store rows for (user_id, entity, child_id)"""
+        with self._lock:
+            self._store[(user_id, entity, child_id)] = (time.time(), _copy_rows(rows))
+
+    def invalidate(self, user_id, entity: str, child_id=None):
+        """
+        Drop cached lists affected by a write for one user
+
+        A write scoped to a child also drops the user's unfiltered list for the
+        entity; a write without a child drops every list for the entity.
+        """
+        with self._lock:
+            for key in list(self._store.keys()):
+                key_user, key_entity, key_child = key
+                if key_user != user_id or key_entity != entity:
+                    continue
+                if child_id is None or key_child is None or key_child == child_id:
+                    del self._store[key]
+
+    def invalidate_row(self, entity: str, row_id, column: str = 'id') -> List[CacheKey]:
+        """
+        Drop cached lists that contain a row whose column equals row_id
+
+        Used by writes that only know the row id (update/delete by id); with
+        column='child_id' it finds the lists showing rows of one child. Lists
+        that never contained the row cannot be stale and are kept.
+        Returns the dropped keys so callers can invalidate dependent entities.
+        """
+        dropped = []
+        with self._lock:
+            for key, (_, rows) in list(self._store.items()):
+                if key[1] != entity:
+                    continue
+                if any(isinstance(row, dict) and row.get(column) == row_id for row in rows):
+                    del self._store[key]
+                    dropped.append(key)
+        return dropped
+
+    def invalidate_entity(self, entity: str):
+        """Drop every cached list for an entity regardless of user"""
+        with self._lock:
+            for key in list(self._store.keys()):
+                if key[1] == entity:
+                    del self._store[key]
+
+    def invalidate_user(self, user_id=None):
+        """Drop every entry for a user, or the whole cache if user_id is None"""
+        with self._lock:
+            if user_id is None:
+                self._store.clear()
+                return
+            for key in list(self._store.keys()):
+                if key[0] == user_id:
+                    del self._store[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current entry count"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._store)}
+
+
+def cached_read(entity: str):
+    """
+    Decorator for CloudDatabaseManager read methods taking (user_id, child_id=None)
+
+    The wrapped method's instance must expose a ``user_cache`` attribute.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, user_id, *args, **kwargs):
+            cache = getattr(self, 'user_cache', None)
+            if cache is None or user_id is None:
+                return func(self, user_id, *args, **kwargs)
+
+            child_id = args[0] if args else kwargs.get('child_id')
+            rows = cache.get(user_id, entity, child_id)
+            if rows is not None:
+                return rows
+
+            rows = func(self, user_id, *args, **kwargs)
+            if isinstance(rows, list):
+                cache.set(user_id, entity, child_id, rows)
+            return rows
+        return wrapper
+    return decorator